@@ -0,0 +1,486 @@
+import atexit
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import gzip
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.pdf_services import atomic_output
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:
+    Counter = Gauge = Histogram = None
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_LOG_MODES = ('sync', 'buffered', 'queue')
+# Activity logs with daily rollups and archives: core.ActivityLog and lsalms.StudentActivityLog.
+ACTIVITY_SOURCES = ('core', 'lms')
+ACTIVITY_ROLES = ('teacher', 'guardian', 'student')
+ARCHIVE_CHUNK_SIZE = 2000
+EVENT_FIELDS = ('user_id', 'activity_type', 'description', 'related_model', 'related_id', 'ip_address', 'user_agent')
+
+if Gauge is not None:
+    BUFFER_DEPTH = Gauge('lsa_activity_log_buffer_depth', 'Activity log events waiting to be written.')
+    FLUSH_SECONDS = Histogram('lsa_activity_log_flush_seconds', 'Time taken to write one batch of activity log events.')
+    EVENTS_WRITTEN = Counter('lsa_activity_log_events_written', 'Activity log events written or queued.')
+    EVENTS_DROPPED = Counter('lsa_activity_log_events_dropped', 'Activity log events dropped on buffer overflow.')
+else:
+    BUFFER_DEPTH = FLUSH_SECONDS = EVENTS_WRITTEN = EVENTS_DROPPED = None
+
+
+def activity_log_mode():
+    mode = getattr(settings, 'ACTIVITY_LOG_MODE', 'sync')
+    return mode if mode in ACTIVITY_LOG_MODES else 'sync'
+
+
+def build_activity_event(user, activity_type, description='', related_model='', related_id=None, request=None):
+    """The JSON-safe record of one activity, stamped with the time it happened."""
+    ip_address = None
+    user_agent = ''
+    if request:
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            ip_address = x_forwarded_for.split(',')[0]
+        else:
+            ip_address = request.META.get('REMOTE_ADDR')
+        user_agent = request.META.get('HTTP_USER_AGENT', '')
+    return {
+        'user_id': user.pk,
+        'activity_type': activity_type,
+        'description': description,
+        'related_model': related_model,
+        'related_id': related_id,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def write_activity_events(events):
+    """
+    Inserts activity events with a single bulk_create. Returns the number written. The insert
+    runs in its own savepoint, so a failure inside a caller's transaction does not abort it.
+    """
+    from core.models import ActivityLog
+
+    rows = [
+        ActivityLog(created_at=parse_datetime(event['created_at']), **{field: event.get(field) for field in EVENT_FIELDS})
+        for event in events
+    ]
+    with transaction.atomic():
+        ActivityLog.objects.bulk_create(rows)
+    return len(rows)
+
+
+class ActivityLogBuffer:
+    """
+    Per-process buffer of activity events. Events are written in one batch once `flush_every`
+    have collected or `flush_interval` seconds after the first pending one, whichever comes
+    first; a background timer covers the interval when no further events arrive. In 'queue'
+    mode each batch is handed to the Celery worker instead of being written here.
+
+    A batch that falls due inside a transaction is flushed once that transaction commits, never
+    inside it, so a rollback cannot take other requests' events with it; if it rolls back, the
+    events stay buffered for the timer.
+
+    A failed write puts the batch back (up to `max_events`, dropping the oldest beyond that) so
+    it is retried with the next flush. `stats()` reports the buffer depth and flush latency.
+    """
+
+    def __init__(self, flush_every=50, flush_interval=2.0, max_events=5000, mode='buffered'):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.mode = mode
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._events = []
+        self._first_event_at = None
+        self._timer = None
+        self._stats = {
+            'flushes': 0,
+            'events_written': 0,
+            'events_dropped': 0,
+            'failed_flushes': 0,
+            'last_flush_ms': None,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def _check_fork(self):
+        # A forked worker inherits the parent's pending events and lock; they belong to the parent.
+        if self._pid != os.getpid():
+            self._lock = threading.RLock()
+            self._reset()
+
+    def add(self, event):
+        self._check_fork()
+        with self._lock:
+            self._events.append(event)
+            if self._first_event_at is None:
+                self._first_event_at = time.monotonic()
+            self._trim()
+            due = len(self._events) >= self.flush_every or (
+                time.monotonic() - self._first_event_at >= self.flush_interval
+            )
+            deferred = due and connection.in_atomic_block
+            if not due or deferred:
+                self._start_timer()
+        if BUFFER_DEPTH is not None:
+            BUFFER_DEPTH.set(len(self._events))
+        if deferred:
+            transaction.on_commit(self.flush)
+        elif due:
+            self.flush()
+
+    def _trim(self):
+        overflow = len(self._events) - self.max_events
+        if overflow > 0:
+            del self._events[:overflow]
+            self._stats['events_dropped'] += overflow
+            if EVENTS_DROPPED is not None:
+                EVENTS_DROPPED.inc(overflow)
+            logger.warning("Activity log buffer full; dropped %s oldest events.", overflow)
+
+    def _start_timer(self):
+        if self._timer is None and self.flush_interval > 0:
+            self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection; don't leave it behind.
+            connection.close()
+
+    def flush(self):
+        """Writes (or queues) every pending event. Returns the number of events handled."""
+        self._check_fork()
+        with self._lock:
+            events, self._events = self._events, []
+            self._first_event_at = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not events:
+            return 0
+
+        # The write happens outside the lock so requests can keep adding events meanwhile.
+        started = time.monotonic()
+        try:
+            if self.mode == 'queue':
+                from core.tasks import write_activity_logs_task
+                write_activity_logs_task.delay(events)
+            else:
+                write_activity_events(events)
+        except Exception:
+            logger.exception("Could not write %s activity log events; they will be retried.", len(events))
+            with self._lock:
+                self._stats['failed_flushes'] += 1
+                self._events = events + self._events
+                self._first_event_at = time.monotonic()
+                self._trim()
+                self._start_timer()
+            return 0
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['events_written'] += len(events)
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            self._stats['total_flush_ms'] += elapsed_ms
+            depth = len(self._events)
+        if FLUSH_SECONDS is not None:
+            FLUSH_SECONDS.observe(elapsed_ms / 1000)
+            EVENTS_WRITTEN.inc(len(events))
+            BUFFER_DEPTH.set(depth)
+        return len(events)
+
+    def stats(self):
+        """Buffer depth and flush counters/latency of this process."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._events)
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['flushes'] if stats['flushes'] else None
+        return stats
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_buffer():
+    """The process-wide ActivityLogBuffer, configured from the ACTIVITY_LOG_* settings."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ActivityLogBuffer(
+                    flush_every=getattr(settings, 'ACTIVITY_LOG_FLUSH_EVERY', 50),
+                    flush_interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL_MS', 2000) / 1000,
+                    max_events=getattr(settings, 'ACTIVITY_LOG_MAX_BUFFER', 5000),
+                    mode=activity_log_mode(),
+                )
+    return _buffer
+
+
+def record_activity(event):
+    """Writes one event now in 'sync' mode, otherwise adds it to the process buffer."""
+    if activity_log_mode() == 'sync':
+        write_activity_events([event])
+    else:
+        get_activity_buffer().add(event)
+
+
+def flush_activity_buffer():
+    """Flushes this process's pending events, if a buffer was ever used. Safe to call at shutdown."""
+    if _buffer is None:
+        return 0
+    return _buffer.flush()
+
+
+def _activity_source(source):
+    """(model, timestamp field) of one activity log."""
+    if source == 'lms':
+        from lsalms.models import StudentActivityLog
+        return StudentActivityLog, 'timestamp'
+    from core.models import ActivityLog
+    return ActivityLog, 'created_at'
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _add_months(day, months):
+    """First day of the month `months` after (or before) the month of `day`."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_days(month):
+    return [month + timedelta(days=offset) for offset in range((_add_months(month, 1) - month).days)]
+
+
+def _activity_counts(source, start, end):
+    """
+    Yields (day, activity_type, role, user_id, events) for the raw rows of one activity log between
+    `start` (inclusive) and `end`, from one grouped query. LMS events all belong to students.
+    """
+    model, field = _activity_source(source)
+    fields = ['day', 'activity_type', 'student_id'] if source == 'lms' else ['day', 'activity_type', 'user_id', 'user__role']
+    rows = (
+        model.objects.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+        .annotate(day=TruncDate(field))
+        .values(*fields)
+        .annotate(events=Count('pk'))
+        .order_by()
+    )
+    for row in rows:
+        if source == 'lms':
+            yield row['day'], row['activity_type'], 'student', row['student_id'], row['events']
+        else:
+            yield row['day'], row['activity_type'], row['user__role'] or '', row['user_id'], row['events']
+
+
+def rollup_activity_days(days, sources=ACTIVITY_SOURCES):
+    """
+    Rebuilds the ActivityDailyRollup rows of `days` from the raw logs, one grouped query per
+    source. Every rolled-up day gets at least one row; a day without activity is marked by a
+    single row with an empty activity type. Only roll up days whose raw rows are still in the
+    database: the rows of an archived day are gone, so rebuilding it would wipe its counts.
+    Returns {'days', 'rows'}.
+    """
+    from core.models import ActivityDailyRollup
+
+    days = sorted(set(days))
+    if not days:
+        return {'days': 0, 'rows': 0}
+    wanted = set(days)
+    start, end = _day_start(days[0]), _day_start(days[-1] + timedelta(days=1))
+
+    written = 0
+    for source in sources:
+        buckets = defaultdict(lambda: [0, set()])
+        for day, activity_type, role, user_id, events in _activity_counts(source, start, end):
+            if day in wanted:
+                bucket = buckets[(day, activity_type, role)]
+                bucket[0] += events
+                bucket[1].add(user_id)
+        for day in wanted.difference(key[0] for key in buckets):
+            buckets[(day, '', '')] = [0, set()]
+
+        with transaction.atomic():
+            ActivityDailyRollup.objects.filter(source=source, date__in=days).delete()
+            ActivityDailyRollup.objects.bulk_create([
+                ActivityDailyRollup(
+                    date=day, source=source, activity_type=activity_type, role=role,
+                    event_count=events, user_ids=sorted(users),
+                )
+                for (day, activity_type, role), (events, users) in buckets.items()
+            ])
+        written += len(buckets)
+    return {'days': len(days), 'rows': written}
+
+
+def rollup_recent_activity(days=None):
+    """
+    Rolls up the last `days` complete days (ACTIVITY_ROLLUP_LOOKBACK_DAYS by default). Going back
+    more than one day picks up buffered events written after the previous night's run.
+    """
+    days = days or getattr(settings, 'ACTIVITY_ROLLUP_LOOKBACK_DAYS', 3)
+    today = timezone.localdate()
+    return rollup_activity_days([today - timedelta(days=offset) for offset in range(1, days + 1)])
+
+
+def weekly_activity_summary(start_date, end_date, source='core'):
+    """
+    {role: {'events', 'users'}} for the days start_date..end_date of one activity log. Days that
+    are rolled up are read from ActivityDailyRollup. Days not rolled up yet (today, or a night the
+    job did not run) are counted from the raw rows. `users` is the number of distinct users.
+    """
+    from core.models import ActivityDailyRollup
+
+    events = dict.fromkeys(ACTIVITY_ROLES, 0)
+    users = {role: set() for role in ACTIVITY_ROLES}
+    rolled = set()
+    for day, role, count, user_ids in ActivityDailyRollup.objects.filter(
+        source=source, date__range=(start_date, end_date),
+    ).values_list('date', 'role', 'event_count', 'user_ids'):
+        rolled.add(day)
+        if role in events:
+            events[role] += count
+            users[role].update(user_ids)
+
+    last_day = min(end_date, timezone.localdate())
+    missing = {
+        start_date + timedelta(days=offset) for offset in range((last_day - start_date).days + 1)
+    } - rolled
+    if missing:
+        start, end = _day_start(min(missing)), _day_start(max(missing) + timedelta(days=1))
+        for day, _activity_type, role, user_id, count in _activity_counts(source, start, end):
+            if day in missing and role in events:
+                events[role] += count
+                users[role].add(user_id)
+
+    return {role: {'events': events[role], 'users': len(users[role])} for role in ACTIVITY_ROLES}
+
+
+def activity_archive_dir(source):
+    """Folder of the archive files of one activity log: ACTIVITY_ARCHIVE_DIR/<source>."""
+    root = getattr(settings, 'ACTIVITY_ARCHIVE_DIR', pathlib.Path(settings.BASE_DIR) / 'activity_archive')
+    return pathlib.Path(root) / source
+
+
+def archive_activity_month(source, month):
+    """
+    Moves the raw rows of one calendar month of an activity log into a gzip-compressed JSON
+    Lines file, ACTIVITY_ARCHIVE_DIR/<source>/<YYYY-MM>.<first id>-<last id>.jsonl.gz. The month
+    is rolled up first (unless an earlier run already archived part of it), so the analytics keep
+    its counts. Rows are deleted only once the file is complete. Rows that arrive later for the
+    same month go to a file of their own on the next run. Returns {'rows', 'path'}.
+    """
+    model, field = _activity_source(source)
+    month = month.replace(day=1)
+    folder = activity_archive_dir(source)
+    if not any(folder.glob(f'{month:%Y-%m}.*.jsonl.gz')):
+        rollup_activity_days(_month_days(month), sources=[source])
+
+    rows = model.objects.filter(**{
+        f'{field}__gte': _day_start(month), f'{field}__lt': _day_start(_add_months(month, 1)),
+    })
+    bounds = rows.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return {'rows': 0, 'path': None}
+    # Rows inserted while the file is written get higher ids and stay for the next run.
+    rows = rows.filter(pk__lte=bounds['last'])
+
+    path = folder / f"{month:%Y-%m}.{bounds['first']}-{bounds['last']}.jsonl.gz"
+    written = 0
+    with atomic_output(path) as handle, gzip.GzipFile(filename='', fileobj=handle, mode='wb') as archive:
+        for row in rows.order_by('pk').values().iterator(chunk_size=ARCHIVE_CHUNK_SIZE):
+            archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode('utf-8') + b'\n')
+            written += 1
+    rows.delete()
+    return {'rows': written, 'path': str(path)}
+
+
+def archive_expired_activity(retention_months=None, sources=ACTIVITY_SOURCES):
+    """
+    Archives, month by month, the raw rows older than `retention_months` full months
+    (ACTIVITY_LOG_RETENTION_MONTHS by default; 0 keeps everything). Returns one
+    {'source', 'month', 'rows', 'path'} per archive file written.
+    """
+    if retention_months is None:
+        retention_months = getattr(settings, 'ACTIVITY_LOG_RETENTION_MONTHS', 12)
+    if not retention_months:
+        return []
+    cutoff = _add_months(timezone.localdate(), -retention_months)
+
+    archived = []
+    for source in sources:
+        model, field = _activity_source(source)
+        oldest = model.objects.filter(**{f'{field}__lt': _day_start(cutoff)}).aggregate(oldest=Min(field))['oldest']
+        if oldest is None:
+            continue
+        month = timezone.localtime(oldest).date().replace(day=1)
+        while month < cutoff:
+            result = archive_activity_month(source, month)
+            if result['rows']:
+                archived.append({'source': source, 'month': f'{month:%Y-%m}', **result})
+            month = _add_months(month, 1)
+    return archived
+
+
+def iter_archived_activity(source, start=None, end=None, **filters):
+    """
+    Rows of the archive files of one activity log, month by month, as the dicts they were written
+    as (timestamps stay ISO strings). `start` and `end` are dates limiting the months read;
+    `filters` keep the rows whose field equals the value, e.g. user_id=5. The files are plain
+    gzip JSON Lines, so zcat, jq or DuckDB can read them as well.
+    """
+    first = f'{start:%Y-%m}' if start else None
+    last = f'{end:%Y-%m}' if end else None
+    for path in sorted(activity_archive_dir(source).glob('*.jsonl.gz')):
+        month = path.name[:7]
+        if (first and month < first) or (last and month > last):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                row = json.loads(line)
+                if all(row.get(key) == value for key, value in filters.items()):
+                    yield row
+
+
+# Graceful shutdowns (gunicorn worker exit, manage.py commands, Celery worker processes) write
+# whatever is still buffered before the process goes away.
+atexit.register(flush_activity_buffer)
+
+try:
+    from celery.signals import worker_process_shutdown
+except ImportError:
+    worker_process_shutdown = None
+
+if worker_process_shutdown is not None:
+    worker_process_shutdown.connect(lambda **kwargs: flush_activity_buffer(), weak=False)
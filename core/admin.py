@@ -14,10 +14,14 @@ from .models import (
     AssessmentSubmission, AssignmentSubmission, ExamSubmission, Result,
     # Financial Models
     Attendance, Expense, Payment, FeeAssignment, FinancialRecord,
+    # Background Jobs
+    ReportCardJob, SubmissionIntake,
     # Communication and Blog Models
     Message, Notification, EmailCampaign, Post, Category, Tag,
 )
+from core.finance_services import post_payments, update_payment
 from core.system_settings import SystemSettings
+from django.urls import reverse
 from django.utils.html import format_html # For custom display fields
 
 # --- Admin Actions (Define these once at the top) ---
@@ -252,6 +256,55 @@ class SystemSettingsAdmin(admin.ModelAdmin):
         return False
 
 
+# --- Background Jobs ---
+
+@admin.register(ReportCardJob)
+class ReportCardJobAdmin(admin.ModelAdmin):
+    """Read-only view of report card print runs; new runs are started from the Print Report Cards page."""
+    list_display = ('term', 'class_obj', 'output_format', 'status', 'progress', 'requested_by', 'created_at')
+    list_filter = ('status', 'output_format', 'term')
+    list_select_related = ('term', 'class_obj', 'requested_by')
+    readonly_fields = [field.name for field in ReportCardJob._meta.fields]
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        return format_html(
+            '<a href="{}">{} / {} ({}%)</a>',
+            reverse('report_card_job_detail', args=[obj.pk]), obj.cards_done, obj.cards_total, obj.progress_percent,
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SubmissionIntake)
+class SubmissionIntakeAdmin(admin.ModelAdmin):
+    """Read-only view of queued assessment and exam submissions and their grading status."""
+    list_display = ('kind', 'submission_id', 'status', 'attempts', 'force_submitted', 'received_at', 'processed_at')
+    list_filter = ('status', 'kind', 'force_submitted')
+    search_fields = ('submission_id',)
+    readonly_fields = [field.name for field in SubmissionIntake._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    """Saves through the finance services so admin edits take the same row locks as the payment views."""
+    list_display = ('financial_record', 'amount_paid', 'payment_date', 'batch_reference')
+    list_filter = ('payment_date',)
+    search_fields = ('batch_reference', 'financial_record__student__user__username')
+    date_hierarchy = 'payment_date'
+    raw_id_fields = ('financial_record',)
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            update_payment(obj)
+        else:
+            post_payments([obj])
+
+
 # --- Other Models (Simple Registration) ---
 
 admin.site.register(Enrollment)
@@ -261,7 +314,6 @@ admin.site.register(ClassSubjectAssignment)
 admin.site.register(Attendance)
 admin.site.register(Expense)
 admin.site.register(FeeAssignment)
-admin.site.register(Payment)
 admin.site.register(Result)
 admin.site.register(FinancialRecord)
 admin.site.register(Holiday)
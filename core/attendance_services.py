@@ -0,0 +1,325 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from core.dashboard_services import invalidate_dashboard_metrics, mark_dashboard_snapshots_stale
+from core.models import Attendance, Student, Term, TermAttendanceSummary
+
+
+ATTENDANCE_UNIQUE_FIELDS = ['student', 'date', 'class_assigned', 'term']
+SUMMARY_COUNTER_FIELDS = ['present_days', 'absent_days', 'school_days', 'updated_at']
+
+
+def parse_attendance_grid(data, students, days):
+    """
+    Reads the `attendance_<user id>_<YYYY-MM-DD>` radio values posted by the marking grid.
+    Returns {(student_id, date): is_present}; cells left blank are skipped.
+    """
+    marks = {}
+    for student in students:
+        for day in days:
+            status = data.get(f"attendance_{student.user_id}_{day.strftime('%Y-%m-%d')}")
+            if status in ('present', 'absent'):
+                marks[(student.pk, day)] = status == 'present'
+    return marks
+
+
+def _lock_students(student_ids):
+    """
+    Row locks on the given students in primary-key order. Students always have a row, unlike
+    their Attendance marks and counters, so this also serializes a student's first save.
+    """
+    return list(
+        Student.objects.select_for_update().filter(pk__in=list(student_ids)).order_by('pk').values_list('pk', flat=True)
+    )
+
+
+@transaction.atomic
+def save_attendance_week(class_obj, term, marks):
+    """
+    Writes a grid of attendance marks with one read and one upsert.
+
+    `marks` maps (student_id, date) to is_present. Existing rows are read once and diffed so
+    unchanged cells are skipped; new and changed cells go through a single
+    bulk_create(update_conflicts=True) on the attendance unique key, and the per-term
+    counters are moved by the same diff. The query count does not depend on the class size.
+
+    The students' rows are locked first, so two saves of the same grid queue up and the second
+    diffs against the first's committed marks instead of applying the same deltas twice.
+    """
+    if not marks:
+        return {'created': 0, 'updated': 0, 'unchanged': 0}
+
+    student_ids = {student_id for student_id, _ in marks}
+    days = {day for _, day in marks}
+    _lock_students(student_ids)
+    existing = {
+        (row['student_id'], row['date']): row['is_present']
+        for row in Attendance.objects.filter(
+            class_assigned=class_obj, term=term, student_id__in=student_ids, date__in=days,
+        ).values('student_id', 'date', 'is_present')
+    }
+
+    changed, created, deltas = [], 0, {}
+    for (student_id, day), is_present in marks.items():
+        previous = existing.get((student_id, day))
+        if previous is None:
+            created += 1
+        elif previous == is_present:
+            continue
+        changed.append(Attendance(
+            student_id=student_id, date=day, class_assigned=class_obj, term=term, is_present=is_present,
+        ))
+        # A new mark adds a day to one counter; a flipped mark also takes it off the other.
+        present_delta, absent_delta = deltas.get(student_id, (0, 0))
+        step = 1 if is_present else -1
+        if previous is None:
+            deltas[student_id] = (present_delta + int(is_present), absent_delta + int(not is_present))
+        else:
+            deltas[student_id] = (present_delta + step, absent_delta - step)
+
+    if changed:
+        Attendance.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            unique_fields=ATTENDANCE_UNIQUE_FIELDS,
+            update_fields=['is_present'],
+        )
+        apply_attendance_deltas(term, deltas)
+        # bulk_create skips post_save, so refresh the dashboards that show attendance explicitly.
+        invalidate_dashboard_metrics()
+        mark_dashboard_snapshots_stale(['admin'])
+        guardian_ids = set(
+            Student.objects.filter(pk__in={row.student_id for row in changed}, student_guardian__isnull=False)
+            .values_list('student_guardian_id', flat=True)
+        )
+        if guardian_ids:
+            mark_dashboard_snapshots_stale(['guardian'], owner_ids=guardian_ids)
+
+    return {'created': created, 'updated': len(changed) - created, 'unchanged': len(marks) - len(changed)}
+
+
+def count_school_days(term):
+    """Mon-Fri days in the term excluding holidays, bypassing the per-instance cached_property."""
+    term.__dict__.pop('actual_school_days_count', None)
+    return term.actual_school_days_count
+
+
+def apply_attendance_deltas(term, deltas):
+    """
+    Moves the TermAttendanceSummary counters by `deltas` ({student_id: (present, absent)}).
+
+    Counters that already exist are shifted in a single UPDATE with F() expressions, so
+    concurrent writers never overwrite each other. Students without a counter row yet are
+    rebuilt from their raw Attendance rows instead, which also backfills data recorded
+    before the counters existed.
+    """
+    deltas = {student_id: delta for student_id, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    tracked = set(
+        TermAttendanceSummary.objects.filter(term=term, student_id__in=deltas).values_list('student_id', flat=True)
+    )
+    if tracked:
+        TermAttendanceSummary.objects.filter(term=term, student_id__in=tracked).update(
+            present_days=F('present_days') + Case(
+                *[When(student_id=student_id, then=Value(deltas[student_id][0])) for student_id in tracked],
+                default=Value(0),
+            ),
+            absent_days=F('absent_days') + Case(
+                *[When(student_id=student_id, then=Value(deltas[student_id][1])) for student_id in tracked],
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+    untracked = set(deltas) - tracked
+    if untracked:
+        refresh_attendance_summaries(term, untracked)
+
+
+def refresh_attendance_summaries(term, student_ids=None):
+    """
+    Rebuilds the counters for `student_ids` (every student with attendance or a counter
+    in the term when omitted) from the raw Attendance rows: one grouped count and one upsert.
+    Returns the rebuilt summaries keyed by student id.
+    """
+    attendance = Attendance.objects.filter(term=term)
+    if student_ids is None:
+        student_ids = set(attendance.values_list('student_id', flat=True).distinct())
+        student_ids |= set(TermAttendanceSummary.objects.filter(term=term).values_list('student_id', flat=True))
+    else:
+        student_ids = set(student_ids)
+        attendance = attendance.filter(student_id__in=student_ids)
+    if not student_ids:
+        return {}
+
+    counts = {
+        row['student_id']: row
+        for row in attendance.values('student_id').annotate(
+            present=Count('pk', filter=Q(is_present=True)), absent=Count('pk', filter=Q(is_present=False)),
+        )
+    }
+    school_days = count_school_days(term)
+    now = timezone.now()
+    summaries = {
+        student_id: TermAttendanceSummary(
+            student_id=student_id,
+            term=term,
+            present_days=counts.get(student_id, {}).get('present', 0),
+            absent_days=counts.get(student_id, {}).get('absent', 0),
+            school_days=school_days,
+            updated_at=now,
+        )
+        for student_id in student_ids
+    }
+    TermAttendanceSummary.objects.bulk_create(
+        summaries.values(),
+        update_conflicts=True,
+        unique_fields=['student', 'term'],
+        update_fields=SUMMARY_COUNTER_FIELDS,
+    )
+    return summaries
+
+
+def sync_term_school_days(term):
+    """Re-stamps the school-day count on every counter row of the term after its calendar changes."""
+    school_days = count_school_days(term)
+    return TermAttendanceSummary.objects.filter(term=term).exclude(school_days=school_days).update(
+        school_days=school_days, updated_at=timezone.now(),
+    )
+
+
+def reconcile_attendance_counters(terms=None):
+    """
+    Rebuilds the counters of `terms` (all terms when omitted) from raw Attendance rows.
+    Returns {'terms', 'rows', 'corrected'}, where `corrected` counts rows that had drifted.
+    """
+    if terms is None:
+        terms = Term.objects.all()
+    report = {'terms': 0, 'rows': 0, 'corrected': 0}
+    for term in terms:
+        before = {
+            row['student_id']: (row['present_days'], row['absent_days'], row['school_days'])
+            for row in TermAttendanceSummary.objects.filter(term=term)
+            .values('student_id', 'present_days', 'absent_days', 'school_days')
+        }
+        summaries = refresh_attendance_summaries(term)
+        report['terms'] += 1
+        report['rows'] += len(summaries)
+        report['corrected'] += sum(
+            1 for student_id, summary in summaries.items()
+            if before.get(student_id) != (summary.present_days, summary.absent_days, summary.school_days)
+        )
+    return report
+
+
+def get_attendance_summary(student, term):
+    """
+    Attendance counters for one student and term as the dict the report templates use
+    (total_days, present_days, absent_days, school_days, attendance_percentage).
+    """
+    summary = TermAttendanceSummary.objects.filter(student=student, term=term).first()
+    if summary is None:
+        summary = refresh_attendance_summaries(term, [student.pk])[student.pk]
+    return summary.as_dict()
+
+
+def get_attendance_summaries(term, student_ids):
+    """
+    get_attendance_summary for many students: existing counters load in one query and only
+    students without one are rebuilt. Returns {student_id: summary dict}.
+    """
+    student_ids = set(student_ids)
+    summaries = {
+        summary.student_id: summary
+        for summary in TermAttendanceSummary.objects.filter(term=term, student_id__in=student_ids)
+    }
+    missing = student_ids - summaries.keys()
+    if missing:
+        summaries.update(refresh_attendance_summaries(term, missing))
+    return {student_id: summary.as_dict() for student_id, summary in summaries.items()}
+
+
+def sessional_attendance_summary(student, terms):
+    """Counters for one student summed across `terms` in a single query."""
+    totals = TermAttendanceSummary.objects.filter(student=student, term__in=terms).aggregate(
+        present=Sum('present_days'), absent=Sum('absent_days'), school_days=Sum('school_days'),
+    )
+    present, absent = totals['present'] or 0, totals['absent'] or 0
+    return {
+        'total_days': present + absent,
+        'present_days': present,
+        'absent_days': absent,
+        'school_days': totals['school_days'] or 0,
+    }
+
+
+def class_attendance_summary(term, students, week_days=()):
+    """
+    Per-student present/absent counts for the selected week and the whole term,
+    computed in one grouped query with conditional counts.
+    Returns rows in the order of `students`.
+    """
+    students = list(students)
+    aggregates = {
+        'total_present_term': Count('pk', filter=Q(is_present=True)),
+        'total_absent_term': Count('pk', filter=Q(is_present=False)),
+    }
+    if week_days:
+        aggregates['present_in_selected_week'] = Count('pk', filter=Q(date__in=week_days, is_present=True))
+        aggregates['absent_in_selected_week'] = Count('pk', filter=Q(date__in=week_days, is_present=False))
+
+    counts = {
+        row['student_id']: row
+        for row in Attendance.objects.filter(term=term, student__in=[student.pk for student in students])
+        .values('student_id').annotate(**aggregates)
+    }
+
+    summary = []
+    for student in students:
+        row = counts.get(student.pk, {})
+        summary.append({
+            'student': student,
+            'present_in_selected_week': row.get('present_in_selected_week', 0),
+            'absent_in_selected_week': row.get('absent_in_selected_week', 0),
+            'total_present_term': row.get('total_present_term', 0),
+            'total_absent_term': row.get('total_absent_term', 0),
+        })
+    return summary
+
+
+def class_attendance_heatmap(class_obj, term):
+    """
+    Daily attendance for a class across a term, laid out week by week (Mon-Fri)
+    for a heatmap. One grouped query; days without records have no rate.
+    """
+    by_day = {
+        row['date']: row
+        for row in Attendance.objects.filter(class_assigned=class_obj, term=term)
+        .values('date').annotate(present=Count('pk', filter=Q(is_present=True)), total=Count('pk'))
+    }
+
+    weeks = []
+    for index, week in enumerate(term.get_term_weeks(), start=1):
+        days = []
+        for day in week:
+            if day.weekday() >= 5:
+                continue
+            row = by_day.get(day)
+            present, total = (row['present'], row['total']) if row else (0, 0)
+            days.append({
+                'date': day.isoformat(),
+                'present': present,
+                'absent': total - present,
+                'rate': round(present / total * 100, 1) if total else None,
+            })
+        weeks.append({'week': index, 'days': days})
+
+    present = sum(row['present'] for row in by_day.values())
+    total = sum(row['total'] for row in by_day.values())
+    return {
+        'class_id': class_obj.pk,
+        'term_id': term.pk,
+        'weeks': weeks,
+        'overall_rate': round(present / total * 100, 1) if total else None,
+    }
@@ -11,23 +11,22 @@ from django.contrib.messages.views import SuccessMessageMixin
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.urls import reverse, reverse_lazy, NoReverseMatch
-from django.db.models import Count, Sum, Q, F, Window, OuterRef, Subquery, IntegerField, Value, Prefetch, Max
+from django.db.models import Count, Q, F, Window, OuterRef, Subquery, IntegerField, Value, Prefetch, Max
 from django.db.models.functions import Rank, Coalesce
-from datetime import timedelta
 from collections import defaultdict
-from decimal import Decimal
-from core.models import CustomUser, Student, Teacher, Guardian, Assignment, Result, Attendance, Subject, Class, Payment, ClassSubjectAssignment
+from core.models import Student, Teacher, Guardian, Assignment, Result, Subject, ClassSubjectAssignment
 from core.models import Session, Term, Message, Assessment, Exam, Notification, AssignmentSubmission, AcademicAlert, TeacherAssignment
 from core.models import FinancialRecord, PaymentReceipt, StudentFeeRecord, AssessmentSubmission, ExamSubmission, SessionalResult, Enrollment
 from lsalms.models import Course, CourseEnrollment
 from lsalms.services import update_course_grade_for_student
-from django.db.models import Sum, Avg, Count
 from django.views.generic.edit import FormView
 from django.contrib import messages
 from core.guardian.forms import GuardianRegistrationForm
 from core.teacher.forms import TeacherRegistrationForm
 from core.student.forms import MessageForm
 from core.auth.forms import LoginForm
+from core.dashboard_services import get_dashboard_snapshot
+from core.attendance_services import get_attendance_summary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -133,125 +132,13 @@ def admin_required(login_url=None):
 @login_required
 @admin_required() # Apply decorator
 def admin_dashboard(request):
-    now = timezone.now()
     active_term = Term.objects.filter(is_active=True).select_related('session').first()
     active_session = active_term.session if active_term else None
-    
-    # Debug: Print to console
-    print(f"DEBUG - Active Term: {active_term}")
-    print(f"DEBUG - Active Session: {active_session}")
-    if active_term:
-        print(f"DEBUG - Term Name: {active_term.name}, Session Name: {active_session.name}")
-    
-    # === CORE STATISTICS ===
-    student_count = Student.objects.filter(status='active').count()
-    dormant_students = Student.objects.filter(status='dormant').count()
-    left_students = Student.objects.filter(status='left').count()
-    total_students = Student.objects.count()
-    
-    teacher_count = Teacher.objects.filter(status='active').count()
-    dormant_teachers = Teacher.objects.filter(status='dormant').count()
-    
-    guardian_count = Guardian.objects.filter(status='active').count()
-    class_count = Class.objects.count()
-    subject_count = Subject.objects.count()
-    
-    # === GROWTH TRENDS (last 30 days) ===
-    thirty_days_ago = now - timedelta(days=30)
-    new_students = Student.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-    new_teachers = Teacher.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-    new_guardians = Guardian.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-    
-    # === ACADEMIC PERFORMANCE ===
-    if active_term:
-        # Results statistics
-        approved_results = Result.objects.filter(term=active_term, is_approved=True).count()
-        pending_results = Result.objects.filter(term=active_term, is_approved=False).count()
-        
-        # Submission statistics
-        total_assignments = Assignment.objects.filter(term=active_term, active=True).count()
-        total_assessments = Assessment.objects.filter(term=active_term, is_approved=True).count()
-        total_exams = Exam.objects.filter(term=active_term, is_approved=True).count()
-        
-        assignment_submissions = AssignmentSubmission.objects.filter(assignment__term=active_term).count()
-        assessment_submissions = AssessmentSubmission.objects.filter(assessment__term=active_term).count()
-        exam_submissions = ExamSubmission.objects.filter(exam__term=active_term).count()
-        
-        # Average GPA calculation
-        avg_gpa = Result.objects.filter(term=active_term, is_approved=True).aggregate(
-            avg=Avg('calculated_gpa')
-        )['avg'] or 0
-    else:
-        approved_results = pending_results = 0
-        total_assignments = total_assessments = total_exams = 0
-        assignment_submissions = assessment_submissions = exam_submissions = 0
-        avg_gpa = 0
-    
-    # === FINANCIAL OVERVIEW ===
-    if active_term:
-        total_fees_expected = FinancialRecord.objects.filter(term=active_term).aggregate(
-            total=Sum('net_fee')
-        )['total'] or Decimal('0')
-        
-        total_collected = Payment.objects.filter(
-            financial_record__term=active_term
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        outstanding_fees = total_fees_expected - total_collected
-        collection_rate = (total_collected / total_fees_expected * 100) if total_fees_expected > 0 else 0
-        
-        # Payment statistics (last 30 days)
-        recent_payments = Payment.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).aggregate(
-            total=Sum('amount'),
-            count=Count('id')
-        )
-        recent_payment_amount = recent_payments['total'] or Decimal('0')
-        recent_payment_count = recent_payments['count'] or 0
-    else:
-        total_fees_expected = total_collected = outstanding_fees = Decimal('0')
-        collection_rate = 0
-        recent_payment_amount = Decimal('0')
-        recent_payment_count = 0
-    
-    # === ATTENDANCE OVERVIEW ===
-    if active_term:
-        attendance_stats = Attendance.objects.filter(term=active_term).aggregate(
-            total=Count('id'),
-            present=Count('id', filter=Q(is_present=True))
-        )
-        total_attendance_records = attendance_stats['total'] or 0
-        present_records = attendance_stats['present'] or 0
-        attendance_rate = (present_records / total_attendance_records * 100) if total_attendance_records > 0 else 0
-    else:
-        attendance_rate = total_attendance_records = present_records = 0
-    
-    # === ENGAGEMENT METRICS ===
-    # Messages in last 30 days
-    recent_messages = Message.objects.filter(sent_at__gte=thirty_days_ago).count()
-    
-    # Active notifications
-    active_notifications = Notification.objects.filter(
-        is_active=True,
-        expiry_date__gte=now.date()
-    ).count()
-    
-    # === STUDENTS PER CLASS (for charts) ===
-    class_counts_query = Class.objects.annotate(
-        num_students=Count('enrolled_students', filter=Q(enrolled_students__status='active'))
-    ).order_by('order')
-    
-    student_counts_by_class_labels = [c.name for c in class_counts_query]
-    student_counts_by_class_data = [c.num_students for c in class_counts_query]
-    
-    # === GENDER DISTRIBUTION ===
-    gender_stats = Student.objects.filter(status='active').values('gender').annotate(
-        count=Count('id')
-    )
-    male_students = next((item['count'] for item in gender_stats if item['gender'] == 'M'), 0)
-    female_students = next((item['count'] for item in gender_stats if item['gender'] == 'F'), 0)
-    
+
+    # Headline aggregates come from the precomputed snapshot (one query).
+    snapshot = get_dashboard_snapshot('admin', active_term)
+    context = dict(snapshot.payload)
+
     # === RECENT ACTIVITIES ===
     recent_enrollments = Enrollment.objects.filter(
         student__status='active'
@@ -265,130 +152,18 @@ def admin_dashboard(request):
     recent_results = Result.objects.filter(
         is_approved=True
     ).select_related('student__user', 'term').order_by('-updated_at')[:5]
-    
-    # === TOP PERFORMING CLASSES (by average GPA) ===
-    if active_term:
-        top_classes = Result.objects.filter(
-            term=active_term,
-            is_approved=True
-        ).values(
-            'student__current_class__name'
-        ).annotate(
-            avg_gpa=Avg('calculated_gpa'),
-            student_count=Count('student')
-        ).order_by('-avg_gpa')[:5]
-    else:
-        top_classes = []
-    
-    # === LMS STATISTICS ===
-    from lsalms.models import Course, CourseEnrollment
-    total_courses = Course.objects.count()
-    active_courses = Course.objects.filter(is_active=True).count()
-    total_enrollments = CourseEnrollment.objects.count()
-    
-    # === SYSTEM HEALTH ===
-    # Users logged in recently (last 7 days)
-    seven_days_ago = now - timedelta(days=7)
-    active_users = CustomUser.objects.filter(
-        last_login__gte=seven_days_ago
-    ).count()
-    
-    # === ADDITIONAL STATISTICS ===
-    # Pending approvals count
-    pending_assessments = Assessment.objects.filter(is_approved=False).count() if active_term else 0
-    pending_exams = Exam.objects.filter(is_approved=False).count() if active_term else 0
-    
-    # Students without fee records
-    students_without_fees = Student.objects.filter(
-        status='active'
-    ).exclude(
-        id__in=FinancialRecord.objects.filter(term=active_term).values_list('student_id', flat=True)
-    ).count() if active_term else 0
-    
-    # Teachers without class assignments
-    teachers_without_class = Teacher.objects.filter(
-        status='active'
-    ).exclude(
-        id__in=TeacherAssignment.objects.filter(term=active_term).values_list('teacher_id', flat=True)
-    ).count() if active_term else 0
-    
-    # Debug output for statistics
-    print(f"DEBUG - Student Count: {student_count}")
-    print(f"DEBUG - Teacher Count: {teacher_count}")
-    print(f"DEBUG - Active Users: {active_users}")
-    print(f"DEBUG - Total Assignments: {total_assignments if active_term else 'N/A'}")
-    print(f"DEBUG - Collection Rate: {collection_rate}%")
-    
-    context = {
-        # Core Statistics
-        'student_count': student_count,
-        'dormant_students': dormant_students,
-        'left_students': left_students,
-        'total_students': total_students,
-        'teacher_count': teacher_count,
-        'dormant_teachers': dormant_teachers,
-        'guardian_count': guardian_count,
-        'class_count': class_count,
-        'subject_count': subject_count,
-        
-        # Growth Trends
-        'new_students': new_students,
-        'new_teachers': new_teachers,
-        'new_guardians': new_guardians,
-        
-        # Academic Performance
+
+    context.update({
         'active_term': active_term,
         'active_session': active_session,
-        'approved_results': approved_results,
-        'pending_results': pending_results,
-        'total_assignments': total_assignments,
-        'total_assessments': total_assessments,
-        'total_exams': total_exams,
-        'assignment_submissions': assignment_submissions,
-        'assessment_submissions': assessment_submissions,
-        'exam_submissions': exam_submissions,
-        'avg_gpa': round(float(avg_gpa), 2) if avg_gpa else 0,
-        
-        # Financial Overview
-        'total_fees_expected': total_fees_expected,
-        'total_collected': total_collected,
-        'outstanding_fees': outstanding_fees,
-        'collection_rate': round(float(collection_rate), 1),
-        'recent_payment_amount': recent_payment_amount,
-        'recent_payment_count': recent_payment_count,
-        
-        # Attendance
-        'attendance_rate': round(float(attendance_rate), 1),
-        'total_attendance_records': total_attendance_records,
-        'present_records': present_records,
-        
-        # Engagement
-        'recent_messages': recent_messages,
-        'active_notifications': active_notifications,
-        
-        # Charts Data
-        'student_counts_by_class_labels': student_counts_by_class_labels,
-        'student_counts_by_class_data': student_counts_by_class_data,
-        'male_students': male_students,
-        'female_students': female_students,
-        
-        # Recent Activities
+        'avg_gpa': round(float(context['avg_gpa']), 2) if context['avg_gpa'] else 0,
+        'collection_rate': round(float(context['collection_rate']), 1),
+        'attendance_rate': round(float(context['attendance_rate']), 1),
         'recent_enrollments': recent_enrollments,
         'recent_results': recent_results,
-        'top_classes': top_classes,
-        
-        # LMS Statistics
-        'total_courses': total_courses,
-        'active_courses': active_courses,
-        'total_enrollments': total_enrollments,
-        
-        # System Health
-        'active_users': active_users,
-        'pending_assessments': pending_assessments,
-        'pending_exams': pending_exams,
-        'students_without_fees': students_without_fees,
-        'teachers_without_class': teachers_without_class,
-    }
+        'snapshot_refreshed_at': snapshot.refreshed_at,
+        'snapshot_is_stale': snapshot.is_stale,
+    })
 
     return render(request, 'setup/dashboard.html', context) 
 
@@ -531,17 +306,7 @@ def student_dashboard(request):
     # --- 3. FETCH OTHER DASHBOARD DATA ---
     context['subjects'] = Subject.objects.filter(class_assignments__class_assigned=student.current_class, class_assignments__term=active_term).distinct()
 
-    attendance_summary = Attendance.objects.filter(student=student, term=active_term).aggregate(
-        total_days=Count('id'), present_days=Count('id', filter=Q(is_present=True))
-    )
-    total_days = attendance_summary.get('total_days', 0)
-    present_days = attendance_summary.get('present_days', 0)
-    context['attendance_data'] = {
-        'total_days': total_days,
-        'present_days': present_days,
-        'absent_days': total_days - present_days,
-        'attendance_percentage': round((present_days / total_days * 100)) if total_days > 0 else 0
-    }
+    context['attendance_data'] = get_attendance_summary(student, active_term)
 
     context['financial_data'] = FinancialRecord.objects.filter(student=student, term=active_term).first()
     context['result_data'] = Result.objects.filter(student=student, term=active_term, is_approved=True).first()
@@ -752,10 +517,6 @@ def teacher_dashboard(request):
     form_teacher_classes_qs = teacher.current_classes().order_by('name')
     subjects_taught_qs = teacher.subjects_taught()
     
-    # --- CONTEXT FOR: Overview Tab ---
-    student_count = Student.objects.filter(current_class__in=teacher_assigned_classes_qs, status='active').count()
-    subject_count = subjects_taught_qs.count()
-    
     form_teacher_classes = teacher.current_classes().all()
 
     # --- Upcoming Tasks ---
@@ -919,21 +680,11 @@ def teacher_dashboard(request):
     if not display_term:
         display_term = active_term if active_term in selectable_terms else selectable_terms.first()
 
-    leaderboard_data = {}
-    if display_term:
-        for class_instance in teacher_assigned_classes_qs:
-            # Subqueries for counting submissions
-            assignment_count_sub = AssignmentSubmission.objects.filter(student=OuterRef('pk'), assignment__term=display_term).values('student').annotate(c=Count('pk')).values('c')
-            assessment_count_sub = AssessmentSubmission.objects.filter(student=OuterRef('pk'), assessment__term=display_term).values('student').annotate(c=Count('pk')).values('c')
-            exam_count_sub = ExamSubmission.objects.filter(student=OuterRef('pk'), exam__term=display_term).values('student').annotate(c=Count('pk')).values('c')
-            class_leaderboard_qs = Student.objects.filter(current_class=class_instance, status='active').select_related('user').annotate(
-                num_assignments=Coalesce(Subquery(assignment_count_sub, output_field=IntegerField()), Value(0)),
-                num_assessments=Coalesce(Subquery(assessment_count_sub, output_field=IntegerField()), Value(0)),
-                num_exams=Coalesce(Subquery(exam_count_sub, output_field=IntegerField()), Value(0)),
-            ).annotate(term_submission_count=F('num_assignments') + F('num_assessments') + F('num_exams')) \
-             .annotate(rank=Window(expression=Rank(), order_by=F('term_submission_count').desc())) \
-             .order_by('rank', 'user__last_name', 'user__first_name')
-            leaderboard_data[class_instance.id] = {'class_name': class_instance.name, 'top_students': class_leaderboard_qs[:5]}
+    # Counts and leaderboards are read from the precomputed snapshot for the displayed term
+    snapshot = get_dashboard_snapshot('teacher', display_term or active_term, owner=request.user)
+    student_count = snapshot.payload['student_count']
+    subject_count = snapshot.payload['subject_count']
+    leaderboard_data = snapshot.payload['leaderboard'] if display_term else {}
     
     received_messages = Message.objects.filter(recipient=request.user).select_related('sender', 'student_context__user').order_by('-sent_at')
 
@@ -970,6 +721,10 @@ def teacher_dashboard(request):
         'current_task_totals': current_task_totals,
         'previous_task_totals': previous_task_totals,
         'pending_approval_count': pending_approval_count,
+
+        # Snapshot freshness
+        'snapshot_refreshed_at': snapshot.refreshed_at,
+        'snapshot_is_stale': snapshot.is_stale,
         
         # Broadsheets Tab
         'all_sessions': all_sessions, 
@@ -1130,32 +885,10 @@ def guardian_dashboard(request):
         for user_id in linked_student_user_ids:
             receipt_data[user_id].append(receipt)
     
-    # 2b. Attendance per-student for active term
-    attendance_data = {}
-    if active_term and ward_pks:
-        attendance_agg = Attendance.objects.filter(student_id__in=ward_pks, term=active_term).values('student_id').annotate(
-            total_days=Count('id'), present_days=Count('id', filter=Q(is_present=True))
-        )
-        for item in attendance_agg:
-            student_id = item['student_id']
-            total = item.get('total_days', 0) or 0
-            present = item.get('present_days', 0) or 0
-            absent = total - present
-            attendance_data_key = None
-            try:
-                # Use the user's id as the key to match templates which use student.user.id
-                user_id = Student.objects.get(pk=student_id).user.id
-                attendance_data_key = user_id
-            except Student.DoesNotExist:
-                attendance_data_key = student_id
-
-            attendance_data[attendance_data_key] = {
-                'total_days': total,
-                'present_days': present,
-                'absent_days': absent,
-                'attendance_percentage': round((present / total * 100), 1) if total > 0 else 0
-            }
-    # Ensure attendance_data is available in template using the same keying as other maps (student.user.id)
+    # 2b. Attendance per-student for active term, from the precomputed snapshot.
+    # Keys are the student's user id to match templates which use student.user.id.
+    snapshot = get_dashboard_snapshot('guardian', active_term, owner=request.user)
+    attendance_data = {int(key): value for key, value in snapshot.payload['attendance'].items()}
     
     # 3. Results (Termly, Sessional, Archived)
     result_data = {res.student_id: res for res in Result.objects.filter(student_id__in=ward_pks, term=active_term, is_published=True)}
@@ -1285,6 +1018,7 @@ def guardian_dashboard(request):
 
         'lms_student_data': lms_student_data,
         'attendance_data': attendance_data,
+        'snapshot_refreshed_at': snapshot.refreshed_at,
 
     }
     return render(request, 'guardian/guardian_dashboard.html', context)
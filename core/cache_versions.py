@@ -0,0 +1,44 @@
+"""
+Version keys in the shared cache, used to retire cached data across every worker at once.
+Reads go through a short-lived process-local copy so a hot path does not pay a cache round
+trip (a query with the database cache) on every call.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Version key -> (version, monotonic time it was read from the shared cache).
+_local_versions = {}
+
+
+def _check_interval():
+    return getattr(settings, 'CACHE_VERSION_CHECK_SECONDS', 5)
+
+
+def get_version(key):
+    """
+    The current value of the version key `key`, created on first use. The shared cache is read
+    at most once every CACHE_VERSION_CHECK_SECONDS per process: a bump made by another worker is
+    seen within that interval, one made in this process straight away.
+    """
+    now = time.monotonic()
+    local = _local_versions.get(key)
+    if local is not None and now - local[1] < _check_interval():
+        return local[0]
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    _local_versions[key] = (version, now)
+    return version
+
+
+def bump_version(key):
+    """Gives `key` a new version, retiring everything cached under the old one."""
+    version = uuid.uuid4().hex
+    cache.set(key, version, None)
+    _local_versions[key] = (version, time.monotonic())
+    return version
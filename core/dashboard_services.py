@@ -0,0 +1,420 @@
+from collections import defaultdict
+from datetime import date, timedelta
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+
+from core.cache_versions import bump_version, get_version
+from core.models import (
+    AssessmentSubmission, AssignmentSubmission, Class, DashboardSnapshot, Enrollment, ExamSubmission,
+    FinancialRecord, Guardian, Result, Student, Subject, Teacher, TeacherAssignment, Term, TermAttendanceSummary,
+)
+
+
+DASHBOARD_METRICS_VERSION_KEY = 'core:dashboard_metrics:version'
+
+AGE_BUCKETS = (
+    # (label, youngest age, oldest age); None means open-ended.
+    ('5-7', None, 7),
+    ('8-10', 8, 10),
+    ('11-13', 11, 13),
+    ('14-16', 14, 16),
+    ('17+', 17, None),
+)
+
+# Classes listed for a teacher and wards listed for a guardian in the activity feed.
+ACTIVITY_CONTEXT_LIMIT = 3
+
+PERFORMANCE_BUCKETS = (
+    # (label, lowest average, highest average exclusive); None means open-ended.
+    ('Excellent (80-100)', 80, None),
+    ('Very Good (70-79)', 70, 80),
+    ('Good (60-69)', 60, 70),
+    ('Average (50-59)', 50, 60),
+    ('Below Average (<50)', None, 50),
+)
+
+
+def _metrics_cache_timeout():
+    return getattr(settings, 'DASHBOARD_METRICS_CACHE_TIMEOUT', 5 * 60)
+
+
+def invalidate_dashboard_metrics():
+    """Bumps the metrics version so every cached dashboard snapshot is recomputed on next access."""
+    bump_version(DASHBOARD_METRICS_VERSION_KEY)
+
+
+def _metrics_version():
+    return get_version(DASHBOARD_METRICS_VERSION_KEY)
+
+
+def _birthday_cutoff(today, years):
+    """Latest date of birth for someone who is at least `years` old today."""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 February in a non-leap target year
+        return today.replace(year=today.year - years, day=28)
+
+
+def _age_filter(today, youngest, oldest):
+    condition = Q(status='active', date_of_birth__isnull=False)
+    if youngest is not None:
+        condition &= Q(date_of_birth__lte=_birthday_cutoff(today, youngest))
+    if oldest is not None:
+        condition &= Q(date_of_birth__gt=_birthday_cutoff(today, oldest + 1))
+    return condition
+
+
+def _score_filter(low, high):
+    condition = Q(average_score__isnull=False)
+    if low is not None:
+        condition &= Q(average_score__gte=low)
+    if high is not None:
+        condition &= Q(average_score__lt=high)
+    return condition
+
+
+def _student_metrics(today, since):
+    aggregates = {
+        'active': Count('pk', filter=Q(status='active')),
+        'dormant': Count('pk', filter=Q(status='dormant')),
+        'left': Count('pk', filter=Q(status='left')),
+        'total': Count('pk'),
+        'male': Count('pk', filter=Q(status='active', gender='M')),
+        'female': Count('pk', filter=Q(status='active', gender='F')),
+        'new': Count('pk', filter=Q(user__date_joined__gte=since)),
+    }
+    for index, (_, youngest, oldest) in enumerate(AGE_BUCKETS):
+        aggregates[f'age_{index}'] = Count('pk', filter=_age_filter(today, youngest, oldest))
+    row = Student.objects.aggregate(**aggregates)
+    return {
+        'student_count': row['active'],
+        'dormant_students': row['dormant'],
+        'left_students': row['left'],
+        'total_students': row['total'],
+        'male_students': row['male'],
+        'female_students': row['female'],
+        'new_students': row['new'],
+        'gender_labels': ['Male', 'Female'],
+        'gender_data': [row['male'], row['female']],
+        'age_labels': [label for label, _, _ in AGE_BUCKETS],
+        'age_data': [row[f'age_{index}'] for index in range(len(AGE_BUCKETS))],
+    }
+
+
+def _staff_metrics(since):
+    teachers = Teacher.objects.aggregate(
+        active=Count('pk', filter=Q(status='active')),
+        dormant=Count('pk', filter=Q(status='dormant')),
+        new=Count('pk', filter=Q(user__date_joined__gte=since)),
+    )
+    guardians = Guardian.objects.aggregate(
+        active=Count('pk', filter=Q(status='active')),
+        new=Count('pk', filter=Q(user__date_joined__gte=since)),
+    )
+    return {
+        'teacher_count': teachers['active'],
+        'dormant_teachers': teachers['dormant'],
+        'new_teachers_count': teachers['new'],
+        'guardian_count': guardians['active'],
+        'new_guardians_count': guardians['new'],
+        'class_count': Class.objects.count(),
+        'subject_count': Subject.objects.count(),
+    }
+
+
+def _class_distribution(active_term):
+    if active_term:
+        rows = Enrollment.objects.filter(term=active_term, is_active=True).values(
+            name=F('class_enrolled__name'), order=F('class_enrolled__order'),
+        )
+    else:
+        rows = Student.objects.filter(status='active', current_class__isnull=False).values(
+            name=F('current_class__name'), order=F('current_class__order'),
+        )
+    rows = rows.annotate(count=Count('pk')).order_by('order', 'name')
+    return {
+        'student_counts_by_class_labels': [row['name'] for row in rows],
+        'student_counts_by_class_data': [row['count'] for row in rows],
+    }
+
+
+def _term_metrics(active_term):
+    if not active_term:
+        return {
+            'approved_results': 0, 'pending_results': 0, 'avg_gpa': 0, 'current_term_avg': 0,
+            'performance_labels': [], 'performance_data': [],
+            'total_fees_expected': 0, 'total_collected': 0, 'outstanding_fees': 0, 'collection_rate': 0,
+            'total_attendance_records': 0, 'present_records': 0, 'attendance_rate': 0,
+        }
+
+    approved = Q(is_approved=True)
+    aggregates = {
+        'approved': Count('pk', filter=approved),
+        'pending': Count('pk', filter=Q(is_approved=False)),
+        'avg_gpa': Avg('term_gpa', filter=approved & Q(term_gpa__isnull=False)),
+        'avg_score': Avg('average_score', filter=approved),
+    }
+    for index, (_, low, high) in enumerate(PERFORMANCE_BUCKETS):
+        aggregates[f'band_{index}'] = Count('pk', filter=approved & _score_filter(low, high))
+    results = Result.objects.filter(term=active_term).aggregate(**aggregates)
+    band_counts = [results[f'band_{index}'] for index in range(len(PERFORMANCE_BUCKETS))]
+    has_scores = results['approved'] > 0
+
+    finance = FinancialRecord.objects.filter(term=active_term).aggregate(
+        expected=Sum('total_fee'), collected=Sum('total_paid'), outstanding=Sum('outstanding_balance'),
+    )
+    expected, collected = finance['expected'] or 0, finance['collected'] or 0
+
+    attendance = TermAttendanceSummary.objects.filter(term=active_term).aggregate(
+        present=Sum('present_days'), absent=Sum('absent_days'),
+    )
+    attendance['present'] = attendance['present'] or 0
+    attendance['total'] = attendance['present'] + (attendance['absent'] or 0)
+
+    return {
+        'approved_results': results['approved'],
+        'pending_results': results['pending'],
+        'avg_gpa': results['avg_gpa'] or 0,
+        'current_term_avg': results['avg_score'] or 0,
+        'performance_labels': [label for label, _, _ in PERFORMANCE_BUCKETS] if has_scores else [],
+        'performance_data': band_counts if has_scores else [],
+        'total_fees_expected': expected,
+        'total_collected': collected,
+        'outstanding_fees': finance['outstanding'] or 0,
+        'collection_rate': (collected / expected * 100) if expected > 0 else 0,
+        'total_attendance_records': attendance['total'],
+        'present_records': attendance['present'],
+        'attendance_rate': (attendance['present'] / attendance['total'] * 100) if attendance['total'] else 0,
+    }
+
+
+def compute_dashboard_metrics(active_term=None):
+    """
+    Computes the admin dashboard headline numbers with conditional aggregation:
+    one query each for students, teachers, guardians, results, finance and attendance,
+    plus the class distribution and the class/subject totals.
+    """
+    now = timezone.now()
+    since = now - timedelta(days=30)
+    metrics = {}
+    metrics.update(_student_metrics(date.today(), since))
+    metrics.update(_staff_metrics(since))
+    metrics.update(_class_distribution(active_term))
+    metrics.update(_term_metrics(active_term))
+    metrics['computed_at'] = now
+    return metrics
+
+
+def get_dashboard_metrics(active_term=None):
+    """
+    Returns the dashboard metrics for the active term, cached per term for a short TTL
+    (DASHBOARD_METRICS_CACHE_TIMEOUT) and dropped whenever students or results change.
+    """
+    cache_key = f"core:dashboard_metrics:{active_term.pk if active_term else 'none'}:{_metrics_version()}"
+    metrics = cache.get(cache_key)
+    if metrics is None:
+        metrics = compute_dashboard_metrics(active_term)
+        cache.set(cache_key, metrics, _metrics_cache_timeout())
+    return metrics
+
+
+# --- Dashboard snapshots -------------------------------------------------------
+
+LEADERBOARD_SIZE = 5
+
+
+def _snapshots_async():
+    return getattr(settings, 'DASHBOARD_SNAPSHOT_ASYNC', False)
+
+
+def _teacher_snapshot_payload(teacher, term):
+    classes = list(teacher.assigned_classes().order_by('name'))
+    students = list(
+        Student.objects.filter(current_class__in=classes, status='active')
+        .select_related('user').order_by('user__last_name', 'user__first_name')
+    )
+    student_ids = [student.pk for student in students]
+
+    submission_counts = defaultdict(int)
+    if term and student_ids:
+        for model, term_lookup in (
+            (AssignmentSubmission, 'assignment__term'),
+            (AssessmentSubmission, 'assessment__term'),
+            (ExamSubmission, 'exam__term'),
+        ):
+            rows = model.objects.filter(student_id__in=student_ids, **{term_lookup: term}).values('student_id')
+            for row in rows.annotate(count=Count('pk')):
+                submission_counts[row['student_id']] += row['count']
+
+    students_by_class = defaultdict(list)
+    for student in students:
+        students_by_class[student.current_class_id].append(student)
+
+    leaderboard = {}
+    for class_obj in classes:
+        ranked = sorted(students_by_class[class_obj.pk], key=lambda s: -submission_counts[s.pk])
+        top_students, rank, previous = [], 0, None
+        for position, student in enumerate(ranked, start=1):
+            count = submission_counts[student.pk]
+            if count != previous:
+                rank, previous = position, count
+            if position > LEADERBOARD_SIZE:
+                break
+            top_students.append({
+                'student_id': student.pk,
+                'full_name': student.user.get_full_name(),
+                'profile_image_url': student.profile_image.url if student.profile_image else '',
+                'term_submission_count': count,
+                'rank': rank,
+            })
+        leaderboard[str(class_obj.pk)] = {'class_name': class_obj.name, 'top_students': top_students}
+
+    return {
+        'student_count': len(students),
+        'subject_count': teacher.subjects_taught().count(),
+        'leaderboard': leaderboard,
+    }
+
+
+def _guardian_snapshot_payload(guardian, term):
+    attendance = {}
+    if term:
+        summaries = TermAttendanceSummary.objects.filter(
+            student__student_guardian=guardian, student__status='active', term=term,
+        )
+        for summary in summaries:
+            # Keyed by the student's user id (the Student primary key), as the templates expect.
+            attendance[str(summary.student_id)] = summary.as_dict()
+    return {'attendance': attendance}
+
+
+def build_snapshot_payload(scope, term, owner=None):
+    if scope == 'admin':
+        return compute_dashboard_metrics(term)
+    if scope == 'teacher':
+        return _teacher_snapshot_payload(owner.teacher, term)
+    if scope == 'guardian':
+        return _guardian_snapshot_payload(owner.guardian, term)
+    raise ValueError(f"Unknown dashboard scope: {scope}")
+
+
+def refresh_dashboard_snapshot(scope, term, owner=None):
+    """Rebuilds and stores the snapshot for one (scope, owner, term)."""
+    payload = build_snapshot_payload(scope, term, owner)
+    # The unique constraints make a concurrent refresh update the row the other one created.
+    snapshot, _ = DashboardSnapshot.objects.update_or_create(
+        scope=scope, owner=owner, term=term, defaults={'payload': payload, 'is_stale': False},
+    )
+    # Round-trip through JSON so fresh and stored snapshots look the same to the views.
+    snapshot.payload = json.loads(json.dumps(payload, cls=DjangoJSONEncoder))
+    return snapshot
+
+
+def get_dashboard_snapshot(scope, term, owner=None):
+    """
+    Returns the stored snapshot with a single query. Missing snapshots are built inline.
+    Stale ones are served as-is when a background worker refreshes them
+    (DASHBOARD_SNAPSHOT_ASYNC); otherwise they are rebuilt on this read.
+    """
+    snapshot = DashboardSnapshot.objects.filter(scope=scope, owner=owner, term=term).first()
+    if snapshot is None or (snapshot.is_stale and not _snapshots_async()):
+        snapshot = refresh_dashboard_snapshot(scope, term, owner)
+    return snapshot
+
+
+def mark_dashboard_snapshots_stale(scopes, owner_ids=None):
+    """Flags snapshots for a refresh and, in async mode, queues the background job."""
+    snapshots = DashboardSnapshot.objects.filter(scope__in=scopes, is_stale=False)
+    if owner_ids is not None:
+        snapshots = snapshots.filter(owner_id__in=owner_ids)
+    if snapshots.update(is_stale=True) and _snapshots_async():
+        from core.tasks import refresh_dashboard_snapshots_task
+        transaction.on_commit(refresh_dashboard_snapshots_task.delay)
+
+
+def refresh_stale_dashboard_snapshots(include_fresh=False):
+    """Rebuilds stale snapshots (or all of them). Used by the Celery task and management command."""
+    snapshots = DashboardSnapshot.objects.select_related('owner', 'term')
+    if not include_fresh:
+        snapshots = snapshots.filter(is_stale=True)
+    refreshed = 0
+    for snapshot in snapshots:
+        refresh_dashboard_snapshot(snapshot.scope, snapshot.term, snapshot.owner)
+        refreshed += 1
+    return refreshed
+
+
+def attach_activity_context(activities, term=None):
+    """
+    Resolves the class and ward labels of every ActivityLog in `activities` in one pass, so the
+    user_class, guardian_context and week_number properties need no queries of their own.
+
+    `term` is the term the labels and week numbers refer to; the active term is loaded once when
+    it is not given. Teachers, students and guardians among the users, their teacher assignments,
+    wards and enrollments are each loaded with one query. Returns the activities as a list.
+    """
+    activities = list(activities)
+    if term is None:
+        term = Term.objects.filter(is_active=True).first()
+    user_ids = {activity.user_id for activity in activities}
+    teacher_ids = set(Teacher.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    guardian_ids = set(Guardian.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    student_ids = set(Student.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+
+    teacher_classes = defaultdict(list)
+    if term and teacher_ids:
+        for teacher_id, class_name in (
+            TeacherAssignment.objects.filter(teacher_id__in=teacher_ids, term=term)
+            .order_by('class_assigned__name')
+            .values_list('teacher_id', 'class_assigned__name')
+            .distinct()
+        ):
+            if len(teacher_classes[teacher_id]) < ACTIVITY_CONTEXT_LIMIT:
+                teacher_classes[teacher_id].append(class_name)
+
+    wards = defaultdict(list)
+    for ward in (
+        Student.objects.filter(student_guardian_id__in=guardian_ids)
+        .select_related('user')
+        .order_by('user__last_name', 'user__first_name')
+    ):
+        if len(wards[ward.student_guardian_id]) < ACTIVITY_CONTEXT_LIMIT:
+            wards[ward.student_guardian_id].append(ward)
+
+    enrolled_class = {}
+    enrolled_ids = student_ids | {ward.pk for guardian_wards in wards.values() for ward in guardian_wards}
+    if term and enrolled_ids:
+        for student_id, class_name in (
+            Enrollment.objects.filter(student_id__in=enrolled_ids, term=term, is_active=True)
+            .order_by('-pk')
+            .values_list('student_id', 'class_enrolled__name')
+        ):
+            enrolled_class.setdefault(student_id, class_name)
+
+    for activity in activities:
+        user_id = activity.user_id
+        user_class = guardian_context = None
+        if user_id in teacher_ids:
+            user_class = ', '.join(teacher_classes[user_id]) or 'No class assigned'
+        elif user_id in student_ids:
+            user_class = enrolled_class.get(user_id, 'Not enrolled')
+        if user_id in guardian_ids:
+            labels = [
+                f"{ward.user.get_full_name()} ({enrolled_class[ward.pk]})" if ward.pk in enrolled_class
+                else ward.user.get_full_name()
+                for ward in wards[user_id]
+            ]
+            guardian_context = ', '.join(labels) or 'No wards'
+        activity._activity_context = {
+            'term': term,
+            'user_class': user_class,
+            'guardian_context': guardian_context,
+        }
+    return activities
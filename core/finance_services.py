@@ -1,9 +1,46 @@
+from contextlib import contextmanager
 from decimal import Decimal
+import threading
 import uuid
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.db import transaction
-
-from core.models import Class, FeeAssignment, FinancialRecord, Guardian, Payment, PaymentReceipt, Student, StudentFeeRecord, Term
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from core.cache_versions import bump_version, get_version
+from core.dashboard_services import invalidate_dashboard_metrics, mark_dashboard_snapshots_stale
+from core.models import (
+    Class, FeeAssignment, FeeSyncState, FinancialRecord, FinanceSummarySnapshot, Guardian, Payment, PaymentDailyRollup,
+    PaymentReceipt, Student, StudentFeeRecord, Term,
+)
+
+
+FINANCIAL_RECORD_FIELDS = ['total_fee', 'total_discount', 'total_paid', 'outstanding_balance', 'archived']
+FINANCE_SUMMARY_VERSION_KEY = 'core:finance_summary:version'
+# Summary key -> FinancialRecord field, for the overall totals and each per-class row.
+FINANCE_SUMMARY_FIELDS = {
+    'expected': 'total_fee',
+    'discounts': 'total_discount',
+    'paid': 'total_paid',
+    'outstanding': 'outstanding_balance',
+}
+PAYMENT_ROLLUP_PERIODS = {
+    'day': lambda: F('date'),
+    'week': lambda: TruncWeek('date'),
+    'month': lambda: TruncMonth('date'),
+}
+# Extra columns each collection-trend grouping adds to a series point.
+PAYMENT_ROLLUP_GROUPS = {
+    'class': ('school_class_id', 'school_class__name'),
+    'term': ('term_id', 'term__name', 'term__session__name'),
+    'batch_reference': ('batch_reference',),
+}
+
+_rebuild_queue = threading.local()
 
 
 def _generate_receipt_reference(scope, payment_date):
@@ -27,31 +64,266 @@ def get_previous_term(target_term):
     )
 
 
-def summarize_fee_rollover(source_term, target_term):
-    source_assignments = list(
-        FeeAssignment.objects.filter(term=source_term).select_related('class_instance')
+def _ledger_totals(student_ids, term_ids):
+    """
+    Grouped fee and payment totals keyed by (student_id, term_id): one aggregate query each.
+    Returns ({key: {'total_fee', 'total_discount'}}, {key: total_paid}).
+    """
+    fee_totals = {
+        (row['student_id'], row['term_id']): row
+        for row in StudentFeeRecord.objects.filter(student_id__in=student_ids, term_id__in=term_ids)
+        .values('student_id', 'term_id')
+        .annotate(
+            total_fee=Coalesce(Sum('net_fee'), Decimal('0.00')),
+            total_discount=Coalesce(Sum('discount'), Decimal('0.00')),
+        )
+    }
+    paid_totals = {
+        (row['financial_record__student_id'], row['financial_record__term_id']): row['total_paid']
+        for row in Payment.objects.filter(
+            financial_record__student_id__in=student_ids, financial_record__term_id__in=term_ids,
+        )
+        .values('financial_record__student_id', 'financial_record__term_id')
+        .annotate(total_paid=Sum('amount_paid'))
+    }
+    return fee_totals, paid_totals
+
+
+def _lock_financial_records(record_ids):
+    """
+    Takes row locks on the given FinancialRecords in primary-key order, so concurrent posters
+    touching overlapping records always queue in the same order instead of deadlocking. Each
+    record carries its student's current class as `student_class_id`; only the record rows are
+    locked.
+    """
+    return list(
+        FinancialRecord.objects.select_for_update(of=('self',))
+        .filter(pk__in=list(record_ids))
+        .annotate(student_class_id=F('student__current_class_id'))
+        .order_by('pk')
     )
-    existing_target_class_ids = set(
-        FeeAssignment.objects.filter(
-            term=target_term,
-            class_instance_id__in=[assignment.class_instance_id for assignment in source_assignments],
-        ).values_list('class_instance_id', flat=True)
+
+
+def _balance_snapshot(records):
+    """
+    Payable balance per FinancialRecord id, read from the fee and payment tables rather than
+    the denormalized ledger columns (which may still be waiting on a deferred rebuild).
+    Two queries for any number of records.
+    """
+    records = list(records)
+    fee_totals, paid_totals = _ledger_totals(
+        {record.student_id for record in records}, {record.term_id for record in records},
     )
+    snapshot = {}
+    for record in records:
+        key = (record.student_id, record.term_id)
+        total_fee = fee_totals.get(key, {}).get('total_fee') or Decimal('0.00')
+        snapshot[record.pk] = {
+            'total_fee': total_fee,
+            'outstanding': total_fee - (paid_totals.get(key) or Decimal('0.00')),
+        }
+    return snapshot
+
+
+def rebuild_financial_records(pairs):
+    """
+    Recomputes the FinancialRecord ledger for every (student_id, term_id) pair in `pairs`.
+
+    Fee totals and payment totals come from one grouped aggregate each; missing records are
+    upserted with bulk_create and changed ones written with a single bulk_update, so the
+    query count does not grow with the number of students. Mirrors
+    FinancialRecord.update_record. Returns {'created', 'updated', 'unchanged'}.
+    """
+    pairs = {(int(student_id), int(term_id)) for student_id, term_id in pairs}
+    if not pairs:
+        return {'created': 0, 'updated': 0, 'unchanged': 0}
+    student_ids = {student_id for student_id, _ in pairs}
+    term_ids = {term_id for _, term_id in pairs}
+
+    fee_totals, paid_totals = _ledger_totals(student_ids, term_ids)
+    active_terms = dict(Term.objects.filter(pk__in=term_ids).values_list('pk', 'is_active'))
+    existing = {
+        (record.student_id, record.term_id): record
+        for record in FinancialRecord.objects.filter(student_id__in=student_ids, term_id__in=term_ids)
+        if (record.student_id, record.term_id) in pairs
+    }
+
+    to_create, to_update = [], []
+    for key in pairs:
+        fees = fee_totals.get(key, {})
+        total_fee = fees.get('total_fee') or Decimal('0.00')
+        total_paid = paid_totals.get(key) or Decimal('0.00')
+        values = {
+            'total_fee': total_fee,
+            'total_discount': fees.get('total_discount') or Decimal('0.00'),
+            'total_paid': total_paid,
+            'outstanding_balance': max(total_fee - total_paid, Decimal('0.00')),
+            'archived': not active_terms.get(key[1], False),
+        }
+        record = existing.get(key)
+        if record is None:
+            to_create.append(FinancialRecord(student_id=key[0], term_id=key[1], **values))
+        elif any(getattr(record, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(record, field, value)
+            to_update.append(record)
+
+    if to_create:
+        # Upsert so a record created concurrently since the read above is updated, not duplicated.
+        FinancialRecord.objects.bulk_create(
+            to_create, update_conflicts=True, unique_fields=['student', 'term'], update_fields=FINANCIAL_RECORD_FIELDS,
+        )
+    if to_update:
+        FinancialRecord.objects.bulk_update(to_update, FINANCIAL_RECORD_FIELDS)
+    if to_create or to_update:
+        # Bulk writes skip the FinancialRecord post_save that flags the admin dashboard.
+        invalidate_dashboard_metrics()
+        mark_dashboard_snapshots_stale(['admin'])
+        # Only archived terms have frozen summaries; see the Term signal for reactivation.
+        invalidate_finance_summaries({
+            record.term_id for record in (*to_create, *to_update) if not active_terms.get(record.term_id, False)
+        })
+
     return {
-        'source_term': source_term,
-        'target_term': target_term,
-        'source_assignments': source_assignments,
-        'existing_count': len(existing_target_class_ids),
-        'creatable_count': sum(1 for assignment in source_assignments if assignment.class_instance_id not in existing_target_class_ids),
-        'existing_target_class_ids': existing_target_class_ids,
+        'created': len(to_create),
+        'updated': len(to_update),
+        'unchanged': len(pairs) - len(to_create) - len(to_update),
     }
 
 
-def _rebuild_financial_records(term, student_ids):
-    for student_id in student_ids:
-        fin_record, _ = FinancialRecord.objects.get_or_create(student_id=student_id, term=term)
-        fin_record.update_record()
-        fin_record.save(update_fields=['total_fee', 'total_discount', 'total_paid', 'outstanding_balance', 'archived'])
+def invalidate_finance_summaries(term_ids):
+    """Drops every cached finance summary and the frozen snapshots of `term_ids`."""
+    bump_version(FINANCE_SUMMARY_VERSION_KEY)
+    if term_ids:
+        FinanceSummarySnapshot.objects.filter(term_id__in=term_ids).delete()
+
+
+def _finance_summary_version():
+    return get_version(FINANCE_SUMMARY_VERSION_KEY)
+
+
+def compute_finance_summary(records):
+    """
+    Overall and per-class totals of a FinancialRecord queryset from one grouped query; the
+    overall figures are the sum of the class rows. Returns {'total_fee', 'total_discount',
+    'total_paid', 'total_outstanding_balance', 'summary_by_class'}.
+    """
+    rows = records.order_by().values('student__current_class__name').annotate(
+        **{key: Sum(field) for key, field in FINANCE_SUMMARY_FIELDS.items()}
+    ).order_by('student__current_class__name')
+
+    summary_by_class = []
+    totals = {key: Decimal('0.00') for key in FINANCE_SUMMARY_FIELDS}
+    for row in rows:
+        class_row = {'class_name': row['student__current_class__name'] or 'Unassigned'}
+        for key in FINANCE_SUMMARY_FIELDS:
+            class_row[key] = row[key] or Decimal('0.00')
+            totals[key] += class_row[key]
+        summary_by_class.append(class_row)
+    return {
+        'total_fee': totals['expected'],
+        'total_discount': totals['discounts'],
+        'total_paid': totals['paid'],
+        'total_outstanding_balance': totals['outstanding'],
+        'summary_by_class': summary_by_class,
+    }
+
+
+def _summary_from_payload(payload):
+    # JSON stores the Decimals as strings.
+    summary = {key: Decimal(value) for key, value in payload.items() if key != 'summary_by_class'}
+    summary['summary_by_class'] = [
+        {key: value if key == 'class_name' else Decimal(value) for key, value in row.items()}
+        for row in payload.get('summary_by_class', [])
+    ]
+    return summary
+
+
+def _archived_term_summary(term_id):
+    """The frozen summary of an archived term, built on first use; None for an active term."""
+    snapshot = FinanceSummarySnapshot.objects.filter(term_id=term_id, term__is_active=False).first()
+    if snapshot is not None:
+        return _summary_from_payload(snapshot.payload)
+    term = Term.objects.filter(pk=term_id).only('pk', 'is_active').first()
+    if term is None or term.is_active:
+        return None
+    summary = compute_finance_summary(FinancialRecord.objects.filter(term=term))
+    FinanceSummarySnapshot.objects.update_or_create(term=term, defaults={'payload': summary})
+    return summary
+
+
+def get_finance_summary(session_id=None, term_id=None):
+    """
+    Finance totals for one term, one session or the whole ledger, cached per (session, term)
+    until the next ledger rebuild or FINANCE_SUMMARY_CACHE_TIMEOUT. On a cache miss an archived
+    term is read from its FinanceSummarySnapshot, so historical reports cost no aggregation.
+    """
+    cache_key = f"core:finance_summary:{session_id or 'all'}:{term_id or 'all'}:{_finance_summary_version()}"
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = _archived_term_summary(term_id) if term_id else None
+        if summary is None:
+            records = FinancialRecord.objects.all()
+            if term_id:
+                records = records.filter(term_id=term_id)
+            elif session_id:
+                records = records.filter(term__session_id=session_id)
+            summary = compute_finance_summary(records)
+        cache.set(cache_key, summary, getattr(settings, 'FINANCE_SUMMARY_CACHE_TIMEOUT', 10 * 60))
+    return summary
+
+
+def _pending_rebuilds():
+    return getattr(_rebuild_queue, 'pairs', None)
+
+
+def queue_financial_record_rebuild(student_id, term_id):
+    """
+    Marks the (student, term) ledger dirty. Inside deferred_financial_rebuilds() the rebuild
+    is coalesced with every other change in the block; outside it runs straight away.
+    """
+    pending = _pending_rebuilds()
+    if pending is None:
+        rebuild_financial_records([(student_id, term_id)])
+    else:
+        pending.add((student_id, term_id))
+
+
+def flush_financial_rebuilds(pairs):
+    """
+    Rebuilds a batch of dirty ledgers. Batches at or above FINANCE_REBUILD_ASYNC_THRESHOLD go to
+    the worker once the transaction commits when FINANCE_REBUILD_ASYNC is on.
+    """
+    pairs = sorted(pairs)
+    if not pairs:
+        return None
+    threshold = getattr(settings, 'FINANCE_REBUILD_ASYNC_THRESHOLD', 500)
+    if getattr(settings, 'FINANCE_REBUILD_ASYNC', False) and len(pairs) >= threshold:
+        from core.tasks import rebuild_financial_records_task
+        transaction.on_commit(lambda: rebuild_financial_records_task.delay(pairs))
+        return None
+    return rebuild_financial_records(pairs)
+
+
+@contextmanager
+def deferred_financial_rebuilds():
+    """
+    Collects the FinancialRecord rebuilds requested by signals and services in the block and
+    runs them once, as a single batch, when the outermost block exits. Nested blocks join the
+    outer one; if the block raises, the queue is dropped along with the work that filled it.
+    Usable as a decorator.
+    """
+    if _pending_rebuilds() is not None:
+        yield
+        return
+    _rebuild_queue.pairs = set()
+    try:
+        yield
+    except BaseException:
+        _rebuild_queue.pairs = None
+        raise
+    pairs, _rebuild_queue.pairs = _rebuild_queue.pairs, None
+    flush_financial_rebuilds(pairs)
 
 
 @transaction.atomic
@@ -142,19 +414,20 @@ def sync_student_fee_records_for_term(
             record.fee_assignment = assignment
             needs_save = True
         if needs_save:
+            record.net_fee = record.calculate_net_fee()
             records_to_update.append(record)
             touched_student_ids.add(student.pk)
             updated_count += 1
         else:
             skipped_count += 1
 
-    if created_records:
-        StudentFeeRecord.objects.bulk_create(created_records)
-    for record in records_to_update:
-        record.save()
-
-    if touched_student_ids:
-        _rebuild_financial_records(target_term, touched_student_ids)
+    with deferred_financial_rebuilds():
+        if created_records:
+            StudentFeeRecord.objects.bulk_create(created_records)
+        if records_to_update:
+            StudentFeeRecord.objects.bulk_update(records_to_update, ['amount', 'fee_assignment', 'net_fee'])
+        for student_id in touched_student_ids:
+            queue_financial_record_rebuild(student_id, target_term.pk)
 
     return {
         'created': created_count,
@@ -164,56 +437,39 @@ def sync_student_fee_records_for_term(
     }
 
 
-@transaction.atomic
-def rollover_fee_assignments(
-    source_term,
-    target_term,
-    overwrite_existing_assignments=False,
-    carry_forward_adjustments=True,
-):
-    created_count = 0
-    updated_count = 0
-    skipped_count = 0
-    touched_class_ids = []
-
-    for source_assignment in FeeAssignment.objects.filter(term=source_term).select_related('class_instance'):
-        target_assignment = FeeAssignment.objects.filter(
-            term=target_term,
-            class_instance=source_assignment.class_instance,
-        ).first()
-
-        if target_assignment is None:
-            FeeAssignment.objects.create(
-                class_instance=source_assignment.class_instance,
-                term=target_term,
-                amount=source_assignment.amount,
-            )
-            created_count += 1
-            touched_class_ids.append(source_assignment.class_instance_id)
-            continue
-
-        if overwrite_existing_assignments and target_assignment.amount != source_assignment.amount:
-            target_assignment.amount = source_assignment.amount
-            target_assignment.save(update_fields=['amount'])
-            updated_count += 1
-            touched_class_ids.append(source_assignment.class_instance_id)
-        else:
-            skipped_count += 1
-            touched_class_ids.append(source_assignment.class_instance_id)
-
-    sync_summary = sync_student_fee_records_for_term(
-        target_term,
-        source_term=source_term,
-        class_ids=touched_class_ids,
-        carry_forward_adjustments=carry_forward_adjustments,
+def request_fee_sync(term, force=False):
+    """
+    Queues a background StudentFeeRecord sync for `term` once the current transaction commits.
+    Requests made while one is already pending coalesce into that run unless `force` is set
+    (the manual "sync now", which also recovers from a run that never finished).
+    Returns True if a run was queued.
+    """
+    if term is None:
+        return False
+    state, _ = FeeSyncState.objects.get_or_create(term=term)
+    pending = FeeSyncState.objects.filter(pk=state.pk)
+    if not force:
+        pending = pending.filter(is_pending=False)
+    queued = pending.update(is_pending=True, requested_at=timezone.now())
+    if queued:
+        from core.tasks import sync_fee_records_task
+        term_id = term.pk
+        transaction.on_commit(lambda: sync_fee_records_task.delay(term_id))
+    return bool(queued)
+
+
+def run_fee_sync(term):
+    """Runs the fee sync for `term` now and records when it finished."""
+    # Clear the flag first so changes made while the sync runs queue another pass.
+    FeeSyncState.objects.update_or_create(term=term, defaults={'is_pending': False})
+    summary = sync_student_fee_records_for_term(
+        term,
+        source_term=get_previous_term(term),
+        carry_forward_adjustments=True,
         active_only=True,
     )
-    return {
-        'created_assignments': created_count,
-        'updated_assignments': updated_count,
-        'skipped_assignments': skipped_count,
-        'sync': sync_summary,
-    }
+    FeeSyncState.objects.filter(term=term).update(last_synced_at=timezone.now(), last_summary=summary)
+    return summary
 
 
 def get_bulk_payment_candidates(scope, term, guardian=None, class_instance=None):
@@ -311,6 +567,227 @@ def _clean_manual_allocations(preview, manual_allocations, total_amount):
     return allocations
 
 
+@transaction.atomic
+def post_payments(payments):
+    """
+    Validates and saves new (unsaved) Payment instances under row locks.
+
+    The affected FinancialRecords are locked with select_for_update in primary-key order, so
+    posters that share records wait for each other in the same order and never deadlock, while
+    posters on different records run in parallel. Each payment is checked against the balance
+    left by the fees, the payments already committed and the earlier payments in this batch,
+    and the batch is inserted with one bulk_create. Raises ValidationError and saves nothing if
+    any payment would overpay its record.
+
+    Each payment's fields are validated with clean_fields() and validate_constraints(); the
+    balance check of Payment.clean() is replaced by the batch check below, which already runs
+    under the locks.
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+    records = {
+        record.pk: record
+        for record in _lock_financial_records({payment.financial_record_id for payment in payments})
+    }
+    snapshot = _balance_snapshot(records.values())
+
+    remaining = {record_id: balance['outstanding'] for record_id, balance in snapshot.items()}
+    for payment in payments:
+        if payment.pk is not None:
+            raise ValueError('post_payments only posts new payments.')
+        # The financial record was just locked, so its existence needs no extra query.
+        payment.clean_fields(exclude=['financial_record'])
+        payment.validate_constraints()
+        if payment.amount_paid is None or payment.amount_paid <= Decimal('0.00'):
+            raise ValidationError('Payment amount must be greater than zero.')
+        record = records.get(payment.financial_record_id)
+        if record is None:
+            raise ValidationError('Payment must be associated with a Financial Record.')
+        if snapshot[record.pk]['total_fee'] <= Decimal('0.00'):
+            raise ValidationError(f"No fee record found for {record.student} in {record.term}.")
+        if payment.amount_paid > remaining[record.pk] + Decimal('0.01'):
+            raise ValidationError(
+                f"Payment of ₦{payment.amount_paid:.2f} for {record.student} exceeds the outstanding balance "
+                f"(₦{max(remaining[record.pk], Decimal('0.00')):.2f})."
+            )
+        remaining[record.pk] -= payment.amount_paid
+        if payment.school_class_id is None:
+            payment.school_class_id = record.student_class_id
+
+    with deferred_financial_rebuilds():
+        created = Payment.objects.bulk_create(payments)
+        # bulk_create skips the Payment post_save, so queue the ledgers and rollups explicitly.
+        for record in records.values():
+            queue_financial_record_rebuild(record.student_id, record.term_id)
+        record_payment_rollups(
+            (
+                payment.financial_record_id, payment.school_class_id, payment.payment_date,
+                payment.batch_reference, payment.amount_paid, 1,
+            )
+            for payment in created
+        )
+    return created
+
+
+@transaction.atomic
+def update_payment(payment):
+    """
+    Saves an edit of an existing Payment under a row lock on its FinancialRecord (and on the
+    previous one when the payment moves), so the overpayment check in Payment.clean() sees every
+    payment committed by concurrent posters. Raises ValidationError and saves nothing if the
+    edit would overpay the record.
+    """
+    if payment.pk is None:
+        raise ValueError('update_payment only saves existing payments; use post_payments.')
+    previous_record_id = Payment.objects.filter(pk=payment.pk).values_list('financial_record_id', flat=True).first()
+    _lock_financial_records({payment.financial_record_id, previous_record_id} - {None})
+    payment.save()  # full_clean() runs here, under the lock; the post_save signal moves the ledgers
+    return payment
+
+
+def record_payment_rollups(entries):
+    """
+    Moves the PaymentDailyRollup totals by `entries`: (financial_record_id, school_class_id,
+    payment_date, batch_reference, amount, count) tuples where count is 1 for a new payment and -1
+    for a removed one. The class is the one stored on the payment when it was recorded, so a
+    removal leaves the bucket it was added to even if the student has changed class since. One
+    query resolves each record's term; the buckets are then created if missing and shifted in a
+    single UPDATE with F() expressions, so concurrent posters add up.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+    term_by_record = dict(
+        FinancialRecord.objects.filter(pk__in={entry[0] for entry in entries}).order_by().values_list('pk', 'term_id')
+    )
+    date_field = Payment._meta.get_field('payment_date')
+    deltas = {}
+    for record_id, class_id, payment_date, batch_reference, amount, count in entries:
+        if record_id not in term_by_record:
+            continue
+        term_id = term_by_record[record_id]
+        key = (date_field.to_python(payment_date), term_id, class_id, (batch_reference or '').strip())
+        total, payments = deltas.get(key, (Decimal('0.00'), 0))
+        deltas[key] = (total + amount * count, payments + count)
+    _apply_rollup_deltas({key: delta for key, delta in deltas.items() if delta != (Decimal('0.00'), 0)})
+
+
+def _rollup_buckets(keys):
+    rows = PaymentDailyRollup.objects.filter(
+        date__in={key[0] for key in keys}, term_id__in={key[1] for key in keys},
+    ).order_by('pk').values_list('pk', 'date', 'term_id', 'school_class_id', 'batch_reference')
+    buckets = {}
+    for pk, *key in rows:
+        buckets.setdefault(tuple(key), pk)
+    return buckets
+
+
+def _apply_rollup_deltas(deltas):
+    if not deltas:
+        return
+    buckets = _rollup_buckets(deltas)
+    missing = [key for key in deltas if key not in buckets]
+    if missing:
+        # Create empty buckets first (a concurrent poster may win the race), then add to them.
+        PaymentDailyRollup.objects.bulk_create(
+            [
+                PaymentDailyRollup(date=day, term_id=term_id, school_class_id=class_id, batch_reference=reference)
+                for day, term_id, class_id, reference in missing
+            ],
+            ignore_conflicts=True,
+        )
+        buckets = _rollup_buckets(deltas)
+    targets = {buckets[key]: delta for key, delta in deltas.items()}
+    PaymentDailyRollup.objects.filter(pk__in=targets).update(
+        total_amount=F('total_amount') + Case(
+            *[When(pk=pk, then=Value(total)) for pk, (total, _) in targets.items()],
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        payment_count=F('payment_count') + Case(
+            *[When(pk=pk, then=Value(count)) for pk, (_, count) in targets.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_payment_rollups(terms=None):
+    """
+    Rebuilds the PaymentDailyRollup rows of `terms` (every term when omitted) from Payment in one
+    grouped query, attributing payments to the class stored on each payment when it was recorded.
+    Returns {'rows', 'payments'}.
+    """
+    payments = Payment.objects.all()
+    rollups = PaymentDailyRollup.objects.all()
+    if terms is not None:
+        payments = payments.filter(financial_record__term__in=terms)
+        rollups = rollups.filter(term__in=terms)
+    rows = list(
+        payments.values(
+            'payment_date', 'financial_record__term_id', 'school_class_id', 'batch_reference',
+        ).annotate(total=Sum('amount_paid'), count=Count('pk')).order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        PaymentDailyRollup.objects.bulk_create([
+            PaymentDailyRollup(
+                date=row['payment_date'],
+                term_id=row['financial_record__term_id'],
+                school_class_id=row['school_class_id'],
+                batch_reference=row['batch_reference'],
+                total_amount=row['total'],
+                payment_count=row['count'],
+            )
+            for row in rows
+        ])
+    return {'rows': len(rows), 'payments': sum(row['count'] for row in rows)}
+
+
+def payment_collection_trends(
+    period='day', start=None, end=None, term_id=None, class_id=None, batch_reference=None, group_by=None,
+):
+    """
+    Collection totals per day, week or month from PaymentDailyRollup, optionally filtered and split
+    by class, term or batch reference. One grouped query over the rollup rows.
+    """
+    if period not in PAYMENT_ROLLUP_PERIODS:
+        raise ValueError(f"Unknown period '{period}'.")
+    if group_by is not None and group_by not in PAYMENT_ROLLUP_GROUPS:
+        raise ValueError(f"Unknown grouping '{group_by}'.")
+    rollups = PaymentDailyRollup.objects.all()
+    if start:
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        rollups = rollups.filter(date__lte=end)
+    if term_id:
+        rollups = rollups.filter(term_id=term_id)
+    if class_id:
+        rollups = rollups.filter(school_class_id=class_id)
+    if batch_reference is not None:
+        rollups = rollups.filter(batch_reference=batch_reference)
+
+    group_fields = PAYMENT_ROLLUP_GROUPS.get(group_by, ())
+    rows = rollups.annotate(period=PAYMENT_ROLLUP_PERIODS[period]()).values('period', *group_fields).annotate(
+        amount=Sum('total_amount'), payments=Sum('payment_count'),
+    ).order_by('period', *group_fields)
+
+    series = [
+        {'period': row['period'], **{field: row[field] for field in group_fields},
+         'amount': row['amount'], 'payments': row['payments']}
+        for row in rows
+    ]
+    return {
+        'period': period,
+        'group_by': group_by,
+        'series': series,
+        'total_amount': sum((point['amount'] for point in series), Decimal('0.00')),
+        'total_payments': sum(point['payments'] for point in series),
+    }
+
+
 def create_payment_receipt(
     payments,
     *,
@@ -333,18 +810,23 @@ def create_payment_receipt(
 
     first_payment = payments[0]
     resolved_reference = (batch_reference or '').strip() or _generate_receipt_reference(scope, first_payment.payment_date)
+    # Current ledger state for every record on the receipt, in one query.
+    records = FinancialRecord.objects.select_related('student__user', 'student__current_class').in_bulk(
+        {payment.financial_record_id for payment in payments}
+    )
     line_items = []
     for payment in payments:
-        payment.financial_record.refresh_from_db(fields=['outstanding_balance', 'total_discount'])
+        record = records[payment.financial_record_id]
+        student = record.student
         preview_entry = preview_map.get(str(payment.financial_record_id), {})
         line_items.append({
             'payment_id': payment.pk,
             'financial_record_id': payment.financial_record_id,
-            'student_id': payment.financial_record.student_id,
-            'student_name': payment.student.user.get_full_name(),
-            'class_name': payment.student.current_class.name if payment.student.current_class else 'Unassigned',
-            'discount_amount': str(preview_entry.get('discount_amount', payment.financial_record.total_discount or Decimal('0.00'))),
-            'outstanding_balance': str(payment.financial_record.outstanding_balance or Decimal('0.00')),
+            'student_id': record.student_id,
+            'student_name': student.user.get_full_name(),
+            'class_name': student.current_class.name if student.current_class else 'Unassigned',
+            'discount_amount': str(preview_entry.get('discount_amount', record.total_discount or Decimal('0.00'))),
+            'outstanding_balance': str(record.outstanding_balance or Decimal('0.00')),
             'fee_category': 'School Fees',
             'amount_paid': str(payment.amount_paid),
         })
@@ -366,6 +848,7 @@ def create_payment_receipt(
 
 
 @transaction.atomic
+@deferred_financial_rebuilds()
 def allocate_bulk_payment(
     scope,
     term,
@@ -376,6 +859,17 @@ def allocate_bulk_payment(
     batch_reference='',
     manual_allocations=None,
 ):
+    """
+    Splits one payment across the outstanding records of a class or guardian.
+
+    The candidate FinancialRecords are locked before the preview is read, and the allocations are
+    posted through post_payments, which checks them against one balance snapshot taken under
+    those locks and inserts them with a single bulk_create. The touched ledgers are rebuilt
+    together when the block exits.
+    """
+    candidates = get_bulk_payment_candidates(scope, term, guardian=guardian, class_instance=class_instance)
+    _lock_financial_records(candidates.values_list('pk', flat=True))
+
     preview = build_bulk_payment_preview(
         scope,
         term,
@@ -404,22 +898,24 @@ def allocate_bulk_payment(
     else:
         allocations = _clean_manual_allocations(preview, manual_allocations, total_amount)
 
-    created_payments = []
-
-    for record, allocation in allocations:
-        created_payments.append(
-            Payment.objects.create(
+    try:
+        created_payments = post_payments(
+            Payment(
                 financial_record=record,
                 amount_paid=allocation,
                 payment_date=payment_date,
                 batch_reference=(batch_reference or '').strip(),
             )
+            for record, allocation in allocations
         )
+    except ValidationError as exc:
+        raise ValueError(exc.messages[0]) from exc
 
+    allocated_total = sum((payment.amount_paid for payment in created_payments), Decimal('0.00'))
     return {
         'created_payments': created_payments,
-        'allocated_total': sum((payment.amount_paid for payment in created_payments), Decimal('0.00')),
-        'remaining_amount': max(Decimal(str(total_amount or '0.00')) - sum((payment.amount_paid for payment in created_payments), Decimal('0.00')), Decimal('0.00')),
+        'allocated_total': allocated_total,
+        'remaining_amount': max(Decimal(str(total_amount or '0.00')) - allocated_total, Decimal('0.00')),
         'candidate_count': preview['candidate_count'],
         'preview': preview,
-    }
\ No newline at end of file
+    }
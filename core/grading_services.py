@@ -0,0 +1,249 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+from core.models import Assessment, AssessmentSubmission, Exam, ExamSubmission, SubmissionIntake
+
+
+AUTO_GRADED_TYPES = ('SCQ', 'MCQ')
+
+
+def compile_question_key(question):
+    """
+    The answer key of one OnlineQuestion as a (question_id, question_type, points, correct)
+    tuple. `correct` is already normalized: the stripped, lower-cased answer for an SCQ, a
+    frozenset of options for an MCQ, and None when the question has no correct answer.
+    """
+    correct = None
+    if question.correct_answer:
+        if question.question_type == 'SCQ':
+            correct = str(question.correct_answer).strip().lower()
+        elif question.question_type == 'MCQ':
+            # Stored comma separated, or space separated when there is no comma.
+            if ',' in question.correct_answer:
+                options = (opt.strip().lower() for opt in question.correct_answer.split(','))
+            else:
+                options = (opt.strip().lower() for opt in question.correct_answer.split(' ') if opt.strip())
+            correct = frozenset(options) or None
+    return (question.pk, question.question_type, question.points or 0, correct)
+
+
+def is_answer_correct(question_key, submitted_answer):
+    """Whether `submitted_answer` (a string for SCQ, a list of options for MCQ) matches a compiled key."""
+    _question_id, question_type, _points, correct = question_key
+    if correct is None or submitted_answer is None:
+        return False
+    if question_type == 'SCQ':
+        return str(submitted_answer).strip().lower() == correct
+    if question_type == 'MCQ':
+        if not isinstance(submitted_answer, list):
+            return False
+        return {str(opt).strip().lower() for opt in submitted_answer} == correct
+    # Essays are marked by hand.
+    return False
+
+
+def _answer_key_cache_key(kind, item_id, version):
+    return f'core:answer_key:{kind}:{item_id}:{version}'
+
+
+def get_answer_key(item):
+    """
+    The compiled answer key of an Assessment or Exam: a tuple of compile_question_key entries
+    in question order. The cache key carries the item's answer_key_version, read from the
+    database on every call, so a key changed by another worker is never served stale.
+    """
+    model = type(item)
+    version = model.objects.filter(pk=item.pk).values_list('answer_key_version', flat=True).first() or 0
+    cache_key = _answer_key_cache_key(item._meta.model_name, item.pk, version)
+    answer_key = cache.get(cache_key)
+    if answer_key is None:
+        answer_key = tuple(compile_question_key(question) for question in item.questions.order_by('pk'))
+        cache.set(cache_key, answer_key, getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 24 * 60 * 60))
+    return answer_key
+
+
+def invalidate_answer_keys(assessment_ids=(), exam_ids=()):
+    """Bumps the answer_key_version of the given assessments and exams, retiring their cached keys."""
+    if assessment_ids:
+        Assessment.objects.filter(pk__in=assessment_ids).update(answer_key_version=F('answer_key_version') + 1)
+    if exam_ids:
+        Exam.objects.filter(pk__in=exam_ids).update(answer_key_version=F('answer_key_version') + 1)
+
+
+def invalidate_question_answer_keys(question):
+    """Retires the cached answer keys of every assessment and exam that uses `question`."""
+    invalidate_answer_keys(
+        assessment_ids=list(question.assessments.values_list('pk', flat=True)),
+        exam_ids=list(question.exams.values_list('pk', flat=True)),
+    )
+
+
+def collect_answers(answer_key, data):
+    """
+    The answers of one submission from POST-like `data`, keyed by question id as a string: the
+    list of ticked options for an MCQ (field answer_<id>), otherwise the single value or None.
+    """
+    answers = {}
+    for question_id, question_type, _points, _correct in answer_key:
+        field = f'answer_{question_id}'
+        answers[str(question_id)] = data.getlist(field) if question_type == 'MCQ' else data.get(field)
+    return answers
+
+
+def grade_answers(answer_key, answers):
+    """
+    Scores a whole answer sheet against a compiled key in one pass. Returns (score,
+    requires_manual_review); essays score nothing here and flag the sheet for review.
+    """
+    score = 0
+    requires_manual_review = False
+    for question_key in answer_key:
+        question_type = question_key[1]
+        if question_type == 'ES':
+            requires_manual_review = True
+        elif question_type in AUTO_GRADED_TYPES and is_answer_correct(question_key, answers.get(str(question_key[0]))):
+            score += question_key[2]
+    return Decimal(score), requires_manual_review
+
+
+def grade_submission(submission, data, force_submitted=False):
+    """
+    Grades and completes an AssessmentSubmission or ExamSubmission from POST-like `data`,
+    inline from submit_answers or in the worker for a queued intake. The submission row is locked
+    while it is graded, so a beacon and a manual submit arriving together grade it once.
+    Returns (submission, was_processed).
+    """
+    with transaction.atomic():
+        submission = type(submission).objects.select_for_update().get(pk=submission.pk)
+        if submission.is_completed:
+            return submission, False
+
+        item = submission.exam if hasattr(submission, 'exam_id') else submission.assessment
+        answer_key = get_answer_key(item)
+        answers = collect_answers(answer_key, data)
+        score, requires_manual_review = grade_answers(answer_key, answers)
+
+        now = timezone.now()
+        submission.answers = answers
+        submission.score = score
+        submission.requires_manual_review = requires_manual_review
+        submission.is_graded = not requires_manual_review
+        submission.is_completed = True
+        submission.submitted_at = now
+        if force_submitted:
+            submission.force_submitted_at = now
+        submission.save()  # The result signals fire after this save
+    return submission, True
+
+
+def _submission_kind(submission):
+    return 'exam' if hasattr(submission, 'exam_id') else 'assessment'
+
+
+def _submission_model(kind):
+    return ExamSubmission if kind == 'exam' else AssessmentSubmission
+
+
+def submit_answers(submission, data, force_submitted=False):
+    """
+    Entry point of every submit and autosubmit beacon. Grades inline, or, with
+    SUBMISSION_INGEST_ASYNC, stores the raw answers with one INSERT and queues the grading once
+    the transaction commits. Returns (submission, accepted); accepted is False when the
+    submission was already completed or already queued.
+    """
+    if not getattr(settings, 'SUBMISSION_INGEST_ASYNC', False):
+        return grade_submission(submission, data, force_submitted=force_submitted)
+    if submission.is_completed:
+        return submission, False
+
+    answers = {field: data.getlist(field) for field in data if field.startswith('answer_')}
+    try:
+        with transaction.atomic():
+            intake = SubmissionIntake.objects.create(
+                kind=_submission_kind(submission), submission_id=submission.pk,
+                answers=answers, force_submitted=force_submitted,
+            )
+    except IntegrityError:
+        # A beacon or a second click for a submission that is already queued.
+        return submission, False
+    queue_submission_intake(intake)
+    return submission, True
+
+
+def queue_submission_intake(intake):
+    from core.tasks import process_submission_intake_task
+    intake_id = intake.pk
+    transaction.on_commit(lambda: process_submission_intake_task.delay(intake_id))
+
+
+def process_submission_intake(intake_id):
+    """
+    Grades one queued submission in the worker. The grading save fires the subject-result and
+    dashboard signals here too, not in the request. Running it twice is harmless: a completed
+    intake is skipped, and grade_submission leaves a completed submission alone.
+    Returns the intake's status.
+    """
+    intake = SubmissionIntake.objects.filter(pk=intake_id).first()
+    if intake is None:
+        return None
+    if intake.status == 'completed':
+        return intake.status
+    intakes = SubmissionIntake.objects.filter(pk=intake.pk)
+    intakes.update(status='processing', attempts=F('attempts') + 1, updated_at=timezone.now())
+
+    submission = _submission_model(intake.kind)(pk=intake.submission_id)
+    try:
+        grade_submission(submission, MultiValueDict(intake.answers), force_submitted=intake.force_submitted)
+    except Exception as exc:
+        intakes.update(status='failed', error=str(exc), updated_at=timezone.now())
+        raise
+    now = timezone.now()
+    intakes.update(status='completed', error='', processed_at=now, updated_at=now)
+    return 'completed'
+
+
+def requeue_stalled_submission_intakes():
+    """
+    Queues again the intakes whose task never ran or did not finish: pending or processing for
+    longer than SUBMISSION_INTAKE_STALL_SECONDS, and failed ones with attempts left
+    (SUBMISSION_INTAKE_MAX_ATTEMPTS). Returns the number queued.
+    """
+    from core.tasks import process_submission_intake_task
+    stalled_before = timezone.now() - timedelta(seconds=getattr(settings, 'SUBMISSION_INTAKE_STALL_SECONDS', 300))
+    intake_ids = list(
+        SubmissionIntake.objects.filter(
+            Q(status__in=['pending', 'processing'], updated_at__lt=stalled_before) | Q(status='failed'),
+            attempts__lt=getattr(settings, 'SUBMISSION_INTAKE_MAX_ATTEMPTS', 5),
+        ).values_list('pk', flat=True)
+    )
+    for intake_id in intake_ids:
+        process_submission_intake_task.delay(intake_id)
+    return len(intake_ids)
+
+
+def get_submission_status(submission):
+    """Grading status of a submission for the client to poll, including its queued intake if any."""
+    kind = _submission_kind(submission)
+    intake = SubmissionIntake.objects.filter(kind=kind, submission_id=submission.pk).first()
+    if submission.is_completed:
+        status = 'completed'
+    elif intake is not None:
+        status = intake.status
+    else:
+        status = 'not_submitted'
+    return {
+        'kind': kind,
+        'submission_id': submission.pk,
+        'status': status,
+        'is_graded': submission.is_graded,
+        'requires_manual_review': submission.requires_manual_review,
+        'score': submission.score if submission.is_completed and submission.is_graded else None,
+        'error': intake.error if intake is not None and status == 'failed' else '',
+    }
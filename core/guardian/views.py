@@ -1,9 +1,7 @@
 # views.py
 
-import io 
 import json
 import random
-import pathlib
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.mixins import UserPassesTestMixin
@@ -14,7 +12,7 @@ from django.template.loader import render_to_string
 from django.http import HttpResponse, Http404, HttpResponseForbidden, HttpResponseNotAllowed
 from django.views import View
 from django.core.paginator import Paginator
-from django.db.models import Q, Sum, Count, Avg, F, DecimalField, Case, When, Value
+from django.db.models import Q, Sum, Avg, F, DecimalField, Case, When, Value
 from django.db.models.functions import Cast
 from decimal import Decimal, InvalidOperation
 from datetime import timedelta
@@ -22,18 +20,13 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from playwright.sync_api import sync_playwright
 from .forms import GuardianRegistrationForm, MessageForm, ReplyForm
-from core.models import CustomUser, Guardian, Term, Teacher, Session, FinancialRecord, Student, Result, Subject, SubjectResult, Attendance
+from core.models import CustomUser, Guardian, Term, Teacher, Session, FinancialRecord, Student, Result, Subject
 from core.models import Assignment, Assessment, Exam, AssessmentSubmission, ExamSubmission, Message, CumulativeRecord, SessionalResult, StudentFeeRecord
 from core.assignment.forms import AssignmentSubmission, AssignmentSubmissionForm
-
-
-try:
-    from weasyprint import HTML, CSS
-    from weasyprint.text.fonts import FontConfiguration
-except ImportError:
-    HTML = None # Handle case where WeasyPrint might not be installed
-    CSS = None
-    FontConfiguration = None
+from core.attendance_services import sessional_attendance_summary
+from core.grading_services import submit_answers
+from core.pdf_services import PDF_AVAILABLE, RESULT_STYLESHEETS, render_pdf
+from core.report_card_services import build_report_card_contexts, render_report_card_document
 
 
 # Guardian Views
@@ -488,43 +481,9 @@ def take_assessment(request, submission_id):
 
 
 def _process_and_save_assessment_submission(request, submission_id, force_submitted=False):
-    """Internal helper to process POST data for both regular and beacon submissions."""
+    """Internal helper to grade (or queue) the POSTed answers for both regular and beacon submissions."""
     submission = get_object_or_404(AssessmentSubmission, id=submission_id)
-    if submission.is_completed:
-        return submission, False
-
-    assessment = submission.assessment
-    answers = {}
-    score = Decimal('0.0')
-    requires_manual_review = False
-
-    for question in assessment.questions.all():
-        answer_key = f'answer_{question.id}'
-        submitted_answer = None
-        if question.question_type == 'MCQ':
-            submitted_answer = request.POST.getlist(answer_key)
-        else:
-            submitted_answer = request.POST.get(answer_key)
-        
-        answers[str(question.id)] = submitted_answer
-
-        if question.question_type == 'ES':
-            requires_manual_review = True
-        elif question.is_option_correct(submitted_answer):
-            score += Decimal(question.points) # Use points from OnlineQuestion
-            
-    submission.answers = answers
-    submission.score = score
-    submission.requires_manual_review = requires_manual_review
-    submission.is_graded = not requires_manual_review
-    submission.is_completed = True
-    submission.submitted_at = timezone.now()
-
-    if force_submitted:
-        submission.force_submitted_at = timezone.now()
-
-    submission.save() # The signal will fire after this save
-    return submission, True
+    return submit_answers(submission, request.POST, force_submitted=force_submitted)
 
 
 @login_required
@@ -534,7 +493,9 @@ def submit_assessment(request, submission_id):
         return HttpResponseNotAllowed(['POST'])
     
     submission, was_processed = _process_and_save_assessment_submission(request, submission_id)
-    if was_processed:
+    if was_processed and not submission.is_completed:
+        messages.success(request, f"Assessment '{submission.assessment.title}' received. Your score will appear once it has been graded.")
+    elif was_processed:
         messages.success(request, f"Assessment '{submission.assessment.title}' submitted successfully.")
     else:
         messages.warning(request, "Assessment was already submitted.")
@@ -548,10 +509,7 @@ def autosubmit_beacon_assessment(request, submission_id):
     if request.method != 'POST':
         return HttpResponse(status=204)
         
-    submission, was_processed = _process_and_save_assessment_submission(request, submission_id)
-    if was_processed:
-        submission.force_submitted_at = timezone.now()
-        submission.save()
+    _process_and_save_assessment_submission(request, submission_id, force_submitted=True)
     return HttpResponse(status=204)
 
 
@@ -633,43 +591,9 @@ def take_exam(request, submission_id):
 
 
 def _process_and_save_exam_submission(request, submission_id, force_submitted=False):
-    """Internal helper to process POST data for both regular and beacon submissions."""
+    """Internal helper to grade (or queue) the POSTed answers for both regular and beacon submissions."""
     submission = get_object_or_404(ExamSubmission, id=submission_id)
-    if submission.is_completed:
-        return submission, False
-
-    exam = submission.exam
-    answers = {}
-    score = Decimal('0.0')
-    requires_manual_review = False
-
-    for question in exam.questions.all():
-        answer_key = f'answer_{question.id}'
-        submitted_answer = None
-        if question.question_type == 'MCQ':
-            submitted_answer = request.POST.getlist(answer_key)
-        else:
-            submitted_answer = request.POST.get(answer_key)
-        
-        answers[str(question.id)] = submitted_answer
-
-        if question.question_type == 'ES':
-            requires_manual_review = True
-        elif question.is_option_correct(submitted_answer):
-            score += Decimal(question.points) # Use points from OnlineQuestion
-            
-    submission.answers = answers
-    submission.score = score
-    submission.requires_manual_review = requires_manual_review
-    submission.is_graded = not requires_manual_review
-    submission.is_completed = True
-    submission.submitted_at = timezone.now()
-
-    if force_submitted:
-        submission.force_submitted_at = timezone.now()
-    
-    submission.save() # The signal will fire after this save
-    return submission, True
+    return submit_answers(submission, request.POST, force_submitted=force_submitted)
 
 
 @login_required
@@ -679,7 +603,9 @@ def submit_exam(request, submission_id):
         return HttpResponseNotAllowed(['POST'])
     
     submission, was_processed = _process_and_save_exam_submission(request, submission_id)
-    if was_processed:
+    if was_processed and not submission.is_completed:
+        messages.success(request, f"Exam '{submission.exam.title}' received. Your score will appear once it has been graded.")
+    elif was_processed:
         messages.success(request, f"Exam '{submission.exam.title}' submitted successfully.")
     else:
         messages.warning(request, "Exam was already submitted.")
@@ -693,10 +619,7 @@ def autosubmit_beacon_exam(request, submission_id):
     if request.method != 'POST':
         return HttpResponse(status=204)
         
-    submission, was_processed = _process_and_save_exam_submission(request, submission_id)
-    if was_processed:
-        submission.force_submitted_at = timezone.now()
-        submission.save()
+    _process_and_save_exam_submission(request, submission_id, force_submitted=True)
     return HttpResponse(status=204)
 
 
@@ -996,11 +919,10 @@ def view_termly_result(request, student_id, term_id):
         # Use student_id (which is user_id/pk for Student model)
         student = get_object_or_404(Student.objects.select_related('user', 'current_class', 'cumulative_record'), pk=student_id)
         term = get_object_or_404(Term.objects.select_related('session'), id=term_id)
-        session = term.session
-        class_obj = student.current_class
 
         # Get or create the result object. get_or_create is safer.
         result, _ = Result.objects.get_or_create(student=student, term=term)
+        result.student, result.term = student, term
 
     except Http404:
         messages.error(request, "The requested result data could not be found.")
@@ -1022,127 +944,27 @@ def view_termly_result(request, student_id, term_id):
     if not (user.is_superuser or hasattr(user, 'teacher')) and not can_view_result:
         return render(request, 'student/result_access_denied.html', {'student': student, 'term': term})
         
-    # --- Just-in-Time Calculation (Fail-safe) ---
-    # If summary fields are empty, calculate and save them now.
-    if result.term_gpa is None or result.total_score is None or result.performance_change is None:
-        print(f"INFO: Calculating summary on-the-fly for result ID {result.id}...")
-        result.calculate_term_summary()
-        result.refresh_from_db() # Reload the instance to get the newly saved values
-
     # --- Fetch and Prepare ALL Data for Template ---
-    
-    # Absolute URLs for PDF rendering
-    profile_image_url = build_absolute_uri(request, student.profile_image.url) if student.profile_image else None
-    school_logo_url = build_absolute_uri(request, 'images/logo.jpg')
-    signature_url = build_absolute_uri(request, 'images/signature.png')
-
-    # Attendance Data (using the stored value on the result if available, otherwise calculate)
-    if result.attendance_percentage is not None:
-        attendance_data = {'attendance_percentage': result.attendance_percentage}
-    else:
-        total_days = Attendance.objects.filter(student=student, term=term).count() 
-        present_days = Attendance.objects.filter(student=student, term=term, is_present=True).count()
-        attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
-        attendance_data = {
-            'total_days': total_days,
-            'present_days': present_days,
-            'absent_days': total_days - present_days,
-            'attendance_percentage': round(attendance_percentage, 1), 
-        }
-    
-    # Subject Results for the table
-    subject_results_list = result.subject_results.select_related('subject').order_by('subject__name')
-
-    # Cumulative GPA (ensure the record is up-to-date)
-    try:
-        cumulative_record = student.cumulative_record
-        cumulative_record.update_cumulative_gpa() 
-        cumulative_gpa = cumulative_record.cumulative_gpa
-    except Student.cumulative_record.RelatedObjectDoesNotExist:
-        # Create cumulative record if it doesn't exist
-        from core.models import CumulativeRecord
-        cumulative_record = CumulativeRecord.objects.create(student=student)
-        cumulative_record.update_cumulative_gpa(save=True)
-        cumulative_gpa = cumulative_record.cumulative_gpa
-    
-    # If this is the first term within THIS SESSION for the student, show term GPA
-    # as the cumulative GPA for display purposes (tests expect this behaviour).
-    terms_in_same_session_count = Result.objects.filter(student=student, term__session=session).count()
-    if terms_in_same_session_count == 1:
-        cumulative_gpa = result.term_gpa
-
-    # Chart Data
-    chart_data = []
-    for sr in subject_results_list:
-        class_average = SubjectResult.get_class_average(sr.subject, term, class_obj) 
-        total_score_val = sr.total_score() 
-        chart_data.append({
-            'subject': sr.subject.name,
-            'total_score': float(total_score_val) if total_score_val is not None else 0.0,
-            'class_average': float(class_average) if class_average is not None else 0.0
-        })
-
-    # --- Final Context Dictionary ---
-    context = {
-        'student': student,
-        'result': result, # Contains term_gpa, performance_change, remarks, skills
-        'term': term,
-        'session': session, 
-        'class_obj': class_obj,
-        'subject_results': subject_results_list, 
-        'cumulative_gpa': cumulative_gpa,
-        'chart_data_json': json.dumps(chart_data), 
-        'attendance_data': attendance_data,
-        'teacher_comment': result.teacher_remarks,
-        'principal_comment': result.principal_remarks,
-        'profile_image_url': profile_image_url,
-        'school_logo_url': school_logo_url,
-        'signature_url': signature_url,
-        'is_pdf_render': False, 
-    }
+    # Summaries that were never computed are filled in on the way (just-in-time fail-safe);
+    # asset URLs are absolute so the same context also renders the PDF.
+    context = build_report_card_contexts(
+        [result], absolute_url=lambda path: build_absolute_uri(request, path),
+    )[0]
 
     # --- PDF Download Handling ---
     if "download" in request.GET and request.GET["download"] == "pdf":
-        if HTML is None:
+        if not PDF_AVAILABLE:
             return HttpResponse("PDF generation library (WeasyPrint) is not installed or configured correctly.", status=500) 
 
         context['is_pdf_render'] = True 
 
-        # Render HTML to string using the SAME template
-        html_string = render_to_string('guardian/view_result.html', context)
+        # The printable part of the page, in the same document the batch report cards use
+        html_string = render_report_card_document([context], title=f"{student.user.get_full_name()} - {term}")
 
         try:
-            # Assume STATICFILES_DIRS contains at least one path
-            base_static_dir = pathlib.Path(settings.STATICFILES_DIRS[0])
-            css_path = base_static_dir / 'css' / 'result_styles.css' # Use / operator with Path objects
-
-            # Check if the file actually exists before trying to load it
-            if not css_path.is_file():
-                 raise FileNotFoundError(f"Result CSS file not found at calculated path: {css_path}")
-
-            font_config = FontConfiguration()
-            css = CSS(filename=css_path, font_config=font_config)
-
-        except IndexError:
-            return HttpResponse("Error generating PDF: Static file configuration missing.", status=500)
-        except FileNotFoundError as e:
-             return HttpResponse("Error generating PDF: Required styles missing.", status=500)
-        except Exception as e:
-             return HttpResponse("Error generating PDF: Could not load styles.", status=500)
-
-
-        try:
-            # Create HTML object
-            html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-            # Generate PDF in memory
-            pdf_file = io.BytesIO()
-            html.write_pdf(
-                target=pdf_file,
-                stylesheets=[css], 
-                font_config=font_config # Needed if using CSS object method
-            )
-            pdf_file.seek(0) # Rewind the buffer
-
+            pdf_file = render_pdf(html_string, RESULT_STYLESHEETS)
+        except FileNotFoundError:
+            return HttpResponse("Error generating PDF: Required styles missing.", status=500)
         except Exception as e:
             # Catch WeasyPrint errors
             return HttpResponse(f"An error occurred during PDF generation: {e}", status=500)
@@ -1222,9 +1044,7 @@ def view_sessional_result(request, student_id, session_id):
     ).distinct().order_by('name')
 
     # Sessional Attendance
-    sessional_attendance = Attendance.objects.filter(student=student, term__in=terms_in_session).aggregate(
-        total_days=Count('id'), present_days=Count('id', filter=Q(is_present=True))
-    )
+    sessional_attendance = sessional_attendance_summary(student, terms_in_session)
     sessional_total_days = sessional_attendance.get('total_days', 0)
     sessional_present_days = sessional_attendance.get('present_days', 0)
     
@@ -1332,15 +1152,13 @@ def view_sessional_result(request, student_id, session_id):
 
     # --- PDF Download Handling ---
     if "download" in request.GET and request.GET["download"] == "pdf":
-        if HTML is None:
+        if not PDF_AVAILABLE:
             return HttpResponse("PDF generation library is not available.", status=501)
         
         context['is_pdf_render'] = True
         html_string = render_to_string('student/view_sessional_result.html', context)
         try:
-            css_path = settings.STATICFILES_DIRS[0] / 'css' / 'result_styles.css'
-            html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-            pdf_file = html.write_pdf(stylesheets=[CSS(filename=css_path)])
+            pdf_file = render_pdf(html_string, RESULT_STYLESHEETS)
             
             response = HttpResponse(pdf_file, content_type='application/pdf')
             student_name_safe = "".join(c for c in student.user.get_full_name() if c.isalnum() or c in " _-").rstrip()
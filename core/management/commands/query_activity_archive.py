@@ -0,0 +1,50 @@
+"""
+Management command to read archived activity log rows back, one JSON object per line.
+
+Usage:
+    python manage.py query_activity_archive core --from 2025-01 --to 2025-03
+    python manage.py query_activity_archive core --user 12 --type login
+    python manage.py query_activity_archive lms --user 40 --count
+"""
+
+from datetime import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from core.activity_services import ACTIVITY_SOURCES, iter_archived_activity
+
+
+class Command(BaseCommand):
+    help = 'Print (or count) the rows of the activity log archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', choices=ACTIVITY_SOURCES, help="'core' (ActivityLog) or 'lms' (StudentActivityLog)")
+        parser.add_argument('--from', dest='start', help='First month to read, as YYYY-MM')
+        parser.add_argument('--to', dest='end', help='Last month to read, as YYYY-MM')
+        parser.add_argument('--user', type=int, help='Only rows of this user (student for lms)')
+        parser.add_argument('--type', dest='activity_type', help='Only rows of this activity type')
+        parser.add_argument('--count', action='store_true', help='Print the number of matching rows only')
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options['user'] is not None:
+            filters['student_id' if options['source'] == 'lms' else 'user_id'] = options['user']
+        if options['activity_type']:
+            filters['activity_type'] = options['activity_type']
+
+        rows = iter_archived_activity(
+            options['source'], self._month(options['start']), self._month(options['end']), **filters,
+        )
+        if options['count']:
+            self.stdout.write(str(sum(1 for _ in rows)))
+            return
+        for row in rows:
+            self.stdout.write(json.dumps(row))
+
+    def _month(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f"'{value}' is not a month in YYYY-MM form.")
@@ -0,0 +1,34 @@
+"""
+Management command to rebuild the daily payment rollups from Payment rows.
+
+Usage:
+    python manage.py rebuild_payment_rollups            # every term
+    python manage.py rebuild_payment_rollups --term 4
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Term
+from core.finance_services import rebuild_payment_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild PaymentDailyRollup rows from Payment rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--term',
+            type=int,
+            help='ID of the term to rebuild (defaults to every term)',
+        )
+
+    def handle(self, *args, **options):
+        terms = None
+        if options['term']:
+            terms = Term.objects.filter(pk=options['term'])
+            if not terms.exists():
+                raise CommandError(f"Term {options['term']} does not exist.")
+
+        report = rebuild_payment_rollups(terms)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {report['rows']} daily rollup rows from {report['payments']} payments."
+        ))
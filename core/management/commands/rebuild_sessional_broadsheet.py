@@ -0,0 +1,44 @@
+"""
+Management command to rebuild the materialized sessional broadsheet for a session.
+
+Usage:
+    python manage.py rebuild_sessional_broadsheet            # active session
+    python manage.py rebuild_sessional_broadsheet --session 3
+    python manage.py rebuild_sessional_broadsheet --stale-only
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Session
+from core.result_services import refresh_sessional_broadsheet
+
+
+class Command(BaseCommand):
+    help = 'Rebuild SessionalBroadsheetRow entries for every class in a session'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--session',
+            type=int,
+            help='ID of the session to rebuild (defaults to the active session)',
+        )
+        parser.add_argument(
+            '--stale-only',
+            action='store_true',
+            help='Only refresh rows whose results changed since they were last built',
+        )
+
+    def handle(self, *args, **options):
+        if options['session']:
+            session = Session.objects.filter(pk=options['session']).first()
+            if not session:
+                raise CommandError(f"Session {options['session']} does not exist.")
+        else:
+            session = Session.objects.filter(is_active=True).order_by('-start_date').first()
+            if not session:
+                raise CommandError('No active session found. Pass --session explicitly.')
+
+        summary = refresh_sessional_broadsheet(session, force=not options['stale_only'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sessional broadsheet for {session.name}: {summary['created']} created, "
+            f"{summary['updated']} updated, {summary['deleted']} removed."
+        ))
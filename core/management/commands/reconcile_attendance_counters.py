@@ -0,0 +1,35 @@
+"""
+Management command to rebuild the per-term attendance counters from raw Attendance rows.
+
+Usage:
+    python manage.py reconcile_attendance_counters            # every term
+    python manage.py reconcile_attendance_counters --term 4
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Term
+from core.attendance_services import reconcile_attendance_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild TermAttendanceSummary counters from Attendance rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--term',
+            type=int,
+            help='ID of the term to reconcile (defaults to every term)',
+        )
+
+    def handle(self, *args, **options):
+        terms = None
+        if options['term']:
+            terms = Term.objects.filter(pk=options['term'])
+            if not terms.exists():
+                raise CommandError(f"Term {options['term']} does not exist.")
+
+        report = reconcile_attendance_counters(terms)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {report['rows']} attendance counters across {report['terms']} term(s); "
+            f"{report['corrected']} had drifted."
+        ))
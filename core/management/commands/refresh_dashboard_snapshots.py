@@ -0,0 +1,25 @@
+"""
+Management command to refresh the precomputed dashboard snapshots.
+
+Usage:
+    python manage.py refresh_dashboard_snapshots          # stale snapshots only
+    python manage.py refresh_dashboard_snapshots --all
+"""
+
+from django.core.management.base import BaseCommand
+from core.dashboard_services import refresh_stale_dashboard_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild stale (or all) DashboardSnapshot rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refresh every snapshot, not only the ones marked stale',
+        )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_stale_dashboard_snapshots(include_fresh=options['all'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} dashboard snapshot(s)."))
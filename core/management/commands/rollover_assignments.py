@@ -0,0 +1,85 @@
+"""
+Management command to roll assignments over between terms or sessions, or resume a failed job.
+
+Usage:
+    python manage.py rollover_assignments --source-term 4 --target-term 5 --dry-run
+    python manage.py rollover_assignments --source-session 2 --target-session 3
+    python manage.py rollover_assignments --source-term 4 --target-term 5 --kinds fee_assignments --overwrite
+    python manage.py rollover_assignments --resume 12
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import RolloverJob, Session, Term
+from core.rollover_services import (
+    ASSIGNMENT_KINDS,
+    ROLLOVER_KINDS,
+    create_rollover_job,
+    preview_rollover,
+    run_rollover_job,
+    session_term_pairs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Copy teacher, subject and fee assignments into a new term or session'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source-term', type=int, help='ID of the term to copy from')
+        parser.add_argument('--target-term', type=int, help='ID of the term to copy into')
+        parser.add_argument('--source-session', type=int, help='ID of the session to copy from')
+        parser.add_argument('--target-session', type=int, help='ID of the session to copy into')
+        parser.add_argument(
+            '--kinds',
+            nargs='+',
+            choices=sorted(ROLLOVER_KINDS),
+            default=list(ASSIGNMENT_KINDS),
+            help='Assignment kinds to copy (defaults to teacher, class subject and subject assignments)',
+        )
+        parser.add_argument('--overwrite', action='store_true', help='Reset existing target rows to the source values')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be copied without writing')
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help='Resume an unfinished rollover job')
+
+    def get_object(self, model, pk):
+        obj = model.objects.filter(pk=pk).first()
+        if obj is None:
+            raise CommandError(f"{model.__name__} {pk} does not exist.")
+        return obj
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            job = self.get_object(RolloverJob, options['resume'])
+            self.report(run_rollover_job(job.pk)['summary'], job.kinds)
+            return
+
+        if options['source_session'] and options['target_session']:
+            scope = 'session'
+            source = self.get_object(Session, options['source_session'])
+            target = self.get_object(Session, options['target_session'])
+        elif options['source_term'] and options['target_term']:
+            scope = 'term'
+            source = self.get_object(Term, options['source_term'])
+            target = self.get_object(Term, options['target_term'])
+        else:
+            raise CommandError('Pass --source-term/--target-term, --source-session/--target-session or --resume.')
+
+        if options['dry_run']:
+            pairs = session_term_pairs(source, target, create_missing=False) if scope == 'session' else [(source, target)]
+            self.stdout.write("Dry run: nothing will be written.")
+            self.report(preview_rollover(pairs, options['kinds'], overwrite_existing=options['overwrite']), options['kinds'])
+            return
+
+        # Runs inline; the job row still records progress so an interrupted run can be resumed.
+        job = create_rollover_job(
+            scope, source, target, kinds=options['kinds'], options={'overwrite_existing': options['overwrite']},
+        )
+        result = run_rollover_job(job.pk)
+        self.stdout.write(self.style.SUCCESS(f"Rollover job {job.pk} completed."))
+        self.report(result['summary'], options['kinds'])
+
+    def report(self, summary, kinds):
+        for kind in kinds:
+            counts = summary.get(kind, {})
+            self.stdout.write(
+                f"  {ROLLOVER_KINDS[kind]['label']}: {counts.get('created', 0)} created, "
+                f"{counts.get('updated', 0)} updated, {counts.get('unchanged', 0)} unchanged"
+            )
@@ -0,0 +1,43 @@
+"""
+Management command to roll up the activity logs and archive raw rows past their retention.
+
+Usage:
+    python manage.py rollup_activity_logs                  # last ACTIVITY_ROLLUP_LOOKBACK_DAYS days
+    python manage.py rollup_activity_logs --days 30
+    python manage.py rollup_activity_logs --archive
+    python manage.py rollup_activity_logs --archive --retention-months 6
+"""
+
+from django.core.management.base import BaseCommand
+from core.activity_services import archive_expired_activity, rollup_recent_activity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild ActivityDailyRollup rows for recent days and optionally archive old raw activity rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Number of complete days to roll up (defaults to ACTIVITY_ROLLUP_LOOKBACK_DAYS)',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Also move raw rows past their retention into monthly archive files',
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            help='Full months of raw rows to keep (defaults to ACTIVITY_LOG_RETENTION_MONTHS)',
+        )
+
+    def handle(self, *args, **options):
+        report = rollup_recent_activity(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {report['days']} day(s) into {report['rows']} rollup rows."))
+
+        if options['archive']:
+            archived = archive_expired_activity(options['retention_months'])
+            for entry in archived:
+                self.stdout.write(f"Archived {entry['rows']} {entry['source']} rows of {entry['month']} to {entry['path']}")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(archived)} archive file(s)."))
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_paymentreceipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='result',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='subjectresult',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='SessionalBroadsheetRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject_summary_json', models.JSONField(blank=True, default=dict)),
+                ('average_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('sessional_gpa', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('source_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('class_assigned', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessional_broadsheet_rows', to='core.class')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadsheet_rows', to='core.session')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessional_broadsheet_rows', to='core.student')),
+            ],
+            options={
+                'ordering': ['class_assigned__order', '-sessional_gpa'],
+                'indexes': [models.Index(fields=['session', 'class_assigned'], name='core_sessio_session_d57056_idx')],
+                'unique_together': {('session', 'class_assigned', 'student')},
+            },
+        ),
+    ]
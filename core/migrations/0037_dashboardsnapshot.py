@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-18 14:56
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_sessionalbroadsheetrow_result_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('admin', 'Admin'), ('teacher', 'Teacher'), ('guardian', 'Guardian')], max_length=10)),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('is_stale', models.BooleanField(default=False, help_text='Source data changed since the payload was built.')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, help_text='Teacher or guardian user; empty for the admin scope.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to=settings.AUTH_USER_MODEL)),
+                ('term', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to='core.term')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'is_stale'], name='core_dashbo_scope_87b294_idx')],
+                'unique_together': {('scope', 'owner', 'term')},
+            },
+        ),
+    ]
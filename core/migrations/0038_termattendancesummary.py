@@ -0,0 +1,62 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:07
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_attendance_counters(apps, schema_editor):
+    """Builds the counters from existing Attendance rows, one grouped query per term."""
+    Attendance = apps.get_model('core', 'Attendance')
+    Holiday = apps.get_model('core', 'Holiday')
+    Term = apps.get_model('core', 'Term')
+    TermAttendanceSummary = apps.get_model('core', 'TermAttendanceSummary')
+
+    for term in Term.objects.all():
+        school_days = 0
+        if term.start_date and term.end_date:
+            holidays = set(Holiday.objects.filter(term=term).values_list('date', flat=True))
+            day = term.start_date
+            while day <= term.end_date:
+                if day.weekday() < 5 and day not in holidays:
+                    school_days += 1
+                day += timedelta(days=1)
+        rows = (
+            Attendance.objects.filter(term=term).values('student_id')
+            .annotate(present=Count('pk', filter=Q(is_present=True)), absent=Count('pk', filter=Q(is_present=False)))
+        )
+        TermAttendanceSummary.objects.bulk_create([
+            TermAttendanceSummary(
+                student_id=row['student_id'], term=term, present_days=row['present'],
+                absent_days=row['absent'], school_days=school_days,
+            )
+            for row in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_dashboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('school_days', models.PositiveIntegerField(default=0, help_text='Mon-Fri days in the term, excluding holidays.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='core.student')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='core.term')),
+            ],
+            options={
+                'unique_together': {('student', 'term')},
+            },
+        ),
+        migrations.RunPython(backfill_attendance_counters, migrations.RunPython.noop),
+    ]
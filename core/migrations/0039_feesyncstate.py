@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_termattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_pending', models.BooleanField(default=False, help_text='A sync has been requested and not yet run.')),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('last_summary', models.JSONField(blank=True, default=dict)),
+                ('term', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fee_sync_state', to='core.term')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_rolloverjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceSummarySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('term', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='finance_summary_snapshot', to='core.term')),
+            ],
+        ),
+    ]
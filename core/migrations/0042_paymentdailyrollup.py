@@ -0,0 +1,55 @@
+# Generated by Django 5.0.1 on 2026-10-18 15:41
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_payment_rollups(apps, schema_editor):
+    """Builds the rollups from existing payments in one grouped query."""
+    Payment = apps.get_model('core', 'Payment')
+    PaymentDailyRollup = apps.get_model('core', 'PaymentDailyRollup')
+
+    rows = Payment.objects.values(
+        'payment_date', 'financial_record__term_id', 'financial_record__student__current_class_id', 'batch_reference',
+    ).annotate(total=Sum('amount_paid'), count=Count('pk')).order_by()
+    PaymentDailyRollup.objects.bulk_create([
+        PaymentDailyRollup(
+            date=row['payment_date'],
+            term_id=row['financial_record__term_id'],
+            school_class_id=row['financial_record__student__current_class_id'],
+            batch_reference=row['batch_reference'],
+            total_amount=row['total'],
+            payment_count=row['count'],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_financesummarysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('batch_reference', models.CharField(blank=True, default='', max_length=64)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_rollups', to='core.class')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_rollups', to='core.term')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'date'], name='core_paymen_term_id_8abbae_idx')],
+                'unique_together': {('date', 'term', 'school_class', 'batch_reference')},
+            },
+        ),
+        migrations.RunPython(backfill_payment_rollups, migrations.RunPython.noop),
+    ]
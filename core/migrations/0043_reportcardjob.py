@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_paymentdailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCardJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('output_format', models.CharField(choices=[('pdf', 'Merged PDF'), ('zip', 'Zip of PDFs')], default='pdf', max_length=3)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('cards_total', models.PositiveIntegerField(default=0)),
+                ('cards_done', models.PositiveIntegerField(default=0)),
+                ('output_file', models.CharField(blank=True, help_text='Path relative to PDF_CACHE_DIR.', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('class_obj', models.ForeignKey(blank=True, help_text='Leave empty to print every class in the term.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='report_card_jobs', to='core.class')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_jobs', to='core.term')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_alter_activitylog_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('core', 'Activity log'), ('lms', 'LMS activity log')], default='core', max_length=10)),
+                ('activity_type', models.CharField(max_length=50)),
+                ('role', models.CharField(blank=True, default='', max_length=20)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('user_ids', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('date', 'source', 'activity_type', 'role')},
+                'indexes': [models.Index(fields=['source', 'date', 'role'], name='core_activi_source_17fbc2_idx')],
+            },
+        ),
+    ]
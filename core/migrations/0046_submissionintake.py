@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_activitydailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionIntake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('assessment', 'Assessment'), ('exam', 'Exam')], max_length=20)),
+                ('submission_id', models.PositiveIntegerField()),
+                ('answers', models.JSONField(default=dict, help_text='POSTed answer_<question id> fields, each a list of values.')),
+                ('force_submitted', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'submission_id')},
+                'indexes': [models.Index(fields=['status', 'received_at'], name='core_submis_status_b375c7_idx')],
+            },
+        ),
+    ]
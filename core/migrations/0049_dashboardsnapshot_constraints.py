@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_snapshots(apps, schema_editor):
+    # NULL owners and terms slipped past unique_together; keep the latest row of each key.
+    DashboardSnapshot = apps.get_model('core', 'DashboardSnapshot')
+    seen = set()
+    duplicate_ids = []
+    for pk, scope, owner_id, term_id in DashboardSnapshot.objects.order_by('-refreshed_at', '-pk').values_list(
+        'pk', 'scope', 'owner_id', 'term_id',
+    ):
+        key = (scope, owner_id, term_id)
+        if key in seen:
+            duplicate_ids.append(pk)
+        else:
+            seen.add(key)
+    DashboardSnapshot.objects.filter(pk__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0048_create_cache_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='dashboardsnapshot',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsnapshot',
+            constraint=models.UniqueConstraint(fields=('scope', 'owner', 'term'), name='unique_dashboard_snapshot'),
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True), ('term__isnull', False)), fields=('scope', 'term'), name='unique_dashboard_snapshot_without_owner'),
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', False), ('term__isnull', True)), fields=('scope', 'owner'), name='unique_dashboard_snapshot_without_term'),
+        ),
+        migrations.AddConstraint(
+            model_name='dashboardsnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True), ('term__isnull', True)), fields=('scope',), name='unique_dashboard_snapshot_without_owner_or_term'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_payment_classes(apps, schema_editor):
+    # The class at posting time was never stored; the student's current class is the best guess,
+    # and it is what the existing rollup buckets were built from.
+    Payment = apps.get_model('core', 'Payment')
+    FinancialRecord = apps.get_model('core', 'FinancialRecord')
+    Payment.objects.update(
+        school_class_id=Subquery(
+            FinancialRecord.objects.filter(pk=OuterRef('financial_record_id')).values('student__current_class_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0049_dashboardsnapshot_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='school_class',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='core.class'),
+        ),
+        migrations.RunPython(backfill_payment_classes, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from django.core.validators import MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Sum, Avg, Q, F
 from django.db.models.functions import Coalesce
 from django.urls import reverse
@@ -364,6 +365,18 @@ class Student(models.Model):
     def __str__(self):
         return self.user.get_full_name()
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember class and status as loaded so signals can tell when enrolment changes.
+        instance._loaded_enrollment = (instance.__dict__.get('current_class_id'), instance.__dict__.get('status'))
+        # Likewise the fields the dashboard metrics count by.
+        instance._loaded_dashboard = instance.dashboard_fields()
+        return instance
+
+    def dashboard_fields(self):
+        return tuple(self.__dict__.get(field) for field in ('current_class_id', 'status', 'gender', 'date_of_birth'))
+
     def save(self, *args, **kwargs):
         if not self.LSA_number:
             self.set_LSA_number()
@@ -967,30 +980,13 @@ class OnlineQuestion(models.Model):
         return _map_answers_to_option_labels(self.options_list(), self.correct_answer)
 
     def is_option_correct(self, submitted_answer):
-        if not self.correct_answer or submitted_answer is None:
-            return False
-
-        if self.question_type == 'SCQ':
-            return str(submitted_answer).strip().lower() == str(self.correct_answer).strip().lower()
-        elif self.question_type == 'MCQ':
-            # For MCQ, self.correct_answer stores comma or space-separated correct options
-            # submitted_answer here for MCQ would be a LIST of strings from request.POST.getlist()
-            if not isinstance(submitted_answer, list): 
-                return False 
-            
-            correct_options_set = set()
-            if self.correct_answer:
-                if ',' in self.correct_answer:
-                    correct_options_set = set(opt.strip().lower() for opt in self.correct_answer.split(','))
-                else: # Assume space separated
-                    correct_options_set = set(opt.strip().lower() for opt in self.correct_answer.split(' ') if opt.strip())
-            
-            submitted_options_set = set(str(opt).strip().lower() for opt in submitted_answer)
-            
-            return submitted_options_set == correct_options_set and bool(correct_options_set) # Match and ensure not empty set comparison
-        
-        # For ES, this method isn't directly applicable for boolean correctness
-        return False
+        """
+        Whether `submitted_answer` (a string for SCQ, the list of ticked options for MCQ) is
+        correct. Essays are never auto-correct. Submissions are graded in bulk from the cached
+        answer key in core.grading_services, which this shares its normalization with.
+        """
+        from core.grading_services import compile_question_key, is_answer_correct
+        return is_answer_correct(compile_question_key(self), submitted_answer)
     
 class Assessment(models.Model):
 
@@ -1023,6 +1019,8 @@ class Assessment(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
     shuffle_questions = models.BooleanField(default=False)
+    # Bumped whenever a question or the question list changes; part of the answer key cache key.
+    answer_key_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.title} - {self.subject.name}"
@@ -1088,6 +1086,8 @@ class Exam(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(default=timezone.now)
     shuffle_questions = models.BooleanField(default=False)
+    # Bumped whenever a question or the question list changes; part of the answer key cache key.
+    answer_key_version = models.PositiveIntegerField(default=0, editable=False)
 
 
     def __str__(self):
@@ -1168,6 +1168,38 @@ class AcademicAlert(models.Model):
         ordering = ['-date_created']
 
 
+SUBJECT_SCORE_FIELDS = (
+    'continuous_assessment_1', 'continuous_assessment_2', 'continuous_assessment_3',
+    'assignment', 'oral_test', 'exam_score',
+)
+
+# (minimum total score, letter grade, grade point), highest band first.
+SCORE_GRADE_BANDS = (
+    (Decimal('80'), 'A', Decimal('5.0')),
+    (Decimal('65'), 'B', Decimal('4.0')),
+    (Decimal('50'), 'C', Decimal('3.0')),
+    (Decimal('45'), 'D', Decimal('2.0')),
+    (Decimal('40'), 'E', Decimal('1.0')),
+)
+
+
+def _grade_band(score):
+    for minimum, grade, point in SCORE_GRADE_BANDS:
+        if score >= minimum:
+            return grade, point
+    return 'F', Decimal('0.0')
+
+
+def grade_for_score(score) -> str:
+    """Letter grade for a subject total or an average score."""
+    return _grade_band(score)[0]
+
+
+def grade_point_for_score(score) -> Decimal:
+    """Grade point for a subject total, using the same bands as grade_for_score."""
+    return _grade_band(score)[1]
+
+
 class SubjectResult(models.Model):
     """
     Stores all scores for ONE subject within ONE term's result sheet.
@@ -1184,6 +1216,7 @@ class SubjectResult(models.Model):
     exam_score = models.DecimalField(max_digits=4, decimal_places=1, null=True, blank=True, validators=[MaxValueValidator(40.0)])
     
     is_finalized = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('result', 'subject')
@@ -1205,36 +1238,20 @@ class SubjectResult(models.Model):
 
     def calculate_grade(self) -> str:
         """Determines the letter grade based on the total score."""
-        score = self.total_score()
-        if score >= 80:
-            return 'A'
-        elif score >= 65:
-            return 'B'
-        elif score >= 50:
-            return 'C'
-        elif score >= 45:
-            return 'D'
-        elif score >= 40:
-            return 'E'
-        else:
-            return 'F'
+        return grade_for_score(self.total_score())
 
     def calculate_grade_point(self) -> Decimal:
         """Determines the grade point (e.g., for GPA calculation)."""
-        score = self.total_score()
-        # Use the same thresholds as calculate_grade to keep consistency
-        if score >= 80:
-            return Decimal('5.0')
-        elif score >= 65:
-            return Decimal('4.0')
-        elif score >= 50:
-            return Decimal('3.0')
-        elif score >= 45:
-            return Decimal('2.0')
-        elif score >= 40:
-            return Decimal('1.0')
-        else:
-            return Decimal('0.0')
+        return grade_point_for_score(self.total_score())
+
+    @staticmethod
+    def total_score_expression(prefix=''):
+        """Database expression summing every score component (nulls count as zero)."""
+        components = [Coalesce(F(f'{prefix}{field}'), Decimal(0)) for field in SUBJECT_SCORE_FIELDS]
+        expression = components[0]
+        for component in components[1:]:
+            expression = expression + component
+        return expression
 
     @classmethod
     def get_class_average(cls, subject, term, class_obj) -> Decimal:
@@ -1245,14 +1262,7 @@ class SubjectResult(models.Model):
             result__student__current_class=class_obj)
         
         aggregation_queryset = subject_results_in_class.annotate(
-            total_per_student=(
-                Coalesce(F('continuous_assessment_1'), Decimal(0)) +
-                Coalesce(F('continuous_assessment_2'), Decimal(0)) +
-                Coalesce(F('continuous_assessment_3'), Decimal(0)) +
-                Coalesce(F('assignment'), Decimal(0)) +
-                Coalesce(F('oral_test'), Decimal(0)) +
-                Coalesce(F('exam_score'), Decimal(0))
-            )
+            total_per_student=cls.total_score_expression()
         )
         
         aggregation = aggregation_queryset.aggregate(class_avg=Avg('total_per_student'))
@@ -1293,6 +1303,7 @@ class Result(models.Model):
     term_gpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
     performance_change = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True,
         help_text="Percentage change in average score from the previous term.")
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('student', 'term')
@@ -1303,46 +1314,20 @@ class Result(models.Model):
 
     def get_previous_term_result(self):
         """Finds the Result object for the same student from the immediately preceding term."""
-        previous_terms = Term.objects.filter(start_date__lt=self.term.start_date).order_by('-start_date')
-        for prev_term in previous_terms:
-            previous_result = Result.objects.filter(student=self.student, term=prev_term).first()
-            if previous_result and previous_result.average_score is not None:
-                return previous_result
-        return None
+        return (
+            Result.objects.filter(
+                student=self.student,
+                term__start_date__lt=self.term.start_date,
+                average_score__isnull=False,
+            )
+            .order_by('-term__start_date')
+            .first()
+        )
 
     def calculate_term_summary(self):
-        """Calculates all summary fields for this term and saves the instance."""
-        subject_results = self.subject_results.all().select_related('subject')
-        scored_subjects = [sr for sr in subject_results if sr.total_score() > 0]
-        
-        if not scored_subjects:
-            self.total_score, self.average_score, self.term_gpa = Decimal('0.00'), Decimal('0.00'), Decimal('0.00')
-        else:
-            self.total_score = sum(sr.total_score() for sr in scored_subjects)
-            self.average_score = self.total_score / len(scored_subjects)
-            # GPA Calculation
-            total_weighted_points, total_weights = Decimal('0.0'), Decimal('0.0')
-            for sr in scored_subjects:
-                weight = Decimal(getattr(sr.subject, 'subject_weight', 1))
-                total_weighted_points += Decimal(sr.calculate_grade_point()) * weight
-                total_weights += weight
-            self.term_gpa = (total_weighted_points / total_weights) if total_weights > 0 else Decimal('0.00')
-
-        # Calculate Performance Change
-        previous_result = self.get_previous_term_result()
-        if previous_result and self.average_score is not None:
-            prev_avg = previous_result.average_score
-            if prev_avg > 0:
-                change = ((self.average_score - prev_avg) / prev_avg) * 100
-                self.performance_change = change
-            elif self.average_score > 0:
-                self.performance_change = Decimal('100.00') 
-            else:
-                self.performance_change = Decimal('0.00')
-        else:
-            self.performance_change = None 
-        
-        self.save()
+        """Calculates all summary fields for this term and saves them on this instance."""
+        from core.result_services import apply_term_summaries
+        apply_term_summaries([self])
 
 
 class SessionalResult(models.Model):
@@ -1400,13 +1385,14 @@ class SessionalResult(models.Model):
             return
 
         # Ensure each term result has summary fields calculated (just-in-time)
-        for res in term_results:
+        pending = [res for res in term_results if res.average_score is None or res.term_gpa is None]
+        if pending:
+            from core.result_services import apply_term_summaries
             try:
-                if res.average_score is None or res.term_gpa is None:
-                    # Calculate and persist term summary so we can use its averages
-                    res.calculate_term_summary()
+                # Calculate and persist term summaries in one batch so we can use their averages
+                apply_term_summaries(pending)
             except Exception:
-                # If calculating term summary fails for any reason, skip and continue
+                # If calculating term summaries fails for any reason, continue with what we have
                 pass
 
         # --- CORRECTED GPA CALCULATION (True Weighted Average) ---
@@ -1438,6 +1424,36 @@ class SessionalResult(models.Model):
         if save: self.save()
 
 
+class SessionalBroadsheetRow(models.Model):
+    """
+    Materialized sessional broadsheet line for one student in one class.
+    Rows are rebuilt by core.result_services.refresh_sessional_broadsheet, run by the worker
+    after the result signals flag a row (source_updated_at cleared) or its results change
+    after `source_updated_at`. The admin page only reads them.
+    """
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='broadsheet_rows')
+    class_assigned = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='sessional_broadsheet_rows')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='sessional_broadsheet_rows')
+
+    subject_summary_json = models.JSONField(default=dict, blank=True)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    sessional_gpa = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    is_approved = models.BooleanField(default=False)
+
+    source_updated_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('session', 'class_assigned', 'student')
+        ordering = ['class_assigned__order', '-sessional_gpa']
+        indexes = [
+            models.Index(fields=['session', 'class_assigned']),
+        ]
+
+    def __str__(self):
+        return f"Sessional broadsheet row for {self.student} - {self.session}"
+
+
 class CumulativeRecord(models.Model):
     student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='cumulative_record')
     cumulative_gpa = models.DecimalField(max_digits=4, decimal_places=2, default=0.00)
@@ -1705,6 +1721,10 @@ class Payment(models.Model):
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateField(default=timezone.now)
     batch_reference = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # The student's class when the payment was recorded: the PaymentDailyRollup bucket it counts in.
+    school_class = models.ForeignKey(
+        'Class', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='payments'
+    )
 
     def clean(self):
         """ Add validation logic here, checked before save()."""
@@ -1727,9 +1747,25 @@ class Payment(models.Model):
         if prospective_total_paid > total_payable + Decimal('0.01'): # Add tolerance
              raise ValidationError(f"Total payments (₦{prospective_total_paid:.2f}) would exceed net fee (₦{total_payable:.2f}).")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the rollup bucket and amount as loaded so edits can move PaymentDailyRollup totals.
+        instance._loaded_rollup = tuple(
+            instance.__dict__.get(field)
+            for field in ('financial_record_id', 'school_class_id', 'payment_date', 'batch_reference', 'amount_paid')
+        )
+        return instance
+
     def save(self, *args, **kwargs):
         # Run validation before saving
         self.full_clean()
+        loaded = getattr(self, '_loaded_rollup', None)
+        moved = loaded is not None and loaded[0] != self.financial_record_id
+        if moved or (self._state.adding and self.school_class_id is None):
+            self.school_class_id = Student.objects.filter(
+                pk=self.financial_record.student_id,
+            ).values_list('current_class_id', flat=True).first()
         super().save(*args, **kwargs)
         # Signal will handle FinancialRecord update
 
@@ -1971,8 +2007,8 @@ class ActivityLog(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
     
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Timestamps (set when the event happens; buffered events are written later)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
     
     class Meta:
         ordering = ['-created_at']
@@ -1985,74 +2021,372 @@ class ActivityLog(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.get_activity_type_display()} at {self.created_at}"
     
+    def week_number_in(self, term):
+        """Week of `term` (1-based) this activity falls in, or None without a term."""
+        if term and term.start_date:
+            delta = self.created_at.date() - term.start_date
+            return (delta.days // 7) + 1
+        return None
+
+    def _feed_context(self):
+        # Filled in bulk for a whole feed by core.dashboard_services.attach_activity_context;
+        # a row on its own resolves its context the same way on first access.
+        if not hasattr(self, '_activity_context'):
+            from core.dashboard_services import attach_activity_context
+            attach_activity_context([self])
+        return self._activity_context
+
     @property
     def week_number(self):
         """Get the week number within the active term"""
-        from core.models import Term
-        active_term = Term.objects.filter(is_active=True).first()
-        if active_term and active_term.start_date:
-            delta = self.created_at.date() - active_term.start_date
-            return (delta.days // 7) + 1
-        return None
-    
+        return self.week_number_in(self._feed_context()['term'])
+
     @property
     def user_class(self):
         """Get the class of the user (for teachers and students)"""
-        try:
-            if hasattr(self.user, 'teacher'):
-                # Get classes the teacher is assigned to
-                from core.models import TeacherAssignment
-                assignments = TeacherAssignment.objects.filter(
-                    teacher=self.user.teacher,
-                    is_active=True
-                ).select_related('class_assigned')
-                if assignments.exists():
-                    classes = [a.class_assigned.name for a in assignments[:3]]
-                    return ', '.join(classes) if classes else 'No class assigned'
-                return 'No class assigned'
-            elif hasattr(self.user, 'student'):
-                # Get current enrollment
-                from core.models import Enrollment, Term
-                active_term = Term.objects.filter(is_active=True).first()
-                if active_term:
-                    enrollment = Enrollment.objects.filter(
-                        student=self.user.student,
-                        term=active_term,
-                        is_active=True
-                    ).select_related('class_enrolled').first()
-                    if enrollment:
-                        return enrollment.class_enrolled.name
-                return 'Not enrolled'
-        except:
-            pass
-        return None
-    
+        return self._feed_context()['user_class']
+
     @property
     def guardian_context(self):
         """Get guardian's ward information"""
-        try:
-            if hasattr(self.user, 'guardian'):
-                students = self.user.guardian.student_set.all()
-                if students.exists():
-                    # Get students and their classes
-                    from core.models import Enrollment, Term
-                    active_term = Term.objects.filter(is_active=True).first()
-                    wards = []
-                    for student in students[:3]:  # Limit to 3
-                        if active_term:
-                            enrollment = Enrollment.objects.filter(
-                                student=student,
-                                term=active_term,
-                                is_active=True
-                            ).select_related('class_enrolled').first()
-                            if enrollment:
-                                wards.append(f"{student.user.get_full_name()} ({enrollment.class_enrolled.name})")
-                            else:
-                                wards.append(student.user.get_full_name())
-                        else:
-                            wards.append(student.user.get_full_name())
-                    return ', '.join(wards) if wards else 'No wards'
-                return 'No wards'
-        except:
-            pass
-        return None
+        return self._feed_context()['guardian_context']
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Precomputed dashboard aggregates: one JSON payload per role scope, owner and term.
+    Built and refreshed by core.dashboard_services; views only read the row.
+    """
+    SCOPE_CHOICES = [
+        ('admin', 'Admin'),
+        ('teacher', 'Teacher'),
+        ('guardian', 'Guardian'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='dashboard_snapshots', help_text="Teacher or guardian user; empty for the admin scope."
+    )
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, null=True, blank=True, related_name='dashboard_snapshots')
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    is_stale = models.BooleanField(default=False, help_text="Source data changed since the payload was built.")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # One row per (scope, owner, term). A plain unique key lets NULL owners or terms repeat,
+        # so the admin scope and term-less snapshots get partial constraints of their own.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'owner', 'term'], name='unique_dashboard_snapshot',
+            ),
+            models.UniqueConstraint(
+                fields=['scope', 'term'], condition=Q(owner__isnull=True, term__isnull=False),
+                name='unique_dashboard_snapshot_without_owner',
+            ),
+            models.UniqueConstraint(
+                fields=['scope', 'owner'], condition=Q(owner__isnull=False, term__isnull=True),
+                name='unique_dashboard_snapshot_without_term',
+            ),
+            models.UniqueConstraint(
+                fields=['scope'], condition=Q(owner__isnull=True, term__isnull=True),
+                name='unique_dashboard_snapshot_without_owner_or_term',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'is_stale']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_scope_display()} dashboard snapshot ({self.owner_id or 'school'}, {self.term})"
+
+    @property
+    def age(self):
+        return timezone.now() - self.refreshed_at
+
+
+class TermAttendanceSummary(models.Model):
+    """
+    Denormalized attendance counters for one student in one term.
+    Kept in step with Attendance by core.attendance_services; rebuild with the
+    `reconcile_attendance_counters` management command if they ever drift.
+    """
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='attendance_summaries')
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='attendance_summaries')
+    present_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    school_days = models.PositiveIntegerField(default=0, help_text="Mon-Fri days in the term, excluding holidays.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'term')
+
+    def __str__(self):
+        return f"{self.student} - {self.term}: {self.present_days}/{self.total_days}"
+
+    @property
+    def total_days(self):
+        """Days with an attendance record, present or absent."""
+        return self.present_days + self.absent_days
+
+    @property
+    def attendance_percentage(self):
+        return round(self.present_days / self.total_days * 100, 1) if self.total_days else 0
+
+    def as_dict(self):
+        return {
+            'total_days': self.total_days,
+            'present_days': self.present_days,
+            'absent_days': self.absent_days,
+            'school_days': self.school_days,
+            'attendance_percentage': self.attendance_percentage,
+        }
+
+
+class FeeSyncState(models.Model):
+    """
+    Bookkeeping for the background StudentFeeRecord sync of one term: whether a run is queued
+    and when the last one finished. Maintained by core.finance_services.
+    """
+    term = models.OneToOneField(Term, on_delete=models.CASCADE, related_name='fee_sync_state')
+    is_pending = models.BooleanField(default=False, help_text="A sync has been requested and not yet run.")
+    requested_at = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_summary = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"Fee sync for {self.term} (last run {self.last_synced_at or 'never'})"
+
+
+class RolloverJob(models.Model):
+    """
+    A background copy of assignments from one term (or every term of a session) into another.
+    Each (term, assignment kind) step commits on its own and is recorded in `completed_steps`,
+    so a job that fails or whose worker dies can be re-run and resumes where it stopped.
+    Run by core.rollover_services.run_rollover_job.
+    """
+    SCOPE_CHOICES = [
+        ('term', 'Term'),
+        ('session', 'Session'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, default='term')
+    source_session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    target_session = models.ForeignKey(Session, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    source_term = models.ForeignKey(Term, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    target_term = models.ForeignKey(Term, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    kinds = models.JSONField(default=list, help_text="Assignment kinds to copy, see core.rollover_services.ROLLOVER_KINDS.")
+    options = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    steps_total = models.PositiveIntegerField(default=0)
+    completed_steps = models.JSONField(default=list, blank=True)
+    summary = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        source = self.source_session if self.scope == 'session' else self.source_term
+        target = self.target_session if self.scope == 'session' else self.target_term
+        return f"Rollover {source} -> {target} ({self.get_status_display()})"
+
+    @property
+    def steps_done(self):
+        return len(self.completed_steps)
+
+    @property
+    def progress_percent(self):
+        if not self.steps_total:
+            return 100 if self.status == 'completed' else 0
+        return round(self.steps_done / self.steps_total * 100)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'steps_total': self.steps_total,
+            'steps_done': self.steps_done,
+            'progress_percent': self.progress_percent,
+            'summary': self.summary,
+            'error': self.error,
+        }
+
+
+class FinanceSummarySnapshot(models.Model):
+    """
+    Frozen fee totals (overall and per class) of an archived term, so historical finance reports
+    are read without aggregating FinancialRecord. Built on first read and dropped whenever a
+    ledger rebuild touches the term; maintained by core.finance_services.
+    """
+    term = models.OneToOneField(Term, on_delete=models.CASCADE, related_name='finance_summary_snapshot')
+    payload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Finance summary for {self.term} (frozen {self.created_at:%Y-%m-%d})"
+
+
+class PaymentDailyRollup(models.Model):
+    """
+    Payments collected per day, term, class and batch reference, so collection trends are charted
+    from these rows instead of scanning Payment. The class is the student's class when the payment
+    was recorded. Maintained incrementally by core.finance_services and rebuilt by the
+    rebuild_payment_rollups command.
+    """
+    date = models.DateField()
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='payment_rollups')
+    school_class = models.ForeignKey(
+        Class, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment_rollups'
+    )
+    batch_reference = models.CharField(max_length=64, blank=True, default='')
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    payment_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'term', 'school_class', 'batch_reference')
+        indexes = [
+            models.Index(fields=['term', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.term} {self.school_class or 'Unassigned'}: {self.total_amount} ({self.payment_count})"
+
+
+class ActivityDailyRollup(models.Model):
+    """
+    Activity events per day, source log, activity type and user role, so the weekly analytics are
+    read from these rows instead of scanning the raw logs. `user_ids` lists the distinct users
+    behind the count, so active users over several days are unioned exactly. Only complete days
+    are rolled up. Written nightly by core.activity_services.rollup_activity_days, which must
+    cover a month before its raw rows are archived.
+    """
+    SOURCE_CHOICES = [
+        ('core', 'Activity log'),
+        ('lms', 'LMS activity log'),
+    ]
+
+    date = models.DateField()
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='core')
+    activity_type = models.CharField(max_length=50)
+    role = models.CharField(max_length=20, blank=True, default='')
+    event_count = models.PositiveIntegerField(default=0)
+    user_ids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'source', 'activity_type', 'role')
+        indexes = [
+            models.Index(fields=['source', 'date', 'role']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.source} {self.role or '-'} {self.activity_type}: {self.event_count}"
+
+
+class ReportCardJob(models.Model):
+    """
+    A background print run of term report cards for one class (or every class) in a term,
+    written to a single merged PDF or a zip of one PDF per student under PDF_CACHE_DIR.
+    Run by core.report_card_services.run_report_card_job.
+    """
+    FORMAT_CHOICES = [
+        ('pdf', 'Merged PDF'),
+        ('zip', 'Zip of PDFs'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    term = models.ForeignKey(Term, on_delete=models.CASCADE, related_name='report_card_jobs')
+    class_obj = models.ForeignKey(
+        Class, on_delete=models.CASCADE, null=True, blank=True, related_name='report_card_jobs',
+        help_text="Leave empty to print every class in the term.",
+    )
+    output_format = models.CharField(max_length=3, choices=FORMAT_CHOICES, default='pdf')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    cards_total = models.PositiveIntegerField(default=0)
+    cards_done = models.PositiveIntegerField(default=0)
+    output_file = models.CharField(max_length=255, blank=True, help_text="Path relative to PDF_CACHE_DIR.")
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        scope = self.class_obj or 'All classes'
+        return f"Report cards {self.term} / {scope} ({self.get_status_display()})"
+
+    @property
+    def progress_percent(self):
+        if not self.cards_total:
+            return 100 if self.status == 'completed' else 0
+        return round(self.cards_done / self.cards_total * 100)
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'cards_total': self.cards_total,
+            'cards_done': self.cards_done,
+            'progress_percent': self.progress_percent,
+            'has_output': bool(self.output_file) and self.status == 'completed',
+            'error': self.error,
+        }
+
+
+class SubmissionIntake(models.Model):
+    """
+    The raw answers of one assessment or exam submission, stored with a single INSERT when
+    submissions are queued (SUBMISSION_INGEST_ASYNC) and graded later by the worker through
+    core.grading_services.process_submission_intake. At most one intake exists per submission;
+    the first submit or autosubmit beacon to arrive wins.
+    """
+    KIND_CHOICES = [
+        ('assessment', 'Assessment'),
+        ('exam', 'Exam'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    submission_id = models.PositiveIntegerField()
+    answers = models.JSONField(default=dict, help_text="POSTed answer_<question id> fields, each a list of values.")
+    force_submitted = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('kind', 'submission_id')
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} submission {self.submission_id} ({self.status})"
@@ -0,0 +1,207 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import hashlib
+import mimetypes
+import os
+import pathlib
+import tempfile
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    from weasyprint import HTML, CSS
+    from weasyprint.text.fonts import FontConfiguration
+except (ImportError, OSError):
+    # WeasyPrint not installed, or its system libraries (Pango) are missing.
+    HTML = None
+    CSS = None
+    FontConfiguration = None
+
+
+PDF_AVAILABLE = HTML is not None
+# Documents are rendered from strings; relative asset URLs resolve against this and are
+# then served by local_url_fetcher, so the rendering host never matters.
+PDF_BASE_URL = 'file:///'
+RESULT_STYLESHEETS = ('css/result_styles.css',)
+
+# Per-process WeasyPrint state: fonts are discovered and stylesheets parsed once per worker.
+_font_config = None
+_stylesheets = {}
+
+
+def get_font_config():
+    global _font_config
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def _stylesheet(name):
+    if name not in _stylesheets:
+        path = finders.find(name)
+        if path is None:
+            raise FileNotFoundError(f"Stylesheet {name} not found in the static files.")
+        _stylesheets[name] = CSS(filename=path, font_config=get_font_config())
+    return _stylesheets[name]
+
+
+def local_asset_path(url):
+    """
+    The file on disk behind a static or media URL (absolute or relative, on any host), or None
+    when the URL points elsewhere. Media paths never escape MEDIA_ROOT.
+    """
+    path = unquote(urlsplit(url).path)
+    static_prefix = urlsplit(settings.STATIC_URL).path
+    media_prefix = urlsplit(settings.MEDIA_URL).path
+    if path.startswith(static_prefix):
+        name = path[len(static_prefix):]
+        found = finders.find(name)
+        if found:
+            return pathlib.Path(found)
+        root = pathlib.Path(settings.STATIC_ROOT).resolve()
+    elif path.startswith(media_prefix):
+        name = path[len(media_prefix):]
+        root = pathlib.Path(settings.MEDIA_ROOT).resolve()
+    else:
+        return None
+    candidate = (root / name).resolve()
+    if root in candidate.parents and candidate.is_file():
+        return candidate
+    return None
+
+
+def local_url_fetcher(url):
+    """WeasyPrint url_fetcher that reads static and media assets from disk instead of over HTTP."""
+    path = local_asset_path(url)
+    if path is None:
+        from weasyprint import default_url_fetcher
+        return default_url_fetcher(url)
+    return {
+        'string': path.read_bytes(),
+        'mime_type': mimetypes.guess_type(path.name)[0],
+        'redirected_url': url,
+    }
+
+
+def render_pdf(html_string, stylesheets=()):
+    """Renders an HTML string to PDF bytes with the shared font configuration and local assets."""
+    if not PDF_AVAILABLE:
+        raise RuntimeError("PDF generation library (WeasyPrint) is not installed.")
+    html = HTML(string=html_string, base_url=PDF_BASE_URL, url_fetcher=local_url_fetcher)
+    return html.write_pdf(
+        stylesheets=[_stylesheet(name) for name in stylesheets],
+        font_config=get_font_config(),
+    )
+
+
+def _reset_worker_state():
+    # Font handles inherited from a forked parent are not safe to share; each worker builds its own.
+    global _font_config
+    _font_config = None
+    _stylesheets.clear()
+
+
+def _render_pdf_job(job):
+    html_string, stylesheets = job
+    return render_pdf(html_string, stylesheets)
+
+
+def iter_render_pdfs(html_strings, stylesheets=(), max_workers=None):
+    """
+    Yields PDF bytes for each HTML string, in order, as soon as each one is ready. Batches of at
+    least PDF_POOL_THRESHOLD documents are spread over a process pool of PDF_RENDER_WORKERS
+    processes; smaller ones render inline.
+    """
+    max_workers = max_workers or getattr(settings, 'PDF_RENDER_WORKERS', None) or os.cpu_count() or 1
+    jobs = [(html_string, tuple(stylesheets)) for html_string in html_strings]
+    if max_workers < 2 or len(jobs) < getattr(settings, 'PDF_POOL_THRESHOLD', 8):
+        for job in jobs:
+            yield _render_pdf_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)), initializer=_reset_worker_state) as pool:
+        yield from pool.map(_render_pdf_job, jobs)
+
+
+def render_merged_pdf(html_strings, stylesheets=(), on_progress=None):
+    """
+    One PDF holding the pages of every HTML string, in order. Each document is laid out on its
+    own (so a broken one cannot shift the others) and `on_progress(done)` is called after each.
+    WeasyPrint can only merge laid-out documents within one process, so this runs inline.
+    """
+    if not PDF_AVAILABLE:
+        raise RuntimeError("PDF generation library (WeasyPrint) is not installed.")
+    css = [_stylesheet(name) for name in stylesheets]
+    documents = []
+    for done, html_string in enumerate(html_strings, start=1):
+        html = HTML(string=html_string, base_url=PDF_BASE_URL, url_fetcher=local_url_fetcher)
+        documents.append(html.render(stylesheets=css, font_config=get_font_config()))
+        if on_progress:
+            on_progress(done)
+    if not documents:
+        raise ValueError("There are no documents to merge.")
+    pages = [page for document in documents for page in document.pages]
+    return documents[0].copy(pages).write_pdf()
+
+
+def cache_path(kind, name):
+    """Location of a generated file under PDF_CACHE_DIR/<kind>."""
+    return _cache_dir(kind) / name
+
+
+def _cache_dir(kind):
+    return pathlib.Path(getattr(settings, 'PDF_CACHE_DIR', pathlib.Path(settings.BASE_DIR) / 'pdf_cache')) / kind
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    Yields a binary file handle whose content replaces `path` only once the block finishes,
+    so readers never see a half-written file. The temporary file is removed on error.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            yield handle
+        os.replace(tmp_path, path)
+    except BaseException:
+        pathlib.Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _write_atomic(path, content):
+    with atomic_output(path) as handle:
+        handle.write(content)
+
+
+def receipt_pdf_path(receipt_number, html_string, origin=''):
+    """
+    Cache location of a receipt PDF, keyed by receipt number and a hash of its rendered HTML.
+    `origin` (the scheme and host the HTML's absolute links were built from) is left out of the
+    hash, so the same receipt shares one PDF whichever host it is downloaded from.
+    """
+    if origin:
+        html_string = html_string.replace(origin, '')
+    digest = hashlib.sha256(html_string.encode('utf-8')).hexdigest()[:24]
+    safe_number = "".join(c if c.isalnum() or c in '-_' else '_' for c in receipt_number)
+    return _cache_dir('receipts') / f"{safe_number}-{digest}.pdf"
+
+
+def _store_receipt_pdf(path, content):
+    _write_atomic(path, content)
+    # Older renders of the same receipt (e.g. before a school settings change) are superseded.
+    prefix = path.name.rsplit('-', 1)[0]
+    for stale in path.parent.glob(f"{prefix}-*.pdf"):
+        if stale != path and stale.name.rsplit('-', 1)[0] == prefix:
+            stale.unlink(missing_ok=True)
+
+
+def cached_receipt_pdf(receipt_number, html_string, origin=''):
+    """Path of the receipt's PDF, rendering it only when this exact content is not cached yet."""
+    path = receipt_pdf_path(receipt_number, html_string, origin)
+    if not path.is_file():
+        _store_receipt_pdf(path, render_pdf(html_string))
+    return path
+
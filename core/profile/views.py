@@ -171,7 +171,7 @@ def system_settings_view(request):
     """
     System settings configuration view (admin only)
     """
-    settings = SystemSettings.get_settings()
+    settings = SystemSettings.get_settings(use_cache=False)
     
     if request.method == 'POST':
         form = SystemSettingsForm(request.POST, request.FILES, instance=settings)
@@ -202,7 +202,7 @@ def grading_system_view(request):
     """
     Manage grading system configuration
     """
-    settings = SystemSettings.get_settings()
+    settings = SystemSettings.get_settings(use_cache=False)
     
     if request.method == 'POST':
         import json
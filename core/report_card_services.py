@@ -0,0 +1,223 @@
+from collections import defaultdict
+import json
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.attendance_services import get_attendance_summaries
+from core.models import ReportCardJob, Result, SubjectResult
+from core.pdf_services import RESULT_STYLESHEETS, atomic_output, cache_path, iter_render_pdfs, render_merged_pdf
+from core.result_services import (
+    apply_term_summaries,
+    class_subject_averages,
+    refresh_cumulative_gpas,
+    session_result_counts,
+)
+
+
+REPORT_CARD_TEMPLATE = 'guardian/partials/_term_report_card.html'
+REPORT_CARD_DOCUMENT_TEMPLATE = 'guardian/report_card_pdf.html'
+# Job progress is written every few cards rather than after each one.
+PROGRESS_SAVE_EVERY = 5
+
+
+def report_card_results(term, class_obj=None):
+    """Results of the active students of one class (or every class) in a term, in printing order."""
+    results = Result.objects.filter(term=term, student__status='active', student__current_class__isnull=False)
+    if class_obj is not None:
+        results = results.filter(student__current_class=class_obj)
+    return results.select_related('term__session', 'student__user', 'student__current_class').order_by(
+        'student__current_class__order', 'student__user__last_name', 'student__user__first_name',
+    )
+
+
+def build_report_card_contexts(results, absolute_url=None):
+    """
+    Template contexts for the report cards of `results` (Results of a single term).
+
+    The number of queries does not depend on how many cards are built. Missing term summaries
+    are computed in one batch. Subject rows, class averages, cumulative GPAs, session result
+    counts and attendance are each loaded once. `absolute_url` maps a static or media path to
+    the URL used in the card; by default the site-relative path is kept, which the PDF
+    renderer reads from disk.
+    """
+    results = list(results)
+    if not results:
+        return []
+    absolute_url = absolute_url or (lambda path: path)
+    term = results[0].term
+    session = term.session
+
+    # Same fail-safe as the result page: summaries that were never computed are filled in now.
+    unsummarized = [
+        result for result in results
+        if result.term_gpa is None or result.total_score is None or result.performance_change is None
+    ]
+    if unsummarized:
+        apply_term_summaries(unsummarized)
+
+    student_ids = [result.student_id for result in results]
+    subject_results = defaultdict(list)
+    for subject_result in (
+        SubjectResult.objects.filter(result_id__in=[result.pk for result in results])
+        .select_related('subject')
+        .order_by('subject__name')
+    ):
+        subject_results[subject_result.result_id].append(subject_result)
+    class_averages = class_subject_averages(term, {result.student.current_class_id for result in results})
+    cumulative_gpas = refresh_cumulative_gpas(student_ids)
+    terms_in_session = session_result_counts(session, student_ids)
+    attendance = get_attendance_summaries(term, student_ids)
+
+    school_logo_url = absolute_url(settings.STATIC_URL + 'images/logo.jpg')
+    signature_url = absolute_url(settings.STATIC_URL + 'images/signature.png')
+
+    contexts = []
+    for result in results:
+        student = result.student
+        class_obj = student.current_class
+        cumulative_gpa = cumulative_gpas.get(student.pk)
+        # In the first term of a session the term GPA stands in for the cumulative one.
+        if terms_in_session.get(student.pk) == 1:
+            cumulative_gpa = result.term_gpa
+
+        rows = subject_results.get(result.pk, [])
+        chart_data = [
+            {
+                'subject': row.subject.name,
+                'total_score': float(row.total_score()),
+                'class_average': float(class_averages.get((student.current_class_id, row.subject_id), 0)),
+            }
+            for row in rows
+        ]
+        contexts.append({
+            'student': student,
+            'result': result,
+            'term': term,
+            'session': session,
+            'class_obj': class_obj,
+            'subject_results': rows,
+            'cumulative_gpa': cumulative_gpa,
+            'chart_data': chart_data,
+            'chart_data_json': json.dumps(chart_data),
+            'attendance_data': attendance.get(student.pk, {}),
+            'teacher_comment': result.teacher_remarks,
+            'principal_comment': result.principal_remarks,
+            'profile_image_url': absolute_url(student.profile_image.url) if student.profile_image else None,
+            'school_logo_url': school_logo_url,
+            'signature_url': signature_url,
+            'is_pdf_render': False,
+        })
+    return contexts
+
+
+def render_report_card_document(contexts, title='Report Cards'):
+    """HTML print document holding the report card of each context, one per page."""
+    cards = [render_to_string(REPORT_CARD_TEMPLATE, {**context, 'is_pdf_render': True}) for context in contexts]
+    return render_to_string(REPORT_CARD_DOCUMENT_TEMPLATE, {'cards': cards, 'title': title})
+
+
+def _safe_name(value):
+    return "".join(c if c.isalnum() else "_" for c in str(value))
+
+
+def report_card_filename(context):
+    """Name of one card inside a zip: a folder per class, then roll number and student name."""
+    student = context['student']
+    return (
+        f"{_safe_name(context['class_obj'].name)}/"
+        f"{_safe_name(student.LSA_number or student.pk)}_{_safe_name(student.user.get_full_name())}.pdf"
+    )
+
+
+def create_report_card_job(term, class_obj=None, output_format='pdf', requested_by=None):
+    """Records a pending ReportCardJob for one class, or every class when `class_obj` is None."""
+    return ReportCardJob.objects.create(
+        term=term, class_obj=class_obj, output_format=output_format, requested_by=requested_by,
+    )
+
+
+def start_report_card_job(term, class_obj=None, output_format='pdf', requested_by=None):
+    """Creates a ReportCardJob and queues it to run once the current transaction commits."""
+    job = create_report_card_job(term, class_obj, output_format=output_format, requested_by=requested_by)
+    queue_report_card_job(job)
+    return job
+
+
+def queue_report_card_job(job):
+    from core.tasks import run_report_card_job_task
+    job_id = job.pk
+    transaction.on_commit(lambda: run_report_card_job_task.delay(job_id))
+
+
+def retry_report_card_job(job):
+    """Re-queues a failed job from the start. Returns True if queued."""
+    retried = ReportCardJob.objects.filter(pk=job.pk, status='failed').update(status='pending', error='')
+    if retried:
+        queue_report_card_job(job)
+    return bool(retried)
+
+
+def report_card_output_path(job):
+    """The finished file of a job, or None while it has none."""
+    if not job.output_file:
+        return None
+    path = cache_path('report_cards', job.output_file)
+    return path if path.is_file() else None
+
+
+def _record_progress(job, done):
+    job.cards_done = done
+    if done == job.cards_total or done % PROGRESS_SAVE_EVERY == 0:
+        ReportCardJob.objects.filter(pk=job.pk).update(cards_done=done, updated_at=timezone.now())
+
+
+def run_report_card_job(job_id):
+    """
+    Builds every card of a ReportCardJob and writes its output file. The shared data is
+    prepared once by build_report_card_contexts. A zip renders its cards across the PDF
+    process pool. A merged PDF lays out the cards one by one in this process and joins their
+    pages. `cards_done` is updated as cards finish, so the job page can show progress.
+    Returns the job's as_dict().
+    """
+    job = ReportCardJob.objects.select_related('term__session', 'class_obj').get(pk=job_id)
+    if job.status == 'completed':
+        return job.as_dict()
+    job.status, job.error, job.cards_done = 'running', '', 0
+    job.save(update_fields=['status', 'error', 'cards_done', 'updated_at'])
+
+    try:
+        contexts = build_report_card_contexts(report_card_results(job.term, job.class_obj))
+        if not contexts:
+            raise ValueError('There are no results to print for this term and class.')
+        job.cards_total = len(contexts)
+        job.save(update_fields=['cards_total', 'updated_at'])
+
+        documents = [
+            render_report_card_document([context], title=f"{context['student'].user.get_full_name()} - {job.term}")
+            for context in contexts
+        ]
+        output_file = f"job-{job.pk}.{job.output_format}"
+        with atomic_output(cache_path('report_cards', output_file)) as handle:
+            if job.output_format == 'zip':
+                # PDFs are already compressed, so the cards are stored as they are.
+                with zipfile.ZipFile(handle, 'w', zipfile.ZIP_STORED) as archive:
+                    pdfs = iter_render_pdfs(documents, RESULT_STYLESHEETS)
+                    for done, (context, pdf) in enumerate(zip(contexts, pdfs), start=1):
+                        archive.writestr(report_card_filename(context), pdf)
+                        _record_progress(job, done)
+            else:
+                handle.write(render_merged_pdf(
+                    documents, RESULT_STYLESHEETS, on_progress=lambda done: _record_progress(job, done),
+                ))
+    except Exception as exc:
+        job.status, job.error = 'failed', str(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    job.status, job.output_file, job.finished_at = 'completed', output_file, timezone.now()
+    job.save(update_fields=['status', 'output_file', 'cards_done', 'finished_at', 'updated_at'])
+    return job.as_dict()
@@ -0,0 +1,625 @@
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from core.models import (
+    SUBJECT_SCORE_FIELDS,
+    Class,
+    ClassSubjectAssignment,
+    CumulativeRecord,
+    Result,
+    SessionalBroadsheetRow,
+    SessionalResult,
+    Student,
+    SubjectResult,
+    Term,
+    grade_for_score,
+    grade_point_for_score,
+)
+from core.dashboard_services import invalidate_dashboard_metrics, mark_dashboard_snapshots_stale
+from core.utils import count_queries
+
+
+def _subjects_by_class(term, class_ids):
+    assignments = (
+        ClassSubjectAssignment.objects.filter(term=term, class_assigned_id__in=class_ids)
+        .select_related('subject')
+        .order_by('subject__name')
+    )
+    subjects_by_class = defaultdict(list)
+    seen = set()
+    for assignment in assignments:
+        key = (assignment.class_assigned_id, assignment.subject_id)
+        if key in seen:
+            continue
+        seen.add(key)
+        subjects_by_class[assignment.class_assigned_id].append(assignment.subject)
+    return subjects_by_class
+
+
+def _rank_rows(rows):
+    """Sorts rows by total score then GPA and assigns competition ranks (1, 2, 2, 4)."""
+    rows.sort(key=lambda row: (-row['total_score'], -row['gpa']))
+    previous_key = None
+    rank = 0
+    for position, row in enumerate(rows, start=1):
+        key = (row['total_score'], row['gpa'])
+        if key != previous_key:
+            rank = position
+            previous_key = key
+        row['rank'] = rank
+    return rows
+
+
+def build_term_broadsheets(term, class_ids=None):
+    """
+    Builds the class-by-subject score matrix for every class in a term.
+
+    Runs a fixed number of queries regardless of how many classes or students are
+    involved: classes, class subjects, students, result flags and subject scores are
+    each loaded once, then totals, weighted GPA and ranks are computed in one pass.
+    Returns a list of broadsheet dicts ordered by class order.
+    """
+    if class_ids is None:
+        class_ids = (
+            Result.objects.filter(term=term, student__status='active', student__current_class__isnull=False)
+            .values_list('student__current_class_id', flat=True)
+            .distinct()
+        )
+    classes = list(Class.objects.filter(pk__in=class_ids).order_by('order'))
+    if not classes:
+        return []
+    class_ids = [class_obj.pk for class_obj in classes]
+
+    subjects_by_class = _subjects_by_class(term, class_ids)
+
+    students = list(
+        Student.objects.filter(current_class_id__in=class_ids, status='active')
+        .select_related('user')
+        .order_by('user__last_name', 'user__first_name')
+    )
+    student_ids = [student.pk for student in students]
+
+    approval_by_student = dict(
+        Result.objects.filter(term=term, student_id__in=student_ids).values_list('student_id', 'is_approved')
+    )
+
+    subject_results = (
+        SubjectResult.objects.filter(result__term=term, result__student_id__in=student_ids)
+        .exclude(
+            continuous_assessment_1__isnull=True,
+            continuous_assessment_2__isnull=True,
+            continuous_assessment_3__isnull=True,
+            assignment__isnull=True,
+            oral_test__isnull=True,
+            exam_score__isnull=True,
+        )
+        .annotate(broadsheet_total=SubjectResult.total_score_expression())
+        .values('result__student_id', 'subject_id', 'broadsheet_total')
+    )
+    scores_by_student = defaultdict(dict)
+    for row in subject_results:
+        scores_by_student[row['result__student_id']][row['subject_id']] = row['broadsheet_total']
+
+    rows_by_class = defaultdict(list)
+    for student in students:
+        class_subjects = subjects_by_class.get(student.current_class_id, [])
+        student_scores = scores_by_student.get(student.pk, {})
+        cells = {}
+        total_score = Decimal('0.0')
+        weighted_points = Decimal('0.0')
+        total_weights = Decimal('0.0')
+
+        for subject in class_subjects:
+            if subject.pk not in student_scores:
+                continue
+            subject_total = Decimal(student_scores[subject.pk] or 0).quantize(Decimal('0.1'))
+            grade_point = grade_point_for_score(subject_total)
+            weight = Decimal(subject.subject_weight or 1)
+            cells[subject.pk] = {
+                'subject': subject,
+                'total_score': subject_total,
+                'grade': grade_for_score(subject_total),
+                'grade_point': grade_point,
+            }
+            total_score += subject_total
+            weighted_points += grade_point * weight
+            total_weights += weight
+
+        average_score = total_score / len(cells) if cells else Decimal('0.0')
+        gpa = weighted_points / total_weights if total_weights > 0 else Decimal('0.0')
+        rows_by_class[student.current_class_id].append({
+            'student': student,
+            'subject_results': cells,
+            'total_score': total_score.quantize(Decimal('0.1')),
+            'average_score': average_score.quantize(Decimal('0.1')),
+            'gpa': gpa.quantize(Decimal('0.01')),
+            'grade': grade_for_score(average_score),
+            'is_approved': approval_by_student.get(student.pk, False),
+        })
+
+    broadsheets = []
+    for class_obj in classes:
+        rows = _rank_rows(rows_by_class.get(class_obj.pk, []))
+        is_all_approved = bool(rows) and all(row['is_approved'] for row in rows)
+        broadsheets.append({
+            'class': class_obj,
+            'subjects': subjects_by_class.get(class_obj.pk, []),
+            'results_data': rows,
+            'is_approved': is_all_approved,
+            'is_all_approved': is_all_approved,
+        })
+    return broadsheets
+
+
+def build_class_broadsheet(term, class_obj):
+    """Broadsheet for a single class; same shape as one entry of build_term_broadsheets."""
+    broadsheets = build_term_broadsheets(term, class_ids=[class_obj.pk])
+    if broadsheets:
+        return broadsheets[0]
+    return {
+        'class': class_obj,
+        'subjects': [],
+        'results_data': [],
+        'is_approved': False,
+        'is_all_approved': False,
+    }
+
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return sum(values, Decimal('0.0')) / len(values)
+
+
+def _sessional_summary(subject_rows, term_ids):
+    """
+    Builds the materialized summary for one student from their SubjectResult rows in a session.
+    `subject_rows` are dicts with term_id, subject_id, subject_weight and total (None when unscored).
+    """
+    scores = defaultdict(dict)
+    weighted_points = Decimal('0.0')
+    total_weights = Decimal('0.0')
+    term_totals = defaultdict(list)
+
+    for row in subject_rows:
+        total = row['total']
+        scores[row['subject_id']][row['term_id']] = total
+        if total is not None and total > 0:
+            weight = Decimal(row['subject_weight'] or 1)
+            weighted_points += grade_point_for_score(total) * weight
+            total_weights += weight
+            term_totals[row['term_id']].append(total)
+
+    subject_summary = {}
+    for subject_id, term_scores in scores.items():
+        sessional_average = _mean(term_scores.values())
+        subject_summary[str(subject_id)] = {
+            'term_scores': {
+                f'term_{term_id}_score': float(term_scores[term_id]) if term_scores.get(term_id) is not None else None
+                for term_id in term_ids
+            },
+            'sessional_average': float(round(sessional_average, 1)) if sessional_average is not None else None,
+        }
+
+    term_averages = [_mean(totals) for totals in term_totals.values()]
+    average_score = _mean(term_averages)
+    return {
+        'subject_summary_json': subject_summary,
+        'average_score': average_score.quantize(Decimal('0.01')) if average_score is not None else Decimal('0.00'),
+        'sessional_gpa': (weighted_points / total_weights).quantize(Decimal('0.01')) if total_weights > 0 else Decimal('0.00'),
+    }
+
+
+def _is_stale(row, class_id, source_changed_at):
+    if row is None or row.class_assigned_id != class_id or row.source_updated_at is None:
+        return True
+    return source_changed_at is not None and source_changed_at > row.source_updated_at
+
+
+@transaction.atomic
+def refresh_sessional_broadsheet(session, force=False):
+    """
+    Brings the materialized SessionalBroadsheetRow table for a session up to date.
+
+    Only students whose Result/SubjectResult rows changed since their row was built
+    (or who changed class, or have no row yet) are recomputed; pass force=True to
+    rebuild every row. Rows for students who left the class list are removed.
+    Missing SessionalResult rows are created so the approval flow has something to flag.
+    Returns counts of created, updated and deleted rows.
+    """
+    term_ids = list(Term.objects.filter(session=session).order_by('start_date').values_list('pk', flat=True))
+
+    class_ids = (
+        Result.objects.filter(term__session=session, student__status='active', student__current_class__isnull=False)
+        .values('student__current_class_id')
+    )
+    class_by_student = dict(
+        Student.objects.filter(status='active', current_class_id__in=class_ids).values_list('pk', 'current_class_id')
+    )
+
+    source_changes = {}
+    for row in (
+        Result.objects.filter(term__session=session, student_id__in=class_by_student.keys())
+        .values('student_id')
+        .annotate(result_changed=Max('updated_at'), scores_changed=Max('subject_results__updated_at'))
+    ):
+        source_changes[row['student_id']] = max(filter(None, (row['result_changed'], row['scores_changed'])))
+
+    existing_rows = {row.student_id: row for row in SessionalBroadsheetRow.objects.filter(session=session)}
+    stale_ids = [
+        student_id for student_id, class_id in class_by_student.items()
+        if force or _is_stale(existing_rows.get(student_id), class_id, source_changes.get(student_id))
+    ]
+
+    removed_ids = [student_id for student_id in existing_rows if student_id not in class_by_student]
+    deleted_count = 0
+    if removed_ids:
+        deleted_count, _ = SessionalBroadsheetRow.objects.filter(session=session, student_id__in=removed_ids).delete()
+
+    if not stale_ids:
+        return {'created': 0, 'updated': 0, 'deleted': deleted_count}
+
+    rows_by_student = defaultdict(list)
+    subject_results = (
+        SubjectResult.objects.filter(result__term__session=session, result__student_id__in=stale_ids)
+        .annotate(total=SubjectResult.total_score_expression())
+        .values(
+            'result__student_id', 'result__term_id', 'subject_id', 'subject__subject_weight', 'total',
+            *SUBJECT_SCORE_FIELDS,
+        )
+    )
+    for row in subject_results:
+        is_scored = any(row[field] is not None for field in SUBJECT_SCORE_FIELDS)
+        rows_by_student[row['result__student_id']].append({
+            'term_id': row['result__term_id'],
+            'subject_id': row['subject_id'],
+            'subject_weight': row['subject__subject_weight'],
+            'total': Decimal(row['total']).quantize(Decimal('0.1')) if is_scored else None,
+        })
+
+    sessional_results = dict(
+        SessionalResult.objects.filter(session=session, student_id__in=stale_ids).values_list('student_id', 'is_approved')
+    )
+    missing_sessional = [student_id for student_id in stale_ids if student_id not in sessional_results]
+    if missing_sessional:
+        SessionalResult.objects.bulk_create(
+            [SessionalResult(student_id=student_id, session=session) for student_id in missing_sessional],
+            ignore_conflicts=True,
+        )
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for student_id in stale_ids:
+        summary = _sessional_summary(rows_by_student.get(student_id, []), term_ids)
+        row = existing_rows.get(student_id) or SessionalBroadsheetRow(session=session, student_id=student_id)
+        row.class_assigned_id = class_by_student[student_id]
+        row.subject_summary_json = summary['subject_summary_json']
+        row.average_score = summary['average_score']
+        row.sessional_gpa = summary['sessional_gpa']
+        row.is_approved = sessional_results.get(student_id, False)
+        row.source_updated_at = source_changes.get(student_id, now)
+        row.refreshed_at = now
+        if row.pk:
+            to_update.append(row)
+        else:
+            to_create.append(row)
+
+    if to_create:
+        SessionalBroadsheetRow.objects.bulk_create(to_create)
+    if to_update:
+        SessionalBroadsheetRow.objects.bulk_update(
+            to_update,
+            ['class_assigned', 'subject_summary_json', 'average_score', 'sessional_gpa', 'is_approved',
+             'source_updated_at', 'refreshed_at'],
+        )
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': deleted_count}
+
+
+def mark_sessional_broadsheet_stale(placements):
+    """
+    Flags the broadsheet rows of `placements`, (session_id, student_id) pairs, for a rebuild
+    (a row without source_updated_at is always rebuilt), which also catches deleted scores the
+    timestamp scan cannot see. A refresh of the session is queued for when the transaction
+    commits, unless every row was already flagged and so already has one queued.
+    """
+    students_by_session = defaultdict(set)
+    for session_id, student_id in placements:
+        if session_id is not None:
+            students_by_session[session_id].add(student_id)
+    for session_id, student_ids in students_by_session.items():
+        rows = SessionalBroadsheetRow.objects.filter(session_id=session_id, student_id__in=student_ids)
+        flagged = rows.filter(source_updated_at__isnull=False).update(source_updated_at=None)
+        if flagged or rows.count() < len(student_ids):
+            queue_sessional_broadsheet_refresh(session_id)
+
+
+def queue_sessional_broadsheet_refresh(session_id):
+    from core.tasks import refresh_sessional_broadsheet_task
+    transaction.on_commit(lambda: refresh_sessional_broadsheet_task.delay(session_id))
+
+
+def build_sessional_broadsheets(session, terms_in_session):
+    """
+    Reads the materialized rows for a session (one indexed query) and shapes them for
+    the admin sessional broadsheet template, ranked by sessional GPA within each class.
+    """
+    rows = list(
+        SessionalBroadsheetRow.objects.filter(session=session)
+        .select_related('student__user', 'class_assigned')
+        .order_by('class_assigned__order', '-sessional_gpa', 'student__user__last_name', 'student__user__first_name')
+    )
+    if not rows:
+        return []
+
+    class_ids = {row.class_assigned_id for row in rows}
+    subjects_by_class = defaultdict(list)
+    seen = set()
+    for assignment in (
+        ClassSubjectAssignment.objects.filter(class_assigned_id__in=class_ids, term__in=terms_in_session)
+        .select_related('subject')
+        .order_by('subject__name')
+    ):
+        key = (assignment.class_assigned_id, assignment.subject_id)
+        if key not in seen:
+            seen.add(key)
+            subjects_by_class[assignment.class_assigned_id].append(assignment.subject)
+
+    broadsheets = []
+    by_class = {}
+    for row in rows:
+        if row.class_assigned_id not in by_class:
+            by_class[row.class_assigned_id] = {
+                'class': row.class_assigned,
+                'subjects': subjects_by_class.get(row.class_assigned_id, []),
+                'sessional_results_data': [],
+            }
+            broadsheets.append(by_class[row.class_assigned_id])
+        data = by_class[row.class_assigned_id]
+        subject_rows = []
+        for subject in data['subjects']:
+            subject_summary = row.subject_summary_json.get(str(subject.id), {})
+            term_scores = subject_summary.get('term_scores', {})
+            subject_rows.append({
+                'subject_name': subject.name,
+                'term_scores': [term_scores.get(f'term_{term.id}_score') for term in terms_in_session],
+                'sessional_average': subject_summary.get('sessional_average'),
+            })
+        data['sessional_results_data'].append({
+            'student_obj': row.student,
+            'sessional_gpa': row.sessional_gpa,
+            'sessional_average': row.average_score,
+            'is_approved': row.is_approved,
+            'subject_rows': subject_rows,
+        })
+
+    for data in broadsheets:
+        is_all_approved = all(entry['is_approved'] for entry in data['sessional_results_data'])
+        data['is_all_approved'] = is_all_approved
+        data['status_text'] = "Approved & Published" if is_all_approved else "Pending Approval"
+        data['status_class'] = "bg-success" if is_all_approved else "bg-warning text-dark"
+    return broadsheets
+
+
+SCORE_ENTRY_FIELDS = list(SUBJECT_SCORE_FIELDS) + ['is_finalized']
+TERM_SUMMARY_FIELDS = ['total_score', 'average_score', 'term_gpa', 'performance_change', 'updated_at']
+
+
+def _performance_change(average_score, previous_average):
+    if previous_average is None or average_score is None:
+        return None
+    if previous_average > 0:
+        return ((average_score - previous_average) / previous_average * 100).quantize(Decimal('0.01'))
+    if average_score > 0:
+        return Decimal('100.00')
+    return Decimal('0.00')
+
+
+def apply_term_summaries(results):
+    """
+    Recomputes total, average, GPA and performance change for the given Result instances.
+
+    Uses one query for their subject totals and one for earlier term averages of the same
+    students (a previous-term lookup map), then writes everything with a single bulk_update.
+    The instances are updated in place. Returns the number of rows written.
+    """
+    results = list(results)
+    if not results:
+        return 0
+
+    scored_totals = defaultdict(list)
+    for row in (
+        SubjectResult.objects.filter(result_id__in=[result.pk for result in results])
+        .annotate(total=SubjectResult.total_score_expression())
+        .values('result_id', 'subject__subject_weight', 'total')
+    ):
+        total = Decimal(row['total']).quantize(Decimal('0.1'))
+        if total > 0:
+            scored_totals[row['result_id']].append((total, Decimal(row['subject__subject_weight'] or 1)))
+
+    # Earlier averages per student, newest first, so the first older entry is the previous term.
+    latest_start = max(result.term.start_date for result in results)
+    previous_averages = defaultdict(list)
+    for row in (
+        Result.objects.filter(
+            student_id__in={result.student_id for result in results},
+            term__start_date__lt=latest_start,
+            average_score__isnull=False,
+        )
+        .order_by('-term__start_date')
+        .values('student_id', 'term__start_date', 'average_score')
+    ):
+        previous_averages[row['student_id']].append((row['term__start_date'], row['average_score']))
+
+    now = timezone.now()
+    for result in results:
+        totals = scored_totals.get(result.pk, [])
+        if totals:
+            total_score = sum((total for total, _ in totals), Decimal('0.0'))
+            total_weights = sum((weight for _, weight in totals), Decimal('0.0'))
+            weighted_points = sum((grade_point_for_score(total) * weight for total, weight in totals), Decimal('0.0'))
+            result.total_score = total_score.quantize(Decimal('0.01'))
+            result.average_score = (total_score / len(totals)).quantize(Decimal('0.01'))
+            result.term_gpa = (weighted_points / total_weights).quantize(Decimal('0.01'))
+        else:
+            result.total_score = result.average_score = result.term_gpa = Decimal('0.00')
+
+        previous_average = next(
+            (average for start_date, average in previous_averages.get(result.student_id, [])
+             if start_date < result.term.start_date),
+            None,
+        )
+        result.performance_change = _performance_change(result.average_score, previous_average)
+        result.updated_at = now
+
+    Result.objects.bulk_update(results, TERM_SUMMARY_FIELDS)
+    # bulk_update skips post_save, so drop the cached dashboard numbers explicitly.
+    invalidate_dashboard_metrics()
+    mark_dashboard_snapshots_stale(['admin', 'teacher'])
+    return len(results)
+
+
+def recalculate_term_summaries(result_ids=None, term=None, class_obj=None):
+    """
+    Batched replacement for calling Result.calculate_term_summary row by row.
+
+    Scope it with explicit result ids, a whole term, or a (term, class) pair where the
+    class is the students' current class. Returns the number of rows written.
+    """
+    if result_ids is None and term is None:
+        raise ValueError('Pass result_ids or a term to scope the recalculation.')
+    results = Result.objects.select_related('term')
+    if result_ids is not None:
+        results = results.filter(pk__in=list(result_ids))
+    if term is not None:
+        results = results.filter(term=term)
+    if class_obj is not None:
+        results = results.filter(student__current_class=class_obj)
+    return apply_term_summaries(results)
+
+
+def class_subject_averages(term, class_ids):
+    """
+    SubjectResult.get_class_average for every (class, subject) pair of the given classes in one
+    grouped query. Returns {(class_id, subject_id): average rounded to 0.1}.
+    """
+    rows = (
+        SubjectResult.objects.filter(result__term=term, result__student__current_class_id__in=list(class_ids))
+        .values('result__student__current_class_id', 'subject_id')
+        .annotate(class_avg=Avg(SubjectResult.total_score_expression()))
+    )
+    return {
+        (row['result__student__current_class_id'], row['subject_id']): Decimal(row['class_avg']).quantize(Decimal('0.1'))
+        for row in rows
+        if row['class_avg'] is not None
+    }
+
+
+def refresh_cumulative_gpas(student_ids):
+    """
+    Batched CumulativeRecord.update_cumulative_gpa: approved sessional GPAs are read in one query,
+    missing records are bulk-created and the rest bulk-updated. Returns {student_id: cumulative_gpa}.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return {}
+    history = defaultdict(dict)
+    for student_id, session_id, sessional_gpa in (
+        SessionalResult.objects.filter(student_id__in=student_ids, is_approved=True, sessional_gpa__isnull=False)
+        .order_by('session__start_date')
+        .values_list('student_id', 'session_id', 'sessional_gpa')
+    ):
+        history[student_id][str(session_id)] = sessional_gpa
+
+    records = {record.student_id: record for record in CumulativeRecord.objects.filter(student_id__in=student_ids)}
+    now = timezone.now()
+    created = []
+    for student_id in student_ids:
+        record = records.get(student_id)
+        if record is None:
+            record = records[student_id] = CumulativeRecord(student_id=student_id)
+            created.append(record)
+        gpas = list(history[student_id].values())
+        record.session_gpa_history_json = {session_id: float(gpa) for session_id, gpa in history[student_id].items()}
+        if gpas:
+            record.cumulative_gpa = (sum(gpas) / len(gpas)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        else:
+            record.cumulative_gpa = Decimal('0.00')
+        record.last_updated = now
+
+    CumulativeRecord.objects.bulk_create(created, ignore_conflicts=True)
+    created_ids = {record.student_id for record in created}
+    existing = [record for student_id, record in records.items() if student_id not in created_ids]
+    CumulativeRecord.objects.bulk_update(existing, ['cumulative_gpa', 'session_gpa_history_json', 'last_updated'])
+    return {student_id: record.cumulative_gpa for student_id, record in records.items()}
+
+
+def session_result_counts(session, student_ids):
+    """Number of term Results each student has in `session`, in one grouped query."""
+    return dict(
+        Result.objects.filter(term__session=session, student_id__in=list(student_ids))
+        .values('student_id')
+        .annotate(count=Count('pk'))
+        .values_list('student_id', 'count')
+    )
+
+
+def prepare_score_sheet(term, subject, students):
+    """
+    Returns {student_id: SubjectResult} for one subject sheet, creating any missing
+    Result and SubjectResult rows with bulk_create instead of per-student get_or_create.
+    """
+    student_ids = [student.pk for student in students]
+    result_ids = dict(Result.objects.filter(term=term, student_id__in=student_ids).values_list('student_id', 'pk'))
+    missing_results = [student_id for student_id in student_ids if student_id not in result_ids]
+    if missing_results:
+        Result.objects.bulk_create(
+            [Result(student_id=student_id, term=term) for student_id in missing_results], ignore_conflicts=True
+        )
+        result_ids.update(
+            Result.objects.filter(term=term, student_id__in=missing_results).values_list('student_id', 'pk')
+        )
+
+    sheet_qs = SubjectResult.objects.filter(subject=subject).select_related('result')
+    sheet = {row.result.student_id: row for row in sheet_qs.filter(result_id__in=result_ids.values())}
+    missing_rows = [student_id for student_id in student_ids if student_id not in sheet]
+    if missing_rows:
+        SubjectResult.objects.bulk_create(
+            [SubjectResult(result_id=result_ids[student_id], subject=subject) for student_id in missing_rows],
+            ignore_conflicts=True,
+        )
+        missing_result_ids = [result_ids[student_id] for student_id in missing_rows]
+        sheet.update({row.result.student_id: row for row in sheet_qs.filter(result_id__in=missing_result_ids)})
+    return sheet
+
+
+@transaction.atomic
+def save_score_sheet(changed_subject_results):
+    """
+    Writes edited score cells with one bulk_update and refreshes the term summaries of
+    every affected Result in one batched pass. Returns a summary including the number
+    of database queries issued.
+    """
+    changed_subject_results = list(changed_subject_results)
+    with count_queries() as counter:
+        if changed_subject_results:
+            now = timezone.now()
+            for subject_result in changed_subject_results:
+                subject_result.updated_at = now
+            SubjectResult.objects.bulk_update(changed_subject_results, SCORE_ENTRY_FIELDS + ['updated_at'])
+        result_ids = {row.result_id for row in changed_subject_results}
+        summaries = recalculate_term_summaries(result_ids)
+        # bulk_update skips the SubjectResult signals, so flag the broadsheet rows here.
+        mark_sessional_broadsheet_stale(
+            Result.objects.filter(pk__in=result_ids).values_list('term__session_id', 'student_id')
+        )
+    return {
+        'updated_cells': len(changed_subject_results),
+        'updated_summaries': summaries,
+        'queries': counter['count'],
+    }
@@ -1,10 +1,28 @@
 # forms.py
 
 from django import forms
-from ..models import Result
+from ..models import Class, ReportCardJob, Result, Term
 
 class ResultForm(forms.ModelForm):
     class Meta:
         model = Result
         fields = '__all__'
 
+
+
+class ReportCardJobForm(forms.ModelForm):
+    class Meta:
+        model = ReportCardJob
+        fields = ['term', 'class_obj', 'output_format']
+        labels = {'class_obj': 'Class'}
+        widgets = {
+            'term': forms.Select(attrs={'class': 'form-select'}),
+            'class_obj': forms.Select(attrs={'class': 'form-select'}),
+            'output_format': forms.Select(attrs={'class': 'form-select'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['term'].queryset = Term.objects.select_related('session').order_by('-start_date')
+        self.fields['class_obj'].queryset = Class.objects.order_by('order')
+        self.fields['class_obj'].empty_label = 'All classes'
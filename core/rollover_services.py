@@ -0,0 +1,342 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core.finance_services import deferred_financial_rebuilds, sync_student_fee_records_for_term
+from core.models import (
+    Class,
+    ClassSubjectAssignment,
+    FeeAssignment,
+    RolloverJob,
+    SubjectAssignment,
+    TeacherAssignment,
+    Term,
+)
+
+
+# How each kind of per-term assignment is copied: rows are matched on `key_fields` within the
+# target term, and `copy_fields` are the values an existing target row may be overwritten with.
+ROLLOVER_KINDS = {
+    'teacher_assignments': {
+        'model': TeacherAssignment,
+        'label': 'Teacher assignments',
+        'key_fields': ('class_assigned_id', 'teacher_id', 'is_form_teacher'),
+        'copy_fields': (),
+        'has_session': True,
+        'select_related': (),
+    },
+    'class_subject_assignments': {
+        'model': ClassSubjectAssignment,
+        'label': 'Class subject assignments',
+        'key_fields': ('class_assigned_id', 'subject_id'),
+        'copy_fields': (),
+        'has_session': True,
+        'select_related': (),
+    },
+    'subject_assignments': {
+        'model': SubjectAssignment,
+        'label': 'Subject teacher assignments',
+        'key_fields': ('class_assigned_id', 'subject_id', 'teacher_id'),
+        'copy_fields': (),
+        'has_session': True,
+        'select_related': (),
+    },
+    'fee_assignments': {
+        'model': FeeAssignment,
+        'label': 'Class fees',
+        'key_fields': ('class_instance_id',),
+        'copy_fields': ('amount',),
+        'has_session': False,
+        'select_related': ('class_instance',),
+    },
+}
+ASSIGNMENT_KINDS = ('teacher_assignments', 'class_subject_assignments', 'subject_assignments')
+
+
+def _term_rows(spec, term):
+    queryset = spec['model'].objects.filter(term=term)
+    if spec['has_session']:
+        queryset = queryset.filter(session_id=term.session_id)
+    if spec['select_related']:
+        queryset = queryset.select_related(*spec['select_related'])
+    return queryset.order_by('pk')
+
+
+def _row_key(spec, row):
+    return tuple(getattr(row, field) for field in spec['key_fields'])
+
+
+def _clone_row(spec, row, target_term):
+    values = {field: getattr(row, field) for field in (*spec['key_fields'], *spec['copy_fields'])}
+    if spec['has_session']:
+        values['session_id'] = target_term.session_id if target_term else None
+    return spec['model'](term=target_term, **values)
+
+
+def plan_rollover(source_term, target_term, kinds, overwrite_existing=False):
+    """
+    Diffs the assignments of `source_term` against `target_term` in memory: two queries per kind.
+
+    Returns {kind: {'source', 'create', 'update', 'unchanged'}} where `create` holds unsaved
+    copies for the target term and `update` holds target rows whose copy fields were reset to
+    the source values (only when `overwrite_existing`). `target_term` may be None to preview a
+    term that does not exist yet, in which case every source row is a create.
+    """
+    plan = {}
+    for kind in kinds:
+        spec = ROLLOVER_KINDS[kind]
+        source_rows = list(_term_rows(spec, source_term))
+        target_rows = {}
+        if target_term is not None:
+            for row in _term_rows(spec, target_term):
+                target_rows.setdefault(_row_key(spec, row), row)
+
+        create, update, unchanged, seen = [], [], 0, set()
+        for row in source_rows:
+            key = _row_key(spec, row)
+            if key in seen:
+                continue
+            seen.add(key)
+            existing = target_rows.get(key)
+            if existing is None:
+                create.append(_clone_row(spec, row, target_term))
+            elif overwrite_existing and any(
+                getattr(existing, field) != getattr(row, field) for field in spec['copy_fields']
+            ):
+                for field in spec['copy_fields']:
+                    setattr(existing, field, getattr(row, field))
+                update.append(existing)
+            else:
+                unchanged += 1
+        plan[kind] = {'source': source_rows, 'create': create, 'update': update, 'unchanged': unchanged}
+    return plan
+
+
+def summarize_rollover_plan(plan):
+    """Row counts of a plan, in the same shape apply_rollover_plan returns."""
+    return {
+        kind: {'created': len(entry['create']), 'updated': len(entry['update']), 'unchanged': entry['unchanged']}
+        for kind, entry in plan.items()
+    }
+
+
+def _link_class_subjects(assignments):
+    # ClassSubjectAssignment.save() keeps Class.subjects in step; bulk_create bypasses it.
+    through = Class.subjects.through
+    through.objects.bulk_create(
+        [through(class_id=row.class_assigned_id, subject_id=row.subject_id) for row in assignments],
+        ignore_conflicts=True,
+    )
+
+
+def apply_rollover_plan(plan):
+    """Writes a plan with one bulk_create and one bulk_update per kind. Returns its counts."""
+    for kind, entry in plan.items():
+        spec = ROLLOVER_KINDS[kind]
+        if entry['create']:
+            spec['model'].objects.bulk_create(entry['create'], ignore_conflicts=True)
+            if kind == 'class_subject_assignments':
+                _link_class_subjects(entry['create'])
+        if entry['update']:
+            spec['model'].objects.bulk_update(entry['update'], spec['copy_fields'])
+    return summarize_rollover_plan(plan)
+
+
+def rollover_term(source_term, target_term, kinds=ASSIGNMENT_KINDS, overwrite_existing=False, dry_run=False):
+    """
+    Copies the `kinds` assignments of `source_term` into `target_term`; rows already in the target
+    are left alone unless `overwrite_existing`. With `dry_run` nothing is written.
+    Returns {kind: {'created', 'updated', 'unchanged'}}.
+    """
+    plan = plan_rollover(source_term, target_term, kinds, overwrite_existing=overwrite_existing)
+    if dry_run:
+        return summarize_rollover_plan(plan)
+    with transaction.atomic():
+        return apply_rollover_plan(plan)
+
+
+def session_term_pairs(source_session, target_session, create_missing=True):
+    """
+    Pairs every term of `source_session` with the term of the same order in `target_session`.
+    Missing target terms are created (or paired with None when `create_missing` is off).
+    """
+    source_terms = list(Term.objects.filter(session=source_session).order_by('order'))
+    target_terms = {
+        term.order: term
+        for term in Term.objects.filter(session=target_session, order__in=[term.order for term in source_terms])
+    }
+    pairs = []
+    for source_term in source_terms:
+        target_term = target_terms.get(source_term.order)
+        if target_term is None and create_missing:
+            # Saving a Term drives the SchoolDay and Result signals, so the few missing terms are
+            # created one at a time rather than in bulk.
+            target_term = Term.objects.create(
+                session=target_session,
+                name=source_term.name,
+                start_date=source_term.start_date,
+                end_date=source_term.end_date,
+                is_active=False,
+            )
+        pairs.append((source_term, target_term))
+    return pairs
+
+
+def preview_rollover(term_pairs, kinds=ASSIGNMENT_KINDS, overwrite_existing=False):
+    """Dry-run counts for `term_pairs` ((source_term, target_term or None) tuples), totalled by kind."""
+    totals = {kind: {'created': 0, 'updated': 0, 'unchanged': 0} for kind in kinds}
+    for source_term, target_term in term_pairs:
+        counts = rollover_term(source_term, target_term, kinds, overwrite_existing=overwrite_existing, dry_run=True)
+        for kind, row in counts.items():
+            for field, value in row.items():
+                totals[kind][field] += value
+    return totals
+
+
+@transaction.atomic
+@deferred_financial_rebuilds()
+def rollover_fee_assignments(
+    source_term,
+    target_term,
+    overwrite_existing_assignments=False,
+    carry_forward_adjustments=True,
+):
+    plan = plan_rollover(
+        source_term, target_term, ['fee_assignments'], overwrite_existing=overwrite_existing_assignments,
+    )
+    counts = apply_rollover_plan(plan)['fee_assignments']
+    # bulk_create skips the FeeAssignment post_save sync, so the touched classes are synced here.
+    sync_summary = sync_student_fee_records_for_term(
+        target_term,
+        source_term=source_term,
+        class_ids=[row.class_instance_id for row in plan['fee_assignments']['source']],
+        carry_forward_adjustments=carry_forward_adjustments,
+        active_only=True,
+    )
+    return {
+        'created_assignments': counts['created'],
+        'updated_assignments': counts['updated'],
+        'skipped_assignments': counts['unchanged'],
+        'sync': sync_summary,
+    }
+
+
+def summarize_fee_rollover(source_term, target_term):
+    entry = plan_rollover(source_term, target_term, ['fee_assignments'])['fee_assignments']
+    creatable_class_ids = {row.class_instance_id for row in entry['create']}
+    existing_target_class_ids = {row.class_instance_id for row in entry['source']} - creatable_class_ids
+    return {
+        'source_term': source_term,
+        'target_term': target_term,
+        'source_assignments': entry['source'],
+        'existing_count': len(existing_target_class_ids),
+        'creatable_count': len(creatable_class_ids),
+        'existing_target_class_ids': existing_target_class_ids,
+    }
+
+
+def create_rollover_job(scope, source, target, kinds=ASSIGNMENT_KINDS, options=None, requested_by=None):
+    """Records a pending RolloverJob from `source` to `target` (terms, or sessions when `scope` is 'session')."""
+    fields = {'source_session': source, 'target_session': target} if scope == 'session' else {
+        'source_term': source, 'target_term': target,
+    }
+    return RolloverJob.objects.create(
+        scope=scope, kinds=list(kinds), options=options or {}, requested_by=requested_by, **fields,
+    )
+
+
+def start_rollover_job(scope, source, target, kinds=ASSIGNMENT_KINDS, options=None, requested_by=None):
+    """Creates a RolloverJob and queues it to run once the current transaction commits."""
+    job = create_rollover_job(scope, source, target, kinds=kinds, options=options, requested_by=requested_by)
+    queue_rollover_job(job)
+    return job
+
+
+def queue_rollover_job(job):
+    from core.tasks import run_rollover_job_task
+    job_id = job.pk
+    transaction.on_commit(lambda: run_rollover_job_task.delay(job_id))
+
+
+def resume_rollover_job(job):
+    """Re-queues a failed job; steps it already finished are skipped. Returns True if queued."""
+    resumed = RolloverJob.objects.filter(pk=job.pk, status='failed').update(status='pending', error='')
+    if resumed:
+        queue_rollover_job(job)
+    return bool(resumed)
+
+
+def _job_term_pairs(job):
+    if job.scope == 'session':
+        return session_term_pairs(job.source_session, job.target_session)
+    if job.source_term is None or job.target_term is None:
+        raise ValueError('The source or target term of this rollover no longer exists.')
+    return [(job.source_term, job.target_term)]
+
+
+def _run_rollover_step(job, source_term, target_term, kind):
+    if kind == 'fee_assignments':
+        result = rollover_fee_assignments(
+            source_term,
+            target_term,
+            overwrite_existing_assignments=job.options.get('overwrite_existing', False),
+            carry_forward_adjustments=job.options.get('carry_forward_adjustments', True),
+        )
+        counts = {
+            'created': result['created_assignments'],
+            'updated': result['updated_assignments'],
+            'unchanged': result['skipped_assignments'],
+        }
+        return counts, result['sync']
+    counts = rollover_term(
+        source_term, target_term, [kind], overwrite_existing=job.options.get('overwrite_existing', False),
+    )[kind]
+    return counts, None
+
+
+def run_rollover_job(job_id):
+    """
+    Runs (or resumes) a RolloverJob. Each (term, kind) step commits together with its entry in
+    `completed_steps` and its counts in `summary`, so progress is visible while the job runs and a
+    re-run skips finished steps. Returns the job's as_dict().
+    """
+    job = RolloverJob.objects.select_related(
+        'source_session', 'target_session', 'source_term', 'target_term',
+    ).get(pk=job_id)
+    if job.status == 'completed':
+        return job.as_dict()
+    job.status, job.error = 'running', ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        steps = [
+            (source_term, target_term, kind)
+            for source_term, target_term in _job_term_pairs(job)
+            for kind in job.kinds
+        ]
+        job.steps_total = len(steps)
+        job.save(update_fields=['steps_total', 'updated_at'])
+
+        for source_term, target_term, kind in steps:
+            step = f'{source_term.pk}:{kind}'
+            if step in job.completed_steps:
+                continue
+            with transaction.atomic():
+                counts, sync_summary = _run_rollover_step(job, source_term, target_term, kind)
+                summary = dict(job.summary)
+                totals = dict(summary.get(kind, {}))
+                for field, value in counts.items():
+                    totals[field] = totals.get(field, 0) + value
+                summary[kind] = totals
+                if sync_summary is not None:
+                    summary['fee_sync'] = [*summary.get('fee_sync', []), sync_summary]
+                job.summary = summary
+                job.completed_steps = [*job.completed_steps, step]
+                job.save(update_fields=['summary', 'completed_steps', 'updated_at'])
+    except Exception as exc:
+        job.status, job.error = 'failed', str(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    job.status, job.finished_at = 'completed', timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job.as_dict()
@@ -1,14 +1,14 @@
 # signals.py
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from core.models import Student, Term, SchoolDay, Student, Teacher, Guardian, Result, FeeAssignment, StudentFeeRecord
-from core.models import StudentFeeRecord, Payment, FinancialRecord, Term, Student, Holiday
+from core.models import StudentFeeRecord, Payment, FinancialRecord, FinanceSummarySnapshot, Term, Student, Holiday
 from core.models import (
-    Assessment, Exam, Assignment, 
+    Assessment, Exam, Assignment, OnlineQuestion,
     AssessmentSubmission, ExamSubmission, AssignmentSubmission,
-    Student, AcademicAlert, SubjectResult
+    Student, AcademicAlert, SubjectResult, Enrollment, Attendance
 )
 
 from django.core.mail import send_mail, EmailMultiAlternatives
@@ -18,6 +18,14 @@ from django.db import IntegrityError
 from django.db import transaction
 from django.template.loader import render_to_string
 from core.models import CustomUser
+from core.system_settings import SystemSettings, invalidate_settings_cache
+from core.dashboard_services import invalidate_dashboard_metrics, mark_dashboard_snapshots_stale
+from core.attendance_services import refresh_attendance_summaries, sync_term_school_days
+from core.grading_services import invalidate_answer_keys, invalidate_question_answer_keys
+from core.result_services import mark_sessional_broadsheet_stale
+from core.finance_services import (
+    invalidate_finance_summaries, queue_financial_record_rebuild, record_payment_rollups, request_fee_sync,
+)
 from core.tasks import send_email_task
 from decimal import Decimal
 from datetime import timedelta
@@ -159,6 +167,9 @@ def manage_schoolday_entries_for_term(sender, instance, created, **kwargs):
                 deleted_count, _ = SchoolDay.objects.filter(term=term, date__in=dates_to_delete).delete()
                 print(f"Signal: Deleted {deleted_count} SchoolDays for Term {term.pk}.")
 
+            if dates_to_add or dates_to_delete:
+                sync_term_school_days(term)
+
     print(f"Signal: Finished SchoolDay management for Term {instance.pk}.")
 
 
@@ -210,6 +221,8 @@ def remove_schoolday_on_holiday_creation(sender, instance, created, **kwargs):
         deleted_count, _ = SchoolDay.objects.filter(term=term, date=holiday_date).delete()
         if deleted_count:
              print(f"Signal: Deleted SchoolDay on {holiday_date} for Term {term.pk} because Holiday '{instance.name}' was added/updated.")
+    # Any holiday edit can move the term's school-day count.
+    sync_term_school_days(instance.term)
 
 @receiver(post_delete, sender=Holiday)
 def add_schoolday_on_holiday_deletion(sender, instance, **kwargs):
@@ -226,6 +239,7 @@ def add_schoolday_on_holiday_deletion(sender, instance, **kwargs):
         sd, created = SchoolDay.objects.get_or_create(term=term, date=holiday_date)
         if created:
              print(f"Signal: Re-created SchoolDay on {holiday_date} for Term {term.pk} because Holiday '{instance.name}' was deleted.")
+    sync_term_school_days(term)
 
 
 
@@ -270,19 +284,7 @@ def update_financial_record_on_fee_change(sender, instance, created, **kwargs):
     Update FinancialRecord when StudentFeeRecord changes or is created.
     Handles both creation of FR and updates.
     """
-    fin_record, fin_created = FinancialRecord.objects.get_or_create(
-        student=instance.student,
-        term=instance.term,
-        defaults={ # Basic defaults, will be overwritten by update_record
-            'total_fee': instance.net_fee,
-            'total_discount': instance.discount,
-            'total_paid': Decimal('0.00'),
-            'outstanding_balance': instance.net_fee # Initial balance is net_fee
-        }
-    )
-
-    fin_record.update_record()
-    fin_record.save(update_fields=['total_fee', 'total_discount', 'outstanding_balance', 'archived'])
+    queue_financial_record_rebuild(instance.student_id, instance.term_id)
 
 @receiver(post_save, sender=Payment)
 def update_financial_record_on_payment_save(sender, instance, created, **kwargs):
@@ -291,25 +293,50 @@ def update_financial_record_on_payment_save(sender, instance, created, **kwargs)
     """
     fin_record = instance.financial_record
     if fin_record:
-        # Now it's safe to call update_record because fin_record definitely exists with a PK
-        fin_record.update_record()
-        # Use update_fields for efficiency and to prevent potential signal loops if save() triggers others
-        fin_record.save(update_fields=['total_paid', 'outstanding_balance'])
+        queue_financial_record_rebuild(fin_record.student_id, fin_record.term_id)
+
+
+def _payment_rollup_entry(instance, count):
+    return (
+        instance.financial_record_id, instance.school_class_id, instance.payment_date,
+        instance.batch_reference, instance.amount_paid, count,
+    )
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups_on_save(sender, instance, created, **kwargs):
+    """Single-payment saves move the daily rollups; an edit takes the payment out of its old bucket."""
+    entries = [_payment_rollup_entry(instance, 1)]
+    loaded = getattr(instance, '_loaded_rollup', None)
+    if not created and loaded is not None:
+        entries.append((*loaded, -1))
+    record_payment_rollups(entries)
+    instance._loaded_rollup = _payment_rollup_entry(instance, 1)[:5]
+
+
+@receiver(post_delete, sender=Payment)
+def update_payment_rollups_on_delete(sender, instance, **kwargs):
+    """Deleted payments leave the rollups; cascades from student or term deletion are left to the rebuild command."""
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Payment:
+        return
+    loaded = getattr(instance, '_loaded_rollup', None) or _payment_rollup_entry(instance, 1)[:5]
+    record_payment_rollups([(*loaded, -1)])
 
 
 @receiver(post_delete, sender=Payment)
 def update_financial_record_on_payment_delete(sender, instance, **kwargs):
     """
     Update FinancialRecord when a Payment is deleted.
+    Payments removed along with their FinancialRecord (student or term deletion) are skipped,
+    so the rebuild does not re-create the record being deleted.
     """
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Payment:
+        return
     fin_record = instance.financial_record
-    # Check if the related FinancialRecord still exists before trying to update
-    if fin_record and FinancialRecord.objects.filter(pk=fin_record.pk).exists():
-         # Refresh to ensure we have the latest state if other operations happened
-        fin_record.refresh_from_db()
-        fin_record.update_record()
-        fin_record.save(update_fields=['total_paid', 'outstanding_balance'])
-    # else: pass # Related record deleted, nothing to update
+    if fin_record:
+        queue_financial_record_rebuild(fin_record.student_id, fin_record.term_id)
 
 # Optional: Signal to update FinancialRecord archive status when Term becomes inactive
 @receiver(post_save, sender=Term)
@@ -323,6 +350,8 @@ def update_financial_record_archive_on_term_change(sender, instance, **kwargs):
     # You might also need logic if a term is reactivated (unlikely?)
     else:
         FinancialRecord.objects.filter(term=instance, archived=True).update(archived=False)
+        # A reactivated term can change again, so its frozen finance summary no longer holds.
+        FinanceSummarySnapshot.objects.filter(term=instance).delete()
 
 # Optional: Signal to create initial FinancialRecord when StudentFeeRecord is created
 # This might overlap with the post_save on StudentFeeRecord, ensure logic is sound.
@@ -579,4 +608,148 @@ def update_assessment_result(sender, instance, **kwargs):
 
 @receiver(post_save, sender=ExamSubmission)
 def update_exam_result(sender, instance, **kwargs):
-    _update_subject_result_with_best_attempt(ExamSubmission, instance, instance.exam, 'exam')
\ No newline at end of file
+    _update_subject_result_with_best_attempt(ExamSubmission, instance, instance.exam, 'exam')
+
+@receiver(post_save, sender=OnlineQuestion)
+@receiver(pre_delete, sender=OnlineQuestion)
+def invalidate_answer_keys_on_question_change(sender, instance, **kwargs):
+    """An edited or deleted question changes the answer key of every assessment and exam using it."""
+    if instance.pk:
+        invalidate_question_answer_keys(instance)
+
+
+@receiver(m2m_changed, sender=Assessment.questions.through)
+@receiver(m2m_changed, sender=Exam.questions.through)
+def invalidate_answer_keys_on_question_list_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Questions added to or removed from an assessment or exam change its answer key."""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        key = 'exam_ids' if isinstance(instance, Exam) else 'assessment_ids'
+        invalidate_answer_keys(**{key: [instance.pk]})
+    elif action == 'pre_clear':
+        # question.assessments.clear(): the affected items are only known before the rows go.
+        invalidate_question_answer_keys(instance)
+    elif pk_set:
+        key = 'exam_ids' if sender is Exam.questions.through else 'assessment_ids'
+        invalidate_answer_keys(**{key: pk_set})
+
+
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+def invalidate_system_settings_cache(sender, instance, **kwargs):
+    """Drop cached settings now, and again once the change is committed and visible to other processes."""
+    invalidate_settings_cache()
+    transaction.on_commit(invalidate_settings_cache)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_dashboard_metrics_cache(sender, instance, **kwargs):
+    """Student and result changes make the cached dashboard numbers and snapshots stale."""
+    invalidate_dashboard_metrics()
+    mark_dashboard_snapshots_stale(['admin', 'teacher'])
+
+
+@receiver(post_save, sender=Student)
+def invalidate_dashboard_metrics_on_student_change(sender, instance, created, **kwargs):
+    """
+    New students and changes to the fields the dashboards count by (class, status, gender, date
+    of birth) make them stale. Other saves, such as the profile save on every login, do not.
+    """
+    current = instance.dashboard_fields()
+    previous = getattr(instance, '_loaded_dashboard', None)
+    instance._loaded_dashboard = current
+    if created or current != previous:
+        invalidate_dashboard_metrics_cache(sender, instance, **kwargs)
+
+
+@receiver(post_save, sender=SubjectResult)
+@receiver(post_delete, sender=SubjectResult)
+def mark_broadsheet_stale_on_score_change(sender, instance, **kwargs):
+    """
+    Saved and deleted scores flag the student's sessional broadsheet row for the worker.
+    Deletes cascading from the Result are left to the Result signal below.
+    """
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not SubjectResult:
+        return
+    placement = Result.objects.filter(pk=instance.result_id).values_list('term__session_id', 'student_id').first()
+    if placement:
+        mark_sessional_broadsheet_stale([placement])
+
+
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def mark_broadsheet_stale_on_result_change(sender, instance, **kwargs):
+    """
+    Result edits flag the student's sessional broadsheet row. Deletes cascading from a term,
+    session or student are skipped: the student's rows go with them or the hourly refresh
+    picks the change up.
+    """
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Result:
+        return
+    session_id = Term.objects.filter(pk=instance.term_id).values_list('session_id', flat=True).first()
+    mark_sessional_broadsheet_stale([(session_id, instance.student_id)])
+
+
+@receiver(post_save, sender=FinancialRecord)
+def mark_admin_dashboard_stale(sender, instance, **kwargs):
+    mark_dashboard_snapshots_stale(['admin'])
+
+
+@receiver(post_save, sender=FinancialRecord)
+@receiver(post_delete, sender=FinancialRecord)
+def invalidate_finance_summary_cache(sender, instance, **kwargs):
+    """Single-record ledger writes outside rebuild_financial_records drop the cached finance totals."""
+    invalidate_finance_summaries([instance.term_id])
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+@receiver(post_save, sender=AssessmentSubmission)
+@receiver(post_save, sender=ExamSubmission)
+def mark_teacher_dashboards_stale(sender, instance, **kwargs):
+    mark_dashboard_snapshots_stale(['teacher'])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def mark_attendance_dashboards_stale(sender, instance, **kwargs):
+    mark_dashboard_snapshots_stale(['admin'])
+    guardian_id = Student.objects.filter(pk=instance.student_id).values_list('student_guardian_id', flat=True).first()
+    if guardian_id:
+        mark_dashboard_snapshots_stale(['guardian'], owner_ids=[guardian_id])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_counters(sender, instance, **kwargs):
+    """
+    Single-row attendance edits (admin, shell) rebuild that student's term counters.
+    Deletes cascading from a term, class or student are skipped; their counters go with them.
+    """
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Attendance:
+        return
+    refresh_attendance_summaries(instance.term, [instance.student_id])
+
+
+@receiver(post_save, sender=FeeAssignment)
+def sync_fee_records_on_assignment_change(sender, instance, **kwargs):
+    request_fee_sync(instance.term)
+
+
+@receiver(post_save, sender=Student)
+def sync_fee_records_on_enrollment_change(sender, instance, created, **kwargs):
+    """Queue a fee sync for the active term when a student's class or status changes."""
+    current = (instance.current_class_id, instance.status)
+    previous = getattr(instance, '_loaded_enrollment', None)
+    instance._loaded_enrollment = current
+    # New students get their fee records from create_student_fee_records above.
+    if created or current == previous:
+        return
+    request_fee_sync(Term.objects.filter(is_active=True).first())
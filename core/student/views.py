@@ -6,7 +6,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, Http404, HttpResponseNotAllowed
+from django.http import HttpResponse, Http404, HttpResponseNotAllowed, JsonResponse
 from django.views import View
 from django.core.paginator import Paginator
 from django.db.models import Q
@@ -19,6 +19,7 @@ from core.models import Assessment, AssessmentSubmission, Exam, ExamSubmission
 from .forms import StudentRegistrationForm, MessageForm, ReplyForm
 from core.assignment.forms import AssignmentSubmissionForm
 from core.utils import build_question_result, extract_submission_answer, question_answer_is_correct
+from core.grading_services import get_submission_status, submit_answers
 
 
 # Student Views
@@ -598,40 +599,10 @@ def take_assessment(request, submission_id):
     return render(request, 'assessment/take_assessment.html', context)
 
 
-def _process_and_save_assessment_submission(request, submission_id):
-    """Internal helper to process POST data for both regular and beacon submissions."""
+def _process_and_save_assessment_submission(request, submission_id, force_submitted=False):
+    """Internal helper to grade (or queue) the POSTed answers for both regular and beacon submissions."""
     submission = get_object_or_404(AssessmentSubmission, id=submission_id)
-    if submission.is_completed:
-        return submission, False
-
-    assessment = submission.assessment
-    answers = {}
-    score = Decimal('0.0')
-    requires_manual_review = False
-
-    for question in assessment.questions.all():
-        answer_key = f'answer_{question.id}'
-        submitted_answer = None
-        if question.question_type == 'MCQ':
-            submitted_answer = request.POST.getlist(answer_key)
-        else:
-            submitted_answer = request.POST.get(answer_key)
-        
-        answers[str(question.id)] = submitted_answer
-
-        if question.question_type == 'ES':
-            requires_manual_review = True
-        elif question.is_option_correct(submitted_answer):
-            score += Decimal(question.points) # Use points from OnlineQuestion
-            
-    submission.answers = answers
-    submission.score = score
-    submission.requires_manual_review = requires_manual_review
-    submission.is_graded = not requires_manual_review
-    submission.is_completed = True
-    submission.submitted_at = timezone.now()
-    submission.save() # The signal will fire after this save
-    return submission, True
+    return submit_answers(submission, request.POST, force_submitted=force_submitted)
 
 
 @login_required
@@ -641,7 +612,9 @@ def submit_assessment(request, submission_id):
         return HttpResponseNotAllowed(['POST'])
     
     submission, was_processed = _process_and_save_assessment_submission(request, submission_id)
-    if was_processed:
+    if was_processed and not submission.is_completed:
+        messages.success(request, f"Assessment '{submission.assessment.title}' received. Your score will appear once it has been graded.")
+    elif was_processed:
         messages.success(request, f"Assessment '{submission.assessment.title}' submitted successfully.")
     else:
         messages.warning(request, "Assessment was already submitted.")
@@ -655,10 +628,7 @@ def autosubmit_beacon_assessment(request, submission_id):
     if request.method != 'POST':
         return HttpResponse(status=204)
         
-    submission, was_processed = _process_and_save_assessment_submission(request, submission_id)
-    if was_processed:
-        submission.force_submitted_at = timezone.now()
-        submission.save()
+    _process_and_save_assessment_submission(request, submission_id, force_submitted=True)
     return HttpResponse(status=204)
 
 
@@ -739,40 +709,10 @@ def take_exam(request, submission_id):
     return render(request, 'exam/take_exam.html', context)
 
 
-def _process_and_save_exam_submission(request, submission_id):
-    """Internal helper to process POST data for both regular and beacon submissions."""
+def _process_and_save_exam_submission(request, submission_id, force_submitted=False):
+    """Internal helper to grade (or queue) the POSTed answers for both regular and beacon submissions."""
     submission = get_object_or_404(ExamSubmission, id=submission_id)
-    if submission.is_completed:
-        return submission, False
-
-    exam = submission.exam
-    answers = {}
-    score = Decimal('0.0')
-    requires_manual_review = False
-
-    for question in exam.questions.all():
-        answer_key = f'answer_{question.id}'
-        submitted_answer = None
-        if question.question_type == 'MCQ':
-            submitted_answer = request.POST.getlist(answer_key)
-        else:
-            submitted_answer = request.POST.get(answer_key)
-        
-        answers[str(question.id)] = submitted_answer
-
-        if question.question_type == 'ES':
-            requires_manual_review = True
-        elif question.is_option_correct(submitted_answer):
-            score += Decimal(question.points) # Use points from OnlineQuestion
-            
-    submission.answers = answers
-    submission.score = score
-    submission.requires_manual_review = requires_manual_review
-    submission.is_graded = not requires_manual_review
-    submission.is_completed = True
-    submission.submitted_at = timezone.now()
-    submission.save() # The signal will fire after this save
-    return submission, True
+    return submit_answers(submission, request.POST, force_submitted=force_submitted)
 
 
 @login_required
@@ -782,7 +722,9 @@ def submit_exam(request, submission_id):
         return HttpResponseNotAllowed(['POST'])
     
     submission, was_processed = _process_and_save_exam_submission(request, submission_id)
-    if was_processed:
+    if was_processed and not submission.is_completed:
+        messages.success(request, f"Exam '{submission.exam.title}' received. Your score will appear once it has been graded.")
+    elif was_processed:
         messages.success(request, f"Exam '{submission.exam.title}' submitted successfully.")
     else:
         messages.warning(request, "Exam was already submitted.")
@@ -796,13 +738,28 @@ def autosubmit_beacon_exam(request, submission_id):
     if request.method != 'POST':
         return HttpResponse(status=204)
         
-    submission, was_processed = _process_and_save_exam_submission(request, submission_id)
-    if was_processed:
-        submission.force_submitted_at = timezone.now()
-        submission.save()
+    _process_and_save_exam_submission(request, submission_id, force_submitted=True)
     return HttpResponse(status=204)
 
 
+@login_required
+def submission_status(request, kind, submission_id):
+    """JSON grading status of an assessment or exam submission, polled after a queued submit."""
+    SubmissionModel = {'assessment': AssessmentSubmission, 'exam': ExamSubmission}.get(kind)
+    if SubmissionModel is None:
+        raise Http404
+    submission = get_object_or_404(SubmissionModel.objects.select_related('student'), id=submission_id)
+
+    user = request.user
+    allowed = (
+        user.is_superuser or user.role in ('admin', 'teacher')
+        or user.pk in (submission.student_id, submission.student.student_guardian_id)
+    )
+    if not allowed:
+        raise Http404
+    return JsonResponse(get_submission_status(submission))
+
+
 @login_required
 def message_inbox(request):
     """
@@ -2,12 +2,38 @@
 """
 System-wide settings model and utilities for LSA Application
 """
+from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator, EmailValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 import json
 
+from core.cache_versions import bump_version, get_version
+
+
+SETTINGS_CACHE_KEY = 'core:system_settings:instance'
+SETTINGS_VERSION_KEY = 'core:system_settings:version'
+
+# Process-local copy of the singleton, valid while its version matches the shared version key.
+_local_settings = {'version': None, 'instance': None}
+
+
+def _settings_cache_timeout():
+    return getattr(django_settings, 'SYSTEM_SETTINGS_CACHE_TIMEOUT', 60 * 60)
+
+
+def _current_settings_version():
+    return get_version(SETTINGS_VERSION_KEY)
+
+
+def invalidate_settings_cache():
+    """Bumps the shared version key so every process reloads the settings on next access."""
+    bump_version(SETTINGS_VERSION_KEY)
+    cache.delete(SETTINGS_CACHE_KEY)
+    _local_settings['version'] = _local_settings['instance'] = None
+
 
 class SystemSettings(models.Model):
     """
@@ -213,15 +239,43 @@ class SystemSettings(models.Model):
                 raise ValidationError("Invalid grading system format")
     
     @classmethod
-    def get_settings(cls):
-        """Get or create the singleton settings instance"""
+    def get_settings(cls, use_cache=True):
+        """
+        Get or create the singleton settings instance.
+
+        Reads go through a process-local copy and the shared cache, both keyed on a
+        version that is bumped whenever the settings are saved or deleted, so a request
+        only hits the database after a change. Pass use_cache=False when the instance
+        is going to be edited.
+        """
+        if not use_cache:
+            return cls._load_settings()
+
+        version = _current_settings_version()
+        if _local_settings['version'] == version and _local_settings['instance'] is not None:
+            return _local_settings['instance']
+
+        cached = cache.get(SETTINGS_CACHE_KEY)
+        if cached and cached[0] == version:
+            settings = cached[1]
+        else:
+            settings = cls._load_settings()
+            # Creating the row on first use bumps the version, so cache under the latest one.
+            version = _current_settings_version()
+            cache.set(SETTINGS_CACHE_KEY, (version, settings), _settings_cache_timeout())
+
+        _local_settings['version'], _local_settings['instance'] = version, settings
+        return settings
+
+    @classmethod
+    def _load_settings(cls):
         settings, created = cls.objects.get_or_create(pk=1)
         if created:
             # Set default grading system
             settings.grading_system = cls.get_default_grading_system()
             settings.save()
         return settings
-    
+
     @staticmethod
     def get_default_grading_system():
         """Return the default grading scale"""
@@ -234,18 +288,38 @@ class SystemSettings(models.Model):
             "F": {"min_score": 0, "max_score": 29, "remark": "Fail"}
         }
     
+    def _compile_grade_table(self):
+        """
+        Precompiles the grading system into a lookup table for whole-number scores 0-100,
+        plus the ordered band list used for fractional or out-of-range scores.
+        The first matching band in grading_system order wins, as before.
+        """
+        bands = [
+            (config['min_score'], config['max_score'], {'grade': grade, 'remark': config.get('remark', '')})
+            for grade, config in (self.grading_system or {}).items()
+        ]
+        table = [
+            next((entry for low, high, entry in bands if low <= score <= high), None)
+            for score in range(101)
+        ]
+        self._grade_table = (self.grading_system, table, bands)
+        return self._grade_table
+
     def get_grade(self, score):
         """Get grade for a given score"""
         if not self.grading_system:
             return None
-        
-        for grade, config in self.grading_system.items():
-            if config['min_score'] <= score <= config['max_score']:
-                return {
-                    'grade': grade,
-                    'remark': config.get('remark', '')
-                }
-        return None
-    
+
+        compiled = getattr(self, '_grade_table', None)
+        if compiled is None or compiled[0] is not self.grading_system:
+            compiled = self._compile_grade_table()
+        _, table, bands = compiled
+
+        if 0 <= score <= 100 and score == int(score):
+            entry = table[int(score)]
+        else:
+            entry = next((entry for low, high, entry in bands if low <= score <= high), None)
+        return dict(entry) if entry else None
+
     def __str__(self):
         return f"{self.school_name} - System Settings"
@@ -4,3 +4,74 @@ from celery import shared_task
 def send_email_task(subject, message, from_email, recipient_list):
     from django.core.mail import send_mail
     send_mail(subject, message, from_email, recipient_list)
+
+
+@shared_task
+def refresh_dashboard_snapshots_task(include_fresh=False):
+    from core.dashboard_services import refresh_stale_dashboard_snapshots
+    return refresh_stale_dashboard_snapshots(include_fresh=include_fresh)
+
+
+@shared_task
+def refresh_sessional_broadsheet_task(session_id=None):
+    # Without a session id (the beat schedule) the active session is refreshed.
+    from core.models import Session
+    from core.result_services import refresh_sessional_broadsheet
+    sessions = Session.objects.filter(pk=session_id) if session_id else Session.objects.filter(is_active=True)
+    session = sessions.order_by('-start_date').first()
+    return refresh_sessional_broadsheet(session) if session else None
+
+
+@shared_task
+def rebuild_financial_records_task(pairs):
+    from core.finance_services import rebuild_financial_records
+    return rebuild_financial_records(pairs)
+
+
+@shared_task
+def sync_fee_records_task(term_id):
+    from core.finance_services import run_fee_sync
+    from core.models import Term
+    term = Term.objects.filter(pk=term_id).first()
+    return run_fee_sync(term) if term else None
+
+
+@shared_task(acks_late=True)
+def run_rollover_job_task(job_id):
+    # acks_late: if the worker dies mid-job the message is redelivered and the job resumes.
+    from core.rollover_services import run_rollover_job
+    return run_rollover_job(job_id)
+
+
+@shared_task(acks_late=True)
+def run_report_card_job_task(job_id):
+    from core.report_card_services import run_report_card_job
+    return run_report_card_job(job_id)
+
+
+@shared_task
+def write_activity_logs_task(events):
+    from core.activity_services import write_activity_events
+    return write_activity_events(events)
+
+
+@shared_task
+def rollup_activity_logs_task(days=None, archive=True):
+    # Nightly: roll up the last few complete days, then archive raw rows past their retention.
+    from core.activity_services import archive_expired_activity, rollup_recent_activity
+    report = rollup_recent_activity(days)
+    if archive:
+        report['archived'] = archive_expired_activity()
+    return report
+
+
+@shared_task(acks_late=True)
+def process_submission_intake_task(intake_id):
+    from core.grading_services import process_submission_intake
+    return process_submission_intake(intake_id)
+
+
+@shared_task
+def requeue_stalled_submission_intakes_task():
+    from core.grading_services import requeue_stalled_submission_intakes
+    return requeue_stalled_submission_intakes()
@@ -12,7 +12,7 @@ from django.utils import timezone
 from django.db import models
 from django.db import transaction
 from django.db.models import Q, Count, F, Sum, Subquery, OuterRef, IntegerField
-from django.http import HttpResponseForbidden, Http404
+from django.http import HttpResponseForbidden, Http404, JsonResponse
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from collections import defaultdict
@@ -25,6 +25,10 @@ from core.forms import NonAcademicSkillsForm
 from core.assignment.forms import AssignmentForm, QuestionForm
 from core.assessment.forms import AssessmentForm, OnlineQuestionForm
 from core.exams.forms import ExamForm, OnlineQuestion
+from core.attendance_services import (
+    class_attendance_heatmap, class_attendance_summary, parse_attendance_grid, save_attendance_week
+)
+from core.result_services import build_class_broadsheet, prepare_score_sheet, save_score_sheet
 import logging
 
 logger = logging.getLogger(__name__)
@@ -571,34 +575,9 @@ def mark_attendance(request, class_id):
             messages.error(request, "Week mismatch during submission. Please try again.")
             return redirect(request.path_info + f"?week={selected_week_index}")
 
-        records_to_update_or_create = []
-        for student in students:
-            for day_obj in school_week_days: 
-                day_str = day_obj.strftime("%Y-%m-%d")
-                # Use student.id for consistency in name attribute
-                attendance_status = request.POST.get(f'attendance_{student.user.id}_{day_str}')
-
-                if attendance_status: # If 'present' or 'absent' was selected
-                    is_present_val = (attendance_status == 'present')
-                    is_absent_val = (attendance_status == 'absent')
-                    # Add other status checks if needed
-                    # is_late_val = (attendance_status == 'late')
-                    # is_excused_val = (attendance_status == 'excused')
-
-                    # Prepare for update_or_create
-                    defaults = {'is_present': is_present_val}
-                    # Add other fields to defaults:
-                    # defaults['is_late'] = is_late_val
-                    # defaults['is_excused'] = is_excused_val
-                    # defaults['remarks'] = request.POST.get(f'remarks_{student.id}_{day_str}', '')
-
-                    Attendance.objects.update_or_create(
-                        student=student,
-                        date=day_obj, 
-                        class_assigned=class_instance,
-                        term=current_term,
-                        defaults=defaults
-                    )
+        # Diff the submitted grid against existing rows and write it with one upsert
+        marks = parse_attendance_grid(request.POST, students, school_week_days)
+        save_attendance_week(class_instance, current_term, marks)
 
         messages.success(request, f"Attendance for Week {selected_week_index + 1} saved successfully.")
         # Redirect to the same week to show saved changes
@@ -666,34 +645,7 @@ def attendance_log(request, class_id):
     week_days_for_log = weeks_date_objects[selected_week_index] if selected_week_index < len(weeks_date_objects) else []
     school_week_days_for_log = [day for day in week_days_for_log if day.weekday() < 5]
 
-    student_attendance_summary = []
-    for student in students:
-        # Per-week summary
-        present_in_selected_week = 0
-        absent_in_selected_week = 0
-        if school_week_days_for_log: # Only query if there are school days in the week
-            present_in_selected_week = Attendance.objects.filter(
-                student=student, term=current_term, date__in=school_week_days_for_log, is_present=True
-            ).count()
-            absent_in_selected_week = Attendance.objects.filter(
-                student=student, term=current_term, date__in=school_week_days_for_log, is_present=False
-            ).count()
-
-        # Overall term summary
-        total_present_term = Attendance.objects.filter(
-            student=student, term=current_term, is_present=True
-        ).count()
-        total_absent_term = Attendance.objects.filter(
-            student=student, term=current_term, is_present=False
-        ).count()
-
-        student_attendance_summary.append({
-            'student': student,
-            'present_in_selected_week': present_in_selected_week,
-            'absent_in_selected_week': absent_in_selected_week,
-            'total_present_term': total_present_term,
-            'total_absent_term': total_absent_term,
-        })
+    student_attendance_summary = class_attendance_summary(current_term, students, school_week_days_for_log)
 
     max_week_index = len(weeks_date_objects) - 1 if weeks_date_objects else 0
 
@@ -710,56 +662,65 @@ def attendance_log(request, class_id):
     return render(request, 'teacher/attendance_log.html', context)
 
 
+
+@login_required
+@teacher_required
+def attendance_heatmap(request, class_id):
+    """JSON feed of a class's daily attendance rates for a term (defaults to the current term)."""
+    class_instance = get_object_or_404(Class, id=class_id)
+    term_id = request.GET.get('term_id')
+    term = get_object_or_404(Term, id=term_id) if term_id else Term.get_current_term()
+    if not term:
+        return JsonResponse({'error': 'No active term found.'}, status=404)
+    return JsonResponse(class_attendance_heatmap(class_instance, term))
+
 @login_required
 def input_scores(request, class_id, subject_id, term_id):
     class_obj = get_object_or_404(Class, id=class_id)
     subject = get_object_or_404(Subject, id=subject_id)
     term = get_object_or_404(Term, id=term_id)
     # Ensure we only get students currently enrolled in THIS class
-    students = Student.objects.filter(current_class=class_obj, status='active').order_by('user__last_name', 'user__first_name').distinct()
+    students = list(
+        Student.objects.filter(current_class=class_obj, status='active')
+        .select_related('user').order_by('user__last_name', 'user__first_name').distinct()
+    )
 
-    # Prepare instances and forms
-    subject_results = {}
+    # Missing Result/SubjectResult rows are created in bulk rather than per student
+    subject_results = prepare_score_sheet(term, subject, students)
     forms_dict = {}
-    for student in students:
-        # Ensure a Result object exists for the student and term
-        result_obj, _ = Result.objects.get_or_create(student=student, term=term)
-        # Get or create the specific SubjectResult
-        subject_result, _ = SubjectResult.objects.get_or_create(result=result_obj, subject=subject)
-        subject_results[student.user.id] = subject_result 
 
     if request.method == 'POST':
         all_forms_valid = True
-        forms_to_save = []
-
-        affected_results = set()  # To track which Result objects need GPA recalculation    
+        changed_subject_results = []
 
         for student in students:
             subject_result = subject_results.get(student.user.id)
             if not subject_result:
-                 continue
+                continue
 
             form = SubjectResultForm(request.POST, instance=subject_result, prefix=str(student.user.id))
-            forms_dict[student] = form # Store the bound form for rendering
+            forms_dict[student] = form  # Store the bound form for rendering
 
             if form.is_valid():
-                forms_to_save.append(form) 
-                affected_results.add(subject_result.result)
+                # Only cells the teacher actually edited are written back
+                if form.has_changed():
+                    changed_subject_results.append(form.instance)
             else:
                 all_forms_valid = False
 
         if all_forms_valid:
             try:
-                # Use a transaction to ensure all saves succeed or none do
-                with transaction.atomic():
-                    for form in forms_to_save:
-                        form.save()
-
-                    # After all scores are saved, recalculate the summary for each affected student.
-                    for result_obj in affected_results:
-                        result_obj.calculate_term_summary()
-                
-                messages.success(request, f"{subject.name} scores for {class_obj.name} updated successfully.")
+                summary = save_score_sheet(changed_subject_results)
+                logger.info(
+                    "Score entry for %s/%s/%s: %s cells, %s summaries, %s queries",
+                    class_obj.pk, subject.pk, term.pk,
+                    summary['updated_cells'], summary['updated_summaries'], summary['queries'],
+                )
+                messages.success(
+                    request,
+                    f"{subject.name} scores for {class_obj.name} updated successfully "
+                    f"({summary['updated_cells']} changed, {summary['queries']} database queries)."
+                )
                 return redirect('broadsheet', class_id=class_id, term_id=term_id)
 
             except Exception as e:
@@ -768,7 +729,7 @@ def input_scores(request, class_id, subject_id, term_id):
         else:
             messages.error(request, "Please correct the errors below.")
 
-    else: # GET request
+    else:  # GET request
         for student in students:
             subject_result = subject_results.get(student.user.id)
             forms_dict[student] = SubjectResultForm(instance=subject_result, prefix=str(student.user.id))
@@ -786,90 +747,16 @@ def input_scores(request, class_id, subject_id, term_id):
 @login_required
 def broadsheet(request, class_id, term_id):
     class_obj = get_object_or_404(Class, id=class_id)
-    term = get_object_or_404(Term, id=term_id)
-    session = term.session
-
-    students = Student.objects.filter(current_class=class_obj, status='active').select_related('user').order_by('user__last_name', 'user__first_name')
-
-    subjects = Subject.objects.filter(
-        class_assignments__class_assigned=class_obj,
-        class_assignments__term=term
-    ).distinct().order_by('name')
-
-    results_data = []
-
-    for student in students:
-        result = Result.objects.filter(student=student, term=term).first()
-        
-        # --- Defensive Initialization for ALL variables ---
-        student_subject_results = {}
-        total_score_sum = Decimal('0.0')
-        average_score = Decimal('0.0')
-        student_gpa = Decimal('0.0')
-        overall_grade = 'F'
-        total_weighted_points = Decimal('0.0')
-        total_weights = Decimal('0.0')
-        graded_subject_count = 0
-
-        if result:
-            # Filter for graded subjects relevant to this broadsheet
-            graded_subject_results = result.subject_results.filter(
-                subject__in=subjects
-            ).select_related('subject').exclude(
-                continuous_assessment_1__isnull=True,
-                continuous_assessment_2__isnull=True,
-                continuous_assessment_3__isnull=True,
-                assignment__isnull=True,
-                oral_test__isnull=True,
-                exam_score__isnull=True,
-            )
+    term = get_object_or_404(Term.objects.select_related('session'), id=term_id)
 
-            graded_subject_count = graded_subject_results.count()
-
-            if graded_subject_count > 0:
-                for sr in graded_subject_results:
-                    student_subject_results[sr.subject.id] = sr
-                    total_score_sum += sr.total_score()
-                    
-                    # --- WEIGHTED GPA CALCULATION ---
-                    weight = Decimal(getattr(sr.subject, 'subject_weight', 1))
-                    total_weighted_points += sr.calculate_grade_point() * weight
-                    total_weights += weight
-
-                # Calculate averages only if there were graded subjects
-                average_score = total_score_sum / graded_subject_count
-                student_gpa = total_weighted_points / total_weights if total_weights > 0 else Decimal('0.0')
-
-                # Calculate the overall grade based on the correct average score
-                if average_score >= 80: overall_grade = 'A'
-                elif average_score >= 65: overall_grade = 'B'
-                elif average_score >= 50: overall_grade = 'C'
-                elif average_score >= 45: overall_grade = 'D'
-                elif average_score >= 40: overall_grade = 'E'
-                else: overall_grade = 'F'
-        
-        results_data.append({
-            'student': student,
-            'subject_results': student_subject_results, 
-            'gpa': student_gpa.quantize(Decimal('0.01')), 
-            'total_score': total_score_sum.quantize(Decimal('0.1')),
-            'average_score': average_score.quantize(Decimal('0.1')),
-            'grade': overall_grade,
-        })
-
-    # Sort students based on total score, then GPA
-    results_data.sort(key=lambda x: (-x['total_score'], -x['gpa']))
-
-    # Assign rank AFTER sorting is complete
-    for i, data in enumerate(results_data):
-        data['rank'] = i + 1
+    class_broadsheet = build_class_broadsheet(term, class_obj)
 
     context = {
         'class': class_obj,
         'term': term,
-        'results_data': results_data,
-        'subjects': subjects, 
-        'session': session,
+        'results_data': class_broadsheet['results_data'],
+        'subjects': class_broadsheet['subjects'],
+        'session': term.session,
     }
     return render(request, 'teacher/broadsheet.html', context)
 
@@ -0,0 +1,33 @@
+"""Builders for the session, term, class and student rows the core test suites share."""
+from datetime import timedelta
+
+from core.models import Class, CustomUser, Session, Term
+
+
+def create_term(start_date, term_days=90, session_days=270, name='First Term', is_active=True):
+    """A term starting on `start_date` in a session that starts the same day."""
+    session = Session.objects.create(
+        start_date=start_date, end_date=start_date + timedelta(days=session_days), is_active=is_active,
+    )
+    term, _ = Term.objects.update_or_create(
+        session=session, name=name,
+        defaults={'start_date': start_date, 'end_date': start_date + timedelta(days=term_days), 'is_active': is_active},
+    )
+    return term
+
+
+def create_class(name='JSS 1', school_level='Junior Secondary'):
+    return Class.objects.create(name=name, school_level=school_level)
+
+
+def create_student(username, school_class, **user_fields):
+    """An active student (the profile is created by the CustomUser signal) placed in `school_class`."""
+    student = CustomUser.objects.create_user(username=username, password='pass', role='student', **user_fields).student
+    student.current_class = school_class
+    student.status = 'active'
+    student.save()
+    return student
+
+
+def create_students(count, school_class, prefix='student'):
+    return [create_student(f'{prefix}{index}', school_class) for index in range(count)]
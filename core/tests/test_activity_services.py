@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+import gzip
+import json
+import tempfile
+from unittest import mock
+
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.activity_services import (
+    ActivityLogBuffer, archive_expired_activity, build_activity_event, iter_archived_activity,
+    rollup_activity_days, weekly_activity_summary,
+)
+from core.models import ActivityDailyRollup, ActivityLog, CustomUser
+from core.utils import log_activity
+
+
+class ActivityLogBufferTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='ada', password='pass', role='student')
+        self.buffer = ActivityLogBuffer(flush_every=3, flush_interval=60, max_events=5)
+        # No background timer thread in tests: batches are written on size or by an explicit flush.
+        timer = mock.patch.object(ActivityLogBuffer, '_start_timer')
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def event(self, activity_type='login'):
+        return build_activity_event(self.user, activity_type)
+
+    def test_flushes_with_one_insert_every_n_events(self):
+        self.buffer.add(self.event())
+        self.buffer.add(self.event())
+        self.assertEqual(ActivityLog.objects.count(), 0)
+        # Savepoint, insert, release, once the (test) transaction commits.
+        with self.assertNumQueries(3), self.captureOnCommitCallbacks(execute=True):
+            self.buffer.add(self.event('logout'))
+
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        stats = self.buffer.stats()
+        self.assertEqual((stats['depth'], stats['flushes'], stats['events_written']), (0, 1, 3))
+        self.assertIsNotNone(stats['last_flush_ms'])
+
+    def test_keeps_the_time_the_event_happened(self):
+        event = self.event()
+        event['created_at'] = (timezone.now() - timedelta(minutes=5)).isoformat()
+        self.buffer.add(event)
+        self.buffer.flush()
+
+        self.assertLess(ActivityLog.objects.get().created_at, timezone.now() - timedelta(minutes=4))
+
+    def test_failed_flush_keeps_events_for_the_next_one(self):
+        self.buffer.flush_every = 100
+        for _ in range(4):
+            self.buffer.add(self.event())
+        with mock.patch('core.activity_services.write_activity_events', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.buffer.add(self.event())
+        self.buffer.add(self.event())
+
+        stats = self.buffer.stats()
+        self.assertEqual((stats['depth'], stats['failed_flushes'], stats['events_dropped']), (5, 1, 1))
+        self.assertEqual(self.buffer.flush(), 5)
+        self.assertEqual(ActivityLog.objects.count(), 5)
+
+    def test_a_rolled_back_transaction_keeps_the_batch_buffered(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            for _ in range(3):
+                self.buffer.add(self.event())
+            raise RuntimeError('request failed')
+
+        self.assertEqual(self.buffer.stats()['depth'], 3)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_queue_mode_hands_batches_to_the_worker(self):
+        self.buffer.mode = 'queue'
+        with mock.patch('core.tasks.write_activity_logs_task.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    self.buffer.add(self.event())
+
+        delay.assert_called_once()
+        self.assertEqual(len(delay.call_args.args[0]), 3)
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+    @override_settings(ACTIVITY_LOG_MODE='sync')
+    def test_sync_mode_writes_inside_the_request(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='10.0.0.1, 10.0.0.2', HTTP_USER_AGENT='tests')
+        log_activity(self.user, 'login', description='Signed in', request=request)
+
+        log = ActivityLog.objects.get()
+        self.assertEqual((log.ip_address, log.user_agent, log.description), ('10.0.0.1', 'tests', 'Signed in'))
+
+
+@override_settings(ACTIVITY_ARCHIVE_DIR=tempfile.mkdtemp())
+class ActivityRollupTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username='tess', password='pass', role='teacher')
+        self.student = CustomUser.objects.create_user(username='sam', password='pass', role='student')
+        self.other_student = CustomUser.objects.create_user(username='sola', password='pass', role='student')
+        self.today = timezone.localdate()
+
+    def log(self, user, day, activity_type='login'):
+        moment = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=10)
+        return ActivityLog.objects.create(user=user, activity_type=activity_type, created_at=moment)
+
+    def test_rollup_counts_events_and_distinct_users_and_marks_quiet_days(self):
+        day = self.today - timedelta(days=2)
+        self.log(self.student, day)
+        self.log(self.student, day)
+        self.log(self.other_student, day)
+        self.log(self.teacher, day, 'attendance_marked')
+
+        rollup_activity_days([day, day + timedelta(days=1)], sources=['core'])
+
+        student_row = ActivityDailyRollup.objects.get(date=day, role='student')
+        self.assertEqual((student_row.event_count, student_row.user_ids), (3, sorted([self.student.pk, self.other_student.pk])))
+        quiet = ActivityDailyRollup.objects.get(date=day + timedelta(days=1))
+        self.assertEqual((quiet.activity_type, quiet.event_count), ('', 0))
+
+    def test_weekly_summary_reads_rollups_and_counts_unrolled_days_from_raw_rows(self):
+        yesterday = self.today - timedelta(days=1)
+        self.log(self.student, yesterday)
+        rollup_activity_days([yesterday], sources=['core'])
+        # Rolled-up days are not read from the raw rows again.
+        self.log(self.teacher, yesterday)
+        self.log(self.student, self.today)
+        self.log(self.other_student, self.today)
+
+        summary = weekly_activity_summary(yesterday, self.today)
+
+        self.assertEqual(summary['student'], {'events': 3, 'users': 2})
+        self.assertEqual(summary['teacher'], {'events': 0, 'users': 0})
+
+    def test_expired_months_are_archived_to_gzip_and_keep_their_counts(self):
+        old_day = self.today.replace(day=1) - timedelta(days=400)
+        self.log(self.student, old_day)
+        self.log(self.teacher, old_day, 'attendance_marked')
+        recent = self.log(self.student, self.today)
+
+        archived = archive_expired_activity(retention_months=12, sources=['core'])
+
+        self.assertEqual([(entry['month'], entry['rows']) for entry in archived], [(f'{old_day:%Y-%m}', 2)])
+        self.assertEqual(list(ActivityLog.objects.values_list('pk', flat=True)), [recent.pk])
+        with gzip.open(archived[0]['path'], 'rt') as archive:
+            self.assertEqual(len([json.loads(line) for line in archive]), 2)
+        rows = list(iter_archived_activity('core', user_id=self.teacher.pk))
+        self.assertEqual([row['activity_type'] for row in rows], ['attendance_marked'])
+        self.assertEqual(weekly_activity_summary(old_day, old_day)['student'], {'events': 1, 'users': 1})
+
+        # A second run finds nothing left to archive.
+        self.assertEqual(archive_expired_activity(retention_months=12, sources=['core']), [])
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.http import QueryDict
+from django.test import TestCase
+from django.utils import timezone
+
+from django.core.management import call_command
+
+from core.attendance_services import (
+    class_attendance_heatmap, class_attendance_summary, get_attendance_summary, parse_attendance_grid,
+    save_attendance_week,
+)
+from core.models import Attendance, Holiday, TermAttendanceSummary
+from core.tests.factories import create_class, create_students, create_term
+
+
+class AttendanceTestMixin:
+    def create_term_and_class(self):
+        monday = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
+        self.term = create_term(monday)
+        self.school_class = create_class('Basic 1', 'Primary')
+        self.week = [monday + timedelta(days=offset) for offset in range(5)]
+
+    def create_students(self, count, prefix='pupil'):
+        return create_students(count, self.school_class, prefix)
+
+    def grid(self, students, status='present'):
+        return {(student.pk, day): status == 'present' for student in students for day in self.week}
+
+
+class AttendanceWriterTests(AttendanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+
+    def test_query_count_is_constant_for_class_size(self):
+        small, large = self.create_students(2, 'small'), self.create_students(12, 'large')
+        # Savepoint pair, student locks, existing-row read, upsert, the counter lookup and rebuild for
+        # first-time students (grouped count, holidays, upsert), then the dashboard snapshot flag and
+        # guardian lookup.
+        with self.assertNumQueries(11):
+            save_attendance_week(self.school_class, self.term, self.grid(small))
+        with self.assertNumQueries(11):
+            save_attendance_week(self.school_class, self.term, self.grid(large))
+        self.assertEqual(Attendance.objects.count(), 14 * 5)
+        # Once counters exist they are shifted in place with a single UPDATE.
+        with self.assertNumQueries(9):
+            save_attendance_week(self.school_class, self.term, self.grid(small + large, 'absent'))
+
+    def test_only_changed_cells_are_written(self):
+        students = self.create_students(3)
+        self.assertEqual(
+            save_attendance_week(self.school_class, self.term, self.grid(students)),
+            {'created': 15, 'updated': 0, 'unchanged': 0},
+        )
+        marks = self.grid(students)
+        marks[(students[0].pk, self.week[2])] = False
+        self.assertEqual(
+            save_attendance_week(self.school_class, self.term, marks),
+            {'created': 0, 'updated': 1, 'unchanged': 14},
+        )
+        record = Attendance.objects.get(student=students[0], date=self.week[2])
+        self.assertFalse(record.is_present)
+
+    def test_parse_grid_skips_blank_cells(self):
+        students = self.create_students(1)
+        day = self.week[0].strftime('%Y-%m-%d')
+        data = QueryDict(mutable=True)
+        data[f'attendance_{students[0].user_id}_{day}'] = 'absent'
+        self.assertEqual(parse_attendance_grid(data, students, self.week), {(students[0].pk, self.week[0]): False})
+
+
+class AttendanceAnalyticsTests(AttendanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(3)
+        marks = self.grid(self.students)
+        marks[(self.students[0].pk, self.week[0])] = False
+        save_attendance_week(self.school_class, self.term, marks)
+
+    def test_summary_counts_week_and_term_in_one_query(self):
+        with self.assertNumQueries(1):
+            summary = class_attendance_summary(self.term, self.students, self.week[:2])
+        first = summary[0]
+        self.assertEqual(first['student'], self.students[0])
+        self.assertEqual((first['present_in_selected_week'], first['absent_in_selected_week']), (1, 1))
+        self.assertEqual((first['total_present_term'], first['total_absent_term']), (4, 1))
+
+    def test_heatmap_rates_by_day(self):
+        heatmap = class_attendance_heatmap(self.school_class, self.term)
+        first_day = heatmap['weeks'][0]['days'][0]
+        self.assertEqual((first_day['present'], first_day['absent']), (2, 1))
+        self.assertEqual(first_day['rate'], 66.7)
+        self.assertIsNone(heatmap['weeks'][1]['days'][0]['rate'])
+        self.assertEqual(heatmap['overall_rate'], 93.3)
+
+
+class AttendanceCounterTests(AttendanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(2)
+        save_attendance_week(self.school_class, self.term, self.grid(self.students))
+
+    def counters(self, student):
+        summary = TermAttendanceSummary.objects.get(student=student, term=self.term)
+        return summary.present_days, summary.absent_days
+
+    def test_bulk_writer_moves_counters_by_the_diff(self):
+        self.assertEqual(self.counters(self.students[0]), (5, 0))
+        marks = self.grid(self.students)
+        marks[(self.students[0].pk, self.week[1])] = False
+        marks[(self.students[0].pk, self.week[2])] = False
+        save_attendance_week(self.school_class, self.term, marks)
+        self.assertEqual(self.counters(self.students[0]), (3, 2))
+        self.assertEqual(self.counters(self.students[1]), (5, 0))
+
+    def test_single_row_edits_refresh_counters(self):
+        record = Attendance.objects.get(student=self.students[0], date=self.week[0])
+        record.is_present = False
+        record.save()
+        self.assertEqual(self.counters(self.students[0]), (4, 1))
+        record.delete()
+        self.assertEqual(self.counters(self.students[0]), (4, 0))
+
+    def test_holidays_update_school_days(self):
+        school_days = self.term.actual_school_days_count
+        self.assertEqual(TermAttendanceSummary.objects.get(student=self.students[0]).school_days, school_days)
+        holiday = Holiday.objects.create(name='Break', date=self.week[3], term=self.term)
+        self.assertEqual(TermAttendanceSummary.objects.get(student=self.students[0]).school_days, school_days - 1)
+        holiday.delete()
+        self.assertEqual(TermAttendanceSummary.objects.get(student=self.students[0]).school_days, school_days)
+
+    def test_reader_is_one_query(self):
+        with self.assertNumQueries(1):
+            data = get_attendance_summary(self.students[0], self.term)
+        self.assertEqual((data['total_days'], data['present_days'], data['attendance_percentage']), (5, 5, 100.0))
+
+    def test_reconcile_command_repairs_drift(self):
+        TermAttendanceSummary.objects.filter(student=self.students[0]).update(present_days=42)
+        TermAttendanceSummary.objects.filter(student=self.students[1]).delete()
+        call_command('reconcile_attendance_counters', term=self.term.pk, stdout=StringIO())
+        self.assertEqual(self.counters(self.students[0]), (5, 0))
+        self.assertEqual(self.counters(self.students[1]), (5, 0))
@@ -0,0 +1,193 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from core.dashboard_services import (
+    attach_activity_context, compute_dashboard_metrics, get_dashboard_metrics, get_dashboard_snapshot, refresh_dashboard_snapshot,
+    refresh_stale_dashboard_snapshots,
+)
+from core.models import (
+    ActivityLog, Attendance, Class, CustomUser, DashboardSnapshot, Enrollment, Result, Session, TeacherAssignment, Term,
+)
+
+
+class DashboardMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.now().date()
+        session = Session.objects.create(start_date=today, end_date=today + timedelta(days=270), is_active=True)
+        self.term = Term.objects.create(
+            session=session, name='First Term', start_date=today, end_date=today + timedelta(days=90), is_active=True
+        )
+        self.basic_one = Class.objects.create(name='Basic 1', school_level='Primary', order=1)
+        self.students = [
+            self.create_student('ada', 'F', years_old=6),
+            self.create_student('bayo', 'M', years_old=9),
+            self.create_student('chi', 'F', years_old=17),
+        ]
+        self.students[2].mark_left()
+
+    def create_student(self, username, gender, years_old):
+        user = CustomUser.objects.create_user(username=username, password='pass', role='student')
+        student = user.student
+        student.gender = gender
+        student.current_class = self.basic_one
+        student.date_of_birth = date.today() - timedelta(days=365 * years_old + 30)
+        student.save()
+        return student
+
+    def test_counts_and_buckets(self):
+        metrics = compute_dashboard_metrics(None)
+        self.assertEqual(metrics['student_count'], 2)
+        self.assertEqual(metrics['left_students'], 1)
+        self.assertEqual(metrics['total_students'], 3)
+        self.assertEqual(metrics['gender_data'], [1, 1])
+        # Only active students are bucketed by age.
+        self.assertEqual(metrics['age_data'], [1, 1, 0, 0, 0])
+        self.assertEqual(metrics['student_counts_by_class_labels'], ['Basic 1'])
+        self.assertEqual(metrics['student_counts_by_class_data'], [2])
+
+    def test_performance_buckets_use_approved_results(self):
+        for student, average in ((self.students[0], '82.00'), (self.students[1], '55.00')):
+            Result.objects.update_or_create(
+                student=student, term=self.term, defaults={'average_score': Decimal(average), 'is_approved': True}
+            )
+        metrics = compute_dashboard_metrics(self.term)
+        self.assertEqual(metrics['performance_data'], [1, 0, 0, 1, 0])
+        self.assertEqual(metrics['approved_results'], 2)
+        self.assertEqual(metrics['current_term_avg'], Decimal('68.5'))
+
+    def test_cached_until_students_change(self):
+        get_dashboard_metrics(self.term)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_metrics(self.term)['student_count'], 2)
+
+        self.students[1].mark_dormant()
+        self.assertEqual(get_dashboard_metrics(self.term)['student_count'], 1)
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.now().date()
+        session = Session.objects.create(start_date=today, end_date=today + timedelta(days=270), is_active=True)
+        self.term = Term.objects.create(
+            session=session, name='First Term', start_date=today, end_date=today + timedelta(days=90), is_active=True
+        )
+        self.basic_one = Class.objects.create(name='Basic 1', school_level='Primary', order=1)
+        self.guardian_user = CustomUser.objects.create_user(username='parent', password='pass', role='guardian')
+        self.student = CustomUser.objects.create_user(username='ada', password='pass', role='student').student
+        self.student.current_class = self.basic_one
+        self.student.student_guardian = self.guardian_user.guardian
+        self.student.save()
+
+    def test_admin_snapshot_is_read_with_one_query(self):
+        get_dashboard_snapshot('admin', self.term)
+        with self.assertNumQueries(1):
+            snapshot = get_dashboard_snapshot('admin', self.term)
+        self.assertEqual(snapshot.payload['student_count'], 1)
+        self.assertFalse(snapshot.is_stale)
+
+    def test_student_change_marks_snapshot_stale_and_rebuilds(self):
+        get_dashboard_snapshot('admin', self.term)
+        self.student.mark_left()
+        self.assertTrue(DashboardSnapshot.objects.get(scope='admin', term=self.term).is_stale)
+
+        snapshot = get_dashboard_snapshot('admin', self.term)
+        self.assertFalse(snapshot.is_stale)
+        self.assertEqual(snapshot.payload['student_count'], 0)
+
+    def test_saves_that_change_no_counted_field_keep_the_snapshot(self):
+        get_dashboard_snapshot('admin', self.term)
+        student = CustomUser.objects.get(pk=self.student.pk).student
+        student.relationship = 'Son'
+        student.save()
+        self.student.user.save()  # a login: update_last_login saves the user and its profile
+        self.assertFalse(DashboardSnapshot.objects.get(scope='admin', term=self.term).is_stale)
+
+        student.gender = 'F'
+        student.save()
+        self.assertTrue(DashboardSnapshot.objects.get(scope='admin', term=self.term).is_stale)
+
+    def test_school_wide_snapshot_stays_unique_despite_null_owner(self):
+        refresh_dashboard_snapshot('admin', self.term)
+        refresh_dashboard_snapshot('admin', self.term)
+        refresh_dashboard_snapshot('admin', None)
+        refresh_dashboard_snapshot('admin', None)
+        self.assertEqual(DashboardSnapshot.objects.filter(scope='admin').count(), 2)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DashboardSnapshot.objects.create(scope='admin', term=self.term)
+
+    def test_guardian_attendance_snapshot(self):
+        for offset, present in ((0, True), (1, False)):
+            Attendance.objects.create(
+                student=self.student, date=self.term.start_date + timedelta(days=offset),
+                term=self.term, class_assigned=self.basic_one, is_present=present,
+            )
+        snapshot = get_dashboard_snapshot('guardian', self.term, owner=self.guardian_user)
+        self.assertEqual(snapshot.payload['attendance'][str(self.student.pk)]['attendance_percentage'], 50.0)
+
+        Attendance.objects.filter(student=self.student, is_present=False).delete()
+        self.assertEqual(refresh_stale_dashboard_snapshots(), 1)
+        self.assertEqual(refresh_stale_dashboard_snapshots(), 0)
+        snapshot = get_dashboard_snapshot('guardian', self.term, owner=self.guardian_user)
+        self.assertEqual(snapshot.payload['attendance'][str(self.student.pk)]['attendance_percentage'], 100.0)
+
+
+class ActivityFeedContextTests(TestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        self.session = Session.objects.create(start_date=today, end_date=today + timedelta(days=270), is_active=True)
+        self.term = Term.objects.create(
+            session=self.session, name='First Term', start_date=today - timedelta(days=10),
+            end_date=today + timedelta(days=90), is_active=True,
+        )
+        self.basic_one = Class.objects.create(name='Basic 1', school_level='Primary', order=1)
+        self.basic_two = Class.objects.create(name='Basic 2', school_level='Primary', order=2)
+
+        self.teacher_user = CustomUser.objects.create_user(username='tutor', password='pass', role='teacher')
+        for school_class in (self.basic_two, self.basic_one):
+            TeacherAssignment.objects.create(
+                teacher=self.teacher_user.teacher, class_assigned=school_class, session=self.session, term=self.term,
+            )
+        self.guardian_user = CustomUser.objects.create_user(username='parent', password='pass', role='guardian')
+        self.student_user = CustomUser.objects.create_user(
+            username='ada', password='pass', role='student', first_name='Ada', last_name='Obi',
+        )
+        student = self.student_user.student
+        student.student_guardian = self.guardian_user.guardian
+        student.save()
+        Enrollment.objects.create(
+            student=student, class_enrolled=self.basic_one, session=self.session, term=self.term, is_active=True,
+        )
+
+    def log(self, user, activity_type='login'):
+        return ActivityLog.objects.create(user=user, activity_type=activity_type)
+
+    def test_feed_context_is_resolved_in_bulk(self):
+        activities = [
+            self.log(user) for user in (self.teacher_user, self.guardian_user, self.student_user) for _ in range(3)
+        ]
+        activities = list(ActivityLog.objects.filter(pk__in=[a.pk for a in activities]).select_related('user'))
+
+        with self.assertNumQueries(6):
+            attach_activity_context(activities, self.term)
+        with self.assertNumQueries(0):
+            labels = {(a.user_id, a.user_class, a.guardian_context, a.week_number) for a in activities}
+
+        self.assertEqual(labels, {
+            (self.teacher_user.pk, 'Basic 1, Basic 2', None, 2),
+            (self.guardian_user.pk, None, 'Ada Obi (Basic 1)', 2),
+            (self.student_user.pk, 'Basic 1', None, 2),
+        })
+
+    def test_single_row_resolves_its_own_context(self):
+        activity = self.log(self.student_user)
+
+        self.assertEqual(activity.user_class, 'Basic 1')
+        self.assertEqual(activity.week_number, 2)
@@ -0,0 +1,401 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.finance_services import (
+    allocate_bulk_payment, compute_finance_summary, create_payment_receipt, deferred_financial_rebuilds,
+    get_finance_summary, payment_collection_trends, post_payments, rebuild_financial_records, rebuild_payment_rollups,
+    request_fee_sync, sync_student_fee_records_for_term, update_payment,
+)
+from core.models import (
+    Class, CustomUser, FeeAssignment, FeeSyncState, FinancialRecord, FinanceSummarySnapshot, Payment, PaymentDailyRollup,
+    Student, StudentFeeRecord, Term,
+)
+from core.tests.factories import create_class, create_students, create_term
+
+
+class FinanceTestMixin:
+    def create_term_and_class(self, amount='50000.00'):
+        self.term = create_term(date.today() - timedelta(days=30))
+        self.school_class = create_class()
+        self.fee_assignment = FeeAssignment.objects.create(
+            class_instance=self.school_class, term=self.term, amount=Decimal(amount)
+        )
+
+    def create_students(self, count, prefix='payer'):
+        return create_students(count, self.school_class, prefix)
+
+
+class FinancialRecordRebuildTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+
+    def test_rebuild_query_count_is_constant(self):
+        small, large = self.create_students(2, 'small'), self.create_students(15, 'large')
+        for students in (small, large):
+            StudentFeeRecord.objects.bulk_create([
+                StudentFeeRecord(
+                    student=student, term=self.term, fee_assignment=self.fee_assignment,
+                    amount=self.fee_assignment.amount, net_fee=self.fee_assignment.amount,
+                )
+                for student in students
+            ])
+            # Fee totals, payment totals, terms, existing records, upsert, then the dashboard snapshot flag.
+            with self.assertNumQueries(6):
+                summary = rebuild_financial_records((student.pk, self.term.pk) for student in students)
+            self.assertEqual(summary, {'created': len(students), 'updated': 0, 'unchanged': 0})
+        self.assertEqual(FinancialRecord.objects.filter(term=self.term).count(), 17)
+
+    def test_rebuild_matches_update_record(self):
+        student = self.create_students(1)[0]
+        StudentFeeRecord.objects.create(
+            student=student, term=self.term, fee_assignment=self.fee_assignment,
+            amount=self.fee_assignment.amount, discount=Decimal('5000.00'),
+        )
+        record = FinancialRecord.objects.get(student=student, term=self.term)
+        Payment.objects.create(financial_record=record, amount_paid=Decimal('15000.00'))
+        FinancialRecord.objects.filter(pk=record.pk).update(total_paid=0, outstanding_balance=0, archived=True)
+
+        self.assertEqual(rebuild_financial_records([(student.pk, self.term.pk)])['updated'], 1)
+        record.refresh_from_db()
+        self.assertEqual(
+            (record.total_fee, record.total_discount, record.total_paid, record.outstanding_balance, record.archived),
+            (Decimal('45000.00'), Decimal('5000.00'), Decimal('15000.00'), Decimal('30000.00'), False),
+        )
+        self.assertEqual(rebuild_financial_records([(student.pk, self.term.pk)])['unchanged'], 1)
+
+    def test_sync_creates_fee_records_and_ledgers(self):
+        students = self.create_students(3)
+        summary = sync_student_fee_records_for_term(self.term)
+        self.assertEqual((summary['created'], summary['affected_students']), (3, 3))
+        balances = FinancialRecord.objects.filter(term=self.term, student__in=students).values_list(
+            'outstanding_balance', flat=True
+        )
+        self.assertEqual(list(balances), [Decimal('50000.00')] * 3)
+
+
+class DeferredRebuildTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(3)
+        sync_student_fee_records_for_term(self.term)
+        self.fee_records = list(StudentFeeRecord.objects.filter(term=self.term).order_by('student_id'))
+
+    def outstanding(self):
+        return list(
+            FinancialRecord.objects.filter(term=self.term).order_by('student_id')
+            .values_list('outstanding_balance', flat=True)
+        )
+
+    def apply_discounts(self):
+        for record in self.fee_records:
+            record.discount = Decimal('10000.00')
+            record.save()
+
+    def test_rebuilds_are_coalesced_until_the_block_exits(self):
+        with deferred_financial_rebuilds():
+            self.apply_discounts()
+            self.assertEqual(self.outstanding(), [Decimal('50000.00')] * 3)
+        self.assertEqual(self.outstanding(), [Decimal('40000.00')] * 3)
+
+    def test_queue_is_dropped_when_the_block_raises(self):
+        with self.assertRaises(RuntimeError):
+            with deferred_financial_rebuilds():
+                self.apply_discounts()
+                raise RuntimeError
+        self.assertEqual(self.outstanding(), [Decimal('50000.00')] * 3)
+
+    @override_settings(FINANCE_REBUILD_ASYNC=True, FINANCE_REBUILD_ASYNC_THRESHOLD=2)
+    def test_large_batches_go_to_the_worker_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with deferred_financial_rebuilds():
+                self.apply_discounts()
+            self.assertEqual(self.outstanding(), [Decimal('50000.00')] * 3)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.outstanding(), [Decimal('40000.00')] * 3)
+
+
+class BulkPaymentTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+
+    def allocate(self, total, manual_allocations=None):
+        return allocate_bulk_payment(
+            scope='class', term=self.term, total_amount=total, payment_date=date.today(),
+            class_instance=self.school_class, manual_allocations=manual_allocations,
+        )
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        self.create_students(2, 'small')
+        sync_student_fee_records_for_term(self.term)
+        # Lock, preview, posting (savepoint, lock, balance snapshot, one insert, a new daily rollup
+        # bucket), then one ledger rebuild.
+        with self.assertNumQueries(22):
+            self.allocate(Decimal('100000.00'))
+        Payment.objects.all().delete()
+        PaymentDailyRollup.objects.all().delete()
+        self.create_students(10, 'large')
+        sync_student_fee_records_for_term(self.term)
+        with self.assertNumQueries(22):
+            result = self.allocate(Decimal('600000.00'))
+        self.assertEqual(len(result['created_payments']), 12)
+        self.assertFalse(FinancialRecord.objects.filter(term=self.term, outstanding_balance__gt=0).exists())
+
+    def test_allocations_are_checked_against_payments_not_the_cached_ledger(self):
+        student = self.create_students(1)[0]
+        sync_student_fee_records_for_term(self.term)
+        record = FinancialRecord.objects.get(student=student, term=self.term)
+        Payment.objects.bulk_create([Payment(financial_record=record, amount_paid=Decimal('45000.00'))])
+        # The ledger column still shows the full fee, but only 5,000 is actually payable.
+        with self.assertRaisesMessage(ValueError, 'exceeds the outstanding balance'):
+            self.allocate(Decimal('10000.00'))
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_receipt_line_items_show_updated_balances(self):
+        students = self.create_students(3)
+        sync_student_fee_records_for_term(self.term)
+        result = self.allocate(Decimal('60000.00'))
+        with self.assertNumQueries(3):
+            receipt = create_payment_receipt(result['created_payments'], scope='class', term=self.term)
+        balances = {item['student_id']: item['outstanding_balance'] for item in receipt.line_items}
+        self.assertEqual(balances, {students[0].pk: '0.00', students[1].pk: '40000.00'})
+        self.assertEqual(receipt.payments.count(), 2)
+
+
+class PaymentPostingTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(2)
+        sync_student_fee_records_for_term(self.term)
+        self.records = list(FinancialRecord.objects.filter(term=self.term).order_by('student_id'))
+
+    def test_batch_is_checked_against_its_own_running_balance(self):
+        with self.assertRaisesMessage(ValidationError, 'exceeds the outstanding balance'):
+            post_payments([
+                Payment(financial_record=self.records[0], amount_paid=Decimal('30000.00')),
+                Payment(financial_record=self.records[1], amount_paid=Decimal('10000.00')),
+                Payment(financial_record=self.records[0], amount_paid=Decimal('30000.00')),
+            ])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_posting_updates_the_ledgers_once(self):
+        post_payments([
+            Payment(financial_record=self.records[0], amount_paid=Decimal('30000.00')),
+            Payment(financial_record=self.records[0], amount_paid=Decimal('20000.00')),
+            Payment(financial_record=self.records[1], amount_paid=Decimal('5000.00')),
+        ])
+        balances = FinancialRecord.objects.filter(term=self.term).order_by('student_id').values_list(
+            'total_paid', 'outstanding_balance'
+        )
+        self.assertEqual(
+            list(balances),
+            [(Decimal('50000.00'), Decimal('0.00')), (Decimal('5000.00'), Decimal('45000.00'))],
+        )
+
+    def test_fields_are_validated_before_posting(self):
+        with self.assertRaises(ValidationError):
+            post_payments([
+                Payment(financial_record=self.records[0], amount_paid=Decimal('100.00'), batch_reference='x' * 65),
+            ])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_an_edit_is_checked_against_the_other_payments(self):
+        payment, _ = post_payments([
+            Payment(financial_record=self.records[0], amount_paid=Decimal('30000.00')),
+            Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00')),
+        ])
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.amount_paid = Decimal('45000.00')
+        with self.assertRaisesMessage(ValidationError, 'would exceed net fee'):
+            update_payment(payment)
+
+        payment.amount_paid = Decimal('40000.00')
+        update_payment(payment)
+        self.assertEqual(FinancialRecord.objects.get(pk=self.records[0].pk).total_paid, Decimal('50000.00'))
+
+    def test_admin_saves_go_through_the_locked_services(self):
+        admin = CustomUser.objects.create_superuser('bursar', 'b@example.com', 'pass', role='admin')
+        self.client.force_login(admin)
+        form = {'financial_record': self.records[0].pk, 'amount_paid': '20000.00', 'payment_date': date.today().isoformat()}
+        with mock.patch('core.admin.post_payments', wraps=post_payments) as posted:
+            response = self.client.post(reverse('admin:core_payment_add'), form)
+        self.assertEqual(response.status_code, 302)
+        posted.assert_called_once()
+        payment = Payment.objects.get()
+
+        form['amount_paid'] = '25000.00'
+        with mock.patch('core.admin.update_payment', wraps=update_payment) as updated:
+            response = self.client.post(reverse('admin:core_payment_change', args=[payment.pk]), form)
+        self.assertEqual(response.status_code, 302)
+        updated.assert_called_once()
+        self.assertEqual(FinancialRecord.objects.get(pk=self.records[0].pk).total_paid, Decimal('25000.00'))
+
+
+class FinanceSummaryTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(3)
+        sync_student_fee_records_for_term(self.term)
+        self.record = FinancialRecord.objects.filter(term=self.term).first()
+
+    def test_totals_and_class_rows_come_from_one_query(self):
+        with self.assertNumQueries(1):
+            summary = compute_finance_summary(FinancialRecord.objects.filter(term=self.term))
+        self.assertEqual((summary['total_fee'], summary['total_outstanding_balance']), (Decimal('150000.00'),) * 2)
+        self.assertEqual(summary['summary_by_class'][0]['class_name'], 'JSS 1')
+
+    def test_summary_is_cached_until_the_ledger_is_rebuilt(self):
+        get_finance_summary(term_id=self.term.pk)
+        with self.assertNumQueries(0):
+            get_finance_summary(term_id=self.term.pk)
+
+        post_payments([Payment(financial_record=self.record, amount_paid=Decimal('20000.00'))])
+
+        self.assertEqual(get_finance_summary(term_id=self.term.pk)['total_paid'], Decimal('20000.00'))
+        self.assertEqual(get_finance_summary(session_id=self.term.session_id)['total_paid'], Decimal('20000.00'))
+
+    def test_archived_terms_are_served_from_a_frozen_snapshot(self):
+        Term.objects.filter(pk=self.term.pk).update(is_active=False)
+        summary = get_finance_summary(term_id=self.term.pk)
+        self.assertTrue(FinanceSummarySnapshot.objects.filter(term=self.term).exists())
+
+        # A fresh cache (another worker) reads the snapshot row without aggregating.
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_finance_summary(term_id=self.term.pk), summary)
+
+        post_payments([Payment(financial_record=self.record, amount_paid=Decimal('20000.00'))])
+        self.assertFalse(FinanceSummarySnapshot.objects.filter(term=self.term).exists())
+        self.assertEqual(get_finance_summary(term_id=self.term.pk)['total_paid'], Decimal('20000.00'))
+
+
+class PaymentRollupTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(3)
+        sync_student_fee_records_for_term(self.term)
+        self.records = list(FinancialRecord.objects.filter(term=self.term).order_by('student_id'))
+        self.day = self.term.start_date + timedelta(days=3)
+
+    def rollup_totals(self):
+        return set(PaymentDailyRollup.objects.values_list('date', 'school_class_id', 'total_amount', 'payment_count'))
+
+    def test_posts_accumulate_into_one_bucket_per_day_and_class(self):
+        post_payments([Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00'), payment_date=self.day)])
+        post_payments([
+            Payment(financial_record=record, amount_paid=Decimal('5000.00'), payment_date=self.day)
+            for record in self.records
+        ])
+        self.assertEqual(self.rollup_totals(), {(self.day, self.school_class.pk, Decimal('25000.00'), 4)})
+
+    def test_single_payment_edits_and_deletes_move_the_totals_and_match_a_rebuild(self):
+        payment, = post_payments([
+            Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00'), payment_date=self.day)
+        ])
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.payment_date = self.day + timedelta(days=1)
+        payment.amount_paid = Decimal('12000.00')
+        payment.save()
+        post_payments([Payment(financial_record=self.records[1], amount_paid=Decimal('3000.00'), payment_date=self.day)])
+        Payment.objects.get(financial_record=self.records[1]).delete()
+
+        incremental = {row for row in self.rollup_totals() if row[3]}
+        self.assertEqual(incremental, {(self.day + timedelta(days=1), self.school_class.pk, Decimal('12000.00'), 1)})
+        self.assertEqual(rebuild_payment_rollups(), {'rows': 1, 'payments': 1})
+        self.assertEqual(self.rollup_totals(), incremental)
+
+    def test_payments_stay_in_the_class_they_were_recorded_in(self):
+        kept, removed = post_payments([
+            Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00'), payment_date=self.day),
+            Payment(financial_record=self.records[0], amount_paid=Decimal('5000.00'), payment_date=self.day),
+        ])
+        self.assertEqual(kept.school_class, self.school_class)
+        jss_two = Class.objects.create(name='JSS 2', school_level='Junior Secondary')
+        Student.objects.filter(pk=self.records[0].student_id).update(current_class=jss_two)
+
+        Payment.objects.get(pk=removed.pk).delete()
+        kept = Payment.objects.get(pk=kept.pk)
+        kept.amount_paid = Decimal('8000.00')
+        kept.save()
+
+        incremental = {row for row in self.rollup_totals() if row[3]}
+        self.assertEqual(incremental, {(self.day, self.school_class.pk, Decimal('8000.00'), 1)})
+        rebuild_payment_rollups()
+        self.assertEqual(self.rollup_totals(), incremental)
+
+    def test_trends_roll_days_up_into_months(self):
+        post_payments([
+            Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00'), payment_date=self.day),
+            Payment(
+                financial_record=self.records[1], amount_paid=Decimal('4000.00'),
+                payment_date=self.day + timedelta(days=1), batch_reference='BANK-1',
+            ),
+        ])
+
+        with self.assertNumQueries(1):
+            daily = payment_collection_trends(term_id=self.term.pk)
+        monthly = payment_collection_trends(period='month', group_by='batch_reference')
+
+        self.assertEqual([point['amount'] for point in daily['series']], [Decimal('10000.00'), Decimal('4000.00')])
+        self.assertEqual(
+            sorted((point['batch_reference'], point['payments']) for point in monthly['series']), [('', 1), ('BANK-1', 1)]
+        )
+        self.assertEqual(monthly['total_amount'], Decimal('14000.00'))
+
+    def test_trends_endpoint_serves_json_to_admins(self):
+        admin = CustomUser.objects.create_superuser('bursar', 'b@example.com', 'pass', role='admin')
+        self.client.force_login(admin)
+        post_payments([Payment(financial_record=self.records[0], amount_paid=Decimal('10000.00'), payment_date=self.day)])
+        url = reverse('payment_collection_trends')
+
+        response = self.client.get(url, {'period': 'week', 'group_by': 'class'})
+        self.assertEqual(response.json()['series'][0]['school_class__name'], 'JSS 1')
+        self.assertEqual(response.json()['total_payments'], 1)
+        self.assertEqual(self.client.get(url, {'period': 'fortnight'}).status_code, 400)
+
+
+class FeeSyncJobTests(FinanceTestMixin, TestCase):
+    def setUp(self):
+        self.create_term_and_class()
+        self.students = self.create_students(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            request_fee_sync(self.term, force=True)
+
+    def test_amount_changes_are_written_in_bulk(self):
+        FeeAssignment.objects.filter(pk=self.fee_assignment.pk).update(amount=Decimal('55000.00'))
+        with self.assertNumQueries(12):
+            summary = sync_student_fee_records_for_term(self.term)
+        self.assertEqual((summary['updated'], summary['affected_students']), (3, 3))
+        self.assertEqual(
+            set(FinancialRecord.objects.filter(term=self.term).values_list('outstanding_balance', flat=True)),
+            {Decimal('55000.00')},
+        )
+
+    def test_enrollment_changes_queue_one_coalesced_sync(self):
+        other_class = Class.objects.create(name='JSS 2', school_level='Junior Secondary')
+        with self.captureOnCommitCallbacks() as callbacks:
+            FeeAssignment.objects.create(class_instance=other_class, term=self.term, amount=Decimal('70000.00'))
+            for student in self.students:
+                student.current_class = other_class
+                student.save()
+        # The fee assignment and the three moves share one queued run.
+        self.assertEqual(len(callbacks), 1)
+        for callback in callbacks:
+            callback()
+        state = FeeSyncState.objects.get(term=self.term)
+        self.assertFalse(state.is_pending)
+        self.assertEqual(
+            StudentFeeRecord.objects.filter(term=self.term, fee_assignment__class_instance=other_class).count(), 3
+        )
+
+    def test_unrelated_student_edits_do_not_queue_a_sync(self):
+        student = type(self.students[0]).objects.get(pk=self.students[0].pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            student.relationship = 'Ward'
+            student.save()
+        self.assertEqual(callbacks, [])
@@ -0,0 +1,157 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import F
+from django.http import QueryDict
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.grading_services import get_answer_key, grade_submission, is_answer_correct, process_submission_intake
+from core.models import Assessment, AssessmentSubmission, CustomUser, Exam, ExamSubmission, OnlineQuestion, SubmissionIntake
+from core.tests.test_question_persistence import BaseAssessmentTestCase
+
+
+class AnswerKeyGradingTests(BaseAssessmentTestCase):
+    def setUp(self):
+        cache.clear()
+        self.assessment = Assessment.objects.create(
+            title='Quiz', term=self.term, subject=self.subject, class_assigned=self.school_class,
+            created_by=self.admin_user, is_approved=True, due_date=timezone.now() + timedelta(days=1),
+        )
+        self.scq = OnlineQuestion.objects.create(
+            question_type='SCQ', question_text='Capital of France?', options=['Paris', 'Rome'],
+            correct_answer=' Paris ', points=2,
+        )
+        self.mcq = OnlineQuestion.objects.create(
+            question_type='MCQ', question_text='Even numbers', options=['1', '2', '4'], correct_answer='2, 4', points=3,
+        )
+        self.assessment.questions.add(self.scq, self.mcq)
+
+    def post_data(self, **answers):
+        data = QueryDict(mutable=True)
+        for question, value in answers.items():
+            field = f'answer_{getattr(self, question).pk}'
+            if isinstance(value, list):
+                data.setlist(field, value)
+            else:
+                data[field] = value
+        return data
+
+    def test_answer_key_is_cached_until_a_question_changes(self):
+        get_answer_key(self.assessment)
+        with self.assertNumQueries(1):  # only the answer_key_version check
+            answer_key = get_answer_key(self.assessment)
+        self.assertEqual(answer_key[1][3], frozenset({'2', '4'}))
+
+        self.mcq.correct_answer = '1'
+        self.mcq.save()
+        self.assertEqual(get_answer_key(self.assessment)[1][3], frozenset({'1'}))
+
+    def test_a_change_made_in_another_worker_is_seen_through_the_version(self):
+        get_answer_key(self.assessment)
+        # Another worker edited the question: its cache invalidation never reached this process,
+        # but the version bump in the database did.
+        OnlineQuestion.objects.filter(pk=self.scq.pk).update(correct_answer='Rome')
+        Assessment.objects.filter(pk=self.assessment.pk).update(answer_key_version=F('answer_key_version') + 1)
+
+        self.assertEqual(get_answer_key(self.assessment)[0][3], 'rome')
+
+    def test_adding_a_question_refreshes_the_key(self):
+        get_answer_key(self.assessment)
+        essay = OnlineQuestion.objects.create(question_type='ES', question_text='Explain', points=5)
+        self.assessment.questions.add(essay)
+
+        self.assertEqual(len(get_answer_key(self.assessment)), 3)
+
+    def test_grades_the_whole_sheet_once(self):
+        submission = AssessmentSubmission.objects.create(assessment=self.assessment, student=self.student)
+
+        submission, processed = grade_submission(submission, self.post_data(scq='paris', mcq=['4', '2']))
+        self.assertTrue(processed)
+        self.assertEqual((submission.score, submission.is_graded, submission.is_completed), (5, True, True))
+        self.assertEqual(submission.answers, {str(self.scq.pk): 'paris', str(self.mcq.pk): ['4', '2']})
+
+        _, processed = grade_submission(submission, self.post_data(scq='Rome'))
+        self.assertFalse(processed)
+        submission.refresh_from_db()
+        self.assertEqual(submission.score, 5)
+
+    def test_question_checks_share_the_compiled_normalization(self):
+        cases = [
+            (self.scq, 'paris', True), (self.scq, 'Rome', False), (self.scq, None, False),
+            (self.mcq, ['4', ' 2'], True), (self.mcq, ['2'], False), (self.mcq, '2, 4', False), (self.mcq, [], False),
+        ]
+        answer_key = {entry[0]: entry for entry in get_answer_key(self.assessment)}
+        for question, answer, expected in cases:
+            self.assertIs(is_answer_correct(answer_key[question.pk], answer), expected, answer)
+            self.assertIs(question.is_option_correct(answer), expected, answer)
+
+    def test_exam_beacon_grades_and_marks_force_submitted(self):
+        exam = Exam.objects.create(
+            title='Final', term=self.term, subject=self.subject, class_assigned=self.school_class,
+            created_by=self.admin_user, is_approved=True, due_date=timezone.now() + timedelta(days=1),
+        )
+        essay = OnlineQuestion.objects.create(question_type='ES', question_text='Explain', points=5)
+        exam.questions.add(self.scq, essay)
+        submission = ExamSubmission.objects.create(exam=exam, student=self.student)
+
+        response = self.client.post(
+            reverse('exam_autosubmit_beacon', args=[submission.pk]),
+            {f'answer_{self.scq.pk}': 'Paris', f'answer_{essay.pk}': 'Because'},
+        )
+
+        self.assertEqual(response.status_code, 204)
+        submission.refresh_from_db()
+        self.assertEqual((submission.score, submission.requires_manual_review, submission.is_graded), (2, True, False))
+        self.assertIsNotNone(submission.force_submitted_at)
+
+
+@override_settings(SUBMISSION_INGEST_ASYNC=True)
+class SubmissionIntakeTests(BaseAssessmentTestCase):
+    def setUp(self):
+        cache.clear()
+        self.exam = Exam.objects.create(
+            title='Final', term=self.term, subject=self.subject, class_assigned=self.school_class,
+            created_by=self.admin_user, is_approved=True, due_date=timezone.now() + timedelta(days=1),
+        )
+        self.question = OnlineQuestion.objects.create(
+            question_type='SCQ', question_text='2 + 2?', options=['3', '4'], correct_answer='4', points=4,
+        )
+        self.exam.questions.add(self.question)
+        self.submission = ExamSubmission.objects.create(exam=self.exam, student=self.student)
+        self.beacon_url = reverse('exam_autosubmit_beacon', args=[self.submission.pk])
+        self.status_url = reverse('submission_status', args=['exam', self.submission.pk])
+
+    def test_beacon_stores_raw_answers_and_the_worker_grades_them(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(self.beacon_url, {f'answer_{self.question.pk}': '4'})
+            self.client.post(self.beacon_url, {f'answer_{self.question.pk}': '3'})
+
+        intake = SubmissionIntake.objects.get()
+        self.assertEqual((intake.status, intake.answers), ('pending', {f'answer_{self.question.pk}': ['4']}))
+        self.submission.refresh_from_db()
+        self.assertFalse(self.submission.is_completed)
+        self.assertEqual(len(callbacks), 1)
+
+        self.client.force_login(self.student_user)
+        self.assertEqual(self.client.get(self.status_url).json()['status'], 'pending')
+
+        with mock.patch('core.tasks.process_submission_intake_task.delay', side_effect=process_submission_intake):
+            callbacks[0]()
+        self.assertEqual(process_submission_intake(intake.pk), 'completed')
+
+        status = self.client.get(self.status_url).json()
+        self.assertEqual((status['status'], status['score']), ('completed', 4))
+        self.submission.refresh_from_db()
+        self.assertIsNotNone(self.submission.force_submitted_at)
+        self.assertEqual(SubmissionIntake.objects.get().attempts, 1)
+
+    def test_status_is_private_to_the_student_their_guardian_and_staff(self):
+        other = CustomUser.objects.create_user(username='other', password='pass', role='student')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.status_url).status_code, 404)
+
+        self.client.force_login(self.guardian.user)
+        self.assertEqual(self.client.get(self.status_url).json()['status'], 'not_submitted')
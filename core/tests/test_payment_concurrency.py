@@ -0,0 +1,91 @@
+"""
+Load test for concurrent payment posting. Needs PostgreSQL (SQLite has no row locks):
+
+    DATABASE_URL=postgres://localhost/lsaapp python manage.py test core.tests.test_payment_concurrency
+
+PAYMENT_LOADTEST_WORKERS and PAYMENT_LOADTEST_ROUNDS scale the run.
+"""
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.test import TransactionTestCase
+
+from core.finance_services import post_payments, sync_student_fee_records_for_term
+from core.models import FeeAssignment, FinancialRecord, Payment
+from core.tests.factories import create_class, create_students, create_term
+
+
+WORKERS = int(os.environ.get('PAYMENT_LOADTEST_WORKERS', 16))
+ROUNDS = int(os.environ.get('PAYMENT_LOADTEST_ROUNDS', 10))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row locking is only exercised on PostgreSQL.')
+class ConcurrentPaymentPostingTests(TransactionTestCase):
+    def setUp(self):
+        self.term = create_term(date.today() - timedelta(days=30))
+        school_class = create_class('SS 1', 'Senior Secondary')
+        FeeAssignment.objects.create(class_instance=school_class, term=self.term, amount=Decimal('10000.00'))
+        create_students(4, school_class, 'load')
+        sync_student_fee_records_for_term(self.term)
+        self.record_ids = sorted(FinancialRecord.objects.filter(term=self.term).values_list('pk', flat=True))
+
+    def run_workers(self, batch_for):
+        barrier = threading.Barrier(WORKERS)
+        outcome = {'posted': 0, 'rejected': 0, 'errors': []}
+        lock = threading.Lock()
+
+        def worker(index):
+            try:
+                barrier.wait()
+                for round_number in range(ROUNDS):
+                    try:
+                        post_payments(batch_for(index, round_number))
+                        key = 'posted'
+                    except ValidationError:
+                        key = 'rejected'
+                    with lock:
+                        outcome[key] += 1
+            except Exception as exc:  # deadlocks and other database errors fail the run
+                with lock:
+                    outcome['errors'].append(repr(exc))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcome
+
+    def assert_no_record_overpaid(self):
+        for record in FinancialRecord.objects.filter(pk__in=self.record_ids):
+            paid = sum(record.payments.values_list('amount_paid', flat=True), Decimal('0.00'))
+            self.assertLessEqual(paid, record.total_fee)
+            self.assertEqual(record.total_paid, paid)
+
+    def test_parallel_posters_on_one_record_never_overpay(self):
+        record_id = self.record_ids[0]
+        outcome = self.run_workers(
+            lambda index, round_number: [Payment(financial_record_id=record_id, amount_paid=Decimal('100.00'))]
+        )
+        self.assertEqual(outcome['errors'], [])
+        # 10,000 fee / 100 per payment: exactly 100 postings can succeed.
+        self.assertEqual(outcome['posted'], min(WORKERS * ROUNDS, 100))
+        self.assert_no_record_overpaid()
+
+    def test_overlapping_batches_do_not_deadlock(self):
+        def batch(index, round_number):
+            # Alternate the order records appear in; the service must lock them in a fixed order.
+            ids = self.record_ids if (index + round_number) % 2 else list(reversed(self.record_ids))
+            return [Payment(financial_record_id=record_id, amount_paid=Decimal('50.00')) for record_id in ids]
+
+        outcome = self.run_workers(batch)
+        self.assertEqual(outcome['errors'], [])
+        self.assertEqual(outcome['posted'] + outcome['rejected'], WORKERS * ROUNDS)
+        self.assert_no_record_overpaid()
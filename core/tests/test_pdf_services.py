@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import pathlib
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import pdf_services
+from core.models import Class, CustomUser, PaymentReceipt, Session, Term
+
+
+class LocalAssetTests(TestCase):
+    def test_static_urls_resolve_to_files_on_any_host(self):
+        path = pdf_services.local_asset_path('https://school.example/static/css/result_styles.css')
+
+        self.assertEqual(path, pathlib.Path(settings.BASE_DIR) / 'core' / 'static' / 'css' / 'result_styles.css')
+        self.assertEqual(pdf_services.local_asset_path('/static/css/result_styles.css'), path)
+
+    def test_unknown_and_escaping_urls_are_not_local(self):
+        self.assertIsNone(pdf_services.local_asset_path('https://cdn.example/fonts/inter.woff2'))
+        self.assertIsNone(pdf_services.local_asset_path('/media/../lsaapp/settings.py'))
+        self.assertIsNone(pdf_services.local_asset_path('/static/css/missing.css'))
+
+
+@skipUnless(pdf_services.PDF_AVAILABLE, 'WeasyPrint is not installed')
+class ReceiptPdfCacheTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(PDF_CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.receipt_dir = pathlib.Path(cache_dir.name) / 'receipts'
+
+        admin = CustomUser.objects.create_superuser('bursar', 'b@example.com', 'pass', role='admin')
+        self.client.force_login(admin)
+        session = Session.objects.create(
+            start_date=date.today() - timedelta(days=30), end_date=date.today() + timedelta(days=150), is_active=True,
+        )
+        term, _ = Term.objects.update_or_create(
+            session=session, name='First Term',
+            defaults={
+                'start_date': date.today() - timedelta(days=30), 'end_date': date.today() + timedelta(days=60),
+                'is_active': True,
+            },
+        )
+        school_class = Class.objects.create(name='JSS 1')
+        self.receipt = PaymentReceipt.objects.create(
+            term=term, created_by=admin, scope='single', batch_reference='RCT-PDF',
+            total_amount=Decimal('25000.00'), payment_date=date.today(),
+            line_items=[{
+                'student_name': 'Stud One', 'class_name': school_class.name, 'discount_amount': '0.00',
+                'outstanding_balance': '25000.00', 'amount_paid': '25000.00',
+            }],
+        )
+        self.url = reverse('payment_receipt_download', kwargs={'pk': self.receipt.pk})
+
+    def test_download_streams_cached_pdf(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn(f'{self.receipt.receipt_number}.pdf', response['Content-Disposition'])
+        cached, = self.receipt_dir.glob('*.pdf')
+        self.assertEqual(b''.join(response.streaming_content), cached.read_bytes())
+
+        # A second download is served from disk without rendering again.
+        cached.write_bytes(b'%PDF-cached')
+        self.assertEqual(b''.join(self.client.get(self.url).streaming_content), b'%PDF-cached')
+
+    def test_changed_receipt_replaces_the_cached_pdf(self):
+        self.client.get(self.url)
+        old, = self.receipt_dir.glob('*.pdf')
+        PaymentReceipt.objects.filter(pk=self.receipt.pk).update(total_amount=Decimal('30000.00'))
+
+        self.client.get(self.url)
+
+        new, = self.receipt_dir.glob('*.pdf')
+        self.assertNotEqual(old, new)
+
+    def test_the_same_receipt_shares_one_pdf_across_hosts(self):
+        self.client.get(self.url, HTTP_HOST='localhost')
+        cached, = self.receipt_dir.glob('*.pdf')
+
+        self.client.get(self.url, HTTP_HOST='127.0.0.1', secure=True)
+
+        self.assertEqual(list(self.receipt_dir.glob('*.pdf')), [cached])
+
+
+class ReceiptPdfPathTests(TestCase):
+    def test_origin_is_left_out_of_the_cache_key(self):
+        html = '<a href="{}/payments/receipts/share/abc/">Share</a>'
+        paths = {
+            pdf_services.receipt_pdf_path('RCT-1', html.format(origin), origin)
+            for origin in ('http://localhost:8000', 'https://learnswift.icu')
+        }
+        self.assertEqual(len(paths), 1)
+        self.assertNotEqual(
+            pdf_services.receipt_pdf_path('RCT-1', html.format('https://learnswift.icu')), paths.pop()
+        )
@@ -0,0 +1,125 @@
+from decimal import Decimal
+import tempfile
+from unittest import mock
+import zipfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Class, CumulativeRecord, CustomUser, ReportCardJob, SessionalResult
+from core.report_card_services import (
+    build_report_card_contexts, report_card_output_path, report_card_results, run_report_card_job,
+    start_report_card_job,
+)
+from core.tests.test_result_services import ResultServiceTestMixin
+
+
+class ReportCardContextTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.ada = self.create_student('ada', self.class_a, 'Ada', 'Obi')
+        self.bayo = self.create_student('bayo', self.class_a, 'Bayo', 'Ade')
+        self.dayo = self.create_student('dayo', self.class_b, 'Dayo', 'Ojo')
+        self.record_scores(self.ada, self.term, self.maths, exam_score='80')
+        self.record_scores(self.ada, self.term, self.english, exam_score='50')
+        self.record_scores(self.bayo, self.term, self.maths, exam_score='60')
+        self.record_scores(self.dayo, self.term, self.maths, exam_score='10')
+
+    def test_contexts_share_class_averages_and_fill_missing_summaries(self):
+        contexts = build_report_card_contexts(report_card_results(self.term, self.class_a))
+
+        self.assertEqual([context['student'] for context in contexts], [self.bayo, self.ada])
+        ada = contexts[1]
+        self.assertEqual([row.subject for row in ada['subject_results']], [self.english, self.maths])
+        self.assertEqual(
+            ada['chart_data'],
+            [
+                {'subject': 'English', 'total_score': 50.0, 'class_average': 50.0},
+                {'subject': 'Mathematics', 'total_score': 80.0, 'class_average': 70.0},
+            ],
+        )
+        self.assertEqual(ada['result'].term_gpa, Decimal('4.50'))
+        # First term of the session: the term GPA stands in for the cumulative one.
+        self.assertEqual(ada['cumulative_gpa'], ada['result'].term_gpa)
+        self.assertIn('attendance_percentage', ada['attendance_data'])
+
+    def test_query_count_does_not_grow_with_the_class(self):
+        def count_queries():
+            build_report_card_contexts(report_card_results(self.term, self.class_a))  # warm counters and records
+            with CaptureQueriesContext(connection) as queries:
+                build_report_card_contexts(report_card_results(self.term, self.class_a))
+            return len(queries)
+
+        small_class = count_queries()
+        for index in range(3):
+            student = self.create_student(f'extra{index}', self.class_a)
+            self.record_scores(student, self.term, self.maths, exam_score='70')
+
+        self.assertEqual(count_queries(), small_class)
+
+    def test_cumulative_gpas_are_refreshed_in_bulk(self):
+        SessionalResult.objects.update_or_create(
+            student=self.ada, session=self.session, defaults={'sessional_gpa': Decimal('3.25'), 'is_approved': True},
+        )
+
+        build_report_card_contexts(report_card_results(self.term, self.class_a))
+
+        self.assertEqual(CumulativeRecord.objects.get(student=self.ada).cumulative_gpa, Decimal('3.25'))
+        self.assertEqual(CumulativeRecord.objects.get(student=self.bayo).cumulative_gpa, Decimal('0.00'))
+
+
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp())
+class ReportCardJobTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.ada = self.create_student('ada', self.class_a, 'Ada', 'Obi')
+        self.bayo = self.create_student('bayo', self.class_a, 'Bayo', 'Ade')
+        self.dayo = self.create_student('dayo', self.class_b, 'Dayo', 'Ojo')
+        for student in (self.ada, self.bayo, self.dayo):
+            self.record_scores(student, self.term, self.maths, exam_score='70')
+
+    def fake_render(self, documents, stylesheets=(), max_workers=None):
+        for document in documents:
+            yield b'%PDF-' + document.encode('utf-8')[:20]
+
+    def test_zip_job_writes_one_card_per_student_and_tracks_progress(self):
+        with mock.patch('core.report_card_services.iter_render_pdfs', side_effect=self.fake_render):
+            with self.captureOnCommitCallbacks(execute=True):
+                job = start_report_card_job(self.term, output_format='zip')
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.cards_done, job.cards_total, job.progress_percent), ('completed', 3, 3, 100))
+        with zipfile.ZipFile(report_card_output_path(job)) as archive:
+            names = archive.namelist()
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all(name.startswith(('Basic_1/', 'Basic_2/')) for name in names))
+
+    def test_empty_scope_marks_job_failed(self):
+        empty_class = Class.objects.create(name='Basic 3', school_level='Primary')
+        job = ReportCardJob.objects.create(term=self.term, class_obj=empty_class, output_format='zip')
+
+        with self.assertRaises(ValueError):
+            run_report_card_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(report_card_output_path(job))
+
+    def test_job_pages_serve_progress_and_download(self):
+        admin = CustomUser.objects.create_superuser('cards-admin', 'a@example.com', 'pass', role='admin')
+        self.client.force_login(admin)
+        job = ReportCardJob.objects.create(term=self.term, class_obj=self.class_a, output_format='zip')
+
+        response = self.client.get(reverse('report_card_job_detail', args=[job.pk]), {'format': 'json'})
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(self.client.get(reverse('report_card_job_download', args=[job.pk])).status_code, 404)
+
+        with mock.patch('core.report_card_services.iter_render_pdfs', side_effect=self.fake_render):
+            run_report_card_job(job.pk)
+        response = self.client.get(reverse('report_card_job_download', args=[job.pk]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertContains(self.client.get(reverse('report_card_job_detail', args=[job.pk])), 'Report Card Progress')
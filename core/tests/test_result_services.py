@@ -0,0 +1,265 @@
+from decimal import Decimal
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    Class, Subject, Term, Result, SubjectResult, ClassSubjectAssignment,
+    SessionalResult, SessionalBroadsheetRow
+)
+from core.result_services import (
+    build_class_broadsheet, build_sessional_broadsheets, build_term_broadsheets, prepare_score_sheet,
+    recalculate_term_summaries, refresh_sessional_broadsheet, save_score_sheet
+)
+from core.tests.factories import create_class, create_student, create_term
+
+
+class ResultServiceTestMixin:
+    def create_student(self, username, school_class, first_name='', last_name=''):
+        return create_student(username, school_class, first_name=first_name, last_name=last_name)
+
+    def record_scores(self, student, term, subject, **scores):
+        result, _ = Result.objects.get_or_create(student=student, term=term)
+        subject_result, _ = SubjectResult.objects.get_or_create(result=result, subject=subject)
+        for field, value in scores.items():
+            setattr(subject_result, field, Decimal(value))
+        subject_result.save()
+        return subject_result
+
+    def create_academic_structure(self):
+        self.term = create_term(timezone.now().date())
+        self.session = self.term.session
+        self.class_a = create_class('Basic 1', 'Primary')
+        self.class_b = create_class('Basic 2', 'Primary')
+        self.maths = Subject.objects.create(name='Mathematics', description='Maths', subject_weight=3)
+        self.english = Subject.objects.create(name='English', description='English', subject_weight=1)
+        for school_class in (self.class_a, self.class_b):
+            for subject in (self.maths, self.english):
+                ClassSubjectAssignment.objects.create(
+                    class_assigned=school_class, subject=subject, session=self.session, term=self.term
+                )
+
+
+class TermBroadsheetTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.ada = self.create_student('ada', self.class_a, 'Ada', 'Obi')
+        self.bayo = self.create_student('bayo', self.class_a, 'Bayo', 'Ade')
+        self.chi = self.create_student('chi', self.class_a, 'Chi', 'Eze')
+        self.dayo = self.create_student('dayo', self.class_b, 'Dayo', 'Ojo')
+
+        self.record_scores(self.ada, self.term, self.maths, continuous_assessment_1='10', exam_score='40', oral_test='20')
+        self.record_scores(self.ada, self.term, self.english, exam_score='30', assignment='10')
+        self.record_scores(self.bayo, self.term, self.maths, exam_score='35')
+        self.record_scores(self.bayo, self.term, self.english, exam_score='40', oral_test='20')
+        self.record_scores(self.dayo, self.term, self.maths, exam_score='20')
+
+    def test_matrix_totals_gpa_and_ranks(self):
+        broadsheets = build_term_broadsheets(self.term)
+        self.assertEqual([sheet['class'] for sheet in broadsheets], [self.class_a, self.class_b])
+
+        rows = {row['student']: row for row in broadsheets[0]['results_data']}
+        ada_row = rows[self.ada]
+        self.assertEqual(ada_row['subject_results'][self.maths.pk]['total_score'], Decimal('70.0'))
+        self.assertEqual(ada_row['subject_results'][self.english.pk]['total_score'], Decimal('40.0'))
+        self.assertEqual(ada_row['total_score'], Decimal('110.0'))
+        # Maths (B, 4.0) weighted 3 and English (E, 1.0) weighted 1.
+        self.assertEqual(ada_row['gpa'], Decimal('3.25'))
+        self.assertEqual(ada_row['rank'], 1)
+
+        self.assertEqual(rows[self.bayo]['total_score'], Decimal('95.0'))
+        self.assertEqual(rows[self.bayo]['rank'], 2)
+        # A student with no scores is listed last with an empty row.
+        self.assertEqual(rows[self.chi]['subject_results'], {})
+        self.assertEqual(rows[self.chi]['rank'], 3)
+
+    def test_query_count_does_not_grow_with_classes(self):
+        with self.assertNumQueries(5):
+            build_term_broadsheets(self.term)
+
+        extra_class = Class.objects.create(name='Basic 3', school_level='Primary')
+        ClassSubjectAssignment.objects.create(
+            class_assigned=extra_class, subject=self.maths, session=self.session, term=self.term
+        )
+        for index in range(5):
+            student = self.create_student(f'extra{index}', extra_class)
+            self.record_scores(student, self.term, self.maths, exam_score='25')
+
+        with self.assertNumQueries(5):
+            broadsheets = build_term_broadsheets(self.term)
+        self.assertEqual(len(broadsheets), 3)
+
+    def test_class_broadsheet_matches_totals_from_model_methods(self):
+        sheet = build_class_broadsheet(self.term, self.class_a)
+        for row in sheet['results_data']:
+            for subject_id, cell in row['subject_results'].items():
+                subject_result = SubjectResult.objects.get(result__student=row['student'], subject_id=subject_id)
+                self.assertEqual(cell['total_score'], subject_result.total_score())
+                self.assertEqual(cell['grade_point'], subject_result.calculate_grade_point())
+
+    def test_equal_scores_share_a_rank(self):
+        self.record_scores(self.chi, self.term, self.maths, continuous_assessment_1='10', exam_score='40', oral_test='20')
+        self.record_scores(self.chi, self.term, self.english, exam_score='30', assignment='10')
+
+        ranks = {row['student']: row['rank'] for row in build_class_broadsheet(self.term, self.class_a)['results_data']}
+        self.assertEqual(ranks[self.ada], 1)
+        self.assertEqual(ranks[self.chi], 1)
+        self.assertEqual(ranks[self.bayo], 3)
+
+
+class SessionalBroadsheetTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.second_term = Term.objects.create(
+            session=self.session, name='Second Term',
+            start_date=self.term.end_date + timedelta(days=7), end_date=self.term.end_date + timedelta(days=90),
+        )
+        self.ada = self.create_student('ada', self.class_a, 'Ada', 'Obi')
+        self.bayo = self.create_student('bayo', self.class_a, 'Bayo', 'Ade')
+        self.record_scores(self.ada, self.term, self.maths, exam_score='40', oral_test='20', continuous_assessment_1='10')
+        self.record_scores(self.ada, self.second_term, self.maths, exam_score='30', oral_test='20')
+        self.record_scores(self.bayo, self.term, self.english, exam_score='25', assignment='5')
+
+    def test_refresh_materializes_rows_and_sessional_results(self):
+        summary = refresh_sessional_broadsheet(self.session)
+        self.assertEqual(summary, {'created': 2, 'updated': 0, 'deleted': 0})
+        self.assertEqual(SessionalResult.objects.filter(session=self.session).count(), 2)
+
+        row = SessionalBroadsheetRow.objects.get(session=self.session, student=self.ada)
+        self.assertEqual(row.class_assigned, self.class_a)
+        maths_summary = row.subject_summary_json[str(self.maths.pk)]
+        self.assertEqual(maths_summary['term_scores'][f'term_{self.term.pk}_score'], 70.0)
+        self.assertEqual(maths_summary['term_scores'][f'term_{self.second_term.pk}_score'], 50.0)
+        self.assertEqual(maths_summary['sessional_average'], 60.0)
+        self.assertEqual(row.average_score, Decimal('60.00'))
+        # Both terms graded B (4.0) and C (3.0) in the same subject.
+        self.assertEqual(row.sessional_gpa, Decimal('3.50'))
+
+    def test_refresh_only_rebuilds_changed_students(self):
+        refresh_sessional_broadsheet(self.session)
+        self.assertEqual(refresh_sessional_broadsheet(self.session), {'created': 0, 'updated': 0, 'deleted': 0})
+
+        self.record_scores(self.bayo, self.second_term, self.english, exam_score='35')
+        self.assertEqual(refresh_sessional_broadsheet(self.session), {'created': 0, 'updated': 1, 'deleted': 0})
+        row = SessionalBroadsheetRow.objects.get(session=self.session, student=self.bayo)
+        self.assertEqual(row.subject_summary_json[str(self.english.pk)]['sessional_average'], 32.5)
+
+    def test_deleted_scores_flag_the_row_and_queue_a_refresh(self):
+        refresh_sessional_broadsheet(self.session)
+        with self.captureOnCommitCallbacks() as callbacks:
+            SubjectResult.objects.get(result__student=self.ada, result__term=self.second_term).delete()
+        self.assertIsNone(SessionalBroadsheetRow.objects.get(student=self.ada).source_updated_at)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()  # runs the refresh inline: no broker in tests
+        row = SessionalBroadsheetRow.objects.get(session=self.session, student=self.ada)
+        self.assertEqual(row.subject_summary_json[str(self.maths.pk)]['sessional_average'], 70.0)
+
+    def test_refresh_drops_students_who_left(self):
+        refresh_sessional_broadsheet(self.session)
+        self.bayo.mark_left()
+        self.assertEqual(refresh_sessional_broadsheet(self.session)['deleted'], 1)
+        self.assertFalse(SessionalBroadsheetRow.objects.filter(student=self.bayo).exists())
+
+    def test_build_reads_rows_grouped_by_class(self):
+        refresh_sessional_broadsheet(self.session)
+        terms = [self.term, self.second_term]
+        with self.assertNumQueries(2):
+            broadsheets = build_sessional_broadsheets(self.session, terms)
+
+        self.assertEqual(len(broadsheets), 1)
+        rows = broadsheets[0]['sessional_results_data']
+        self.assertEqual([entry['student_obj'] for entry in rows], [self.ada, self.bayo])
+        self.assertFalse(broadsheets[0]['is_all_approved'])
+        maths_row = next(item for item in rows[0]['subject_rows'] if item['subject_name'] == 'Mathematics')
+        self.assertEqual(maths_row['term_scores'], [70.0, 50.0])
+
+
+class ScoreEntryTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.students = [self.create_student(f'pupil{index}', self.class_a) for index in range(4)]
+        self.record_scores(self.students[0], self.term, self.english, exam_score='50')
+
+    def test_prepare_creates_missing_rows_once(self):
+        sheet = prepare_score_sheet(self.term, self.maths, self.students)
+        self.assertEqual(set(sheet), {student.pk for student in self.students})
+        self.assertEqual(Result.objects.filter(term=self.term).count(), 4)
+        self.assertEqual(SubjectResult.objects.filter(subject=self.maths).count(), 4)
+
+        # A second load finds everything and only issues the two read queries.
+        with self.assertNumQueries(2):
+            prepare_score_sheet(self.term, self.maths, self.students)
+
+    def test_save_matches_per_row_summary(self):
+        sheet = prepare_score_sheet(self.term, self.maths, self.students)
+        first, second = sheet[self.students[0].pk], sheet[self.students[1].pk]
+        first.exam_score, first.continuous_assessment_1 = Decimal('45'), Decimal('20')
+        second.exam_score = Decimal('30')
+
+        summary = save_score_sheet([first, second])
+        self.assertEqual(summary['updated_cells'], 2)
+        self.assertEqual(summary['updated_summaries'], 2)
+        # bulk_update, summary read, subject totals, previous terms, summary bulk_update,
+        # flagging dashboard snapshots stale, then the broadsheet placements, flag and row count.
+        self.assertEqual(summary['queries'], 9)
+
+        result = Result.objects.get(student=self.students[0], term=self.term)
+        self.assertEqual(result.total_score, Decimal('115.00'))
+        self.assertEqual(result.average_score, Decimal('57.50'))
+        batched = (result.total_score, result.average_score, result.term_gpa)
+        result.calculate_term_summary()
+        result.refresh_from_db()
+        self.assertEqual((result.total_score, result.average_score, result.term_gpa), batched)
+
+    def test_performance_change_uses_previous_term(self):
+        previous_term = Term.objects.create(
+            session=self.session, name='Third Term',
+            start_date=self.term.start_date - timedelta(days=100), end_date=self.term.start_date - timedelta(days=10),
+        )
+        Result.objects.update_or_create(
+            student=self.students[0], term=previous_term, defaults={'average_score': Decimal('40.00')}
+        )
+        result = Result.objects.get(student=self.students[0], term=self.term)
+
+        recalculate_term_summaries([result.pk])
+        result.refresh_from_db()
+        self.assertEqual(result.average_score, Decimal('50.00'))
+        self.assertEqual(result.performance_change, Decimal('25.00'))
+
+
+class TermSummaryServiceTests(ResultServiceTestMixin, TestCase):
+    def setUp(self):
+        self.create_academic_structure()
+        self.ada = self.create_student('ada', self.class_a)
+        self.bayo = self.create_student('bayo', self.class_b)
+        self.record_scores(self.ada, self.term, self.maths, exam_score='55', oral_test='10')
+        self.record_scores(self.bayo, self.term, self.english, exam_score='42')
+
+    def test_scopes_to_class_or_whole_term(self):
+        self.assertEqual(recalculate_term_summaries(term=self.term, class_obj=self.class_a), 1)
+        self.assertIsNone(Result.objects.get(student=self.bayo, term=self.term).average_score)
+
+        self.assertEqual(recalculate_term_summaries(term=self.term), 2)
+        bayo_result = Result.objects.get(student=self.bayo, term=self.term)
+        self.assertEqual(bayo_result.average_score, Decimal('42.00'))
+        self.assertEqual(bayo_result.term_gpa, Decimal('1.00'))
+
+    def test_requires_a_scope(self):
+        with self.assertRaises(ValueError):
+            recalculate_term_summaries()
+
+    def test_wrapper_query_count_ignores_number_of_earlier_terms(self):
+        for offset in range(1, 4):
+            Term.objects.create(
+                session=self.session, name=f'Old Term {offset}',
+                start_date=self.term.start_date - timedelta(days=100 * offset),
+                end_date=self.term.start_date - timedelta(days=100 * offset - 80),
+            )
+        result = Result.objects.select_related('term').get(student=self.ada, term=self.term)
+        # Subject totals, previous-term averages, one bulk_update and the snapshot flag.
+        with self.assertNumQueries(4):
+            result.calculate_term_summary()
+        self.assertEqual(result.average_score, Decimal('65.00'))
+        self.assertIsNone(result.performance_change)
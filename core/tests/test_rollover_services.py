@@ -0,0 +1,152 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import (
+    Class, ClassSubjectAssignment, CustomUser, FeeAssignment, RolloverJob, Subject, SubjectAssignment,
+    TeacherAssignment, Term,
+)
+from core.rollover_services import (
+    ASSIGNMENT_KINDS, preview_rollover, resume_rollover_job, rollover_term, run_rollover_job, start_rollover_job,
+)
+from core.tests.factories import create_term
+
+
+class RolloverTestMixin:
+    def create_session(self, year, is_active=False):
+        term = create_term(date(year, 9, 1), is_active=is_active)
+        return term.session, term
+
+    def create_assignments(self, term, count, prefix='jss'):
+        teacher = CustomUser.objects.create_user(username=f'{prefix}-teacher', password='pass', role='teacher').teacher
+        for index in range(count):
+            school_class = Class.objects.create(name=f'{prefix} {index}')
+            subject = Subject.objects.create(name=f'{prefix} subject {index}', description='')
+            TeacherAssignment.objects.create(
+                class_assigned=school_class, teacher=teacher, session=term.session, term=term, is_form_teacher=True,
+            )
+            ClassSubjectAssignment.objects.create(
+                class_assigned=school_class, subject=subject, session=term.session, term=term,
+            )
+            SubjectAssignment.objects.create(
+                class_assigned=school_class, subject=subject, teacher=teacher, session=term.session, term=term,
+            )
+            FeeAssignment.objects.create(class_instance=school_class, term=term, amount=Decimal('40000.00'))
+
+
+class RolloverEngineTests(RolloverTestMixin, TestCase):
+    def setUp(self):
+        self.session, self.source_term = self.create_session(2030)
+        self.next_session, self.target_term = self.create_session(2031)
+
+    def test_rollover_query_count_is_constant(self):
+        for size, prefix in ((2, 'small'), (12, 'large')):
+            TeacherAssignment.objects.all().delete()
+            ClassSubjectAssignment.objects.all().delete()
+            SubjectAssignment.objects.all().delete()
+            self.create_assignments(self.source_term, size, prefix)
+            # Source and target reads per kind, one insert per kind, the Class.subjects links and the savepoint.
+            with self.assertNumQueries(12):
+                counts = rollover_term(self.source_term, self.target_term)
+            self.assertEqual(counts['teacher_assignments'], {'created': size, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(TeacherAssignment.objects.filter(term=self.target_term).count(), 12)
+
+    def test_rerun_only_copies_missing_rows(self):
+        self.create_assignments(self.source_term, 3)
+        rollover_term(self.source_term, self.target_term)
+        ClassSubjectAssignment.objects.filter(term=self.target_term).first().delete()
+
+        counts = rollover_term(self.source_term, self.target_term)
+
+        self.assertEqual(counts['class_subject_assignments'], {'created': 1, 'updated': 0, 'unchanged': 2})
+        self.assertEqual(counts['subject_assignments'], {'created': 0, 'updated': 0, 'unchanged': 3})
+        self.assertEqual(
+            SubjectAssignment.objects.filter(session=self.next_session, term=self.target_term).count(), 3
+        )
+
+    def test_fee_overwrite_updates_changed_amounts(self):
+        self.create_assignments(self.source_term, 2)
+        target_fee = FeeAssignment.objects.create(
+            class_instance=FeeAssignment.objects.filter(term=self.source_term).first().class_instance,
+            term=self.target_term,
+            amount=Decimal('35000.00'),
+        )
+
+        kept = rollover_term(self.source_term, self.target_term, ['fee_assignments'])
+        target_fee.refresh_from_db()
+        self.assertEqual(kept['fee_assignments'], {'created': 1, 'updated': 0, 'unchanged': 1})
+        self.assertEqual(target_fee.amount, Decimal('35000.00'))
+
+        overwritten = rollover_term(self.source_term, self.target_term, ['fee_assignments'], overwrite_existing=True)
+        target_fee.refresh_from_db()
+        self.assertEqual(overwritten['fee_assignments'], {'created': 0, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(target_fee.amount, Decimal('40000.00'))
+
+    def test_dry_run_writes_nothing(self):
+        self.create_assignments(self.source_term, 3)
+
+        preview = preview_rollover([(self.source_term, self.target_term), (self.source_term, None)])
+
+        self.assertEqual(preview['teacher_assignments'], {'created': 6, 'updated': 0, 'unchanged': 0})
+        self.assertFalse(TeacherAssignment.objects.filter(term=self.target_term).exists())
+
+
+class RolloverJobTests(RolloverTestMixin, TestCase):
+    def setUp(self):
+        self.session, self.source_term = self.create_session(2030)
+        self.next_session, self.target_term = self.create_session(2031)
+        self.create_assignments(self.source_term, 2)
+
+    def test_session_job_creates_missing_terms_and_reports_progress(self):
+        Term.objects.create(
+            session=self.session, name='Second Term', start_date=date(2031, 1, 5), end_date=date(2031, 4, 1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            job = start_rollover_job('session', self.session, self.next_session)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.steps_done, job.steps_total, job.progress_percent), (6, 6, 100))
+        self.assertEqual(job.summary['teacher_assignments'], {'created': 2, 'updated': 0, 'unchanged': 0})
+        self.assertTrue(Term.objects.filter(session=self.next_session, name='Second Term', is_active=False).exists())
+
+    def test_resume_skips_completed_steps(self):
+        job = RolloverJob.objects.create(
+            scope='term', source_term=self.source_term, target_term=self.target_term, kinds=list(ASSIGNMENT_KINDS),
+            status='failed', error='worker lost', steps_total=3,
+            completed_steps=[f'{self.source_term.pk}:teacher_assignments'],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(resume_rollover_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.steps_done), ('completed', '', 3))
+        self.assertFalse(TeacherAssignment.objects.filter(term=self.target_term).exists())
+        self.assertEqual(ClassSubjectAssignment.objects.filter(term=self.target_term).count(), 2)
+        self.assertFalse(resume_rollover_job(job))
+
+    def test_failed_step_marks_job_failed(self):
+        job = RolloverJob.objects.create(scope='term', source_term=self.source_term, kinds=['teacher_assignments'])
+
+        with self.assertRaises(ValueError):
+            run_rollover_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_job_detail_serves_progress_json(self):
+        admin = CustomUser.objects.create_superuser('rollover-admin', 'a@example.com', 'pass', role='admin')
+        self.client.force_login(admin)
+        job = RolloverJob.objects.create(
+            scope='term', source_term=self.source_term, target_term=self.target_term, kinds=['teacher_assignments'],
+        )
+
+        response = self.client.get(reverse('rollover_job_detail', args=[job.pk]), {'format': 'json'})
+
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(response.json()['progress_percent'], 0)
+        self.assertContains(self.client.get(reverse('rollover_job_detail', args=[job.pk])), 'Rollover Progress')
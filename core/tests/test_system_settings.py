@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.system_settings import SETTINGS_VERSION_KEY, SystemSettings, invalidate_settings_cache
+
+
+class SystemSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_settings_cache()
+
+    def test_repeat_reads_issue_no_queries(self):
+        settings = SystemSettings.get_settings()
+        with self.assertNumQueries(0):
+            self.assertIs(SystemSettings.get_settings(), settings)
+
+    def test_save_invalidates_cached_instance(self):
+        SystemSettings.get_settings()
+        editable = SystemSettings.get_settings(use_cache=False)
+        editable.school_name = 'Renamed Academy'
+        editable.save()
+
+        self.assertEqual(SystemSettings.get_settings().school_name, 'Renamed Academy')
+
+    def test_shared_cache_serves_other_processes(self):
+        SystemSettings.get_settings()
+        # Simulate a fresh process: only the shared cache is populated.
+        from core import system_settings
+        system_settings._local_settings['instance'] = None
+        with self.assertNumQueries(0):
+            self.assertEqual(SystemSettings.get_settings().pk, 1)
+
+    def test_version_is_read_from_the_shared_cache_once_per_interval(self):
+        SystemSettings.get_settings()
+        with mock.patch.object(cache, 'get', wraps=cache.get) as shared_get:
+            for _ in range(3):
+                SystemSettings.get_settings()
+        # With the database cache each of these reads would be a query.
+        shared_get.assert_not_called()
+
+    def test_another_workers_change_is_seen_after_the_interval(self):
+        settings = SystemSettings.get_settings()
+        # Another worker saved the settings: only the shared version key moved.
+        cache.set(SETTINGS_VERSION_KEY, 'changed-elsewhere', None)
+        self.assertIs(SystemSettings.get_settings(), settings)
+
+        with override_settings(CACHE_VERSION_CHECK_SECONDS=0):
+            self.assertIsNot(SystemSettings.get_settings(), settings)
+
+
+class GradeLookupTests(TestCase):
+    def setUp(self):
+        self.settings = SystemSettings(grading_system=SystemSettings.get_default_grading_system())
+
+    def test_whole_and_fractional_scores(self):
+        self.assertEqual(self.settings.get_grade(70), {'grade': 'A', 'remark': 'Excellent'})
+        self.assertEqual(self.settings.get_grade(45)['grade'], 'D')
+        self.assertEqual(self.settings.get_grade(0)['grade'], 'F')
+        # Gaps between integer bands keep their previous behaviour.
+        self.assertIsNone(self.settings.get_grade(69.5))
+
+    def test_table_recompiles_when_grading_system_changes(self):
+        self.assertEqual(self.settings.get_grade(65)['grade'], 'B')
+        self.settings.grading_system = {'P': {'min_score': 50, 'max_score': 100, 'remark': 'Pass'}}
+        self.assertEqual(self.settings.get_grade(65), {'grade': 'P', 'remark': 'Pass'})
+        self.assertIsNone(self.settings.get_grade(20))
@@ -8,8 +8,9 @@ from datetime import date, timedelta
 # Import ALL your relevant models and forms
 from core.models import (
     Student, Guardian, Class, Session, Term, FeeAssignment,
-    StudentFeeRecord, Payment, PaymentReceipt, FinancialRecord
+    StudentFeeRecord, Payment, PaymentReceipt, FinancialRecord, FeeSyncState, RolloverJob
 )
+from core.finance_services import run_fee_sync
 from core.payment.forms import PaymentForm # Adjust import path
 
 CustomUser = get_user_model()
@@ -70,14 +71,22 @@ class FinancialViewTests(TestCase):
 
     def test_sfr_list_view_get_authenticated_admin(self):
         """Test GET request by admin user."""
+        run_fee_sync(self.term)
         response = self.client.get(self.sfr_list_url)
         self.assertEqual(response.status_code, 200)
         # Template updated to use student_fee_record_list.html
         self.assertTemplateUsed(response, 'fee_assignment/student_fee_record_list.html')
         self.assertIn('all_records_grouped_by_class', response.context)
-        self.assertIn(self.class1.id, response.context['all_records_grouped_by_class'])
-        self.assertIn(self.class2.id, response.context['all_records_grouped_by_class'])
+        self.assertEqual(
+            [(summary['id'], summary['count']) for summary in response.context['class_summaries']],
+            [(self.class1.id, 2), (self.class2.id, 1)],
+        )
+        # Only the selected class (the first, by default) is loaded, one page at a time.
+        self.assertEqual(list(response.context['all_records_grouped_by_class']), [self.class1.id])
         self.assertEqual(len(response.context['all_records_grouped_by_class'][self.class1.id]['records']), 2) # Stud1, Stud2
+        self.assertIsNotNone(response.context['fee_sync_state'].last_synced_at)
+
+        response = self.client.get(self.sfr_list_url, {'class_id': self.class2.id})
         self.assertEqual(len(response.context['all_records_grouped_by_class'][self.class2.id]['records']), 1) # Stud3
 
     def test_sfr_list_view_authentication_redirect(self):
@@ -97,22 +106,27 @@ class FinancialViewTests(TestCase):
         self.assertIn(response.status_code, (302, 403))
         # self.assertIn(reverse('login'), response.url) # Or check for permission denied page
 
-    def test_sfr_list_view_sync_on_get(self):
-        """Test that sync creates missing records on GET."""
-        # Ensure records don't exist initially (setUpTestData doesn't create them)
+    def test_sfr_list_view_get_does_not_sync(self):
+        """GET only reads; records are created by the sync job queued with "Sync now"."""
         self.assertEqual(StudentFeeRecord.objects.count(), 0)
         response = self.client.get(self.sfr_list_url)
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(StudentFeeRecord.objects.count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.sfr_list_url, data={'action': 'sync_now'})
+        self.assertEqual(response.status_code, 302)
         # Check that records for students in assigned classes were created
         self.assertEqual(StudentFeeRecord.objects.count(), 3)
         self.assertTrue(StudentFeeRecord.objects.filter(student=self.student1, term=self.term).exists())
         self.assertTrue(StudentFeeRecord.objects.filter(student=self.student2, term=self.term).exists())
         self.assertTrue(StudentFeeRecord.objects.filter(student=self.student3, term=self.term).exists())
+        self.assertFalse(FeeSyncState.objects.get(term=self.term).is_pending)
 
     def test_sfr_list_view_post_update_discount_single_class(self):
         """Test updating discounts via POST for one class."""
-        # Ensure records exist first by making a GET request
-        self.client.get(self.sfr_list_url)
+        # Ensure records exist first by running the fee sync
+        run_fee_sync(self.term)
         record1 = StudentFeeRecord.objects.get(student=self.student1, term=self.term)
         record2 = StudentFeeRecord.objects.get(student=self.student2, term=self.term)
         record3 = StudentFeeRecord.objects.get(student=self.student3, term=self.term) # Belongs to class2
@@ -148,7 +162,7 @@ class FinancialViewTests(TestCase):
 
     def test_sfr_list_view_post_update_waiver_single_class(self):
         """Test updating waivers via POST for one class."""
-        self.client.get(self.sfr_list_url) # Create records
+        run_fee_sync(self.term) # Create records
         record1 = StudentFeeRecord.objects.get(student=self.student1, term=self.term)
         record2 = StudentFeeRecord.objects.get(student=self.student2, term=self.term)
 
@@ -537,13 +551,19 @@ class FinancialViewTests(TestCase):
 
         FeeAssignment.objects.filter(term=self.term, class_instance=self.class1).delete()
 
-        response = self.client.post(self.rollover_url, {
-            'source_term': previous_term.pk,
-            'target_term': self.term.pk,
-            'carry_forward_adjustments': 'on',
-        })
+        # The rollover runs as a background job queued on commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.rollover_url, {
+                'source_term': previous_term.pk,
+                'target_term': self.term.pk,
+                'carry_forward_adjustments': 'on',
+            })
 
         self.assertEqual(response.status_code, 302)
+        job = RolloverJob.objects.get()
+        self.assertRedirects(response, reverse('rollover_job_detail', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.summary['fee_assignments'], {'created': 1, 'updated': 0, 'unchanged': 0})
         new_assignment = FeeAssignment.objects.get(term=self.term, class_instance=self.class1)
         self.assertEqual(new_assignment.amount, Decimal('42000.00'))
 
@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
 from core.models import Term, Session
 
 
@@ -82,32 +86,37 @@ def log_activity(user, activity_type, description='', related_model='', related_
         related_model: Optional model name the activity is related to
         related_id: Optional ID of the related object
         request: Optional Django request object to extract IP and user agent
+
+    The event is stamped now but written according to ACTIVITY_LOG_MODE: immediately ('sync'),
+    in batches from a per-process buffer ('buffered'), or in batches by the Celery worker
+    ('queue'). See core.activity_services.
     """
-    from core.models import ActivityLog
-    
-    ip_address = None
-    user_agent = ''
-    
-    if request:
-        # Get client IP
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0]
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
-        
-        # Get user agent
-        user_agent = request.META.get('HTTP_USER_AGENT', '')
-    
-    ActivityLog.objects.create(
-        user=user,
-        activity_type=activity_type,
-        description=description,
-        related_model=related_model,
-        related_id=related_id,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
+    from core.activity_services import build_activity_event, record_activity
+
+    record_activity(build_activity_event(
+        user, activity_type, description=description, related_model=related_model, related_id=related_id,
+        request=request,
+    ))
+
+
+@contextmanager
+def count_queries(using=None):
+    """
+    Counts the database queries executed inside the block, without needing DEBUG.
+
+    Usage:
+        with count_queries() as counter:
+            ...
+        counter['count']
+    """
+    counter = {'count': 0}
+
+    def _wrapper(execute, sql, params, many, context):
+        counter['count'] += 1
+        return execute(sql, params, many, context)
+
+    with connections[using or DEFAULT_DB_ALIAS].execute_wrapper(_wrapper):
+        yield counter
 
 
 def get_current_term():
@@ -1,5 +1,5 @@
 import json
-from urllib.parse import quote
+from urllib.parse import quote, urljoin
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -12,7 +12,7 @@ from django.contrib import messages
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView, TemplateView, FormView
 from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
-from django.http import HttpResponseBadRequest, JsonResponse, Http404
+from django.http import FileResponse, HttpResponseBadRequest, JsonResponse, Http404
 from django.core.mail import send_mail, BadHeaderError
 from django.shortcuts import HttpResponse
 from django.template.loader import render_to_string
@@ -21,12 +21,12 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
 from django.templatetags.static import static
 from decimal import Decimal, InvalidOperation
-from datetime import timedelta
+from datetime import date, timedelta
 from core.models import Session, Term, CustomUser, Student, Teacher, Guardian, Notification
-from core.models import Class, Subject, FeeAssignment, Enrollment, Payment, PaymentReceipt, Assignment, Assessment, Exam
-from core.models import SubjectAssignment, TeacherAssignment, ClassSubjectAssignment, Attendance
-from core.models import SubjectResult, Result, StudentFeeRecord, FinancialRecord, Message
-from core.models import OnlineQuestion, AssignmentSubmission, AssessmentSubmission, ExamSubmission, SessionalResult, CumulativeRecord
+from core.models import Class, Subject, FeeAssignment, Payment, PaymentReceipt, Assignment, Assessment, Exam
+from core.models import SubjectAssignment, TeacherAssignment, ClassSubjectAssignment
+from core.models import SubjectResult, Result, StudentFeeRecord, FinancialRecord, FeeSyncState, Message, RolloverJob, ReportCardJob
+from core.models import OnlineQuestion, AssignmentSubmission, AssessmentSubmission, ExamSubmission, SessionalResult, CumulativeRecord, SessionalBroadsheetRow
 from core.utils import get_current_term, get_next_term   
 from core.forms import ClassSubjectAssignmentForm, NonAcademicSkillsForm, NotificationForm, ContactForm, MessageForm, ReplyForm
 from core.session.forms import SessionForm
@@ -45,13 +45,31 @@ from core.finance_services import (
     allocate_bulk_payment,
     build_bulk_payment_preview,
     create_payment_receipt,
+    deferred_financial_rebuilds,
     get_previous_term,
     get_bulk_payment_candidates,
-    rollover_fee_assignments,
+    get_finance_summary,
+    payment_collection_trends,
+    post_payments,
+    request_fee_sync,
+    update_payment,
+)
+from core.rollover_services import (
+    ROLLOVER_KINDS,
+    preview_rollover,
+    resume_rollover_job,
+    rollover_term,
+    session_term_pairs,
+    start_rollover_job,
     summarize_fee_rollover,
-    sync_student_fee_records_for_term,
 )
 from core.fee_assignment.forms import FeeAssignmentRolloverForm
+from core.activity_services import weekly_activity_summary
+from core.dashboard_services import attach_activity_context, get_dashboard_snapshot
+from core.pdf_services import PDF_AVAILABLE, cached_receipt_pdf
+from core.report_card_services import report_card_output_path, retry_report_card_job, start_report_card_job
+from core.results.forms import ReportCardJobForm
+from core.result_services import build_sessional_broadsheets, build_term_broadsheets, queue_sessional_broadsheet_refresh
 from core.system_settings import SystemSettings
 import logging
 
@@ -149,175 +167,12 @@ def _prepare_receipt_display(receipt):
     )
     return receipt
 
-# Rollover Utility Functions
-def rollover_term_assignments(source_term, target_term, request):
-    """
-    Rollover all assignments from source term to target term.
-    Includes: TeacherAssignments, ClassSubjectAssignments, SubjectAssignments
-    """
-    total_rolled_over = 0
-    
-    try:
-        with transaction.atomic():
-            # 1. Rollover Teacher Assignments
-            teacher_assignments = TeacherAssignment.objects.filter(
-                session=source_term.session, term=source_term
-            )
-            if teacher_assignments.exists():
-                new_teacher_assignments = [
-                    TeacherAssignment(
-                        class_assigned=assignment.class_assigned,
-                        teacher=assignment.teacher,
-                        session=target_term.session,
-                        term=target_term,
-                        is_form_teacher=assignment.is_form_teacher
-                    )
-                    for assignment in teacher_assignments
-                ]
-                created = TeacherAssignment.objects.bulk_create(new_teacher_assignments, ignore_conflicts=True)
-                total_rolled_over += len(created)
-            
-            # 2. Rollover Class Subject Assignments
-            class_subject_assignments = ClassSubjectAssignment.objects.filter(
-                session=source_term.session, term=source_term
-            )
-            if class_subject_assignments.exists():
-                new_class_subject_assignments = [
-                    ClassSubjectAssignment(
-                        class_assigned=assignment.class_assigned,
-                        subject=assignment.subject,
-                        session=target_term.session,
-                        term=target_term
-                    )
-                    for assignment in class_subject_assignments
-                ]
-                created = ClassSubjectAssignment.objects.bulk_create(new_class_subject_assignments, ignore_conflicts=True)
-                total_rolled_over += len(created)
-            
-            # 3. Rollover Subject Teacher Assignments
-            subject_assignments = SubjectAssignment.objects.filter(
-                session=source_term.session, term=source_term
-            )
-            if subject_assignments.exists():
-                new_subject_assignments = [
-                    SubjectAssignment(
-                        class_assigned=assignment.class_assigned,
-                        subject=assignment.subject,
-                        teacher=assignment.teacher,
-                        session=target_term.session,
-                        term=target_term
-                    )
-                    for assignment in subject_assignments
-                ]
-                created = SubjectAssignment.objects.bulk_create(new_subject_assignments, ignore_conflicts=True)
-                total_rolled_over += len(created)
-        
-        if total_rolled_over > 0:
-            messages.success(
-                request,
-                f"Successfully rolled over {total_rolled_over} assignments from {source_term} to {target_term}."
-            )
-        else:
-            messages.info(request, f"No new assignments to rollover from {source_term}.")
-    
-    except Exception as e:
-        messages.error(request, f"Error during rollover: {e}")
-
-
-def rollover_session_assignments(source_session, target_session, request):
-    """
-    Rollover all assignments from source session to target session.
-    This copies all terms and their assignments.
-    """
-    total_rolled_over = 0
-    
-    try:
-        with transaction.atomic():
-            # Get all terms from source session
-            source_terms = Term.objects.filter(session=source_session).order_by('order')
-            
-            if not source_terms.exists():
-                messages.warning(request, f"No terms found in {source_session} to rollover.")
-                return
-            
-            # For each term in source session, rollover to corresponding term in target session
-            for source_term in source_terms:
-                # Try to find or create corresponding term in target session
-                target_term, created = Term.objects.get_or_create(
-                    session=target_session,
-                    order=source_term.order,
-                    defaults={
-                        'name': source_term.name,
-                        'start_date': source_term.start_date,
-                        'end_date': source_term.end_date,
-                        'is_active': False,
-                    }
-                )
-                
-                # Rollover assignments for this term
-                # 1. Teacher Assignments
-                teacher_assignments = TeacherAssignment.objects.filter(
-                    session=source_session, term=source_term
-                )
-                if teacher_assignments.exists():
-                    new_teacher_assignments = [
-                        TeacherAssignment(
-                            class_assigned=assignment.class_assigned,
-                            teacher=assignment.teacher,
-                            session=target_session,
-                            term=target_term,
-                            is_form_teacher=assignment.is_form_teacher
-                        )
-                        for assignment in teacher_assignments
-                    ]
-                    created_count = len(TeacherAssignment.objects.bulk_create(new_teacher_assignments, ignore_conflicts=True))
-                    total_rolled_over += created_count
-                
-                # 2. Class Subject Assignments
-                class_subject_assignments = ClassSubjectAssignment.objects.filter(
-                    session=source_session, term=source_term
-                )
-                if class_subject_assignments.exists():
-                    new_class_subject_assignments = [
-                        ClassSubjectAssignment(
-                            class_assigned=assignment.class_assigned,
-                            subject=assignment.subject,
-                            session=target_session,
-                            term=target_term
-                        )
-                        for assignment in class_subject_assignments
-                    ]
-                    created_count = len(ClassSubjectAssignment.objects.bulk_create(new_class_subject_assignments, ignore_conflicts=True))
-                    total_rolled_over += created_count
-                
-                # 3. Subject Teacher Assignments
-                subject_assignments = SubjectAssignment.objects.filter(
-                    session=source_session, term=source_term
-                )
-                if subject_assignments.exists():
-                    new_subject_assignments = [
-                        SubjectAssignment(
-                            class_assigned=assignment.class_assigned,
-                            subject=assignment.subject,
-                            teacher=assignment.teacher,
-                            session=target_session,
-                            term=target_term
-                        )
-                        for assignment in subject_assignments
-                    ]
-                    created_count = len(SubjectAssignment.objects.bulk_create(new_subject_assignments, ignore_conflicts=True))
-                    total_rolled_over += created_count
-        
-        if total_rolled_over > 0:
-            messages.success(
-                request,
-                f"Successfully rolled over {total_rolled_over} assignments from {source_session} to {target_session}."
-            )
-        else:
-            messages.info(request, f"No new assignments to rollover from {source_session}.")
-    
-    except Exception as e:
-        messages.error(request, f"Error during session rollover: {e}")
+def _rollover_preview_rows(term_pairs):
+    """Dry-run rollover counts as labelled rows for the session and term forms."""
+    return [
+        {'label': ROLLOVER_KINDS[kind]['label'], **counts}
+        for kind, counts in preview_rollover(term_pairs).items()
+    ]
 
 # Create your views here.
 
@@ -416,142 +271,11 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
         active_term = Term.objects.filter(is_active=True).select_related('session').first()
         active_session = active_term.session if active_term else None
         
-        # Debug output
-        print(f"DEBUG - Active Term: {active_term}")
-        print(f"DEBUG - Active Session: {active_session}")
-        if active_term:
-            print(f"DEBUG - Term: {active_term.name}, Session: {active_session.name if active_session else 'None'}")
-        
-        # === STUDENT STATISTICS ===
-        student_count = Student.objects.filter(status='active').count()
-        dormant_students = Student.objects.filter(status='dormant').count()
-        left_students = Student.objects.filter(status='left').count()
-        total_students = Student.objects.count()
-        male_students = Student.objects.filter(status='active', gender='male').count()
-        female_students = Student.objects.filter(status='active', gender='female').count()
-        
-        # New students in last 30 days
-        new_students_count = Student.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-        
-        # === TEACHER STATISTICS ===
-        teacher_count = Teacher.objects.filter(status='active').count()
-        dormant_teachers = Teacher.objects.filter(status='dormant').count()
-        new_teachers_count = Teacher.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-        
-        # === GUARDIAN STATISTICS ===
-        guardian_count = Guardian.objects.filter(status='active').count()
-        new_guardians_count = Guardian.objects.filter(user__date_joined__gte=thirty_days_ago).count()
-        
-        # === ACADEMIC STRUCTURE ===
-        class_count = Class.objects.count()
-        subject_count = Subject.objects.count()
-        
-        # === STUDENT DEMOGRAPHICS ===
-        from datetime import date
-        from django.db.models import Avg
-        
-        # By Class Distribution
-        student_counts_by_class = []
-        for cls in Class.objects.all().order_by('order'):
-            count = Enrollment.objects.filter(
-                class_enrolled=cls,
-                term=active_term if active_term else None,
-                is_active=True
-            ).count() if active_term else Student.objects.filter(status='active').count()
-            if count > 0:
-                cls.student_count = count
-                student_counts_by_class.append(cls)
-        
-        student_counts_by_class_labels = [c.name for c in student_counts_by_class] if student_counts_by_class else []
-        student_counts_by_class_data = [c.student_count for c in student_counts_by_class] if student_counts_by_class else []
-        
-        # By Gender Distribution
-        male_count = Student.objects.filter(status='active', gender='M').count()
-        female_count = Student.objects.filter(status='active', gender='F').count()
-        
-        # Debug gender data
-        print(f"DEBUG - Male count: {male_count}")
-        print(f"DEBUG - Female count: {female_count}")
-        print(f"DEBUG - All genders: {list(Student.objects.filter(status='active').values_list('gender', flat=True).distinct())}")
-        
-        gender_labels = ['Male', 'Female']
-        gender_data = [male_count, female_count]
-        
-        # By Age Distribution (group by age ranges)
-        today = date.today()
-        age_ranges = {
-            '5-7': 0,
-            '8-10': 0,
-            '11-13': 0,
-            '14-16': 0,
-            '17+': 0
-        }
-        
-        for student in Student.objects.filter(status='active'):
-            if student.date_of_birth:
-                age = today.year - student.date_of_birth.year - ((today.month, today.day) < (student.date_of_birth.month, student.date_of_birth.day))
-                if age <= 7:
-                    age_ranges['5-7'] += 1
-                elif age <= 10:
-                    age_ranges['8-10'] += 1
-                elif age <= 13:
-                    age_ranges['11-13'] += 1
-                elif age <= 16:
-                    age_ranges['14-16'] += 1
-                else:
-                    age_ranges['17+'] += 1
-        
-        age_labels = list(age_ranges.keys())
-        age_data = list(age_ranges.values())
-        
-        # By Performance (percentile grouping)
-        if active_term:
-            # Get all students with results
-            students_with_results = Result.objects.filter(
-                term=active_term,
-                is_approved=True
-            ).values_list('average_score', flat=True)
-            
-            if students_with_results:
-                performance_ranges = {
-                    'Excellent (80-100)': 0,
-                    'Very Good (70-79)': 0,
-                    'Good (60-69)': 0,
-                    'Average (50-59)': 0,
-                    'Below Average (<50)': 0
-                }
-                
-                for score in students_with_results:
-                    if score is not None:
-                        if score >= 80:
-                            performance_ranges['Excellent (80-100)'] += 1
-                        elif score >= 70:
-                            performance_ranges['Very Good (70-79)'] += 1
-                        elif score >= 60:
-                            performance_ranges['Good (60-69)'] += 1
-                        elif score >= 50:
-                            performance_ranges['Average (50-59)'] += 1
-                        else:
-                            performance_ranges['Below Average (<50)'] += 1
-                
-                performance_labels = list(performance_ranges.keys())
-                performance_data = list(performance_ranges.values())
-                
-                # Debug performance data
-                print(f"DEBUG - Performance labels: {performance_labels}")
-                print(f"DEBUG - Performance data: {performance_data}")
-            else:
-                performance_labels = []
-                performance_data = []
-                print("DEBUG - No students with results found")
-        else:
-            performance_labels = []
-            performance_data = []
-            print("DEBUG - No active term for performance calculation")
-        
-        print(f"DEBUG - Chart Labels: {student_counts_by_class_labels}")
-        print(f"DEBUG - Chart Data: {student_counts_by_class_data}")
-        
+        # === HEADLINE METRICS (precomputed snapshot, see core.dashboard_services) ===
+        snapshot = get_dashboard_snapshot('admin', active_term)
+        metrics = snapshot.payload
+        student_count = metrics['student_count']
+
         # Top performing classes - calculate through student results average_score
         top_classes = Class.objects.annotate(
             avg_score=Avg('enrollment__student__result__average_score', filter=Q(
@@ -563,9 +287,6 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
         
         # === ACADEMIC PERFORMANCE ===
         if active_term:
-            # Results - count through Result model
-            approved_results = Result.objects.filter(term=active_term, is_approved=True).count()
-            pending_results = Result.objects.filter(term=active_term, is_approved=False).count()
             recent_results = Result.objects.filter(term=active_term, is_approved=True).select_related(
                 'student', 'term'
             ).order_by('-id')[:5]
@@ -584,37 +305,14 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
             exam_submissions = ExamSubmission.objects.filter(exam__term=active_term).count()
             pending_exams = Exam.objects.filter(term=active_term, is_approved=False).count()
             
-            # Average GPA from Result model
-            avg_gpa_result = Result.objects.filter(
-                term=active_term,
-                is_approved=True,
-                term_gpa__isnull=False
-            ).aggregate(avg_gpa=Avg('term_gpa'))
-            avg_gpa = avg_gpa_result['avg_gpa'] if avg_gpa_result['avg_gpa'] else 0
         else:
-            approved_results = pending_results = 0
             recent_results = []
             total_assignments = assignment_submissions = 0
             total_assessments = assessment_submissions = pending_assessments = 0
             total_exams = exam_submissions = pending_exams = 0
-            avg_gpa = 0
         
         # === FINANCIAL OVERVIEW ===
         if active_term:
-            total_fees_expected = FinancialRecord.objects.filter(term=active_term).aggregate(
-                total=Sum('total_fee')
-            )['total'] or 0
-            
-            total_collected = FinancialRecord.objects.filter(term=active_term).aggregate(
-                total=Sum('total_paid')
-            )['total'] or 0
-            
-            outstanding_fees = FinancialRecord.objects.filter(term=active_term).aggregate(
-                total=Sum('outstanding_balance')
-            )['total'] or 0
-            
-            collection_rate = (total_collected / total_fees_expected * 100) if total_fees_expected > 0 else 0
-            
             # Recent payments
             recent_payment_stats = Payment.objects.filter(
                 payment_date__gte=thirty_days_ago
@@ -632,18 +330,9 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
                 user_id__in=FinancialRecord.objects.filter(term=active_term).values_list('student_id', flat=True)
             ).count()
         else:
-            total_fees_expected = total_collected = outstanding_fees = collection_rate = 0
             recent_payment_amount = recent_payment_count = 0
             students_without_fees = 0
         
-        # === ATTENDANCE ===
-        if active_term:
-            total_attendance_records = Attendance.objects.filter(term=active_term).count()
-            present_records = Attendance.objects.filter(term=active_term, is_present=True).count()
-            attendance_rate = (present_records / total_attendance_records * 100) if total_attendance_records > 0 else 0
-        else:
-            total_attendance_records = present_records = attendance_rate = 0
-        
         # === ENGAGEMENT ===
         try:
             from lsalms.models import Message
@@ -685,10 +374,6 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
             'user', 'student_guardian__user', 'current_class'
         ).order_by('-user__date_joined')[:10]
         
-        print(f"DEBUG - Recent Students Count: {recent_students.count()}")
-        if recent_students:
-            print(f"DEBUG - Latest Student: {recent_students[0].user.get_full_name()}")
-        
         # Recent teachers (last 30 days)
         new_teachers = Teacher.objects.select_related('user').filter(
             user__date_joined__gte=thirty_days_ago
@@ -699,9 +384,6 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
             user__date_joined__gte=thirty_days_ago
         ).order_by('-user__date_joined')[:10]
         
-        print(f"DEBUG - New Teachers Count: {new_teachers.count()}")
-        print(f"DEBUG - New Guardians Count: {new_guardians.count()}")
-        
         # === WEEKLY ACTIVITY ANALYTICS ===
         weekly_analytics = None
         if active_term:
@@ -747,42 +429,23 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
                     'is_current': week_num == current_week_number
                 })
             
-            # Teacher Activities
-            teacher_activities = ActivityLog.objects.filter(
-                user__role='teacher',
+            # Recent activity feeds: the 20 latest rows per role, an index range read.
+            week_activities = ActivityLog.objects.filter(
                 created_at__range=(week_start_dt, week_end_dt)
-            ).select_related('user').order_by('-created_at')[:20]
-            
-            # Count unique teachers
-            active_teachers_count = ActivityLog.objects.filter(
-                user__role='teacher',
-                created_at__range=(week_start_dt, week_end_dt)
-            ).values('user').distinct().count()
-            
-            # Guardian Activities
-            guardian_activities = ActivityLog.objects.filter(
-                user__role='guardian',
-                created_at__range=(week_start_dt, week_end_dt)
-            ).select_related('user').order_by('-created_at')[:20]
-            
-            # Count unique guardians
-            active_guardians_count = ActivityLog.objects.filter(
-                user__role='guardian',
-                created_at__range=(week_start_dt, week_end_dt)
-            ).values('user').distinct().count()
-            
-            # Student Activities  
-            student_activities = ActivityLog.objects.filter(
-                user__role='student',
-                created_at__range=(week_start_dt, week_end_dt)
-            ).select_related('user').order_by('-created_at')[:20]
-            
-            # Count unique students
-            active_students_count = ActivityLog.objects.filter(
-                user__role='student',
-                created_at__range=(week_start_dt, week_end_dt)
-            ).values('user').distinct().count()
-            
+            ).select_related('user').order_by('-created_at')
+            teacher_activities = week_activities.filter(user__role='teacher')[:20]
+            guardian_activities = week_activities.filter(user__role='guardian')[:20]
+            student_activities = week_activities.filter(user__role='student')[:20]
+
+            # Weekly totals and distinct active users come from the daily rollups.
+            week_summary = weekly_activity_summary(week_start, week_end)
+
+            # Class and ward labels for all three feeds are resolved together, not per row.
+            teacher_activities, guardian_activities, student_activities = (
+                list(teacher_activities), list(guardian_activities), list(student_activities),
+            )
+            attach_activity_context(teacher_activities + guardian_activities + student_activities, active_term)
+
             weekly_analytics = {
                 'current_week': selected_week,
                 'actual_current_week': current_week_number,
@@ -791,11 +454,14 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
                 'total_weeks': total_weeks,
                 'available_weeks': available_weeks,
                 'teacher_activities': teacher_activities,
-                'active_teachers_count': active_teachers_count,
+                'teacher_event_count': week_summary['teacher']['events'],
+                'active_teachers_count': week_summary['teacher']['users'],
                 'guardian_activities': guardian_activities,
-                'active_guardians_count': active_guardians_count,
+                'guardian_event_count': week_summary['guardian']['events'],
+                'active_guardians_count': week_summary['guardian']['users'],
                 'student_activities': student_activities,
-                'active_students_count': active_students_count,
+                'student_event_count': week_summary['student']['events'],
+                'active_students_count': week_summary['student']['users'],
             }
         
         # === ACADEMIC PERFORMANCE TRENDS ===
@@ -806,12 +472,8 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
                 order__lt=active_term.order
             ).order_by('-order').first() if active_session else None
             
-            # Current term average
-            current_term_avg = Result.objects.filter(
-                term=active_term,
-                is_approved=True
-            ).aggregate(avg=Avg('average_score'))['avg'] or 0
-            
+            current_term_avg = Decimal(str(metrics['current_term_avg']))
+
             # Previous term average for comparison
             previous_term_avg = Result.objects.filter(
                 term=previous_term,
@@ -945,74 +607,40 @@ class AdminDashboardView(AdminRequiredMixin, TemplateView):
         one_hour_ago = now - timedelta(hours=1)
         active_now = CustomUser.objects.filter(last_login__gte=one_hour_ago).count()
         
-        # Debug output for key stats
-        print(f"DEBUG - Student Count: {student_count}")
-        print(f"DEBUG - Teacher Count: {teacher_count}")
-        print(f"DEBUG - Collection Rate: {collection_rate}%")
-        print(f"DEBUG - Total Assignments: {total_assignments if active_term else 'N/A'}")
-        
         # Build context
+        context.update(metrics)
         context.update({
-            # Core Statistics
-            'student_count': student_count,
-            'dormant_students': dormant_students,
-            'left_students': left_students,
-            'total_students': total_students,
-            'teacher_count': teacher_count,
-            'dormant_teachers': dormant_teachers,
-            'guardian_count': guardian_count,
-            'class_count': class_count,
-            'subject_count': subject_count,
+            # Snapshot freshness
+            'snapshot_refreshed_at': snapshot.refreshed_at,
+            'snapshot_is_stale': snapshot.is_stale,
             
             # Growth Trends
-            'new_students': new_students_count,
             'new_teachers': new_teachers,
             'new_guardians': new_guardians,
             
             # Academic Performance
             'active_term': active_term,
             'active_session': active_session,
-            'approved_results': approved_results,
-            'pending_results': pending_results,
             'total_assignments': total_assignments,
             'total_assessments': total_assessments,
             'total_exams': total_exams,
             'assignment_submissions': assignment_submissions,
             'assessment_submissions': assessment_submissions,
             'exam_submissions': exam_submissions,
-            'avg_gpa': round(float(avg_gpa), 2) if avg_gpa else 0,
+            'avg_gpa': round(float(metrics['avg_gpa']), 2) if metrics['avg_gpa'] else 0,
             
             # Financial Overview
-            'total_fees_expected': total_fees_expected,
-            'total_collected': total_collected,
-            'outstanding_fees': outstanding_fees,
-            'collection_rate': round(float(collection_rate), 1),
+            'collection_rate': round(float(metrics['collection_rate']), 1),
             'recent_payment_amount': recent_payment_amount,
             'recent_payment_count': recent_payment_count,
             
             # Attendance
-            'attendance_rate': round(float(attendance_rate), 1),
-            'total_attendance_records': total_attendance_records,
-            'present_records': present_records,
+            'attendance_rate': round(float(metrics['attendance_rate']), 1),
             
             # Engagement
             'recent_messages': recent_messages,
             'active_notifications': active_notifications,
             
-            # Charts Data
-            'student_counts_by_class_labels': student_counts_by_class_labels,
-            'student_counts_by_class_data': student_counts_by_class_data,
-            'male_students': male_students,
-            'female_students': female_students,
-            
-            # Demographics Charts
-            'gender_labels': gender_labels,
-            'gender_data': gender_data,
-            'age_labels': age_labels,
-            'age_data': age_data,
-            'performance_labels': performance_labels,
-            'performance_data': performance_data,
-            
             # Recent Activities
             'recent_students': recent_students,
             'recent_results': recent_results,
@@ -1173,6 +801,9 @@ class SessionCreateView(AdminRequiredMixin, CreateView):
             'is_update': False,
             'show_rollover_option': show_rollover_option,
             'previous_session': previous_session,
+            'rollover_preview': _rollover_preview_rows(
+                session_term_pairs(previous_session, None, create_missing=False)
+            ) if previous_session else None,
         }
         return render(request, self.template_name, context)
 
@@ -1182,13 +813,19 @@ class SessionCreateView(AdminRequiredMixin, CreateView):
             new_session = form.save()
             
             # Handle rollover if checkbox is checked
+            job = None
             rollover_assignments = request.POST.get('rollover_assignments') == 'on'
             if rollover_assignments:
                 previous_session = Session.objects.exclude(pk=new_session.pk).order_by('-start_date').first()
                 if previous_session:
-                    rollover_session_assignments(previous_session, new_session, request)
+                    job = start_rollover_job(
+                        'session', previous_session, new_session, requested_by=request.user,
+                    )
             
             messages.success(request, f"Session '{new_session}' created successfully!")
+            if job:
+                # The copy runs as a background job; its page reports progress.
+                return redirect('rollover_job_detail', pk=job.pk)
             return redirect('session_list')
         
         previous_session = Session.objects.order_by('-start_date').first()
@@ -1240,6 +877,33 @@ class SessionDeleteView(AdminRequiredMixin, DeleteView):
         session.delete()
         return redirect('session_list')
 
+class RolloverJobDetailView(AdminRequiredMixin, DetailView):
+    """Progress of a background rollover; `?format=json` serves the same data for polling."""
+    model = RolloverJob
+    template_name = 'setup/rollover_job_detail.html'
+    context_object_name = 'job'
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json':
+            return JsonResponse(self.get_object().as_dict())
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['kind_rows'] = [
+            {'label': ROLLOVER_KINDS[kind]['label'], **self.object.summary.get(kind, {})}
+            for kind in self.object.kinds
+        ]
+        return context
+
+    def post(self, request, *args, **kwargs):
+        job = self.get_object()
+        if resume_rollover_job(job):
+            messages.success(request, 'Rollover resumed. Steps that already finished will be skipped.')
+        else:
+            messages.info(request, 'Only a failed rollover can be resumed.')
+        return redirect('rollover_job_detail', pk=job.pk)
+
 # Term Management
 class TermListView(AdminRequiredMixin, ListView):
     template_name = 'setup/term_list.html'
@@ -1269,6 +933,7 @@ class TermCreateView(AdminRequiredMixin, CreateView):
             'is_update': False,
             'show_rollover_option': show_rollover_option,
             'previous_term': current_term,
+            'rollover_preview': _rollover_preview_rows([(current_term, None)]) if current_term else None,
         }
         return render(request, self.template_name, context)
 
@@ -1278,13 +943,17 @@ class TermCreateView(AdminRequiredMixin, CreateView):
             new_term = form.save()
             
             # Handle rollover if checkbox is checked
+            job = None
             rollover_assignments = request.POST.get('rollover_assignments') == 'on'
             if rollover_assignments:
                 previous_term = Term.objects.exclude(pk=new_term.pk).order_by('-start_date').first()
                 if previous_term:
-                    rollover_term_assignments(previous_term, new_term, request)
+                    job = start_rollover_job('term', previous_term, new_term, requested_by=request.user)
             
             messages.success(request, f"Term '{new_term}' created successfully!")
+            if job:
+                # The copy runs as a background job; its page reports progress.
+                return redirect('rollover_job_detail', pk=job.pk)
             return redirect('term_list')
         
         current_term = Term.get_current_term()
@@ -1639,34 +1308,16 @@ class TeacherAssignmentRolloverView(AdminRequiredMixin, ListView):
              messages.warning(request, f"Assignments already exist for {next_term}. Rollover cancelled.")
              return redirect('teacher_assignment_list')
 
-        assignments_to_copy = TeacherAssignment.objects.filter(
-            session=current_term.session, term=current_term
-        )
-
-        if not assignments_to_copy.exists():
-             messages.info(request, f"No assignments found in {current_term} to roll over.")
-             return redirect('teacher_assignment_list')
-
-        new_assignments = []
-        for assignment in assignments_to_copy:
-            new_assignments.append(
-                TeacherAssignment(
-                    class_assigned=assignment.class_assigned,
-                    teacher=assignment.teacher,
-                    session=next_term.session, 
-                    term=next_term,
-                    is_form_teacher=assignment.is_form_teacher
-                )
-            )
-
         try:
-            # Requires PostgreSQL, SQLite >= 3.24, MySQL >= 8.0.19
-            with transaction.atomic():
-                TeacherAssignment.objects.bulk_create(new_assignments, ignore_conflicts=True)
-            messages.success(request, f"Successfully rolled over {len(new_assignments)} assignments from {current_term} to {next_term}.")
+            counts = rollover_term(current_term, next_term, ['teacher_assignments'])['teacher_assignments']
         except Exception as e:
             messages.error(request, f"An error occurred during rollover: {e}")
+            return redirect('teacher_assignment_list')
 
+        if counts['created']:
+            messages.success(request, f"Successfully rolled over {counts['created']} assignments from {current_term} to {next_term}.")
+        else:
+            messages.info(request, f"No assignments found in {current_term} to roll over.")
         return redirect('teacher_assignment_list')
 
 class TeacherAssignmentDetailView(AdminRequiredMixin, DetailView):
@@ -1901,32 +1552,16 @@ class ClassSubjectRolloverView(AdminRequiredMixin, ListView):
              messages.warning(request, f"Assignments already exist for {next_term}. Rollover cancelled.")
              return redirect('class_subjects')
 
-        assignments_to_copy = ClassSubjectAssignment.objects.filter(
-            session=current_term.session, term=current_term
-        )
-
-        if not assignments_to_copy.exists():
-             messages.info(request, f"No subject assignments found in {current_term} to roll over.")
-             return redirect('class_subjects')
-
-        new_assignments = []
-        for assignment in assignments_to_copy:
-            new_assignments.append(
-                ClassSubjectAssignment(
-                    class_assigned=assignment.class_assigned,
-                    subject=assignment.subject,
-                    session=next_term.session, # Assign to the NEXT session/term
-                    term=next_term,
-                )
-            )
-
         try:
-            with transaction.atomic():
-                created_assignments = ClassSubjectAssignment.objects.bulk_create(new_assignments, ignore_conflicts=True)
-            messages.success(request, f"Successfully rolled over {len(created_assignments)} subject assignments from {current_term} to {next_term}.") # Count actual created
+            counts = rollover_term(current_term, next_term, ['class_subject_assignments'])['class_subject_assignments']
         except Exception as e:
             messages.error(request, f"An error occurred during rollover: {e}")
+            return redirect('class_subjects')
 
+        if counts['created']:
+            messages.success(request, f"Successfully rolled over {counts['created']} subject assignments from {current_term} to {next_term}.")
+        else:
+            messages.info(request, f"No subject assignments found in {current_term} to roll over.")
         return redirect('class_subjects')
 
 class DeleteClassSubjectAssigmentView(DeleteView, AdminRequiredMixin):
@@ -1966,78 +1601,11 @@ def broadsheets(request):
 @login_required
 def termly_broadsheet(request, term_id):
     term = get_object_or_404(Term.objects.select_related('session'), id=term_id)
-    session = term.session
-
-    # Check which classes have active students with results for this term
-    classes = Class.objects.filter(
-        enrolled_students__result__term=term,
-        enrolled_students__status='active'
-    ).distinct().order_by('order')
-
-    broadsheets = [] 
-    for class_obj in classes:
-        # Get subjects assigned to this class for the given term and session
-        subjects = Subject.objects.filter(
-            class_assignments__class_assigned=class_obj,
-            class_assignments__session=session,
-            class_assignments__term=term
-        ).distinct().order_by('name')
-
-        # Get all students currently in this class
-        students = Student.objects.filter(current_class=class_obj, status='active').order_by('user__last_name', 'user__first_name')
-
-        results_data = []
-        for student in students:
-            result = Result.objects.filter(student=student, term=term).first()
-            student_subject_results = {}
-            total_score_sum = Decimal('0.0')
-            gpa_points_sum = Decimal('0.0')
-            subject_count = 0
-
-            if result:
-                # Get all SubjectResult entries for this student/term, but only for the subjects in this class
-                subject_results_qs = result.subject_results.filter(subject__in=subjects)
-
-                for sr in subject_results_qs:
-                     # Check if any score has been entered to consider it 'active'
-                     if (sr.continuous_assessment_1 is not None or
-                         sr.continuous_assessment_2 is not None or
-                         sr.continuous_assessment_3 is not None or
-                         sr.assignment is not None or
-                         sr.oral_test is not None or
-                         sr.exam_score is not None):
-                        
-                        student_subject_results[sr.subject.id] = sr
-                        total_score_sum += sr.total_score()
-                        weight = Decimal(getattr(sr.subject, 'subject_weight', 1))
-                        gpa_points_sum += Decimal(sr.calculate_grade_point()) * weight
-                        subject_count += weight 
-
-            # Calculate the GPA for this student based ONLY on the subjects found and summed above
-            student_gpa = (gpa_points_sum / subject_count) if subject_count > 0 else Decimal('0.0')
-            
-            results_data.append({
-                'student': student,
-                'subject_results': student_subject_results,
-                'gpa': student_gpa.quantize(Decimal('0.01')),
-                'total_score': total_score_sum.quantize(Decimal('0.1')),
-                'is_approved': result.is_approved if result else False,
-            })
-        
-        # Sort students by the newly calculated total score and GPA
-        results_data.sort(key=lambda x: (x['total_score'], x['gpa']), reverse=True)
-
-        broadsheets.append({
-            'class': class_obj,
-            'subjects': subjects,
-            'results_data': results_data,
-            'is_approved': all(r['is_approved'] for r in results_data) if results_data else False, 
-        })
 
     context = {
         'term': term,
-        'session': session,
-        'broadsheets': broadsheets, 
+        'session': term.session,
+        'broadsheets': build_term_broadsheets(term),
     }
     return render(request, 'setup/termly_broadsheet.html', context)
 
@@ -2071,6 +1639,77 @@ def archive_termly_broadsheet(request, term_id):
     return JsonResponse({'error': "Invalid request"}, status=400)
 
 
+class ReportCardJobCreateView(AdminRequiredMixin, FormView):
+    """Queues a batch print of term report cards for one class or the whole term."""
+    form_class = ReportCardJobForm
+    template_name = 'setup/report_card_job_form.html'
+
+    def get_initial(self):
+        initial = super().get_initial()
+        for field in ('term', 'class_obj'):
+            if self.request.GET.get(field):
+                initial[field] = self.request.GET[field]
+        return initial
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recent_jobs'] = ReportCardJob.objects.select_related('term', 'class_obj')[:10]
+        return context
+
+    def form_valid(self, form):
+        if not PDF_AVAILABLE:
+            messages.error(self.request, 'PDF generation library (WeasyPrint) is not installed.')
+            return self.form_invalid(form)
+        job = start_report_card_job(
+            form.cleaned_data['term'],
+            form.cleaned_data['class_obj'],
+            output_format=form.cleaned_data['output_format'],
+            requested_by=self.request.user,
+        )
+        messages.success(self.request, 'Report cards are being generated.')
+        return redirect('report_card_job_detail', pk=job.pk)
+
+
+class ReportCardJobDetailView(AdminRequiredMixin, DetailView):
+    """Progress of a report card print run; `?format=json` serves the same data for polling."""
+    model = ReportCardJob
+    template_name = 'setup/report_card_job_detail.html'
+    context_object_name = 'job'
+
+    def get_queryset(self):
+        return ReportCardJob.objects.select_related('term', 'class_obj', 'requested_by')
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json':
+            return JsonResponse(self.get_object().as_dict())
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        job = self.get_object()
+        if retry_report_card_job(job):
+            messages.success(request, 'Report card generation restarted.')
+        else:
+            messages.info(request, 'Only a failed job can be restarted.')
+        return redirect('report_card_job_detail', pk=job.pk)
+
+
+class ReportCardJobDownloadView(AdminRequiredMixin, DetailView):
+    """Streams the merged PDF or zip of a finished report card job from PDF_CACHE_DIR."""
+    model = ReportCardJob
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        path = report_card_output_path(job) if job.status == 'completed' else None
+        if path is None:
+            raise Http404('This job has no report cards to download.')
+        scope = job.class_obj.name if job.class_obj else 'all_classes'
+        filename = "".join(c if c.isalnum() else "_" for c in f"report_cards_{job.term}_{scope}")
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename=f"{filename}.{job.output_format}",
+            content_type='application/pdf' if job.output_format == 'pdf' else 'application/zip',
+        )
+
+
 @user_passes_test(lambda u: u.is_superuser)
 def sessional_broadsheets(request):
     sessions = Session.objects.all().order_by('-start_date')
@@ -2080,82 +1719,18 @@ def sessional_broadsheets(request):
 @user_passes_test(lambda u: u.is_superuser)
 def admin_sessional_broadsheet(request, session_id):
     session = get_object_or_404(Session, id=session_id)
-    terms_in_session = Term.objects.filter(session=session).order_by('start_date')
+    terms_in_session = list(Term.objects.filter(session=session).order_by('start_date'))
 
-    if not terms_in_session.exists():
+    if not terms_in_session:
         messages.warning(request, f"No terms found for the {session.name} session.")
         return redirect('sessional_broadsheets') 
 
-    classes_in_session = Class.objects.filter(
-        enrolled_students__result__term__in=terms_in_session,
-        enrolled_students__status='active'
-    ).distinct().order_by('order') 
-
-    sessional_broadsheets_data = []
-    for class_obj in classes_in_session:
-        print(f"\n  Processing Class: '{class_obj.name}'")
-        subjects_in_class = Subject.objects.filter(
-            class_assignments__class_assigned=class_obj,
-            class_assignments__term__in=terms_in_session
-        ).distinct().order_by('name')
-
-        students_in_class = Student.objects.filter(
-            current_class=class_obj,
-            status='active'
-        ).select_related('user').order_by('user__last_name', 'user__first_name')
-
-        class_sessional_results_data = []
+    # The rows are kept current by the result signals and the worker; this page only reads them.
+    sessional_broadsheets_data = build_sessional_broadsheets(session, terms_in_session)
+    if not sessional_broadsheets_data:
+        queue_sessional_broadsheet_refresh(session.pk)
+        messages.info(request, f"The {session.name} broadsheet is being built. Reload the page in a moment.")
 
-        sessional_results_for_class = SessionalResult.objects.filter(
-            student__in=students_in_class,
-            session=session
-        )
-        sessional_results_map = {res.student_id: res for res in sessional_results_for_class}
-        
-        for student in students_in_class:
-            sessional_result = sessional_results_map.get(student.pk)
-            
-            if not sessional_result:
-                sessional_result, _ = SessionalResult.objects.get_or_create(student=student, session=session)
-                sessional_result.calculate_and_save_summary()
-                sessional_result.refresh_from_db()
-            
-            student_data = {
-                'student_obj': student,
-                'sessional_gpa': sessional_result.sessional_gpa,
-                'sessional_average': sessional_result.average_score,
-                'is_approved': sessional_result.is_approved,
-                'subject_rows': []
-            }
-          
-            for subject in subjects_in_class:
-                subject_summary = sessional_result.subject_summary_json.get(str(subject.id), {})
-                term_scores = [subject_summary.get('term_scores', {}).get(f'term_{term.id}_score') for term in terms_in_session]
-                student_data['subject_rows'].append({
-                    'subject_name': subject.name, 'term_scores': term_scores,
-                    'sessional_average': subject_summary.get('sessional_average')
-                })
-            class_sessional_results_data.append(student_data)
-        
-        class_sessional_results_data.sort(key=lambda x: x['sessional_gpa'] or Decimal('0.0'), reverse=True)
-
-        is_approved_flag = all(res['is_approved'] for res in class_sessional_results_data) if class_sessional_results_data else False
-        
-        if is_approved_flag:
-            status_text = "Approved & Published"
-            status_class = "bg-success"
-        else:
-            status_text = "Pending Approval"
-            status_class = "bg-warning text-dark"
-
-        sessional_broadsheets_data.append({
-            'class': class_obj, 'subjects': subjects_in_class,
-            'sessional_results_data': class_sessional_results_data,
-'           is_all_approved': is_approved_flag,
-            'status_text': status_text,         
-            'status_class': status_class,  
-        })
-    
     context = {
         'session': session,
         'terms_in_session': terms_in_session,
@@ -2187,6 +1762,10 @@ def approve_sessional_broadsheet(request, session_id, class_id):
         student_id__in=student_pks_to_update, 
         session=session
     ).update(is_approved=True, is_published=True)
+    SessionalBroadsheetRow.objects.filter(
+        student_id__in=student_pks_to_update,
+        session=session
+    ).update(is_approved=True)
     
     if updated_count > 0:
         print(f"  - Triggering Cumulative GPA update for {len(student_pks_to_update)} students...")
@@ -2253,15 +1832,9 @@ class FeeAssignmentCreateView(AdminRequiredMixin, CreateView):
     success_url = reverse_lazy('fee_assignment_list')
 
     def form_valid(self, form):
+        # Saving the assignment queues the background fee record sync (see core.signals).
         response = super().form_valid(form)
-        sync_student_fee_records_for_term(
-            self.object.term,
-            source_term=get_previous_term(self.object.term),
-            class_ids=[self.object.class_instance_id],
-            carry_forward_adjustments=True,
-            active_only=True,
-        )
-        messages.success(self.request, 'Fee assignment created successfully and assigned to students.')
+        messages.success(self.request, 'Fee assignment created successfully. Student fee records are being synced.')
         return response
 
 class FeeAssignmentUpdateView(AdminRequiredMixin, UpdateView):
@@ -2271,15 +1844,9 @@ class FeeAssignmentUpdateView(AdminRequiredMixin, UpdateView):
     success_url = reverse_lazy('fee_assignment_list')
 
     def form_valid(self, form):
+        # Saving the assignment queues the background fee record sync (see core.signals).
         response = super().form_valid(form)
-        sync_student_fee_records_for_term(
-            self.object.term,
-            source_term=get_previous_term(self.object.term),
-            class_ids=[self.object.class_instance_id],
-            carry_forward_adjustments=True,
-            active_only=True,
-        )
-        messages.success(self.request, 'Fee assignment updated successfully.')
+        messages.success(self.request, 'Fee assignment updated successfully. Student fee records are being synced.')
         return response
 
 
@@ -2314,21 +1881,19 @@ class FeeAssignmentRolloverView(AdminRequiredMixin, FormView):
         return context
 
     def form_valid(self, form):
-        result = rollover_fee_assignments(
-            source_term=form.cleaned_data['source_term'],
-            target_term=form.cleaned_data['target_term'],
-            overwrite_existing_assignments=form.cleaned_data['overwrite_existing_assignments'],
-            carry_forward_adjustments=form.cleaned_data['carry_forward_adjustments'],
+        job = start_rollover_job(
+            'term',
+            form.cleaned_data['source_term'],
+            form.cleaned_data['target_term'],
+            kinds=['fee_assignments'],
+            options={
+                'overwrite_existing': form.cleaned_data['overwrite_existing_assignments'],
+                'carry_forward_adjustments': form.cleaned_data['carry_forward_adjustments'],
+            },
+            requested_by=self.request.user,
         )
-        messages.success(
-            self.request,
-            (
-                f"Rollover completed: {result['created_assignments']} class fees created, "
-                f"{result['updated_assignments']} updated, {result['skipped_assignments']} unchanged. "
-                f"Student fee sync created {result['sync']['created']} records and updated {result['sync']['updated']}."
-            ),
-        )
-        return super().form_valid(form)
+        messages.success(self.request, 'Fee rollover started. Class fees and student fee records are being copied.')
+        return redirect('rollover_job_detail', pk=job.pk)
 
 class FeeAssignmentDetailView(DetailView):
     model = FeeAssignment
@@ -2368,29 +1933,18 @@ class StudentFeeRecordListView(AdminRequiredMixin, ListView):
                  messages.error(self.request, f"Configuration Error: {e}")
             return None
 
-    @transaction.atomic # Keep the transaction
-    def sync_fee_records(self, active_term):
+    records_per_page = 50
+
+    def get_queryset(self):
         """
-        Ensure fee records exist for the active term.
-        Pre-calculates net_fee for bulk_create.
-        Manually ensures FinancialRecord consistency after bulk_create.
-        Updates existing records via save() to trigger signals if amount changes.
+        Read-only: record counts per class for the term, plus one page of the selected class's
+        records. Fee records are created by the background sync (see request_fee_sync), not here.
         """
-        if not active_term:
-            return
-        sync_student_fee_records_for_term(
-            active_term,
-            source_term=get_previous_term(active_term),
-            carry_forward_adjustments=True,
-            active_only=True,
-        )
-    def get_queryset(self):
-        """Fetch and group records by class based on filters."""
         # Get term and class from query params
         selected_term_id = self.request.GET.get('term_id')
         selected_class_id = self.request.GET.get('class_id')
 
-        active_term = self.get_active_term() # Get active for default/sync trigger
+        active_term = self.get_active_term()
         target_term = None
 
         # Determine the term to display
@@ -2403,56 +1957,35 @@ class StudentFeeRecordListView(AdminRequiredMixin, ListView):
         else:
             target_term = active_term # Default to active if not specified
 
+        self.target_term = target_term
+        self.target_class = None
+        self.class_summaries = []
+        self.records_page = None
         if not target_term:
             messages.error(self.request, "Cannot determine term to display records for.")
             return {} # Return empty dict
 
-        # --- Run sync ONLY for the active term if needed ---
-        # Syncing historical terms might be complex/undesirable on every load
-        # Consider a separate sync mechanism if needed for old terms.
-        if target_term == active_term:
-             print(f"Running sync for ACTIVE term: {active_term}")
-             self.sync_fee_records(active_term)
-        else:
-            print(f"Displaying records for INACTIVE term: {target_term}. Sync skipped.")
-
+        term_records = StudentFeeRecord.objects.filter(term=target_term, student__current_class__isnull=False)
+        self.class_summaries = [
+            {'id': row['student__current_class_id'], 'name': row['student__current_class__name'], 'count': row['count']}
+            for row in term_records.values('student__current_class_id', 'student__current_class__name')
+            .annotate(count=Count('pk')).order_by('student__current_class__name')
+        ]
+        if not self.class_summaries:
+            return {}
 
-        # Base queryset filtered by the target term
-        queryset = StudentFeeRecord.objects.filter(term=target_term)
+        summaries_by_id = {str(summary['id']): summary for summary in self.class_summaries}
+        if selected_class_id and selected_class_id not in summaries_by_id:
+            messages.warning(self.request, "Invalid Class specified, showing the first class for the term.")
+        summary = summaries_by_id.get(selected_class_id) or self.class_summaries[0]
+        self.target_class = Class(pk=summary['id'], name=summary['name'])
 
-        # Further filter by class if specified
-        target_class = None
-        if selected_class_id:
-            try:
-                target_class = Class.objects.get(pk=selected_class_id)
-                queryset = queryset.filter(student__current_class_id=selected_class_id)
-                print(f"Filtering records for Class: {target_class.name} (ID: {selected_class_id})")
-            except (Class.DoesNotExist, ValueError):
-                 messages.warning(self.request, "Invalid Class specified, showing all classes for the term.")
-                 target_class = None # Reset if class is invalid
-
-        # Select related and order
-        queryset = queryset.select_related(
-                'student__user',
-                'term', # Already filtered, but good practice
-                'student__current_class'
-            ).order_by('student__current_class__name', 'student__user__last_name')
-
-        class_records_grouped = {}
-        for record in queryset:
-            if record.student.current_class:
-                class_obj = record.student.current_class
-                class_id = class_obj.id
-                class_name = class_obj.name
-                if class_id not in class_records_grouped:
-                    class_records_grouped[class_id] = {'name': class_name, 'records': []}
-                class_records_grouped[class_id]['records'].append(record)
-
-        # Store target term/class in context for template display/filtering
-        self.target_term = target_term
-        self.target_class = target_class # Might be None if no class filter applied
+        class_records = term_records.filter(student__current_class_id=summary['id']).select_related(
+            'student__user', 'student__current_class',
+        ).order_by('student__user__last_name', 'student__user__first_name', 'pk')
+        self.records_page = Paginator(class_records, self.records_per_page).get_page(self.request.GET.get('page'))
 
-        return class_records_grouped
+        return {summary['id']: {'name': summary['name'], 'records': list(self.records_page.object_list)}}
 
 
     def get_context_data(self, **kwargs):
@@ -2460,15 +1993,24 @@ class StudentFeeRecordListView(AdminRequiredMixin, ListView):
         # Pass the determined target term and class to the template
         context['term'] = getattr(self, 'target_term', None)
         context['session'] = context['term'].session if context.get('term') else None
-        context['target_class'] = getattr(self, 'target_class', None) # Pass target class if filtered
+        context['target_class'] = getattr(self, 'target_class', None)
+        context['class_summaries'] = getattr(self, 'class_summaries', [])
+        context['records_page'] = getattr(self, 'records_page', None)
+        context['fee_sync_state'] = FeeSyncState.objects.filter(term=context['term']).first() if context['term'] else None
         # Allow selecting other terms/classes (for dropdowns in template perhaps)
         context['all_terms'] = Term.objects.select_related('session').order_by('-start_date')
         context['all_classes'] = Class.objects.order_by('name')
         context.pop('object_list', None)
         return context
 
+    def sync_now(self, request, target_term):
+        request_fee_sync(target_term, force=True)
+        messages.success(request, f"Fee record sync queued for {target_term}. Records update once it finishes.")
+        return redirect(f"{reverse('student_fee_record_list')}?{request.GET.urlencode()}")
+
 
     @transaction.atomic # Process all updates for a class atomically
+    @deferred_financial_rebuilds() # One ledger rebuild for the whole class, not one per row
     def post(self, request, *args, **kwargs):
         """Handle saving changes for a specific class submitted via its form."""
         submitted_class_id_str = request.POST.get('submitted_class_id')
@@ -2487,6 +2029,9 @@ class StudentFeeRecordListView(AdminRequiredMixin, ListView):
              messages.error(request, "Cannot process submission: Term could not be determined.")
              return redirect(request.path_info) 
 
+        if request.POST.get('action') == 'sync_now':
+            return self.sync_now(request, target_term)
+
         if not submitted_class_id_str:
             messages.error(request, "Invalid submission: Missing class identifier.")
             return redirect(request.path_info)
@@ -2857,9 +2402,9 @@ class PaymentCreateView(AdminRequiredMixin, CreateView):
         payment.financial_record = financial_record
 
         try:
-            # Save the payment instance - this will trigger the post_save signal
-            # The signal handler will update the financial_record
-            payment.save()
+            # Post under a row lock on the financial record so concurrent terminals
+            # cannot both pass the overpayment check; the ledger is rebuilt on the way out.
+            payment, = post_payments([payment])
             receipt = create_payment_receipt(
                 [payment],
                 created_by=self.request.user,
@@ -2894,9 +2439,9 @@ class PaymentUpdateView(AdminRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         try:
-            # Saving the form will trigger the post_save signal on Payment
-            # which updates the FinancialRecord
-            payment = form.save()
+            # Saved under a row lock on the financial record, like new payments, so a concurrent
+            # poster cannot slip past the overpayment check; the post_save signal updates the ledger.
+            self.object = update_payment(form.save(commit=False))
             messages.success(self.request, 'Payment updated successfully.')
             return redirect(self.get_success_url())
         except ValidationError as e:
@@ -2935,6 +2480,10 @@ class ReceiptAccessMixin(UserPassesTestMixin):
 
 
 class ReceiptPresentationMixin:
+    def site_origin(self):
+        # SITE_URL keeps share links (and the cached receipt PDFs) the same on every host.
+        return settings.SITE_URL.rstrip('/') or f"{self.request.scheme}://{self.request.get_host()}"
+
     def get_receipt_context(self, receipt, is_shared=False):
         _prepare_receipt_display(receipt)
         school_settings = SystemSettings.get_settings()
@@ -2943,10 +2492,9 @@ class ReceiptPresentationMixin:
         else:
             logo_url = static('images/logo.jpg')
 
-        logo_absolute_url = self.request.build_absolute_uri(logo_url)
-        share_url = self.request.build_absolute_uri(
-            reverse('payment_receipt_share', kwargs={'share_token': receipt.share_token})
-        )
+        origin = self.site_origin() + '/'
+        logo_absolute_url = urljoin(origin, logo_url)
+        share_url = urljoin(origin, reverse('payment_receipt_share', kwargs={'share_token': receipt.share_token}))
         share_message = (
             f"Payment receipt {receipt.receipt_number} for {school_settings.school_name} "
             f"totalling {school_settings.currency_symbol}{receipt.total_amount:.2f}: {share_url}"
@@ -3058,12 +2606,19 @@ class PaymentReceiptDownloadView(ReceiptPresentationMixin, ReceiptAccessMixin, D
 
     def get(self, request, *args, **kwargs):
         receipt = self.get_object()
-        context = {'receipt': receipt, 'request': request}
+        context = {'receipt': receipt, 'request': request, 'is_pdf_render': PDF_AVAILABLE}
         context.update(self.get_receipt_context(receipt, is_shared=False))
         content = render_to_string('payment/receipt_download.html', context)
-        response = HttpResponse(content, content_type='text/html; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="{receipt.receipt_number}.html"'
-        return response
+        if not PDF_AVAILABLE:
+            response = HttpResponse(content, content_type='text/html; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{receipt.receipt_number}.html"'
+            return response
+        # Issued receipts rarely change, so the PDF is rendered once per distinct content and streamed from disk.
+        pdf_path = cached_receipt_pdf(receipt.receipt_number, content, origin=self.site_origin())
+        return FileResponse(
+            pdf_path.open('rb'), as_attachment=True, filename=f"{receipt.receipt_number}.pdf",
+            content_type='application/pdf',
+        )
 
 class PaymentDeleteView(AdminRequiredMixin, DeleteView):
     model = Payment
@@ -3121,45 +2676,14 @@ class FinancialRecordListView(AdminRequiredMixin, ListView):
         context['sessions'] = Session.objects.all().order_by('-start_date')
         context['terms'] = Term.objects.select_related('session').order_by('-start_date')
 
-        # base queryset for totals (apply same filters used for list)
-        totals_qs = FinancialRecord.objects.all()
-        if term_id:
-            try:
-                totals_qs = totals_qs.filter(term_id=int(term_id))
-            except ValueError:
-                pass
-        elif session_id:
-            try:
-                totals_qs = totals_qs.filter(term__session_id=int(session_id))
-            except ValueError:
-                pass
-
-        from decimal import Decimal
-        from django.db.models import Sum
-
-        context['total_fee'] = totals_qs.aggregate(total=Sum('total_fee'))['total'] or Decimal('0.00')
-        context['total_discount'] = totals_qs.aggregate(total=Sum('total_discount'))['total'] or Decimal('0.00')
-        context['total_paid'] = totals_qs.aggregate(total=Sum('total_paid'))['total'] or Decimal('0.00')
-        context['total_outstanding_balance'] = totals_qs.aggregate(total=Sum('outstanding_balance'))['total'] or Decimal('0.00')
-
-        # Summary by class: annotate sums grouped by student's current_class
-        summary_qs = totals_qs.values('student__current_class__name').annotate(
-            expected=Sum('total_fee'),
-            paid=Sum('total_paid'),
-            discounts=Sum('total_discount'),
-            outstanding=Sum('outstanding_balance')
-        ).order_by('student__current_class__name')
-
-        summary_list = []
-        for row in summary_qs:
-            summary_list.append({
-                'class_name': row.get('student__current_class__name') or 'Unassigned',
-                'expected': row.get('expected') or Decimal('0.00'),
-                'paid': row.get('paid') or Decimal('0.00'),
-                'discounts': row.get('discounts') or Decimal('0.00'),
-                'outstanding': row.get('outstanding') or Decimal('0.00'),
-            })
-        context['summary_by_class'] = summary_list
+        # Overall and per-class totals come from one grouped query, cached per (session, term);
+        # archived terms are served from their frozen snapshot.
+        try:
+            summary_session_id = int(session_id) if session_id else None
+            summary_term_id = int(term_id) if term_id else None
+        except ValueError:
+            summary_session_id = summary_term_id = None
+        context.update(get_finance_summary(session_id=summary_session_id, term_id=summary_term_id))
 
         # pass selected ids for templates
         context['selected_session_id'] = int(session_id) if session_id else None
@@ -3167,6 +2691,30 @@ class FinancialRecordListView(AdminRequiredMixin, ListView):
 
         return context
 
+@user_passes_test(lambda u: u.is_superuser)
+def payment_collection_trends_view(request):
+    """
+    JSON collection curve for the finance dashboards, read from PaymentDailyRollup.
+    Query params: period (day/week/month), start, end (YYYY-MM-DD), term_id, class_id,
+    batch_reference and group_by (class/term/batch_reference).
+    """
+    params = request.GET
+    try:
+        start = date.fromisoformat(params['start']) if params.get('start') else None
+        end = date.fromisoformat(params['end']) if params.get('end') else None
+        trends = payment_collection_trends(
+            period=params.get('period', 'day'),
+            start=start,
+            end=end,
+            term_id=int(params['term_id']) if params.get('term_id') else None,
+            class_id=int(params['class_id']) if params.get('class_id') else None,
+            batch_reference=params.get('batch_reference'),
+            group_by=params.get('group_by') or None,
+        )
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(trends)
+
 def update_result(request, student_id, term_id):
     student = get_object_or_404(Student, pk=student_id)
     result = get_object_or_404(Result, student=student, term=term_id)
@@ -12,9 +12,11 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 from decouple import config, Csv
 import dj_database_url
+from celery.schedules import crontab
 
 
 # --- Step 1: Base Directory and .env file loading ---
@@ -132,6 +134,32 @@ else:
     }
 
 
+# Cache
+# The system settings, dashboard and finance version keys and the cached answer keys must be
+# shared by every gunicorn worker, so the cache is Redis when REDIS_URL is set and a database
+# table otherwise (created by migration core 0048). Only the test runner, a single process,
+# keeps a local-memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif len(sys.argv) > 1 and sys.argv[1] == 'test':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'lsaapp_cache',
+        }
+    }
+# The settings, dashboard and finance version keys are re-read from the shared cache at most this
+# often per worker, so an unchanged version costs no cache round trip (no query with the table).
+CACHE_VERSION_CHECK_SECONDS = config('CACHE_VERSION_CHECK_SECONDS', default=5, cast=int)
+
 # --- Step 5: Password, Auth, and Internationalization ---
 
 AUTH_USER_MODEL = 'core.CustomUser'
@@ -231,6 +259,77 @@ if SENTRY_DSN and not DEBUG:
     )
     print("Sentry error tracking is enabled for production.")
 
+# --- BACKGROUND JOBS (CELERY) ---
+
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='')
+# Without a broker, tasks run inline so .delay() keeps working in development.
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_BEAT_SCHEDULE = {
+    'refresh-dashboard-snapshots': {
+        'task': 'core.tasks.refresh_dashboard_snapshots_task',
+        'schedule': config('DASHBOARD_SNAPSHOT_REFRESH_SECONDS', default=600, cast=int),
+        'kwargs': {'include_fresh': True},
+    },
+    'refresh-sessional-broadsheet': {
+        # Safety net for changes that reach the broadsheet without a signal (class moves, bulk edits).
+        'task': 'core.tasks.refresh_sessional_broadsheet_task',
+        'schedule': config('SESSIONAL_BROADSHEET_REFRESH_SECONDS', default=60 * 60, cast=int),
+    },
+    'rollup-activity-logs': {
+        'task': 'core.tasks.rollup_activity_logs_task',
+        'schedule': crontab(hour=config('ACTIVITY_ROLLUP_HOUR', default=1, cast=int), minute=30),
+    },
+    'requeue-stalled-submission-intakes': {
+        'task': 'core.tasks.requeue_stalled_submission_intakes_task',
+        'schedule': 5 * 60,
+    },
+}
+
+# Dashboard snapshots are refreshed by the worker when a broker is configured,
+# otherwise stale snapshots are rebuilt on the next page load.
+DASHBOARD_SNAPSHOT_ASYNC = bool(CELERY_BROKER_URL)
+
+# Deferred FinancialRecord rebuilds larger than this many ledgers are handed to the worker
+# after commit when a broker is configured; smaller batches are rebuilt inline.
+FINANCE_REBUILD_ASYNC = bool(CELERY_BROKER_URL)
+FINANCE_REBUILD_ASYNC_THRESHOLD = config('FINANCE_REBUILD_ASYNC_THRESHOLD', default=500, cast=int)
+
+# With a broker, assessment and exam submits store their raw answers (SubmissionIntake) and are
+# graded by the worker. Intakes pending for SUBMISSION_INTAKE_STALL_SECONDS, or failed, are
+# queued again by the beat task, up to SUBMISSION_INTAKE_MAX_ATTEMPTS tries.
+SUBMISSION_INGEST_ASYNC = config('SUBMISSION_INGEST_ASYNC', default=bool(CELERY_BROKER_URL), cast=bool)
+SUBMISSION_INTAKE_STALL_SECONDS = config('SUBMISSION_INTAKE_STALL_SECONDS', default=300, cast=int)
+SUBMISSION_INTAKE_MAX_ATTEMPTS = config('SUBMISSION_INTAKE_MAX_ATTEMPTS', default=5, cast=int)
+
+# --- ACTIVITY LOG ---
+
+# 'sync' writes each ActivityLog row inside the request, 'buffered' batches them per process and
+# 'queue' hands each batch to the Celery worker. Batches are written every
+# ACTIVITY_LOG_FLUSH_EVERY events or ACTIVITY_LOG_FLUSH_INTERVAL_MS after the first pending one.
+ACTIVITY_LOG_MODE = config('ACTIVITY_LOG_MODE', default='buffered')
+ACTIVITY_LOG_FLUSH_EVERY = config('ACTIVITY_LOG_FLUSH_EVERY', default=50, cast=int)
+ACTIVITY_LOG_FLUSH_INTERVAL_MS = config('ACTIVITY_LOG_FLUSH_INTERVAL_MS', default=2000, cast=int)
+ACTIVITY_LOG_MAX_BUFFER = config('ACTIVITY_LOG_MAX_BUFFER', default=5000, cast=int)
+
+# Each night complete days are rolled up into ActivityDailyRollup (re-rolling the last
+# ACTIVITY_ROLLUP_LOOKBACK_DAYS), and raw ActivityLog / StudentActivityLog rows older than
+# ACTIVITY_LOG_RETENTION_MONTHS full months (0 keeps everything) are moved into monthly
+# gzip JSON Lines files under ACTIVITY_ARCHIVE_DIR.
+ACTIVITY_ROLLUP_LOOKBACK_DAYS = config('ACTIVITY_ROLLUP_LOOKBACK_DAYS', default=3, cast=int)
+ACTIVITY_LOG_RETENTION_MONTHS = config('ACTIVITY_LOG_RETENTION_MONTHS', default=12, cast=int)
+ACTIVITY_ARCHIVE_DIR = config('ACTIVITY_ARCHIVE_DIR', default=str(BASE_DIR / 'activity_archive'))
+
+# --- PDF RENDERING ---
+
+# Rendered receipt PDFs are cached here (outside MEDIA_ROOT, so they are never served directly).
+PDF_CACHE_DIR = config('PDF_CACHE_DIR', default=str(BASE_DIR / 'pdf_cache'))
+# Batches of at least PDF_POOL_THRESHOLD documents are rendered across PDF_RENDER_WORKERS processes.
+PDF_RENDER_WORKERS = config('PDF_RENDER_WORKERS', default=0, cast=int) or None
+PDF_POOL_THRESHOLD = config('PDF_POOL_THRESHOLD', default=8, cast=int)
+# Public origin (e.g. https://learnswift.icu) for links that outlive the request, such as receipt
+# share links. Empty means the host of the current request.
+SITE_URL = config('SITE_URL', default='')
+
 # --- Step 8: CKEditor Configuration ---
 
 customColorPalette = [
@@ -30,15 +30,16 @@ from core.views import custom_404, custom_500, custom_403, custom_400
 from core.views import home, send_test_email
 from core.views import AdminDashboardView, PromoteStudentView, programs, about, contact
 from core.views import CreateNotificationView, NotificationListView
-from core.views import SessionListView, SessionDetailView, SessionCreateView, SessionUpdateView, SessionDeleteView
+from core.views import SessionListView, SessionDetailView, SessionCreateView, SessionUpdateView, SessionDeleteView, RolloverJobDetailView
 from core.views import TermListView, TermDetailView, TermCreateView, TermUpdateView, TermDeleteView, activate_term_view
 from core.views import promote_student, repeat_student, demote_student, mark_dormant_student, mark_left_student, mark_active, unenroll_student
 from core.views import create_assessment as admin_create_assessment, update_assessment as admin_update_assessment_view, admin_assessment_list, approve_assessment, pending_assessments, view_assessment as admin_view_assessment_view, admin_delete_assessment, assessment_submissions_list, class_subjects
 from core.views import create_exam as admin_create_exam, update_exam as admin_update_exam_view, admin_exam_list, approve_exam, pending_exams, view_exam as admin_view_exam_view, admin_delete_exam, exam_submissions_list
 from core.views import broadsheets, termly_broadsheet, approve_termly_broadsheet, archive_termly_broadsheet, admin_leaderboard_view
+from core.views import ReportCardJobCreateView, ReportCardJobDetailView, ReportCardJobDownloadView
 from core.views import sessional_broadsheets, admin_sessional_broadsheet, approve_sessional_broadsheet, archive_sessional_broadsheet
 from core.views import FeeAssignmentCreateView, FeeAssignmentListView, FeeAssignmentUpdateView, FeeAssignmentDetailView, FeeAssignmentDeleteView, StudentFeeRecordListView, FeeAssignmentRolloverView
-from core.views import BulkPaymentView, PaymentCreateView, PaymentListView, PaymentUpdateView, PaymentDetailView, PaymentDeleteView, PaymentReceiptDetailView, PaymentReceiptDownloadView, PaymentReceiptListView, PaymentReceiptShareView, FinancialRecordListView
+from core.views import BulkPaymentView, PaymentCreateView, PaymentListView, PaymentUpdateView, PaymentDetailView, PaymentDeleteView, PaymentReceiptDetailView, PaymentReceiptDownloadView, PaymentReceiptListView, PaymentReceiptShareView, FinancialRecordListView, payment_collection_trends_view
 from core.views import StudentClassEnrollmentView, StudentEnrollmentsView, message_inbox, grant_retake, message_thread, compose_message
 from core.views import AssignSubjectView, AssignTeacherView, AssignClassSubjectView, ClassSubjectRolloverView, DeleteClassSubjectAssigmentView
 from core.views import TeacherAssignmentListView, TeacherAssignmentRolloverView, TeacherAssignmentUpdateView, TeacherAssignmentDetailView, TeacherAssignmentDeleteView
@@ -48,10 +49,10 @@ from core.views import CategoryCreateView, CategoryUpdateView, ManageCategoryLis
 from core.student.views import StudentListView, StudentCreateView, StudentUpdateView, StudentDetailView, StudentDeleteView, BulkUpdateStudentsView, export_students, student_reports
 from core.student.views import submit_assignment as student_submit_assignment, start_assignment, take_assignment, autosubmit_beacon_assignment
 from core.student.views import submit_assessment as student_submit_assessment, start_assessment, take_assessment, autosubmit_beacon_assessment
-from core.student.views import submit_exam as student_submit_exam, start_exam, take_exam, autosubmit_beacon_exam
+from core.student.views import submit_exam as student_submit_exam, start_exam, take_exam, autosubmit_beacon_exam, submission_status
 from core.student.views import view_assignment_result as student_view_assignment_result, view_assessment_result as student_view_assessment_result, view_exam_result as student_view_exam_result
 from core.teacher.views import TeacherListView, TeacherCreateView, TeacherUpdateView, TeacherDetailView, TeacherDeleteView, TeacherBulkActionView, export_teachers, teacher_reports
-from core.teacher.views import input_scores, broadsheet, sessional_broadsheet, mark_attendance, attendance_log, update_result, view_na_result, grade_essay_questions
+from core.teacher.views import input_scores, broadsheet, sessional_broadsheet, mark_attendance, attendance_log, attendance_heatmap, update_result, view_na_result, grade_essay_questions
 from core.teacher.views import create_assignment, add_question, grade_assignment, assignment_submissions_list, update_assignment, delete_assignment, assignment_detail, assignment_list
 from core.teacher.views import create_assessment as teacher_create_assessment, teacher_assessment_list, view_assessment as teacher_view_assessment, update_assessment as teacher_update_assessment, delete_assessment, grade_essay_assessment
 from core.teacher.views import create_exam as teacher_create_exam, teacher_exam_list, view_exam as teacher_view_exam, update_exam as teacher_update_exam, delete_exam, grade_essay_exam
@@ -142,6 +143,7 @@ urlpatterns = [
     path('sessions/update/<int:pk>/', SessionUpdateView.as_view(), name='session_update'),
     path('sessions/<int:pk>/', SessionDetailView.as_view(), name='session_detail'),
     path('sessions/<int:pk>/delete/', SessionDeleteView.as_view(), name='session_delete'),
+    path('rollover-jobs/<int:pk>/', RolloverJobDetailView.as_view(), name='rollover_job_detail'),
 
     path('terms/', TermListView.as_view(), name='term_list'),
     path('terms/create/', TermCreateView.as_view(), name='term_create'),
@@ -166,6 +168,9 @@ urlpatterns = [
     # Broadsheet URLs
     path('all_broadsheets/', broadsheets, name='termly_broadsheets'),
     path('broadsheets/term/<int:term_id>/', termly_broadsheet, name='termly_broadsheet'),
+    path('report-cards/', ReportCardJobCreateView.as_view(), name='report_card_job_create'),
+    path('report-cards/<int:pk>/', ReportCardJobDetailView.as_view(), name='report_card_job_detail'),
+    path('report-cards/<int:pk>/download/', ReportCardJobDownloadView.as_view(), name='report_card_job_download'),
     path('broadsheets/approve/<int:term_id>/<int:class_id>/', approve_termly_broadsheet, name='approve_termly_broadsheet'),
     path('broadsheets/archive/<int:term_id>/', archive_termly_broadsheet, name='archive_termly_broadsheet'),
     path('admin-leaderboards/', admin_leaderboard_view, name='admin_leaderboard_list'),
@@ -215,6 +220,7 @@ urlpatterns = [
     path('teacher/dashboard/', teacher_dashboard, name='teacher_dashboard'),
     path('mark_attendance/<int:class_id>/', mark_attendance, name='mark_attendance'),
     path('attendance_log/<int:class_id>', attendance_log, name='attendance_log'),
+    path('attendance_log/<int:class_id>/heatmap/', attendance_heatmap, name='attendance_heatmap'),
     path('input_scores/<int:class_id>/<int:subject_id>/<int:term_id>/', input_scores, name='input_scores'),
     path('update_result/student/<int:student_id>/result/<int:term_id>/update/', update_result, name='update_result'),
     path('view_na_result/<int:student_id>/<int:term_id>/', view_na_result, name='view_na_result'),
@@ -286,6 +292,7 @@ urlpatterns = [
     path('payments/receipts/share/<uuid:share_token>/', PaymentReceiptShareView.as_view(), name='payment_receipt_share'),
     path('payments/delete/<int:pk>/', PaymentDeleteView.as_view(), name='delete_payment'),
     path('financial-records/', FinancialRecordListView.as_view(), name='financial_record_list'),
+    path('financial-records/collection-trends/', payment_collection_trends_view, name='payment_collection_trends'),
 
     # Assignment URLs
     path('assignments/create/', create_assignment, name='create_assignment'),
@@ -350,6 +357,7 @@ urlpatterns = [
     path('exam/submission/<int:submission_id>/take/', take_exam, name='take_exam'),
     path('exam/submission/<int:submission_id>/submit/', student_submit_exam, name='submit_exam'),
     path('exam/submission/<int:submission_id>/autosubmit-beacon/', autosubmit_beacon_exam, name='exam_autosubmit_beacon'),
+    path('submission/<str:kind>/<int:submission_id>/status/', submission_status, name='submission_status'),
     
     # --- Retake Admin/Teacher URL ---
     path('retake/grant/<str:item_type>/<int:item_id>/<int:student_id>/', grant_retake, name='grant_retake'),
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lsalms', '0007_alter_contentblock_order_alter_lesson_order_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentactivitylog',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -409,7 +409,7 @@ class StudentActivityLog(models.Model):
 
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='lsalms_activity_logs')
     activity_type = models.CharField(max_length=30, choices=ActivityType.choices, db_index=True)
-    timestamp = models.DateTimeField(default=timezone.now)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     
     # Generic link to any model in the system (Lesson, Quiz, Course)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)